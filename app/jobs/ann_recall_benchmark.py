@@ -0,0 +1,160 @@
+# app/jobs/ann_recall_benchmark.py
+# Recall vs latency of the books ANN index across search parameters.
+#
+# Ground truth is exact: seeds are sampled from a local export of the collection
+# (python -m app.jobs.export_local_store <dir>) and their true top-k neighbours computed by brute
+# force in the LocalMilvusClient. Each grid setting then runs the same seed searches against the
+# ANN target (the Zilliz collection) and reports recall@k and p50/p99 latency, plus the cheapest
+# setting (lowest p50) that meets --target-recall. Put it in ANN_SEARCH_PARAMS.
+#
+# Grids are name=v1,v2,... (repeat --grid for a cartesian product); the default sweeps the Zilliz
+# AUTOINDEX `level`. Seeds whose vectors changed since the export are not excluded, so re-export first.
+#
+# Usage: python -m app.jobs.ann_recall_benchmark <export dir> [--seeds 200] [--k 10]
+#        [--grid level=1,2,3,5] [--grid ef=...] [--target-recall 0.95] [--collection books]
+#        [--export-collection books] [--no-defaults] [--json]
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.utils.ann_search_params import validate_ann_params
+from app.utils.metrics import percentile
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = "level=1,2,3,4,5"
+
+
+def parse_grid(specs: list[str]) -> list[dict]:
+    """['ef=16,32', 'nprobe=8'] -> every combination, each validated like ANN_SEARCH_PARAMS ([{}] for none)."""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Bad grid '{spec}' (expected name=v1,v2,...)")
+        axes.append([(name.strip(), int(v)) for v in values.split(",") if v.strip()])
+    return [validate_ann_params(dict(combo)) for combo in itertools.product(*axes)]
+
+
+def sample_seeds(store, collection: str, n: int, seed: int = 7) -> list[tuple[object, list[float]]]:
+    """(id, vector) for `n` random rows of the exported collection."""
+    ids = [r["id"] for r in store.query(collection_name=collection, filter="", output_fields=["id"])]
+    chosen = random.Random(seed).sample(ids, min(n, len(ids)))
+    rows = store.query(collection_name=collection, filter=f"id in {json.dumps(chosen)}", output_fields=["embedding"])
+    return [(r["id"], list(r["embedding"])) for r in rows]
+
+
+def _neighbour_ids(hits: list, seed_id, k: int) -> list:
+    return [h.get("id") for h in hits if h.get("id") != seed_id][:k]
+
+
+def ground_truth(store, collection: str, seeds: list[tuple[object, list[float]]], k: int, batch: int = 64) -> dict:
+    """Exact top-k neighbour ids per seed (the seed itself excluded)."""
+    truth = {}
+    for start in range(0, len(seeds), batch):
+        chunk = seeds[start : start + batch]
+        results = store.search(collection_name=collection, data=[v for _, v in chunk], limit=k + 1, output_fields=[])
+        for (seed_id, _), hits in zip(chunk, results):
+            truth[seed_id] = _neighbour_ids(hits, seed_id, k)
+    return truth
+
+
+def recall_at_k(found: list, expected: list) -> float:
+    return len(set(found) & set(expected)) / len(expected) if expected else 1.0
+
+
+def sweep(client, collection: str, seeds, truth: dict, grid: list[dict], k: int = 10) -> list[dict]:
+    """One row per setting: recall@k and latency percentiles of single-vector searches against `client`."""
+    rows = []
+    for params in grid:
+        search_kwargs = {"search_params": {"params": params}} if params else {}
+        latencies: list[float] = []
+        recalls: list[float] = []
+        for seed_id, vector in seeds:
+            start = time.perf_counter()
+            results = client.search(
+                collection_name=collection, data=[vector], limit=k + 1, output_fields=[], **search_kwargs
+            )
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            recalls.append(recall_at_k(_neighbour_ids(results[0] if results else [], seed_id, k), truth[seed_id]))
+        latencies.sort()
+        rows.append(
+            {
+                "params": params,
+                "recall": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+            }
+        )
+        logger.info("%s recall@%s=%.3f p50=%.1fms", params or "defaults", k, rows[-1]["recall"], rows[-1]["p50_ms"])
+    return rows
+
+
+def cheapest_meeting(rows: list[dict], target_recall: float) -> Optional[dict]:
+    """Lowest-p50 setting whose recall reaches the target (None when no setting does)."""
+    meeting = [r for r in rows if r["recall"] >= target_recall]
+    return min(meeting, key=lambda r: (r["p50_ms"], r["p99_ms"])) if meeting else None
+
+
+def format_report(rows: list[dict], k: int, target_recall: float) -> str:
+    lines = [f"{'params':<28} {'recall@' + str(k):>10} {'p50 ms':>9} {'p99 ms':>9}"]
+    for r in rows:
+        label = json.dumps(r["params"]) if r["params"] else "(cluster defaults)"
+        lines.append(f"{label:<28} {r['recall']:>10.3f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+    best = cheapest_meeting(rows, target_recall)
+    if best is None:
+        lines.append(f"No setting reaches recall@{k} >= {target_recall}")
+    else:
+        lines.append(f"Cheapest setting with recall@{k} >= {target_recall}: ANN_SEARCH_PARAMS='{json.dumps(best['params'])}'")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Sweep ANN search params: recall@k vs latency against exact ground truth.")
+    parser.add_argument("export", help="LocalMilvusClient export of the collection (ground truth vectors)")
+    parser.add_argument("--collection", default=os.getenv("ZILLIZ_COLLECTION", "books"), help="Zilliz collection")
+    parser.add_argument("--export-collection", default="books", help="Collection name inside the export")
+    parser.add_argument("--seeds", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--grid", action="append", help=f"name=v1,v2,... (default {DEFAULT_GRID})")
+    parser.add_argument("--no-defaults", action="store_true", help="Skip the cluster-defaults baseline row")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    from pymilvus import MilvusClient
+
+    from app.utils.local_vector_store import LocalMilvusClient
+
+    store = LocalMilvusClient(args.export, must_exist=True)
+    seeds = sample_seeds(store, args.export_collection, args.seeds)
+    if not seeds:
+        parser.error(f"No rows in {args.export_collection} under {args.export}")
+    start = time.perf_counter()
+    truth = ground_truth(store, args.export_collection, seeds, args.k)
+    logger.info("Exact top-%s for %s seeds in %.1fs", args.k, len(seeds), time.perf_counter() - start)
+
+    grid = parse_grid(args.grid or [DEFAULT_GRID])
+    if not args.no_defaults:
+        grid = [{}] + grid
+    client = MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+    rows = sweep(client, args.collection, seeds, truth, grid, k=args.k)
+    if args.json:
+        print(json.dumps({"rows": rows, "best": cheapest_meeting(rows, args.target_recall)}, indent=2))
+    else:
+        print(format_report(rows, args.k, args.target_recall))
+
+
+if __name__ == "__main__":
+    main()
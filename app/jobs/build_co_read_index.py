@@ -0,0 +1,93 @@
+# app/jobs/build_co_read_index.py
+# Build the item-item co-read index (CO_READ_INDEX_PATH) from reading history, or apply the reads
+# added since the last run. See app/services/co_read_index.py for the scoring and file layout.
+#
+# History comes from Mongo Books.books_with_metadata ({user_id, work_key, read_at}), read in _id
+# order; the last _id is the watermark --incremental resumes from. --jsonl reads an export with one
+# {"user_id", "work_key"} object per line instead (--incremental then appends every line in it).
+#
+# Usage: python -m app.jobs.build_co_read_index <dir> [--k 20] [--min-co-reads 2] [--block-size 2048]
+#        [--incremental] [--jsonl <file>]
+
+import argparse
+import json
+import logging
+import time
+
+from dotenv import load_dotenv
+
+from app.services.co_read_index import (
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_K,
+    DEFAULT_MIN_CO_READS,
+    apply_reads,
+    build_co_read_index,
+    read_meta,
+    set_watermark,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class MongoHistory:
+    """(user_id, work_key) reads after `since` (an _id string) in _id order; `.last` is the final _id seen."""
+
+    def __init__(self, since=None):
+        self.since = since
+        self.last = since
+
+    def __iter__(self):
+        from bson import ObjectId
+
+        from app.utils.db import get_books_collection
+
+        query = {"_id": {"$gt": ObjectId(self.since)}} if self.since else {}
+        cursor = get_books_collection().find(query, {"_id": 1, "user_id": 1, "work_key": 1}).sort("_id", 1)
+        for n, doc in enumerate(cursor, start=1):
+            self.last = str(doc["_id"])
+            yield doc.get("user_id"), doc.get("work_key")
+            if n % 1_000_000 == 0:
+                logger.info("Read %s history events", n)
+
+
+def jsonl_history(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                doc = json.loads(line)
+                yield doc.get("user_id"), doc.get("work_key")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Build or update the co-read (readers also read) index.")
+    parser.add_argument("path", help="Index directory (becomes CO_READ_INDEX_PATH)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Co-read works kept per book")
+    parser.add_argument("--min-co-reads", type=int, default=DEFAULT_MIN_CO_READS, help="Readers two books need in common")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Works per sparse product")
+    parser.add_argument("--incremental", action="store_true", help="Apply reads added since the last run")
+    parser.add_argument("--jsonl", help="Read history from a JSONL export instead of Mongo")
+    args = parser.parse_args()
+
+    history = None
+    if not args.jsonl:
+        history = MongoHistory(read_meta(args.path).get("watermark") if args.incremental else None)
+    events = history if history is not None else jsonl_history(args.jsonl)
+    start = time.perf_counter()
+    if args.incremental:
+        updated = apply_reads(args.path, events, block_size=args.block_size)
+        logger.info("Rewrote %s co-read lists in %s in %.0fs", updated, args.path, time.perf_counter() - start)
+    else:
+        count = build_co_read_index(
+            events, args.path, k=args.k, min_co_reads=args.min_co_reads, block_size=args.block_size
+        )
+        logger.info("Indexed %s books (k=%s) -> %s in %.0fs", count, args.k, args.path, time.perf_counter() - start)
+    # Only once the reads are in the index, so an interrupted run re-reads them (re-applying is a no-op)
+    if history is not None and history.last is not None:
+        set_watermark(args.path, history.last)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# app/jobs/build_mood_centroids.py
+# Embed every MOOD_SUBJECT_MAP subject once and write one centroid per mood, so /recommend/mood
+# serves with a single vector search. Point the API at the output with MOOD_CENTROIDS_PATH.
+# Requires EMBEDDING_API_TOKEN (same model as the stored book vectors).
+#
+# Usage: python -m app.jobs.build_mood_centroids [path]   (defaults to $MOOD_CENTROIDS_PATH)
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+from app.routes.recommendations import MOOD_SUBJECT_MAP
+from app.services.mood_centroids import build_centroids, centroids_path, save_centroids
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Build mood centroid vectors for /recommend/mood.")
+    parser.add_argument("path", nargs="?", default=centroids_path(), help="Output JSON (default: $MOOD_CENTROIDS_PATH)")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no output path (pass one or set MOOD_CENTROIDS_PATH)")
+
+    centroids = asyncio.run(build_centroids(MOOD_SUBJECT_MAP))
+    if not centroids:
+        logger.error("No centroids built; is EMBEDDING_API_TOKEN set?")
+        sys.exit(1)
+    save_centroids(args.path, centroids, MOOD_SUBJECT_MAP)
+    missing = sorted(set(MOOD_SUBJECT_MAP) - set(centroids))
+    logger.info("Wrote %s/%s mood centroids -> %s", len(centroids), len(MOOD_SUBJECT_MAP), args.path)
+    if missing:
+        logger.warning("Moods without centroids (served by subject filter): %s", ", ".join(missing))
+
+
+if __name__ == "__main__":
+    main()
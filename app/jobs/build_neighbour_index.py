@@ -0,0 +1,67 @@
+# app/jobs/build_neighbour_index.py
+# Precompute every catalog book's top-K neighbours so Tier 1 /recommend is served from a
+# memory-mapped table (NEIGHBOUR_INDEX_PATH) instead of a Zilliz search. See
+# app/services/neighbour_index.py for the file layout and incremental updates.
+#
+# Usage: python -m app.jobs.build_neighbour_index <dir> [--k 20] [--explanations] [--with-descriptions]
+#        [--batch-size 1000] [--search-batch 64] [--limit N] [--local <LOCAL_VECTOR_STORE_PATH>]
+
+import argparse
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from app.routes.recommendations import COLLECTION_NAME, OUTPUT_FIELDS
+from app.services.neighbour_index import DEFAULT_K, build_neighbour_index
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Build the precomputed book neighbour index.")
+    parser.add_argument("path", help="Index directory (becomes NEIGHBOUR_INDEX_PATH)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Neighbours kept per book (max page size served)")
+    parser.add_argument("--explanations", action="store_true", help="Store rendered explanations per neighbour")
+    parser.add_argument(
+        "--with-descriptions",
+        action="store_true",
+        help="Store descriptions too (needed to serve requests without a `fields` projection)",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--search-batch", type=int, default=64, help="Query vectors per search call")
+    parser.add_argument("--limit", type=int, default=-1)
+    parser.add_argument("--local", help="Read from a LocalMilvusClient directory instead of Zilliz")
+    args = parser.parse_args()
+
+    if args.local:
+        from app.utils.local_vector_store import LocalMilvusClient
+
+        client = LocalMilvusClient(args.local)
+    else:
+        from pymilvus import MilvusClient
+
+        client = MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+
+    fields = [f for f in OUTPUT_FIELDS if args.with_descriptions or f != "description"]
+    start = time.perf_counter()
+    count = build_neighbour_index(
+        client,
+        args.path,
+        collection_name=COLLECTION_NAME,
+        fields=fields,
+        k=args.k,
+        batch_size=args.batch_size,
+        search_batch=args.search_batch,
+        with_explanations=args.explanations,
+        limit=args.limit,
+    )
+    logger.info("Indexed %s books (k=%s) -> %s in %.0fs", count, args.k, args.path, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+# app/jobs/catalog_snapshot.py
+# Columnar snapshots of the books collection for offline jobs, local rebuilds and disaster recovery.
+#
+# `export` streams the collection with query_iterator (one pass per partition) into chunk files of
+# --chunk-rows rows: Arrow IPC (`.arrow`, the default, uncompressed so loaders memory-map it) or
+# Parquet (`.parquet`, smaller, decoded on read). Scalars keep their types; `embedding` is a
+# fixed-size-list<float32> column, so vector_matrix() hands a chunk's vectors to NumPy as a
+# (rows, dim) view of the mapped file without copying. manifest.json records the schema, index
+# definitions, chunks (rows, partition, id range) and the id watermark: `export --incremental`
+# only fetches rows with id above it and appends new chunks. Tier 2 write-backs get increasing
+# time-based ids, so they are picked up; upserts or deletes of older rows are not.
+#
+# `import` bulk-inserts a snapshot into a fresh collection (schema, indexes and partitions recreated
+# from the manifest), or into a LocalMilvusClient directory with --local.
+#
+# Needs pyarrow (imported on use; the API never loads this module).
+#
+# Usage: python -m app.jobs.catalog_snapshot export <dir> [--collection books] [--format arrow|parquet]
+#        [--chunk-rows 100000] [--incremental] [--limit N] [--local <LOCAL_VECTOR_STORE_PATH>]
+#        python -m app.jobs.catalog_snapshot import <dir> [--collection books] [--drop-target] [--alias NAME]
+#        [--local <LOCAL_VECTOR_STORE_PATH>]
+#        python -m app.jobs.catalog_snapshot info <dir>
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.jobs.migrate_subject_tags import describe_indexes, index_params_from, schema_from_description
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "books"
+MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 1
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_PARTITION = "_default"
+
+
+# --- Manifest ---
+
+
+def read_manifest(directory: str) -> Optional[dict]:
+    """The snapshot's manifest, or None when `directory` holds no snapshot."""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version in {path}")
+    return manifest
+
+
+def _write_manifest(directory: str, manifest: dict) -> None:
+    path = os.path.join(directory, MANIFEST)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, default=str)
+    os.replace(tmp, path)
+
+
+def _type_name(value) -> Optional[str]:
+    return None if value is None else getattr(value, "name", str(value))
+
+
+def _portable_description(description: dict) -> dict:
+    """describe_collection with DataType enums as names, so it survives JSON."""
+    fields = []
+    for f in description.get("fields", []):
+        field = {k: v for k, v in f.items() if k not in ("type", "element_type")}
+        field["type"] = _type_name(f.get("type"))
+        if f.get("element_type") is not None:
+            field["element_type"] = _type_name(f["element_type"])
+        fields.append(field)
+    return {
+        "auto_id": bool(description.get("auto_id", False)),
+        "enable_dynamic_field": bool(description.get("enable_dynamic_field", False)),
+        "fields": fields,
+    }
+
+
+def _new_manifest(client, collection: str, fmt: str) -> dict:
+    description = _portable_description(client.describe_collection(collection_name=collection))
+    primary = next((f["name"] for f in description["fields"] if f.get("is_primary")), "id")
+    vector = next((f for f in description["fields"] if f["type"] == "FLOAT_VECTOR"), {"name": "embedding"})
+    return {
+        "version": SNAPSHOT_VERSION,
+        "collection": collection,
+        "format": fmt,
+        "primary_key": primary,
+        "vector_field": vector["name"],
+        "dim": int((vector.get("params") or {}).get("dim", 0)) or None,
+        "description": description,
+        "indexes": describe_indexes(client, collection) if hasattr(client, "list_indexes") else [],
+        "rows": 0,
+        "watermark": None,
+        "chunks": [],
+        "exports": [],
+    }
+
+
+# --- Export ---
+
+
+def _list_partitions(client, collection: str) -> list[str]:
+    if hasattr(client, "list_partitions"):
+        return list(client.list_partitions(collection_name=collection)) or [DEFAULT_PARTITION]
+    return [DEFAULT_PARTITION]
+
+
+def _chunk_table(rows: list[dict], vector_field: str, dim: int, scalar_schema=None):
+    """Rows -> Arrow table: scalars as inferred (or `scalar_schema`), vectors as fixed_size_list<float32>[dim]."""
+    import pyarrow as pa
+
+    vectors = np.asarray([r[vector_field] for r in rows], dtype=np.float32).reshape(len(rows), dim)
+    scalars = [{k: v for k, v in r.items() if k != vector_field} for r in rows]
+    table = pa.Table.from_pylist(scalars, schema=scalar_schema)
+    embedding = pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), dim)
+    return table.append_column(pa.field(vector_field, pa.list_(pa.float32(), dim), nullable=False), embedding)
+
+
+def _write_chunk(path: str, table, fmt: str) -> None:
+    import pyarrow as pa
+
+    tmp = f"{path}.tmp"
+    if fmt == "arrow":
+        table = table.combine_chunks()
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def _scalar_schema(directory: str, manifest: dict):
+    """Scalar columns of the first chunk, so incremental chunks keep the snapshot's column types."""
+    if not manifest["chunks"]:
+        return None
+    table = read_chunk(directory, manifest["chunks"][0])
+    return table.drop_columns([manifest["vector_field"]]).schema
+
+
+def export_snapshot(
+    client,
+    collection: str,
+    directory: str,
+    *,
+    fmt: str = "arrow",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    batch_size: int = 1000,
+    incremental: bool = False,
+    limit: int = -1,
+) -> dict:
+    """
+    Stream `collection` into chunk files under `directory` and (re)write its manifest. With
+    `incremental`, only rows whose primary key is above the manifest's watermark are fetched. Returns
+    this export's entry: {"since", "rows", "chunks", "watermark", ...}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown snapshot format {fmt!r} (expected one of {sorted(FORMATS)})")
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    if manifest is not None and not incremental:
+        raise ValueError(f"{directory} already holds a snapshot; export --incremental to extend it")
+    if manifest is None:
+        manifest = _new_manifest(client, collection, fmt)
+    fmt = manifest["format"]
+    vector_field = manifest["vector_field"]
+    since = manifest["watermark"]
+    expr = "" if since is None else f"{manifest['primary_key']} > {json.dumps(since)}"
+    scalar_schema = _scalar_schema(directory, manifest)
+    watermark = since
+    exported = 0
+    new_chunks = 0
+    start = time.perf_counter()
+
+    def flush(rows: list[dict], partition: str) -> None:
+        nonlocal scalar_schema, watermark, exported, new_chunks
+        dim = manifest["dim"] = manifest["dim"] or len(rows[0][vector_field])
+        table = _chunk_table(rows, vector_field, dim, scalar_schema)
+        if scalar_schema is None:
+            scalar_schema = table.drop_columns([vector_field]).schema
+        name = f"chunk-{len(manifest['chunks']):05d}{FORMATS[fmt]}"
+        _write_chunk(os.path.join(directory, name), table, fmt)
+        ids = [r[manifest["primary_key"]] for r in rows]
+        manifest["chunks"].append(
+            {"file": name, "rows": len(rows), "partition": partition, "min_id": min(ids), "max_id": max(ids)}
+        )
+        watermark = max(ids) if watermark is None else max(watermark, max(ids))
+        exported += len(rows)
+        new_chunks += 1
+        logger.info("Wrote %s (%s rows, %.0f rows/s)", name, len(rows), exported / max(time.perf_counter() - start, 1e-9))
+
+    for partition in _list_partitions(client, collection):
+        remaining = -1 if limit < 0 else limit - exported
+        if remaining == 0:
+            break
+        iterator = client.query_iterator(
+            collection_name=collection,
+            batch_size=batch_size,
+            limit=remaining,
+            filter=expr,
+            output_fields=["*"],
+            partition_names=[partition],
+        )
+        pending: list[dict] = []
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                pending.extend(dict(r) for r in batch)
+                while len(pending) >= chunk_rows:
+                    flush(pending[:chunk_rows], partition)
+                    pending = pending[chunk_rows:]
+        finally:
+            iterator.close()
+        if pending:
+            flush(pending, partition)
+
+    entry = {
+        "taken_at": datetime.now(timezone.utc).isoformat(),
+        "since": since,
+        "rows": exported,
+        "chunks": new_chunks,
+        "watermark": watermark,
+    }
+    manifest["rows"] += exported
+    manifest["watermark"] = watermark
+    manifest["exports"].append(entry)
+    _write_manifest(directory, manifest)
+    return entry
+
+
+# --- Loading ---
+
+
+def read_chunk(directory: str, chunk: dict, columns: Optional[list[str]] = None):
+    """
+    One chunk as a pyarrow Table. Arrow chunks are memory-mapped (nothing is read until a column is
+    touched, and buffers point into the page cache); Parquet chunks are decoded into memory.
+    """
+    import pyarrow as pa
+
+    path = os.path.join(directory, chunk["file"])
+    if path.endswith(FORMATS["arrow"]):
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return table.select(columns) if columns else table
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def iter_chunks(
+    directory: str, columns: Optional[list[str]] = None, partitions: Optional[list[str]] = None
+) -> Iterator[tuple[dict, object]]:
+    """(manifest chunk entry, Table) for every chunk, optionally only those of `partitions`."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {directory}")
+    for chunk in manifest["chunks"]:
+        if partitions is None or chunk.get("partition") in partitions:
+            yield chunk, read_chunk(directory, chunk, columns)
+
+
+def vector_matrix(table, field: str = "embedding") -> np.ndarray:
+    """
+    (rows, dim) float32 array of a fixed-size-list column. For a single-batch table (any one chunk)
+    it is a read-only view of the Arrow buffer, i.e. of the mapped file; tables spanning several
+    batches are concatenated (one copy).
+    """
+    column = table.column(field)
+    dim = column.type.list_size
+    parts = [c.flatten().to_numpy(zero_copy_only=True).reshape(-1, dim) for c in column.chunks]
+    if not parts:
+        return np.zeros((0, dim), dtype=np.float32)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def load_table(directory: str, columns: Optional[list[str]] = None, partitions: Optional[list[str]] = None):
+    """Every chunk as one Table (chunks are not copied; each stays its own batch)."""
+    import pyarrow as pa
+
+    return pa.concat_tables([table for _, table in iter_chunks(directory, columns, partitions)])
+
+
+# --- Import ---
+
+
+def _milvus_description(description: dict) -> dict:
+    from pymilvus import DataType
+
+    fields = []
+    for f in description["fields"]:
+        field = dict(f)
+        try:
+            field["type"] = DataType[f["type"]]
+            if f.get("element_type") is not None:
+                field["element_type"] = DataType[f["element_type"]]
+        except KeyError as e:
+            raise ValueError(f"Field {f['name']!r} has no Milvus type ({e}); was the snapshot taken from a local store?")
+        fields.append(field)
+    return {**description, "fields": fields}
+
+
+def snapshot_partitions(manifest: dict) -> list[str]:
+    """Named partitions the snapshot's chunks came from (the default partition excluded)."""
+    seen = dict.fromkeys(c.get("partition") or DEFAULT_PARTITION for c in manifest["chunks"])
+    return [name for name in seen if name != DEFAULT_PARTITION]
+
+
+def create_collection_from_snapshot(client, manifest: dict, collection: str) -> None:
+    """Create `collection` on Zilliz/Milvus with the snapshot's schema, indexes and partitions."""
+    schema = schema_from_description(_milvus_description(manifest["description"]))
+    index_params = index_params_from(manifest["indexes"])
+    client.create_collection(collection_name=collection, schema=schema, index_params=index_params)
+    for name in snapshot_partitions(manifest):
+        client.create_partition(collection_name=collection, partition_name=name)
+
+
+def import_snapshot(client, directory: str, collection: str, *, batch_size: int = 1000) -> int:
+    """
+    Insert every chunk into `collection` (already created, with the snapshot's partitions), each
+    row into the partition it was exported from. Null scalars are left out of the row. Returns rows.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {directory}")
+    vector_field = manifest["vector_field"]
+    imported = 0
+    start = time.perf_counter()
+    for chunk, table in iter_chunks(directory):
+        partition = chunk.get("partition") or DEFAULT_PARTITION
+        kwargs = {} if partition == DEFAULT_PARTITION else {"partition_name": partition}
+        vectors = vector_matrix(table, vector_field)
+        scalars = table.drop_columns([vector_field])
+        for offset in range(0, table.num_rows, batch_size):
+            rows = []
+            for row, vector in zip(scalars.slice(offset, batch_size).to_pylist(), vectors[offset : offset + batch_size].tolist()):
+                rows.append({**{k: v for k, v in row.items() if v is not None}, vector_field: vector})
+            client.insert(collection_name=collection, data=rows, **kwargs)
+            imported += len(rows)
+        logger.info("Imported %s (%s rows, %.0f rows/s)", chunk["file"], imported, imported / max(time.perf_counter() - start, 1e-9))
+    return imported
+
+
+# --- CLI ---
+
+
+def _zilliz_client():
+    from pymilvus import MilvusClient
+
+    return MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+
+
+def _local_client(path: str, dim: Optional[int] = None):
+    from app.utils.local_vector_store import DEFAULT_DIM, LocalMilvusClient
+
+    return LocalMilvusClient(path, dim=dim or DEFAULT_DIM)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Export/import columnar (Arrow/Parquet) snapshots of the books collection.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Snapshot a collection into a directory")
+    export.add_argument("path", help="Snapshot directory")
+    export.add_argument("--collection", default=os.getenv("ZILLIZ_COLLECTION", COLLECTION_NAME))
+    export.add_argument("--format", choices=sorted(FORMATS), default="arrow")
+    export.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    export.add_argument("--batch-size", type=int, default=1000)
+    export.add_argument("--incremental", action="store_true", help="Append rows above the snapshot's id watermark")
+    export.add_argument("--limit", type=int, default=-1)
+    export.add_argument("--local", help="Export from a LocalMilvusClient directory instead of Zilliz")
+    restore = commands.add_parser("import", help="Bulk-insert a snapshot into a fresh collection")
+    restore.add_argument("path", help="Snapshot directory")
+    restore.add_argument("--collection", default=COLLECTION_NAME, help="Target collection")
+    restore.add_argument("--batch-size", type=int, default=1000)
+    restore.add_argument("--drop-target", action="store_true", help="Drop an existing target collection first")
+    restore.add_argument("--alias", help="Point this alias at the target once it is loaded")
+    restore.add_argument("--local", help="Import into a LocalMilvusClient directory instead of Zilliz")
+    info = commands.add_parser("info", help="Print a snapshot's manifest summary")
+    info.add_argument("path", help="Snapshot directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        manifest = read_manifest(args.path)
+        if manifest is None:
+            parser.error(f"No snapshot in {args.path}")
+        summary = {k: manifest[k] for k in ("collection", "format", "rows", "watermark", "dim", "vector_field")}
+        print(json.dumps({**summary, "chunks": len(manifest["chunks"]), "exports": manifest["exports"]}, indent=2))
+        return
+
+    if args.command == "export":
+        client = _local_client(args.local) if args.local else _zilliz_client()
+        entry = export_snapshot(
+            client,
+            args.collection,
+            args.path,
+            fmt=args.format,
+            chunk_rows=args.chunk_rows,
+            batch_size=args.batch_size,
+            incremental=args.incremental,
+            limit=args.limit,
+        )
+        logger.info("Exported %s rows in %s chunks (watermark %s) -> %s", entry["rows"], entry["chunks"], entry["watermark"], args.path)
+        return
+
+    manifest = read_manifest(args.path)
+    if manifest is None:
+        parser.error(f"No snapshot in {args.path}")
+    if args.local:
+        client = _local_client(args.local, manifest["dim"])
+        if client.num_entities(args.collection):
+            parser.error(f"{args.collection} already has rows in {args.local}")
+        for name in snapshot_partitions(manifest):
+            client.create_partition(collection_name=args.collection, partition_name=name)
+        total = import_snapshot(client, args.path, args.collection, batch_size=args.batch_size)
+        client.flush(args.collection)
+    else:
+        client = _zilliz_client()
+        if client.has_collection(collection_name=args.collection):
+            if not args.drop_target:
+                parser.error(f"{args.collection} exists; pass --drop-target to rebuild it")
+            client.drop_collection(collection_name=args.collection)
+        create_collection_from_snapshot(client, manifest, args.collection)
+        total = import_snapshot(client, args.path, args.collection, batch_size=args.batch_size)
+        client.flush(collection_name=args.collection)
+        client.load_collection(collection_name=args.collection)
+        if args.alias:
+            try:
+                client.alter_alias(collection_name=args.collection, alias=args.alias)
+            except Exception:
+                client.create_alias(collection_name=args.collection, alias=args.alias)
+            logger.info("Alias %s -> %s", args.alias, args.collection)
+    logger.info("Imported %s rows into %s", total, args.collection)
+
+
+if __name__ == "__main__":
+    main()
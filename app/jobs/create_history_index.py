@@ -0,0 +1,27 @@
+# app/jobs/create_history_index.py
+# Create the (user_id, read_at desc) index on Mongo Books.books_with_metadata that POST
+# /recommend/profile's history query uses (see app/services/reading_profile.py). Run it once per
+# deployment, before serving profiles from user_id; re-running it is a no-op.
+#
+# Usage: python -m app.jobs.create_history_index
+
+import logging
+
+from dotenv import load_dotenv
+
+from app.services.reading_profile import ensure_history_index
+from app.utils.db import get_books_collection
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    collection = get_books_collection()
+    logger.info("Index %s ready on %s", ensure_history_index(collection), collection.full_name)
+
+
+if __name__ == "__main__":
+    main()
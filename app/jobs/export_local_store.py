@@ -0,0 +1,62 @@
+# app/jobs/export_local_store.py
+# Copy the Zilliz `books` collection into a LocalMilvusClient directory so the API can serve
+# fully in-process (VECTOR_BACKEND=local, LOCAL_VECTOR_STORE_PATH=<dir>).
+#
+# Usage: python -m app.jobs.export_local_store <dir> [--limit N] [--batch-size N]
+
+import argparse
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from app.utils.local_vector_store import LocalMilvusClient
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "books"
+
+
+def export_collection(source, target: LocalMilvusClient, *, limit: int = -1, batch_size: int = 1000) -> int:
+    """Stream every row (scalars + embedding) from `source` into `target`. Returns rows copied."""
+    iterator = source.query_iterator(
+        collection_name=COLLECTION_NAME,
+        batch_size=batch_size,
+        limit=limit,
+        output_fields=["*"],
+    )
+    copied = 0
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            target.insert(collection_name=COLLECTION_NAME, data=[dict(r) for r in batch])
+            copied += len(batch)
+            logger.info("Copied %s rows", copied)
+    finally:
+        iterator.close()
+    return copied
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Export the Zilliz books collection to a local vector store.")
+    parser.add_argument("path", help="Target LOCAL_VECTOR_STORE_PATH directory")
+    parser.add_argument("--limit", type=int, default=-1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from pymilvus import MilvusClient
+
+    source = MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+    target = LocalMilvusClient(args.path)
+    total = export_collection(source, target, limit=args.limit, batch_size=args.batch_size)
+    target.flush(COLLECTION_NAME)
+    logger.info("Export complete: %s rows -> %s", total, args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# app/jobs/import_time_report.py
+# Startup import budget: runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+# reports the slowest top-level packages plus the total. Exits 1 when --budget-ms is exceeded, so
+# it can gate CI.
+#
+# Usage: python -m app.jobs.import_time_report [--module main] [--top 15] [--budget-ms 800]
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure_imports(module: str = "main") -> list[tuple[str, int, int, int]]:
+    """Return (name, self_us, cumulative_us, depth) for every import triggered by `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            depth = len(m.group(3)) // 2
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), depth))
+    return rows
+
+
+def top_level_costs(rows: list[tuple[str, int, int, int]]) -> dict[str, int]:
+    """Sum self time per top-level package (e.g. all of sklearn.* under 'sklearn'), in microseconds."""
+    costs: dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        root = name.split(".")[0]
+        costs[root] = costs.get(root, 0) + self_us
+    return costs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report import time of the app entry point.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    rows = measure_imports(args.module)
+    total_us = next((cum for name, _, cum, depth in reversed(rows) if name == args.module and depth == 0), 0)
+    costs = top_level_costs(rows)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms total, {len(rows)} modules")
+    print(f"{'package':<32}{'self ms':>10}")
+    for name, us in sorted(costs.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"{name:<32}{us / 1000:>10.1f}")
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"Over budget: {total_us / 1000:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
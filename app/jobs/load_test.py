@@ -0,0 +1,520 @@
+# app/jobs/load_test.py
+# Load test without touching paid or rate-limited services: starts local stand-ins for the HF
+# feature-extraction endpoint and Open Library (with configurable latency / error distributions),
+# runs the API under uvicorn on the local vector backend, drives it open-loop at a target RPS and
+# reports p50/p95/p99, throughput and error rate per scenario and per answering tier
+# (X-Recommend-Tier).
+#
+# Scenarios (--mix): catalog (/recommend for a seed in the store: Tier 1 / index / cache),
+# new (/recommend for an unknown work with metadata: Tier 2, or Tier 3 when the embedding
+# stand-in fails), mood (/recommend/mood), track (legacy track route; needs MONGO_URL and --track-ids).
+#
+# Usage: python -m app.jobs.load_test [--rps 50] [--duration 30] [--mix catalog=6,new=2,mood=2]
+#        [--store <LOCAL_VECTOR_STORE_PATH> | --books 20000] [--workers 2]
+#        [--embed-latency 80:400] [--embed-errors 0.01] [--ol-latency 150:900] [--ol-errors 0.02]
+#        [--app-env KEY=VALUE ...] [--target http://host:port] [--json report.json]
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.routes.recommendations import COLLECTION_NAME, MOOD_SUBJECT_MAP
+from app.utils.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+DIM = 384
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# z-score of the 99th percentile of a standard normal
+_Z99 = 2.326
+
+
+# --- Latency / error model ---
+
+
+class LatencyModel:
+    """Log-normal latency fitted to a p50 and p99 (ms), plus a probability of answering with an error."""
+
+    def __init__(self, p50_ms: float, p99_ms: float, error_rate: float = 0.0, seed: Optional[int] = None):
+        if p50_ms <= 0 or p99_ms < p50_ms:
+            raise ValueError("latency needs 0 < p50 <= p99")
+        self.p50_ms = p50_ms
+        self.p99_ms = p99_ms
+        self.error_rate = error_rate
+        self._mu = math.log(p50_ms)
+        self._sigma = math.log(p99_ms / p50_ms) / _Z99
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, error_rate: float = 0.0) -> "LatencyModel":
+        """'80:400' -> p50 80 ms, p99 400 ms; a single number means a fixed latency."""
+        p50, _, p99 = spec.partition(":")
+        return cls(float(p50), float(p99 or p50), error_rate)
+
+    def sample_s(self) -> float:
+        return self._rng.lognormvariate(self._mu, self._sigma) / 1000.0
+
+    def fails(self) -> bool:
+        return self._rng.random() < self.error_rate
+
+
+# --- Stand-in servers ---
+
+
+def text_vector(text: str, dim: int = DIM) -> list[float]:
+    """Deterministic unit vector for a text (same text -> same vector, like the real model)."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vec /= np.linalg.norm(vec)
+    return vec.tolist()
+
+
+def embedding_stand_in(model: LatencyModel, dim: int = DIM) -> FastAPI:
+    """HF feature-extraction stand-in: POST {"inputs": str | [str]} -> [[float] * dim] per input."""
+    app = FastAPI()
+
+    @app.post("/{path:path}")
+    async def feature_extraction(path: str, request: Request):
+        await asyncio.sleep(model.sample_s())
+        if model.fails():
+            return JSONResponse({"error": "Model is overloaded (stand-in)"}, status_code=503)
+        inputs = (await request.json()).get("inputs")
+        texts = inputs if isinstance(inputs, list) else [inputs]
+        return [text_vector(str(t), dim) for t in texts]
+
+    return app
+
+
+def open_library_stand_in(model: LatencyModel) -> FastAPI:
+    """Open Library stand-in for the work, author and search endpoints the services call."""
+    app = FastAPI()
+
+    async def _delay() -> Optional[JSONResponse]:
+        await asyncio.sleep(model.sample_s())
+        if model.fails():
+            return JSONResponse({"error": "rate limited (stand-in)"}, status_code=503)
+        return None
+
+    @app.get("/works/{work_id}.json")
+    async def work(work_id: str):
+        error = await _delay()
+        if error is not None:
+            return error
+        n = int.from_bytes(hashlib.sha256(work_id.encode()).digest()[:4], "little")
+        moods = sorted(MOOD_SUBJECT_MAP)
+        return {
+            "key": f"/works/{work_id}",
+            "title": f"Stand-in {work_id}",
+            "authors": [{"author": {"key": f"/authors/OL{n % 5000}A"}}],
+            "subjects": MOOD_SUBJECT_MAP[moods[n % len(moods)]][:3],
+            "description": f"Synthetic description for {work_id}.",
+            "covers": [n % 100000 + 1],
+        }
+
+    @app.get("/authors/{author_id}.json")
+    async def author(author_id: str):
+        error = await _delay()
+        return error if error is not None else {"key": f"/authors/{author_id}", "name": f"Author {author_id}"}
+
+    @app.get("/search.json")
+    async def search(q: str = ""):
+        error = await _delay()
+        if error is not None:
+            return error
+        return {"docs": [{"key": f"/works/{q}", "first_publish_year": 2001, "ratings_average": 3.9}]}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn in a daemon thread (stand-ins only)."""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        import uvicorn
+
+        self.port = port or _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError(f"stand-in on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+# --- Synthetic catalog ---
+
+
+def build_synthetic_store(path: str, books: int, *, seed: int = 7, batch: int = 2000) -> list[dict]:
+    """
+    Fill a LocalMilvusClient directory with `books` rows clustered by mood subjects (so Tier 1,
+    mood and Tier 3 subject filters all find matches). Returns light seed rows for the generator.
+    """
+    from app.utils.local_vector_store import LocalMilvusClient
+
+    rng = np.random.default_rng(seed)
+    moods = sorted(MOOD_SUBJECT_MAP)
+    centres = rng.standard_normal((len(moods), DIM)).astype(np.float32)
+    store = LocalMilvusClient(path, dim=DIM)
+    seeds = []
+    for start in range(0, books, batch):
+        n = min(batch, books - start)
+        clusters = rng.integers(0, len(moods), n)
+        vectors = centres[clusters] + 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        shelves = rng.zipf(1.6, n).clip(max=500_000)
+        rows = []
+        for j in range(n):
+            i = start + j + 1
+            subjects = MOOD_SUBJECT_MAP[moods[clusters[j]]]
+            row = {
+                "id": i,
+                "work_key": f"/works/OL{i}W",
+                "title": f"Synthetic Book {i}",
+                "author_name": f"Author {i % 997}",
+                "subjects": ", ".join(subjects[: 2 + i % 3]),
+                "description": f"Synthetic description {i}.",
+                "avg_rating": round(float(rng.uniform(2.5, 5.0)), 2),
+                "has_rating": True,
+                "rating_count": int(shelves[j] // 10),
+                "want_to_read_count": int(shelves[j] // 2),
+                "currently_reading_count": int(shelves[j] // 20),
+                "already_read_count": int(shelves[j] // 3),
+                "total_shelf_count": int(shelves[j]),
+                "cover_id": 0,
+                "embedding": vectors[j].tolist(),
+            }
+            rows.append(row)
+            seeds.append({"work_key": row["work_key"], "subjects": list(subjects[:2])})
+        store.insert(collection_name=COLLECTION_NAME, data=rows)
+    store.flush(collection_name=COLLECTION_NAME)
+    return seeds
+
+
+def load_seeds(path: str, limit: int = 5000) -> list[dict]:
+    """Seed rows from an existing local store."""
+    from app.utils.local_vector_store import LocalMilvusClient
+
+    rows = LocalMilvusClient(path, must_exist=True).query(
+        collection_name=COLLECTION_NAME, filter="", output_fields=["work_key", "subjects"], limit=limit
+    )
+    return [
+        {"work_key": r["work_key"], "subjects": [s.strip() for s in (r.get("subjects") or "").split(",") if s.strip()][:2]}
+        for r in rows
+    ]
+
+
+# --- Load generator ---
+
+
+@dataclass
+class Result:
+    scenario: str
+    tier: str
+    status: int
+    latency_s: float
+    lag_s: float = 0.0
+
+
+@dataclass
+class Scenarios:
+    seeds: list[dict]
+    token: str = ""
+    track_ids: list[str] = field(default_factory=list)
+    rng: random.Random = field(default_factory=lambda: random.Random(11))
+    _new: int = 0
+
+    def request(self, name: str) -> tuple[str, str, Optional[dict]]:
+        """(method, path, json body) for one request of the scenario."""
+        if name == "catalog":
+            seed = self.rng.choice(self.seeds)
+            return "POST", "/recommend", {"work_key": seed["work_key"], "subjects": seed["subjects"]}
+        if name == "new":
+            self._new += 1
+            mood = self.rng.choice(sorted(MOOD_SUBJECT_MAP))
+            body = {
+                "work_key": f"/works/OL{900_000_000 + self._new}W",
+                "title": f"Unlisted Book {self._new}",
+                "author_name": f"New Author {self._new % 50}",
+                "subjects": MOOD_SUBJECT_MAP[mood][:2],
+            }
+            return "POST", "/recommend", body
+        if name == "mood":
+            return "POST", "/recommend/mood", {"mood": self.rng.choice(sorted(MOOD_SUBJECT_MAP))}
+        if name == "track":
+            track_id = self.rng.choice(self.track_ids)
+            return "GET", f"/recommendations/cosine-similarity/{track_id}?token={self.token}", None
+        raise ValueError(f"Unknown scenario {name!r}")
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """'catalog=6,new=2,mood=2' -> normalized weights."""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            weights[name.strip()] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("mix needs a positive weight")
+    return {k: v / total for k, v in weights.items() if v > 0}
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    scenarios: Scenarios,
+    mix: dict[str, float],
+    *,
+    rps: float,
+    duration_s: float,
+    poisson: bool = True,
+) -> list[Result]:
+    """
+    Open-loop generator: arrivals are scheduled at `rps` (Poisson or evenly spaced) regardless of
+    how fast responses come back, so a slow server shows up as latency and errors rather than as
+    a lower offered load. `lag_s` records how late each request was sent.
+    """
+    names, weights = list(mix), list(mix.values())
+    rng = scenarios.rng
+    results: list[Result] = []
+    headers = {"Authorization": f"Bearer {scenarios.token}"} if scenarios.token else {}
+
+    async def one(name: str, scheduled: float) -> None:
+        method, path, body = scenarios.request(name)
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, path, json=body, headers=headers)
+            status, tier = resp.status_code, resp.headers.get("X-Recommend-Tier", "-")
+        except httpx.HTTPError as e:
+            status, tier = 0, type(e).__name__
+        results.append(Result(name, tier, status, time.perf_counter() - start, start - scheduled))
+
+    tasks = []
+    begin = time.perf_counter()
+    at = 0.0
+    while at < duration_s:
+        delay = begin + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = rng.choices(names, weights)[0]
+        tasks.append(asyncio.create_task(one(name, begin + at)))
+        at += rng.expovariate(rps) if poisson else 1.0 / rps
+    if tasks:
+        await asyncio.gather(*tasks)
+    return results
+
+
+# --- Report ---
+
+
+def _group_stats(results: list[Result], wall_s: float) -> dict:
+    latencies = sorted(r.latency_s * 1000.0 for r in results)
+    errors = sum(1 for r in results if not 200 <= r.status < 300)
+    shed = sum(1 for r in results if r.status in (429, 503))
+    return {
+        "requests": len(results),
+        "throughput_rps": round(len(results) / wall_s, 2) if wall_s > 0 else 0.0,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "shed": shed,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+def summarize(results: list[Result], wall_s: float) -> dict:
+    """Overall, per-scenario and per-(scenario, tier) stats, plus the generator's send lag."""
+    by_scenario: dict[str, list[Result]] = {}
+    by_tier: dict[str, list[Result]] = {}
+    for r in results:
+        by_scenario.setdefault(r.scenario, []).append(r)
+        by_tier.setdefault(f"{r.scenario}/{r.tier}", []).append(r)
+    lags = sorted(r.lag_s * 1000.0 for r in results)
+    return {
+        "wall_s": round(wall_s, 2),
+        "overall": _group_stats(results, wall_s),
+        "scenarios": {k: _group_stats(v, wall_s) for k, v in sorted(by_scenario.items())},
+        "tiers": {k: _group_stats(v, wall_s) for k, v in sorted(by_tier.items())},
+        "statuses": {str(s): n for s, n in sorted(_count(r.status for r in results).items())},
+        "send_lag_p99_ms": round(percentile(lags, 99), 1),
+    }
+
+
+def _count(values) -> dict:
+    counts: dict = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return counts
+
+
+def format_report(report: dict) -> str:
+    header = f"{'group':<28}{'reqs':>7}{'rps':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    lines = [header, "-" * len(header)]
+
+    def row(name: str, s: dict) -> str:
+        return (
+            f"{name:<28}{s['requests']:>7}{s['throughput_rps']:>9.1f}{100 * s['error_rate']:>7.2f}%"
+            f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}"
+        )
+
+    lines.append(row("overall", report["overall"]))
+    for name, s in report["scenarios"].items():
+        lines.append(row(name, s))
+    for name, s in report["tiers"].items():
+        lines.append(row(f"  {name}", s))
+    lines.append(f"statuses: {report['statuses']}  send lag p99: {report['send_lag_p99_ms']} ms  wall: {report['wall_s']} s")
+    return "\n".join(lines)
+
+
+# --- Orchestration ---
+
+
+def _start_app(port: int, env: dict, workers: int, log_path: Optional[str]) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)]
+    cmd += ["--log-level", "warning"]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    out = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=_REPO_ROOT, env={**os.environ, **env}, stdout=out, stderr=subprocess.STDOUT)
+
+
+def _wait_ready(base_url: str, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} not ready after {timeout_s:.0f}s (run with --app-log to see why)")
+
+
+async def _drive(base_url: str, scenarios: Scenarios, mix: dict, args) -> tuple[list[Result], float]:
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        results = await run_load(client, scenarios, mix, rps=args.rps, duration_s=args.duration, poisson=not args.uniform)
+        return results, time.perf_counter() - start
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Load-test the API against local stand-ins.")
+    parser.add_argument("--rps", type=float, default=50.0, help="Offered load (requests per second)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--uniform", action="store_true", help="Evenly spaced arrivals instead of Poisson")
+    parser.add_argument("--mix", default="catalog=6,new=2,mood=2", help="Scenario weights (catalog,new,mood,track)")
+    parser.add_argument("--store", help="Existing LOCAL_VECTOR_STORE_PATH (default: build a synthetic one)")
+    parser.add_argument("--books", type=int, default=20_000, help="Synthetic catalog size when --store is not given")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app under test")
+    parser.add_argument("--embed-latency", default="80:400", help="Embedding stand-in latency p50:p99 ms")
+    parser.add_argument("--embed-errors", type=float, default=0.01, help="Embedding stand-in error rate")
+    parser.add_argument("--ol-latency", default="150:900", help="Open Library stand-in latency p50:p99 ms")
+    parser.add_argument("--ol-errors", type=float, default=0.02, help="Open Library stand-in error rate")
+    parser.add_argument("--track-ids", default="", help="Comma-separated track ids for the track scenario")
+    parser.add_argument("--app-env", action="append", default=[], help="Extra KEY=VALUE for the app (repeatable)")
+    parser.add_argument("--target", help="Drive an already running API instead of starting one (no stand-ins)")
+    parser.add_argument("--token", default="", help="API token (SECRET_TOKEN) for --target")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client timeout per request (s)")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--ready-timeout", type=float, default=180.0)
+    parser.add_argument("--app-log", help="Write the app's stdout/stderr here (default: discarded)")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    track_ids = [t for t in args.track_ids.split(",") if t]
+    if "track" in mix and not track_ids:
+        parser.error("the track scenario needs --track-ids (and MONGO_URL for the app)")
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    try:
+        if args.target:
+            if not args.store:
+                parser.error("--target needs --store to pick catalog seeds")
+            scenarios = Scenarios(load_seeds(args.store), token=args.token, track_ids=track_ids)
+            results, wall_s = asyncio.run(_drive(args.target.rstrip("/"), scenarios, mix, args))
+        else:
+            store = args.store
+            if store is None:
+                store = os.path.join(workdir, "store")
+                logger.info("Building synthetic catalog of %s books in %s", args.books, store)
+                seeds = build_synthetic_store(store, args.books)
+            else:
+                seeds = load_seeds(store)
+            token = "load-test"
+            embed_model = LatencyModel.parse(args.embed_latency, args.embed_errors)
+            ol_model = LatencyModel.parse(args.ol_latency, args.ol_errors)
+            with ServerThread(embedding_stand_in(embed_model)) as embed, ServerThread(open_library_stand_in(ol_model)) as ol:
+                port = _free_port()
+                env = {
+                    "VECTOR_BACKEND": "local",
+                    "LOCAL_VECTOR_STORE_PATH": store,
+                    "EMBEDDING_API_URL": f"{embed.url}/pipeline/feature-extraction/stand-in",
+                    "EMBEDDING_API_TOKEN": "stand-in",
+                    "OPEN_LIBRARY_BASE_URL": ol.url,
+                    "MOOD_CENTROIDS_PATH": os.path.join(workdir, "mood_centroids.json"),
+                    "SECRET_TOKEN": token,
+                }
+                env.update(kv.split("=", 1) for kv in args.app_env)
+                app_proc = _start_app(port, env, args.workers, args.app_log)
+                try:
+                    base_url = f"http://127.0.0.1:{port}"
+                    _wait_ready(base_url, args.ready_timeout)
+                    scenarios = Scenarios(seeds, token=token, track_ids=track_ids)
+                    logger.info("Driving %s at %.0f rps for %.0fs (mix %s)", base_url, args.rps, args.duration, mix)
+                    results, wall_s = asyncio.run(_drive(base_url, scenarios, mix, args))
+                finally:
+                    app_proc.terminate()
+                    app_proc.wait(timeout=30)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(results, wall_s)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
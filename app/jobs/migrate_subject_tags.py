@@ -0,0 +1,199 @@
+# app/jobs/migrate_subject_tags.py
+# Schema migration: copy the books collection into a new collection that adds `subject_tags`
+# (ARRAY<VARCHAR> of alias-normalized subjects) with an INVERTED scalar index, so subject lookups
+# become one indexed array_contains_any instead of LIKE scans. Milvus cannot change a field's type
+# in place, hence the rewrite; `subjects` (CSV) is kept as the display string.
+#
+# After it finishes, point the API at the new collection: ZILLIZ_COLLECTION=<target> (or pass
+# --alias to move an alias the API already uses). The API detects the field at warm-up.
+#
+# Usage: python -m app.jobs.migrate_subject_tags [--source books] [--target books_v2] [--batch-size 1000]
+#        [--limit N] [--drop-target] [--alias NAME] [--local <LOCAL_VECTOR_STORE_PATH>]
+
+import argparse
+import logging
+import os
+import time
+from typing import Callable, Iterable, Optional
+
+from dotenv import load_dotenv
+
+from app.services.subject_families import insert_by_partition
+from app.services.subject_tags import (
+    MAX_SUBJECT_TAGS,
+    SUBJECT_TAG_MAX_LENGTH,
+    SUBJECT_TAGS_FIELD,
+    subject_tags_csv,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VECTOR_FIELD = "embedding"
+_INDEX_PROGRESS_KEYS = ("total_rows", "indexed_rows", "pending_index_rows", "state")
+
+
+def schema_from_description(description: dict):
+    """A MilvusClient schema with the fields and auto_id/dynamic-field flags of a describe_collection result."""
+    from pymilvus import MilvusClient
+
+    schema = MilvusClient.create_schema(
+        auto_id=bool(description.get("auto_id", False)),
+        enable_dynamic_field=bool(description.get("enable_dynamic_field", False)),
+    )
+    for f in description["fields"]:
+        kwargs = dict(f.get("params") or {})
+        if f.get("is_primary"):
+            kwargs["is_primary"] = True
+            kwargs["auto_id"] = bool(f.get("auto_id", False))
+        if f.get("element_type") is not None:
+            kwargs["element_type"] = f["element_type"]
+        schema.add_field(field_name=f["name"], datatype=f["type"], **kwargs)
+    return schema
+
+
+def describe_indexes(client, collection: str) -> list[dict]:
+    """describe_index for every index on `collection`, minus the build-progress counters."""
+    infos = []
+    for name in client.list_indexes(collection_name=collection):
+        info = client.describe_index(collection_name=collection, index_name=name)
+        infos.append({"index_name": name, **{k: v for k, v in info.items() if k not in _INDEX_PROGRESS_KEYS}})
+    return infos
+
+
+def index_params_from(infos: list[dict]):
+    """MilvusClient index params recreating the given describe_indexes entries."""
+    from pymilvus import MilvusClient
+
+    index_params = MilvusClient.prepare_index_params()
+    for info in infos:
+        index_params.add_index(
+            field_name=info["field_name"],
+            index_name=info["index_name"],
+            index_type=info.get("index_type") or "AUTOINDEX",
+            metric_type=info.get("metric_type") or "",
+            params={k: v for k, v in info.items() if k not in ("field_name", "index_name", "index_type", "metric_type")},
+        )
+    return index_params
+
+
+def create_target_collection(client, source: str, target: str, *, partitions: Iterable[str] = ()) -> None:
+    """
+    Create `target` with `source`'s fields plus subject_tags, its vector index, and an INVERTED index on
+    the tags, then the given `partitions`. A source that already has subject_tags is only accepted when
+    partitions are requested (a re-layout; see partition_catalog).
+    """
+    from pymilvus import DataType
+
+    partitions = list(partitions)
+    description = client.describe_collection(collection_name=source)
+    has_tags = any(f["name"] == SUBJECT_TAGS_FIELD for f in description["fields"])
+    if has_tags and not partitions:
+        raise ValueError(f"{source} already has {SUBJECT_TAGS_FIELD}; nothing to migrate")
+    schema = schema_from_description(description)
+    if not has_tags:
+        schema.add_field(
+            field_name=SUBJECT_TAGS_FIELD,
+            datatype=DataType.ARRAY,
+            element_type=DataType.VARCHAR,
+            max_capacity=MAX_SUBJECT_TAGS,
+            max_length=SUBJECT_TAG_MAX_LENGTH,
+        )
+
+    index_params = index_params_from(describe_indexes(client, source))
+    if not has_tags:
+        index_params.add_index(field_name=SUBJECT_TAGS_FIELD, index_name="subject_tags_inverted", index_type="INVERTED")
+    client.create_collection(collection_name=target, schema=schema, index_params=index_params)
+    for name in partitions:
+        client.create_partition(collection_name=target, partition_name=name)
+    logger.info("Created %s with %s (INVERTED) and %s partitions", target, SUBJECT_TAGS_FIELD, len(partitions))
+
+
+def migrate_rows(
+    client,
+    source: str,
+    target: str,
+    *,
+    batch_size: int = 1000,
+    limit: int = -1,
+    partition_for: Optional[Callable[[dict], str]] = None,
+) -> int:
+    """
+    Stream every row from `source` into `target`, adding subject_tags parsed from the subjects CSV
+    (kept as-is when the source already has them). With `partition_for`, each row is inserted into
+    the partition it names.
+    """
+    iterator = client.query_iterator(
+        collection_name=source,
+        batch_size=batch_size,
+        limit=limit,
+        output_fields=["*"],
+    )
+    copied = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            rows = []
+            for r in batch:
+                row = dict(r)
+                if not isinstance(row.get(SUBJECT_TAGS_FIELD), list):
+                    row[SUBJECT_TAGS_FIELD] = subject_tags_csv(row.get("subjects") or "")
+                rows.append(row)
+            if partition_for is None:
+                client.insert(collection_name=target, data=rows)
+            else:
+                insert_by_partition(client, target, rows, partition_for)
+            copied += len(rows)
+            logger.info("Migrated %s rows (%.0f rows/s)", copied, copied / max(time.perf_counter() - start, 1e-9))
+    finally:
+        iterator.close()
+    return copied
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Rewrite the books collection with a subject_tags array field.")
+    parser.add_argument("--source", default="books")
+    parser.add_argument("--target", default="books_v2")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=-1)
+    parser.add_argument("--drop-target", action="store_true", help="Drop an existing target collection first")
+    parser.add_argument("--alias", help="Point this alias at the target once the copy is loaded")
+    parser.add_argument("--local", help="Migrate inside a LocalMilvusClient directory instead of Zilliz")
+    args = parser.parse_args()
+
+    if args.local:
+        from app.utils.local_vector_store import LocalMilvusClient
+
+        client = LocalMilvusClient(args.local)
+        if client.num_entities(args.target):
+            parser.error(f"{args.target} already has rows in {args.local}")
+        copied = migrate_rows(client, args.source, args.target, batch_size=args.batch_size, limit=args.limit)
+        client.flush(args.target)
+    else:
+        from pymilvus import MilvusClient
+
+        client = MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+        if client.has_collection(collection_name=args.target):
+            if not args.drop_target:
+                parser.error(f"{args.target} exists; pass --drop-target to rebuild it")
+            client.drop_collection(collection_name=args.target)
+        create_target_collection(client, args.source, args.target)
+        copied = migrate_rows(client, args.source, args.target, batch_size=args.batch_size, limit=args.limit)
+        client.flush(collection_name=args.target)
+        client.load_collection(collection_name=args.target)
+        if args.alias:
+            try:
+                client.alter_alias(collection_name=args.target, alias=args.alias)
+            except Exception:
+                client.create_alias(collection_name=args.target, alias=args.alias)
+            logger.info("Alias %s -> %s", args.alias, args.target)
+    logger.info("Migrated %s rows into %s; serve it with ZILLIZ_COLLECTION=%s", copied, args.target, args.alias or args.target)
+
+
+if __name__ == "__main__":
+    main()
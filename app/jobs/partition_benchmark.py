@@ -0,0 +1,208 @@
+# app/jobs/partition_benchmark.py
+# Search latency with and without partition pruning on a family-partitioned collection (see
+# app/jobs/partition_catalog.py). Every query runs as the API would issue it:
+#   full         whole collection (today's unpartitioned search)
+#   family       partition_names = the query's family (same_family=true)
+#   rated_full   avg_rating filter over the whole collection (min_avg_rating)
+#   rated        the same filter within the rated partitions only
+# and reports p50/p95/p99 per scenario, the speed-up over `full`, and how much of the full top-k the
+# family search still returns (recall of the pruned search against the unpruned one).
+#
+# By default it builds an in-memory synthetic catalog (clustered by family, 60% rated) in a
+# LocalMilvusClient; --local benchmarks a partitioned local store, --zilliz a partitioned Zilliz collection.
+#
+# Usage: python -m app.jobs.partition_benchmark [--books 100000] [--dim 384] [--queries 200] [--limit 10]
+#        [--local <dir> | --zilliz] [--collection books_partitioned] [--json]
+
+import argparse
+import json
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.services.subject_families import (
+    FAMILIES,
+    FAMILY_KEYWORDS,
+    all_partition_names,
+    insert_by_partition,
+    partition_name,
+    partition_for_record,
+)
+from app.utils.metrics import percentile
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATING_FILTER = "avg_rating >= 4.0"
+SCENARIOS = ("full", "family", "rated_full", "rated")
+
+
+def build_partitioned_store(
+    client, collection: str, *, books: int, dim: int, seed: int = 7, batch: int = 5000
+) -> list[tuple[list[float], str]]:
+    """
+    Fill `collection` with `books` synthetic rows clustered by family, inserted into their family
+    partitions. Returns one (query vector, family) sample per 100 books (at least 10).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((len(FAMILIES), dim)).astype(np.float32)
+    # Skewed family sizes, like a real catalog (general/literary dominate)
+    weights = rng.zipf(1.5, len(FAMILIES)).astype(np.float64)
+    weights /= weights.sum()
+    for name in all_partition_names():
+        client.create_partition(collection_name=collection, partition_name=name)
+    samples: list[tuple[list[float], str]] = []
+    every = max(1, min(100, books // 10))
+    for start in range(0, books, batch):
+        n = min(batch, books - start)
+        families = rng.choice(len(FAMILIES), n, p=weights)
+        vectors = centres[families] + 0.8 * rng.standard_normal((n, dim)).astype(np.float32)
+        rated = rng.random(n) < 0.6
+        rows = []
+        for j in range(n):
+            i = start + j + 1
+            family = FAMILIES[families[j]]
+            keyword = FAMILY_KEYWORDS.get(family, ("anthologies",))[0]
+            rows.append(
+                {
+                    "id": i,
+                    "work_key": f"/works/OL{i}W",
+                    "subjects": keyword,
+                    "avg_rating": round(float(rng.uniform(2.5, 5.0)), 2) if rated[j] else 0.0,
+                    "has_rating": bool(rated[j]),
+                    "embedding": vectors[j].tolist(),
+                }
+            )
+            if i % every == 0:
+                samples.append((vectors[j].tolist(), family))
+        insert_by_partition(client, collection, rows, partition_for_record)
+    return samples
+
+
+def _search(client, collection: str, vector: list[float], limit: int, **kwargs) -> list:
+    results = client.search(collection_name=collection, data=[vector], limit=limit, output_fields=["work_key"], **kwargs)
+    return [hit.get("id") for hit in (results[0] if results else [])]
+
+
+def run_benchmark(
+    client, collection: str, samples: list[tuple[list[float], str]], *, limit: int = 10, rounds: int = 1
+) -> dict:
+    """Per-scenario latency stats (ms), speed-up over the full search, and family-search recall."""
+    latencies: dict[str, list[float]] = {name: [] for name in SCENARIOS}
+    overlap: list[float] = []
+    rated_partitions = [partition_name(f, True) for f in FAMILIES]
+    for _ in range(rounds):
+        for vector, family in samples:
+            family_partitions = [partition_name(family, True), partition_name(family, False)]
+            calls = {
+                "full": {},
+                "family": {"partition_names": family_partitions},
+                "rated_full": {"filter": RATING_FILTER},
+                "rated": {"filter": RATING_FILTER, "partition_names": rated_partitions},
+            }
+            hits = {}
+            for name, kwargs in calls.items():
+                start = time.perf_counter()
+                hits[name] = _search(client, collection, vector, limit, **kwargs)
+                latencies[name].append((time.perf_counter() - start) * 1000.0)
+            if hits["full"]:
+                overlap.append(len(set(hits["full"]) & set(hits["family"])) / len(hits["full"]))
+    report: dict = {"queries": len(samples) * rounds, "limit": limit, "scenarios": {}}
+    base_p50 = None
+    for name in SCENARIOS:
+        values = sorted(latencies[name])
+        stats = {
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        }
+        if name == "full":
+            base_p50 = stats["p50_ms"]
+        if name == "rated":
+            stats["speedup_p50"] = round(report["scenarios"]["rated_full"]["p50_ms"] / max(stats["p50_ms"], 1e-9), 2)
+        elif base_p50:
+            stats["speedup_p50"] = round(base_p50 / max(stats["p50_ms"], 1e-9), 2)
+        report["scenarios"][name] = stats
+    report["family_recall_vs_full"] = round(sum(overlap) / len(overlap), 3) if overlap else None
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{report['queries']} searches per scenario, limit={report['limit']}"]
+    lines.append(f"{'scenario':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'speed-up':>9}")
+    for name, s in report["scenarios"].items():
+        lines.append(
+            f"{name:<12} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {s.get('speedup_p50', 1.0):>8.2f}x"
+        )
+    if report.get("family_recall_vs_full") is not None:
+        lines.append(f"family search keeps {report['family_recall_vs_full']:.0%} of the full top-{report['limit']}")
+    return "\n".join(lines)
+
+
+def _zilliz_samples(client, collection: str, n: int) -> list[tuple[list[float], str]]:
+    """Query vectors taken from stored rows of each non-empty family partition."""
+    samples: list[tuple[list[float], str]] = []
+    per_family = max(1, n // len(FAMILIES))
+    for family in FAMILIES:
+        for rated in (True, False):
+            rows = client.query(
+                collection_name=collection,
+                filter="",
+                output_fields=["embedding"],
+                limit=per_family,
+                partition_names=[partition_name(family, rated)],
+            )
+            samples.extend((list(r["embedding"]), family) for r in rows if r.get("embedding") is not None)
+    random.Random(7).shuffle(samples)
+    return samples[:n]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Benchmark partition-pruned vs full vector search.")
+    parser.add_argument("--books", type=int, default=100_000, help="Synthetic catalog size (default store only)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--collection", default="books_partitioned")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--local", help="Partitioned LocalMilvusClient directory (see partition_catalog --local)")
+    target.add_argument("--zilliz", action="store_true", help="Partitioned collection on ZILLIZ_ENDPOINT")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.zilliz:
+        from pymilvus import MilvusClient
+
+        client = MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+        samples = _zilliz_samples(client, args.collection, args.queries)
+    elif args.local:
+        from app.utils.local_vector_store import LocalMilvusClient
+
+        client = LocalMilvusClient(args.local)
+        samples = _zilliz_samples(client, args.collection, args.queries)
+    else:
+        from app.utils.local_vector_store import LocalMilvusClient
+
+        client = LocalMilvusClient(dim=args.dim)
+        start = time.perf_counter()
+        samples = build_partitioned_store(client, args.collection, books=args.books, dim=args.dim)
+        logger.info("Built %s synthetic books in %.1fs", args.books, time.perf_counter() - start)
+        samples = samples[: args.queries]
+    if not samples:
+        parser.error(f"No query vectors found in {args.collection}; is it partitioned?")
+    report = run_benchmark(client, args.collection, samples, limit=args.limit, rounds=args.rounds)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# app/jobs/partition_catalog.py
+# Re-layout: copy the books collection into a new collection split into subject-family × rated/unrated
+# partitions (see app/services/subject_families.py), adding subject_tags on the way if the source lacks
+# them. Partitions are created by name rather than via a partition-key field so the API can name the
+# ones it wants in `partition_names`; Tier 2 write-backs insert into the matching partition.
+#
+# After it finishes, serve the new collection (ZILLIZ_COLLECTION=<target> or --alias); the API lists
+# its partitions at warm-up and starts pruning. Compare latencies with app.jobs.partition_benchmark.
+#
+# Usage: python -m app.jobs.partition_catalog [--source books] [--target books_partitioned] [--batch-size 1000]
+#        [--limit N] [--drop-target] [--alias NAME] [--local <LOCAL_VECTOR_STORE_PATH>]
+
+import argparse
+import logging
+import os
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from app.jobs.migrate_subject_tags import create_target_collection, migrate_rows
+from app.services.subject_families import all_partition_names, partition_for_record
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def partition_catalog(client, source: str, target: str, *, batch_size: int = 1000, limit: int = -1) -> Counter:
+    """Copy `source` into the (already created) family partitions of `target`; returns rows per partition."""
+    counts: Counter = Counter()
+
+    def route(row: dict) -> str:
+        name = partition_for_record(row)
+        counts[name] += 1
+        return name
+
+    migrate_rows(client, source, target, batch_size=batch_size, limit=limit, partition_for=route)
+    return counts
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    parser = argparse.ArgumentParser(description="Rewrite the books collection into subject-family partitions.")
+    parser.add_argument("--source", default="books")
+    parser.add_argument("--target", default="books_partitioned")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=-1)
+    parser.add_argument("--drop-target", action="store_true", help="Drop an existing target collection first")
+    parser.add_argument("--alias", help="Point this alias at the target once the copy is loaded")
+    parser.add_argument("--local", help="Re-layout inside a LocalMilvusClient directory instead of Zilliz")
+    args = parser.parse_args()
+
+    if args.local:
+        from app.utils.local_vector_store import LocalMilvusClient
+
+        client = LocalMilvusClient(args.local)
+        if client.num_entities(args.target):
+            parser.error(f"{args.target} already has rows in {args.local}")
+        for name in all_partition_names():
+            client.create_partition(collection_name=args.target, partition_name=name)
+        counts = partition_catalog(client, args.source, args.target, batch_size=args.batch_size, limit=args.limit)
+        client.flush(args.target)
+    else:
+        from pymilvus import MilvusClient
+
+        client = MilvusClient(uri=os.environ["ZILLIZ_ENDPOINT"], token=os.environ["ZILLIZ_API_KEY"])
+        if client.has_collection(collection_name=args.target):
+            if not args.drop_target:
+                parser.error(f"{args.target} exists; pass --drop-target to rebuild it")
+            client.drop_collection(collection_name=args.target)
+        create_target_collection(client, args.source, args.target, partitions=all_partition_names())
+        counts = partition_catalog(client, args.source, args.target, batch_size=args.batch_size, limit=args.limit)
+        client.flush(collection_name=args.target)
+        client.load_collection(collection_name=args.target)
+        if args.alias:
+            try:
+                client.alter_alias(collection_name=args.target, alias=args.alias)
+            except Exception:
+                client.create_alias(collection_name=args.target, alias=args.alias)
+            logger.info("Alias %s -> %s", args.alias, args.target)
+    for name, n in counts.most_common():
+        logger.info("  %-28s %8s rows", name, n)
+    logger.info(
+        "Partitioned %s rows into %s; serve it with ZILLIZ_COLLECTION=%s",
+        sum(counts.values()),
+        args.target,
+        args.alias or args.target,
+    )
+
+
+if __name__ == "__main__":
+    main()
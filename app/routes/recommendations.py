@@ -2,28 +2,85 @@
 # Zilliz: POST /recommend is the primary book recommendation endpoint. Legacy GET route retained for tracks.
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import logging
 import os
 import time
+from collections import OrderedDict
+from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
+from pydantic import BaseModel, Field, field_validator, model_validator
 
-from app.services.embedding_client import embed_text
+from app.services.embedding_client import embed_text, expected_latency_s
+from app.services import explanation_templates
 from app.services.explanation_service import build_deterministic_explanation
-from app.utils.db import get_mongo_collection
+from app.services.explanation_subject_signals import record_subject_phrases
+from app.services import hot_keys, open_library_service
+from app.services.mood_centroids import ensure_centroids, get_centroid
+from app.services.reading_profile import interleave, load_recent_reads, profile_centroids, recency_weights
+from app.services.subject_families import (
+    detect_partitions,
+    partition_for_record,
+    partitions_enabled,
+    search_partitions,
+    subject_family,
+)
+from app.services.subject_tags import (
+    SUBJECT_TAGS_FIELD,
+    detect_subject_tags,
+    subject_tags,
+    subject_tags_enabled,
+    subject_tags_filter,
+)
+from app.services.warmup import register_warmup_step, warmup_moods, warmup_work_keys
+from app.utils.ann_search_params import ann_search_params, validate_ann_params
+from app.utils.db import get_books_collection, get_mongo_collection
+from app.utils.deadline import (
+    DeadlineExceeded,
+    begin_deadline,
+    budget_ms_from_headers,
+    call_with_deadline,
+    remaining_s,
+)
+from app.utils.metrics import BACKGROUND_WRITE_QUEUE, record_cache_lookup
+from app.utils.recommend_cursor import (
+    PageCursor,
+    decode_cursor,
+    encode_cursor,
+    overfetch_limit,
+    range_search_params,
+)
+from app.utils.request_timing import stage
+from app.utils.shared_cache import get_shared_cache
+from app.utils.milvus_filters import (
+    and_filters,
+    build_constraint_filter,
+    escape_filter_string,
+    escape_like_pattern,
+    id_list_literal,
+    string_list_literal,
+)
 from app.utils.milvus_search_hits import (
+    normalize_open_library_work_id,
+    open_library_work_number,
     same_open_library_work,
     sanitize_numpy_scalars,
     search_hit_distance,
     search_hit_entity_dict,
+    search_hit_score,
 )
-from app.services.recommendation_service import calculate_cosine_similarity_with_explanation
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # --- Zilliz book recommendations (POST /recommend) ---
 
-COLLECTION_NAME = "books"
+# books_v2 etc. after a schema migration (see app/jobs/migrate_subject_tags.py)
+COLLECTION_NAME = os.getenv("ZILLIZ_COLLECTION", "books")
 OUTPUT_FIELDS = [
     "work_key",
     "title",
@@ -39,6 +96,49 @@ OUTPUT_FIELDS = [
     "total_shelf_count",
     "cover_id",
 ]
+# Always fetched, whatever `fields` asks for: the dedupe key plus what explanations and popularity
+# ranking read. All small; `description` (often kilobytes) is only fetched when requested.
+RANKING_FIELDS = ["work_key", "author_name", "subjects", "avg_rating", "has_rating", "total_shelf_count"]
+
+
+def _check_fields(fields: Optional[list[str]]) -> Optional[list[str]]:
+    if fields is None:
+        return None
+    unknown = sorted(set(fields) - set(OUTPUT_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}. Valid fields: {OUTPUT_FIELDS}")
+    return list(dict.fromkeys(fields))
+
+
+def _output_fields(fields: Optional[list[str]]) -> list[str]:
+    """output_fields for a request's `fields` projection (None = everything in OUTPUT_FIELDS)."""
+    if fields is None:
+        out = OUTPUT_FIELDS
+    else:
+        wanted = set(fields) | set(RANKING_FIELDS)
+        out = [f for f in OUTPUT_FIELDS if f in wanted]
+    # Explanations read the pre-parsed array when the collection has one (never returned to clients)
+    return [*out, SUBJECT_TAGS_FIELD] if subject_tags_enabled() else out
+
+
+def _project(records: list[dict], fields: Optional[list[str]]) -> None:
+    """Drop fields fetched only for ranking/explanations; work_key and explanation are always returned."""
+    if fields is None:
+        for r in records:
+            r.pop(SUBJECT_TAGS_FIELD, None)
+        return
+    keep = set(fields) | {"work_key", "explanation"}
+    for r in records:
+        for k in [k for k in r if k not in keep]:
+            del r[k]
+
+
+MAX_PAGE_SIZE = 50
+# Candidates overfetched (with embeddings) when diversity/popularity re-ranking is requested
+RERANK_CANDIDATES = 50
+# Under a request deadline (X-Request-Deadline-Ms / RECOMMEND_DEADLINE_MS), stages are skipped when
+# less than this is left: a Zilliz query/search, and the margin kept for the search after embedding.
+MIN_STORE_CALL_BUDGET_S = 0.03
 
 
 class RecommendRequest(BaseModel):
@@ -46,6 +146,81 @@ class RecommendRequest(BaseModel):
     title: str = ""
     author_name: str = ""
     subjects: list[str] = []
+    # Page size and opaque cursor from a previous response's next_cursor ("load more")
+    limit: int = Field(10, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
+    # Optional re-rank of the first page: 0 = off. diversity spreads results across authors/series (MMR);
+    # popularity_weight blends in total_shelf_count / avg_rating.
+    diversity: float = Field(0.0, ge=0.0, le=1.0)
+    popularity_weight: float = Field(0.0, ge=0.0, le=1.0)
+    # Share of the first page's score taken by "readers also read" co-reads (CO_READ_INDEX_PATH); 0 = off
+    co_read_weight: float = Field(0.0, ge=0.0, le=1.0)
+    # Optional constraints, compiled into the search filter so a page still comes back full
+    exclude_authors: list[str] = Field(default_factory=list, max_length=50)
+    min_avg_rating: Optional[float] = Field(None, ge=0.0, le=5.0)
+    min_shelf_count: Optional[int] = Field(None, ge=0)
+    require_subjects: list[str] = Field(default_factory=list, max_length=10)
+    # Only search the seed's subject family partition (see subject_families.py); off by default since
+    # it excludes cross-genre neighbours. Needs subjects and a partitioned collection (422 otherwise).
+    same_family: bool = False
+    # Per-request ANN parameters over ANN_SEARCH_PARAMS (level / ef / nprobe / search_list, bounded)
+    ann_params: Optional[dict[str, int]] = None
+    # Response projection (subset of OUTPUT_FIELDS); omit for every field
+    fields: Optional[list[str]] = None
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, v: Optional[list[str]]) -> Optional[list[str]]:
+        return _check_fields(v)
+
+    @field_validator("ann_params")
+    @classmethod
+    def check_ann_params(cls, v: Optional[dict[str, int]]) -> Optional[dict[str, int]]:
+        return validate_ann_params(v) if v is not None else None
+
+    @model_validator(mode="after")
+    def require_family_subjects(self) -> "RecommendRequest":
+        if self.same_family and not self.subjects:
+            raise ValueError("same_family needs the seed's subjects")
+        return self
+
+    def constraint_filter(self) -> str:
+        if subject_tags_enabled():
+            return build_constraint_filter(
+                exclude_authors=self.exclude_authors,
+                min_avg_rating=self.min_avg_rating,
+                min_shelf_count=self.min_shelf_count,
+                require_subjects=subject_tags(self.require_subjects),
+                subject_tags_field=SUBJECT_TAGS_FIELD,
+            )
+        return build_constraint_filter(
+            exclude_authors=self.exclude_authors,
+            min_avg_rating=self.min_avg_rating,
+            min_shelf_count=self.min_shelf_count,
+            require_subjects=self.require_subjects,
+        )
+
+    def reranked(self) -> bool:
+        """
+        Whether the first page is re-ranked over an overfetched candidate set (see _reranked_page).
+        co_read_weight counts only when a co-read index is loaded; without one it is ignored.
+        """
+        return (
+            self.diversity > 0
+            or self.popularity_weight > 0
+            or (self.co_read_weight > 0 and _co_read_index() is not None)
+        )
+
+    def partition_names(self) -> Optional[list[str]]:
+        """Partitions the constraints confine results to (None = the whole collection)."""
+        return search_partitions(
+            families=[subject_family(self.subjects)] if self.same_family else None,
+            rated=True if self.min_avg_rating is not None else None,
+        )
+
+
+def _partition_kwargs(partition_names: Optional[list[str]]) -> dict:
+    return {"partition_names": partition_names} if partition_names else {}
 
 
 def _sanitize_record(record: dict) -> dict:
@@ -78,43 +253,483 @@ def _store_new_book(
     vector: list,
 ) -> None:
     """Write a fallback-generated record to Zilliz for future Tier 1 cache hits. Runs in background task."""
+    record = {
+        "id": _generate_new_id(),
+        "work_key": work_key[:32],
+        "title": (title or "")[:512],
+        "author_name": (author_name or "")[:256],
+        "subjects": ", ".join((subjects or [])[:10])[:2048],
+        "description": "",
+        "avg_rating": 0.0,
+        "has_rating": False,
+        "rating_count": 0,
+        "want_to_read_count": 0,
+        "currently_reading_count": 0,
+        "already_read_count": 0,
+        "total_shelf_count": 0,
+        "cover_id": 0,
+    }
+    if subject_tags_enabled():
+        record[SUBJECT_TAGS_FIELD] = subject_tags((subjects or [])[:10])
+    insert_kwargs = {"partition_name": partition_for_record(record)} if partitions_enabled() else {}
+    try:
+        client.insert(collection_name=COLLECTION_NAME, data=[{**record, "embedding": vector}], **insert_kwargs)
+        # Enter the new book into the precomputed neighbour lists it belongs to
+        index = _neighbour_index()
+        if index is not None:
+            index.add_book(client, record, vector, collection_name=COLLECTION_NAME)
+    except Exception as e:
+        logger.warning("Background Zilliz write failed for %s: %s", work_key, e)
+    finally:
+        BACKGROUND_WRITE_QUEUE.dec()
+
+
+def _co_read_index():
+    """Co-read lists from CO_READ_INDEX_PATH, or None (imported lazily, like the neighbour table)."""
+    if not os.getenv("CO_READ_INDEX_PATH", "").strip():
+        return None
+    from app.services.co_read_index import get_co_read_index
+
+    return get_co_read_index()
+
+
+def _neighbour_index():
+    """Precomputed neighbour table from NEIGHBOUR_INDEX_PATH, or None (imported lazily: NumPy stays off startup)."""
+    if not os.getenv("NEIGHBOUR_INDEX_PATH", "").strip():
+        return None
+    from app.services.neighbour_index import get_neighbour_index
+
+    return get_neighbour_index()
+
+
+def _index_page(request: RecommendRequest) -> Optional[tuple[list[dict], Optional[str]]]:
+    """
+    First page for a catalog seed straight from the neighbour table (no Zilliz call), or None when
+    the request needs live search: re-ranking, constraints, a page larger than the table's K, fields
+    the table does not store, or a seed that is not indexed.
+    """
+    if request.reranked() or request.same_family or request.constraint_filter():
+        return None
+    index = _neighbour_index()
+    if index is None or request.limit > index.k:
+        return None
+    if not set(_output_fields(request.fields)) <= set(index.fields) | {"work_key", SUBJECT_TAGS_FIELD}:
+        return None
+    with stage("index_lookup"):
+        neighbours = index.neighbours(request.work_key)
+        if not neighbours:
+            return None
+        # Build-time explanations were rendered from the stored seed; only use them without request metadata
+        rendered = index.explanations(request.work_key) if not (request.subjects or request.author_name) else None
+        recommendations: list[dict] = []
+        served: list[tuple[object, float]] = []
+        for i, (number, dist) in enumerate(neighbours[: request.limit]):
+            record = index.record(number)
+            if record is None:
+                continue
+            pk = record.pop("id", None)
+            if rendered is not None and i < len(rendered):
+                record["explanation"] = rendered[i]
+                recommendations.append(record)
+            else:
+                recommendations.append(_explain(request, record, dist))
+            served.append((pk, dist))
+    if len(recommendations) < request.limit or len(neighbours) < request.limit:
+        return recommendations, None
+    last_distance = served[-1][1]
+    next_cursor = encode_cursor(
+        PageCursor(
+            work_key=request.work_key,
+            # The table stores 1 − score; page 2 is a live range search on the score
+            last_score=1.0 - last_distance,
+            boundary_ids=[pk for pk, d in served if d == last_distance and pk is not None],
+            served=len(recommendations),
+        )
+    )
+    return recommendations, next_cursor
+
+
+def _cache_key(prefix: str, payload: str) -> str:
+    """Shared-cache key: prefix + digest, so long query texts/request bodies stay slot-friendly."""
+    return f"{prefix}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _embedding_cache_ttl() -> float:
+    return float(os.getenv("EMBEDDING_CACHE_TTL_SEC", "86400"))
+
+
+def _response_cache_ttl() -> float:
+    return float(os.getenv("RECOMMEND_CACHE_TTL_SEC", "300"))
+
+
+def _lookup_stored_embedding(client, work_key: str):
+    """Tier 1: stored embedding for work_key, or None if the book is not in the collection."""
+    cache = get_shared_cache()
+    cache_key = _cache_key("emb:wk", work_key)
+    if cache is not None:
+        cached = cache.get_vector(cache_key)
+        record_cache_lookup("seed_embeddings", cached is not None)
+        if cached is not None:
+            return cached
+    # Escape work_key for filter (avoid injection)
+    work_key_safe = escape_filter_string(work_key)
+    existing = call_with_deadline(
+        client.query,
+        collection_name=COLLECTION_NAME,
+        filter=f'work_key == "{work_key_safe}"',
+        output_fields=["embedding"],
+        limit=1,
+    )
+    if not existing:
+        return None
+    vector = existing[0]["embedding"]
+    if cache is not None:
+        cache.set_vector(cache_key, vector, _embedding_cache_ttl())
+    return vector
+
+
+async def _embed_query_text(query_text: str):
+    """Tier 2 embedding, shared across workers by query text (HF calls are the slowest stage)."""
+    cache = get_shared_cache()
+    cache_key = _cache_key("emb:txt", query_text)
+    if cache is not None:
+        cached = cache.get_vector(cache_key)
+        record_cache_lookup("query_embeddings", cached is not None)
+        if cached is not None:
+            return cached
+    left = remaining_s()
+    # Keep enough of the request budget for the search that follows
+    timeout_s = None if left is None else max(0.001, left - MIN_STORE_CALL_BUDGET_S)
+    vector = await embed_text(query_text, timeout_s=timeout_s)
+    if vector is not None and cache is not None:
+        cache.set_vector(cache_key, vector, _embedding_cache_ttl())
+    return vector
+
+
+def _candidate_hits(hits: list, seed_work_key: str):
+    """
+    Yield (pk, distance, entity) for every search hit, in order. entity is None for hits to skip:
+    unusable rows, the seed itself and repeats of a work already yielded.
+    """
+    seen_works: set[str] = set()
+    for h in hits:
+        pk = h.get("id") if isinstance(h, dict) else getattr(h, "id", None)
+        dist = search_hit_distance(h)
+        entity = search_hit_entity_dict(h)
+        wk = entity.get("work_key") if entity else None
+        if wk is None or same_open_library_work(wk, seed_work_key):
+            yield pk, dist, None
+            continue
+        work_id = normalize_open_library_work_id(wk) or str(wk)
+        if work_id in seen_works:
+            yield pk, dist, None
+            continue
+        seen_works.add(work_id)
+        yield pk, dist, entity
+
+
+def _explain(request: RecommendRequest, entity: dict, dist: Optional[float]) -> dict:
+    with stage("explain"):
+        entity["explanation"] = build_deterministic_explanation(
+            seed_subjects=request.subjects,
+            seed_author=request.author_name,
+            rec=entity,
+            cosine_distance=dist,
+        )
+    return entity
+
+
+def _vector_page(
+    client,
+    request: RecommendRequest,
+    query_vector: list,
+    page_cursor: Optional[PageCursor],
+    query_digest: Optional[str],
+) -> tuple[list[dict], Optional[str]]:
+    """
+    One page of vector-search results plus the cursor for the next page (None when exhausted).
+
+    Overfetches just enough to cover dropping the seed and duplicate works. Later pages resume with
+    a range search from the last distance served, excluding ids already returned at that distance.
+    A first page with diversity/popularity/co-read re-ranking is served by _reranked_page (no cursor).
+    """
+    if page_cursor is None and request.reranked():
+        return _reranked_page(client, request, query_vector), None
+
+    fetch = overfetch_limit(request.limit)
+    search_kwargs = {}
+    boundary_filter = None
+    range_params = range_search_params(page_cursor.last_score) if page_cursor is not None else None
+    search_params = ann_search_params(fetch, request.ann_params, range_params)
+    if search_params:
+        search_kwargs["search_params"] = search_params
+    if page_cursor is not None and page_cursor.boundary_ids:
+        boundary_filter = f"id not in {id_list_literal(page_cursor.boundary_ids)}"
+    search_filter = and_filters(request.constraint_filter(), boundary_filter)
+    if search_filter:
+        search_kwargs["filter"] = search_filter
+    search_kwargs.update(_partition_kwargs(request.partition_names()))
+    with stage("search"):
+        results = call_with_deadline(
+            client.search,
+            collection_name=COLLECTION_NAME,
+            data=[query_vector],
+            limit=fetch,
+            output_fields=_output_fields(request.fields),
+            **search_kwargs,
+        )
+    # results: list of lists (one per query vector); each hit may have 'entity' or flat output_fields
+    hits = results[0] if results else []
+    recommendations = []
+    last_score = None
+    consumed: list[tuple[object, Optional[float]]] = []  # (id, raw score) of every hit looked at
+    # _candidate_hits yields one item per hit, in order; the cursor keeps the raw score for range search
+    for hit, (pk, dist, entity) in zip(hits, _candidate_hits(hits, request.work_key)):
+        score = search_hit_score(hit)
+        consumed.append((pk, score))
+        if entity is None:
+            continue
+        recommendations.append(_explain(request, entity, dist))
+        last_score = score
+        if len(recommendations) >= request.limit:
+            break
+
+    exhausted = len(hits) < fetch and len(consumed) == len(hits)
+    if exhausted or last_score is None or len(recommendations) < request.limit:
+        return recommendations, None
+    boundary = [pk for pk, s in consumed if s == last_score and pk is not None]
+    if page_cursor is not None and page_cursor.last_score == last_score:
+        # Whole page tied with the previous boundary: keep excluding the earlier ties too
+        boundary = list(dict.fromkeys(page_cursor.boundary_ids + boundary))
+    served = (page_cursor.served if page_cursor else 0) + len(recommendations)
+    next_cursor = encode_cursor(
+        PageCursor(
+            work_key=request.work_key,
+            last_score=last_score,
+            boundary_ids=boundary,
+            served=served,
+            query_digest=query_digest,
+        )
+    )
+    return recommendations, next_cursor
+
+
+def _co_read_candidates(client, request: RecommendRequest, scores: dict[int, float], present: set) -> list[tuple[dict, list]]:
+    """
+    (entity, embedding) for the seed's co-read works the vector search did not return, in one
+    `work_key in [...]` query under the request's constraints. Skipped (empty) when the deadline
+    cannot fit the query.
+    """
+    missing = [n for n in scores if n not in present]
+    if not missing or not _budget_allows(MIN_STORE_CALL_BUDGET_S):
+        return []
+    # Write-backs keep the work_key the client sent, so match both spellings
+    keys = [key for n in missing for key in (f"/works/OL{n}W", f"OL{n}W")]
     try:
-        client.insert(
+        with stage("co_read_fetch"):
+            rows = call_with_deadline(
+                client.query,
+                collection_name=COLLECTION_NAME,
+                filter=and_filters(f"work_key in {string_list_literal(keys)}", request.constraint_filter()),
+                output_fields=_output_fields(request.fields) + ["embedding"],
+                limit=len(keys),
+                **_partition_kwargs(request.partition_names()),
+            )
+    except DeadlineExceeded:
+        return []
+    found = []
+    for row in rows or []:
+        number = open_library_work_number(row.get("work_key"))
+        vector = row.pop("embedding", None)
+        if number in present or vector is None:
+            continue
+        present.add(number)
+        found.append((_sanitize_record(row), vector))
+    return found
+
+
+def _reranked_page(client, request: RecommendRequest, query_vector: list) -> list[dict]:
+    """
+    Overfetch RERANK_CANDIDATES hits with embeddings, then MMR + popularity blend in one NumPy pass.
+    With co_read_weight, the seed's co-read works join the candidates and each candidate's relevance
+    becomes (1 - co_read_weight) * cosine similarity + co_read_weight * co-read score.
+    """
+    # Imported on first use so NumPy stays off the startup path (see import_time_report).
+    from app.services.rerank import cosine_distances, mmr_order, popularity_scores
+
+    fetch = max(RERANK_CANDIDATES, overfetch_limit(request.limit))
+    search_kwargs = {}
+    search_params = ann_search_params(fetch, request.ann_params)
+    if search_params:
+        search_kwargs["search_params"] = search_params
+    constraint_filter = request.constraint_filter()
+    if constraint_filter:
+        search_kwargs["filter"] = constraint_filter
+    search_kwargs.update(_partition_kwargs(request.partition_names()))
+    with stage("search"):
+        results = call_with_deadline(
+            client.search,
             collection_name=COLLECTION_NAME,
-            data=[
-                {
-                    "id": _generate_new_id(),
-                    "work_key": work_key[:32],
-                    "title": (title or "")[:512],
-                    "author_name": (author_name or "")[:256],
-                    "subjects": ", ".join((subjects or [])[:10])[:2048],
-                    "description": "",
-                    "avg_rating": 0.0,
-                    "has_rating": False,
-                    "rating_count": 0,
-                    "want_to_read_count": 0,
-                    "currently_reading_count": 0,
-                    "already_read_count": 0,
-                    "total_shelf_count": 0,
-                    "cover_id": 0,
-                    "embedding": vector,
-                }
-            ],
+            data=[query_vector],
+            limit=fetch,
+            output_fields=_output_fields(request.fields) + ["embedding"],
+            **search_kwargs,
         )
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Background Zilliz write failed for %s: %s", work_key, e)
+    hits = results[0] if results else []
+    candidates: list[dict] = []
+    distances: list[Optional[float]] = []
+    vectors: list = []
+    for _, dist, entity in _candidate_hits(hits, request.work_key):
+        if entity is None:
+            continue
+        vector = entity.pop("embedding", None)
+        if vector is None:
+            continue
+        candidates.append(entity)
+        distances.append(dist)
+        vectors.append(vector)
 
+    co_reads: dict[int, float] = {}
+    index = _co_read_index() if request.co_read_weight > 0 else None
+    if index is not None:
+        with stage("co_read_lookup"):
+            co_reads = dict(index.neighbours(request.work_key) or [])
+        if co_reads:
+            present = {open_library_work_number(c.get("work_key")) for c in candidates}
+            present.add(open_library_work_number(request.work_key))
+            extra = _co_read_candidates(client, request, co_reads, present)
+            if extra:
+                candidates.extend(entity for entity, _ in extra)
+                vectors.extend(vector for _, vector in extra)
+                distances.extend(float(d) for d in cosine_distances(query_vector, [v for _, v in extra]))
+    if not candidates:
+        return []
+    relevance = [1.0 - (d if d is not None else 1.0) for d in distances]
+    co_read_scores = [co_reads.get(open_library_work_number(c.get("work_key")), 0.0) for c in candidates]
+    if co_reads:
+        w = request.co_read_weight
+        relevance = [(1.0 - w) * r + w * s for r, s in zip(relevance, co_read_scores)]
+    with stage("rerank"):
+        order = mmr_order(
+            vectors,
+            relevance,
+            request.limit,
+            diversity=request.diversity,
+            popularity=popularity_scores(candidates) if request.popularity_weight > 0 else None,
+            popularity_weight=request.popularity_weight,
+        )
+    page = []
+    for i in order:
+        entity = _explain(request, candidates[i], distances[i])
+        if co_read_scores[i] > 0:
+            entity["explanation"] = explanation_templates.co_read(entity["explanation"])
+        page.append(entity)
+    return page
 
-def _validate_token(request: Request) -> None:
-    secret = os.getenv("SECRET_TOKEN")
-    if not secret:
-        return
+
+def _budget_allows(estimate_s: float) -> bool:
+    """False when the request deadline leaves less than `estimate_s` (always True without a deadline)."""
+    left = remaining_s()
+    return left is None or left > estimate_s
+
+
+def _seed_enrichment_enabled() -> bool:
+    return os.getenv("SEED_ENRICHMENT", "1").strip().lower() not in ("0", "false", "no")
+
+
+async def _enrich_seed(request: RecommendRequest) -> RecommendRequest:
+    """
+    `request` with title, author_name and subjects from Open Library (cached, one fetch per work in
+    flight). Unchanged when disabled, the work is unknown, or the deadline cannot also fit the
+    embedding call and search; the fetch then only gets what is left after reserving those.
+    """
+    work_id = normalize_open_library_work_id(request.work_key)
+    if work_id is None or not _seed_enrichment_enabled():
+        return request
+    reserve_s = expected_latency_s() + MIN_STORE_CALL_BUDGET_S
+    left = remaining_s()
+    if left is not None and left <= reserve_s:
+        return request
+    with stage("enrich"):
+        doc = await open_library_service.get_work_cached(work_id, None if left is None else left - reserve_s)
+    if not doc:
+        return request
+    return request.model_copy(
+        update={
+            "title": doc["title"] if doc.get("title") != "Unknown" else "",
+            "author_name": doc["author_name"] if doc.get("author_name") != "Unknown" else "",
+            "subjects": [s for s in doc.get("subjects") or [] if isinstance(s, str)],
+        }
+    )
+
+
+def _subject_like(subject: str) -> str:
+    return f'subjects like "%{escape_like_pattern(subject)}%"'
+
+
+def _tier3_query(client, request: RecommendRequest, subject_filter: str) -> list:
+    """One Tier 3 subject-filter query (with the request's constraints) under the request deadline."""
+    if not _budget_allows(MIN_STORE_CALL_BUDGET_S):
+        raise DeadlineExceeded()
+    with stage("tier3_query"):
+        return call_with_deadline(
+            client.query,
+            collection_name=COLLECTION_NAME,
+            filter=and_filters(subject_filter, request.constraint_filter()),
+            output_fields=_output_fields(request.fields),
+            limit=request.limit,
+            **_partition_kwargs(request.partition_names()),
+        )
+
+
+def _append_tier3(request: RecommendRequest, recs: list, recommendations: list[dict]) -> None:
+    """Explain and append one Tier 3 query's results (deduplicated within the batch) up to the page size."""
+    seen_keys = {request.work_key}
+    for r in recs:
+        wk = (r.get("work_key") or "").strip()
+        if wk and wk != request.work_key and wk not in seen_keys:
+            seen_keys.add(wk)
+            r = _sanitize_record(r)
+            with stage("explain"):
+                r["explanation"] = build_deterministic_explanation(
+                    seed_subjects=request.subjects,
+                    seed_author=request.author_name,
+                    rec=r,
+                )
+            recommendations.append(r)
+            if len(recommendations) >= request.limit:
+                break
+
+
+def request_token(request: Request) -> Optional[str]:
+    """API token from ?token= or an `Authorization: Bearer` header (query parameter wins)."""
     auth = request.headers.get("Authorization")
     token = request.query_params.get("token")
     if auth and auth.startswith("Bearer "):
         token = token or auth[7:]
-    if token != secret:
+    return token
+
+
+def client_key(request: Request) -> str:
+    """
+    Stable per-client key for fairness (admission control): the digest of a caller's own token.
+    The shared SECRET_TOKEN identifies nobody, so its callers (and tokenless ones) are keyed by
+    X-Client-Id, else client address.
+    """
+    token = request_token(request)
+    if token and token != os.getenv("SECRET_TOKEN"):
+        return "t:" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+    client_id = request.headers.get("X-Client-Id", "").strip()
+    if client_id:
+        return "c:" + client_id[:64]
+    return "a:" + (request.client.host if request.client else "unknown")
+
+
+def _validate_token(request: Request) -> None:
+    secret = os.getenv("SECRET_TOKEN")
+    if not secret:
+        return
+    if request_token(request) != secret:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
@@ -122,85 +737,117 @@ def _validate_token(request: Request) -> None:
 async def recommend_zilliz(request: RecommendRequest, background_tasks: BackgroundTasks, req: Request):
     """Book recommendations via Zilliz vector search. Tier 1: stored embedding; Tier 2: embedding API + async write; Tier 3: subject filter."""
     _validate_token(req)
-    client = getattr(req.app.state, "zilliz_client", None)
-    if not client:
-        raise HTTPException(
-            status_code=503,
-            detail="Recommendation service not configured (ZILLIZ_ENDPOINT / ZILLIZ_API_KEY)",
-        )
+    return await _recommend(_get_zilliz_client(req), request, background_tasks, req)
+
+
+async def _recommend(
+    client, request: RecommendRequest, background_tasks: BackgroundTasks, req: Request, *, refresh: bool = False
+) -> dict:
+    """POST /recommend after auth. refresh=True (hot-key prefetch) recomputes and re-caches instead of reading the cache."""
+    if request.same_family and not partitions_enabled():
+        raise HTTPException(status_code=422, detail="same_family needs a collection with subject-family partitions")
+    # Serialized responses are shared by all workers on the host (SHARED_CACHE_PATH)
+    cache = get_shared_cache()
+    body = json.dumps(request.model_dump(), sort_keys=True)
+    response_key = _cache_key("rec", body)
+    if not refresh and request.cursor is None:
+        hot_keys.record("recommend", body)
+    if cache is not None and not refresh:
+        cached = cache.get_json(response_key)
+        record_cache_lookup("recommend_responses", cached is not None)
+        if cached is not None:
+            req.state.recommend_tier = "cache"
+            return cached
+
+    page_cursor = None
+    if request.cursor:
+        try:
+            page_cursor = decode_cursor(request.cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+        if not same_open_library_work(page_cursor.work_key, request.work_key):
+            raise HTTPException(status_code=400, detail="Cursor belongs to a different work_key")
+
+    # Catalog seeds with a plain first-page request are answered from the precomputed neighbour table
+    indexed = _index_page(request) if page_cursor is None else None
+    if indexed is not None:
+        req.state.recommend_tier = "index"
+        recommendations, next_cursor = indexed
+        _project(recommendations, request.fields)
+        out = {"recommendations": recommendations, "fallback_used": False, "next_cursor": next_cursor}
+        if cache is not None and recommendations:
+            cache.set_json(response_key, out, _response_cache_ttl())
+        return out
 
+    # Optional latency budget for this request; stages below take their timeouts from it
+    begin_deadline(budget_ms_from_headers(req.headers))
     fallback_used = False
     embedding_unavailable = False
-    # Escape work_key for filter (avoid injection)
-    work_key_safe = request.work_key.replace("\\", "\\\\").replace('"', '\\"')
+    degraded = False
+    query_digest = None
+    next_cursor = None
 
     # Tier 1: look up stored embedding by work_key
-    existing = client.query(
-        collection_name=COLLECTION_NAME,
-        filter=f'work_key == "{work_key_safe}"',
-        output_fields=["embedding"],
-        limit=1,
-    )
+    try:
+        with stage("tier1_query"):
+            stored_vector = _lookup_stored_embedding(client, request.work_key)
+    except DeadlineExceeded:
+        stored_vector = None
+        degraded = True
 
-    if existing:
-        query_vector = existing[0]["embedding"]
-    else:
+    query_vector = None
+    if stored_vector is not None:
+        query_vector = stored_vector
+        req.state.recommend_tier = 1
+    elif not degraded:
+        if not _build_query_text(request.title, request.author_name, request.subjects):
+            # work_key only: look the book up on Open Library so Tier 2 (and the write-back) can run
+            request = await _enrich_seed(request)
         # Tier 2: generate embedding via API from Open Library metadata; fall back to Tier 3 if API fails
         query_text = _build_query_text(request.title, request.author_name, request.subjects)
-        if query_text:
-            query_vector = await embed_text(query_text)
+        if query_text and not _budget_allows(expected_latency_s() + MIN_STORE_CALL_BUDGET_S):
+            # Not enough budget left for embedding + search: go straight to Tier 3
+            degraded = True
+        elif query_text:
+            with stage("embed"):
+                query_vector = await _embed_query_text(query_text)
             if query_vector is not None:
-                background_tasks.add_task(
-                    _store_new_book,
-                    client,
-                    request.work_key,
-                    request.title,
-                    request.author_name,
-                    request.subjects,
-                    query_vector,
-                )
+                req.state.recommend_tier = 2
+                query_digest = hashlib.sha256(query_text.encode("utf-8")).hexdigest()[:16]
+                if page_cursor is None:
+                    # Later pages reuse the vector; the write-back was scheduled by page 1
+                    BACKGROUND_WRITE_QUEUE.inc()
+                    background_tasks.add_task(
+                        _store_new_book,
+                        client,
+                        request.work_key,
+                        request.title,
+                        request.author_name,
+                        request.subjects,
+                        query_vector,
+                    )
                 fallback_used = True
             else:
-                query_vector = None
                 embedding_unavailable = True
-        else:
-            query_vector = None
 
+    recommendations = []
     if query_vector is not None:
-        results = client.search(
-            collection_name=COLLECTION_NAME,
-            data=[query_vector],
-            limit=11,
-            output_fields=OUTPUT_FIELDS,
+        if page_cursor is not None and page_cursor.query_digest and page_cursor.query_digest != query_digest:
+            raise HTTPException(status_code=400, detail="Cursor does not match this request's seed metadata")
+        try:
+            recommendations, next_cursor = _vector_page(client, request, query_vector, page_cursor, query_digest)
+        except DeadlineExceeded:
+            degraded = True
+    elif page_cursor is not None:
+        # Tier 3 has no notion of the cursor: replaying its first page would hand the client duplicates
+        raise HTTPException(
+            status_code=503,
+            detail="Cannot resume this page now (embedding unavailable or out of time); retry with the same cursor",
         )
-        # results: list of lists (one per query vector); each hit may have 'entity' or flat output_fields
-        hits = results[0] if results else []
-        recommendations = []
-        for h in hits:
-            dist = search_hit_distance(h)
-            entity = search_hit_entity_dict(h)
-            if not entity:
-                continue
-            wk = entity.get("work_key")
-            if wk is None:
-                continue
-            if same_open_library_work(wk, request.work_key):
-                continue
-            entity["explanation"] = build_deterministic_explanation(
-                seed_subjects=request.subjects,
-                seed_author=request.author_name,
-                rec=entity,
-                cosine_distance=dist,
-            )
-            recommendations.append(entity)
-            if len(recommendations) >= 10:
-                break
-        if not recommendations and hits:
-            # All hits were the seed (shouldn't happen in Tier 2) or work_key missing
-            pass
     else:
-        # Tier 3: subject filter — last resort when embedding failed or unavailable
+        # Tier 3: subject filter — last resort when embedding failed, unavailable or out of budget
         fallback_used = True
+        req.state.recommend_tier = 3
         # Prefer generic subjects; skip API-specific "series:..." so we match bulk Zilliz data
         subject_candidates = [
             s for s in (request.subjects or [])
@@ -208,43 +855,36 @@ async def recommend_zilliz(request: RecommendRequest, background_tasks: Backgrou
         ]
         if not subject_candidates:
             subject_candidates = [s for s in (request.subjects or []) if s]
-        recommendations = []
-        for subject in subject_candidates[:5]:
-            if len(recommendations) >= 10:
+        # One indexed array_contains_any for every candidate; the LIKE scans below only run if it finds nothing
+        tags_filter = subject_tags_filter(subject_candidates[:5]) if subject_tags_enabled() else ""
+        like_candidates = subject_candidates[:5]
+        if tags_filter:
+            try:
+                _append_tier3(request, _tier3_query(client, request, tags_filter) or [], recommendations)
+            except DeadlineExceeded:
+                degraded = True
+                like_candidates = []
+            if recommendations:
+                like_candidates = []
+        for subject in like_candidates:
+            if len(recommendations) >= request.limit:
+                break
+            try:
+                recs = _tier3_query(client, request, _subject_like(subject))
+            except DeadlineExceeded:
+                degraded = True
                 break
-            subject_safe = subject.replace("\\", "\\\\").replace('"', '\\"').replace("%", "\\%")
-            recs = client.query(
-                collection_name=COLLECTION_NAME,
-                filter=f'subjects like "%{subject_safe}%"',
-                output_fields=OUTPUT_FIELDS,
-                limit=10,
-            )
             if recs:
-                seen_keys = {request.work_key}
-                for r in recs:
-                    wk = (r.get("work_key") or "").strip()
-                    if wk and wk != request.work_key and wk not in seen_keys:
-                        seen_keys.add(wk)
-                        r = _sanitize_record(r)
-                        r["explanation"] = build_deterministic_explanation(
-                            seed_subjects=request.subjects,
-                            seed_author=request.author_name,
-                            rec=r,
-                        )
-                        recommendations.append(r)
-                        if len(recommendations) >= 10:
-                            break
+                _append_tier3(request, recs, recommendations)
         # If we still have nothing, try first subject even if series: (for small catalogs)
-        if not recommendations and request.subjects:
+        if not recommendations and not degraded and request.subjects:
             subject = request.subjects[0]
             if subject:
-                subject_safe = subject.replace("\\", "\\\\").replace('"', '\\"').replace("%", "\\%")
-                recs = client.query(
-                    collection_name=COLLECTION_NAME,
-                    filter=f'subjects like "%{subject_safe}%"',
-                    output_fields=OUTPUT_FIELDS,
-                    limit=10,
-                )
+                try:
+                    recs = _tier3_query(client, request, _subject_like(subject))
+                except DeadlineExceeded:
+                    recs = None
+                    degraded = True
                 if recs:
                     for r in recs:
                         if (r.get("work_key") or "").strip() != request.work_key:
@@ -255,12 +895,16 @@ async def recommend_zilliz(request: RecommendRequest, background_tasks: Backgrou
                                 rec=r,
                             )
                             recommendations.append(r)
-                            if len(recommendations) >= 10:
+                            if len(recommendations) >= request.limit:
                                 break
 
-    out = {"recommendations": recommendations, "fallback_used": fallback_used}
+    _project(recommendations, request.fields)
+    out = {"recommendations": recommendations, "fallback_used": fallback_used, "next_cursor": next_cursor}
     if embedding_unavailable:
         out["embedding_unavailable"] = True
+    if degraded:
+        # Deadline cut a stage short: results are partial (or from a lower tier)
+        out["degraded"] = True
     # Hint when work_key-only request had no metadata: book not in Zilliz and no title/author/subjects to build embedding
     if not recommendations and not _build_query_text(request.title, request.author_name, request.subjects):
         out["hint"] = "Book not in catalog or no metadata provided. Send title, author_name, and subjects for similar books."
@@ -272,6 +916,227 @@ async def recommend_zilliz(request: RecommendRequest, background_tasks: Backgrou
             out["hint"] = "Vector search returned no other books. The catalog may be empty or the seed has no close matches yet."
         else:
             out["hint"] = "No similar books found. The catalog may have few books matching this title/subjects, or the subject filter did not match (try more general subjects)."
+    # Don't pin degraded (embedding outage, deadline) or empty answers in the shared cache
+    if cache is not None and recommendations and not embedding_unavailable and not degraded:
+        cache.set_json(response_key, out, _response_cache_ttl())
+    return out
+
+
+# --- Profile: recommendations from a reader's history in one multi-vector search ---
+
+MAX_PROFILE_READS = 200
+
+
+class ReadEvent(BaseModel):
+    work_key: str
+    read_at: Optional[str] = None  # ISO 8601; undated reads weigh as much as the oldest dated one
+
+
+class ProfileRequest(BaseModel):
+    # Either a user whose history is stored in Mongo, or the reads themselves (newest first)
+    user_id: Optional[str] = None
+    reads: list[ReadEvent] = Field(default_factory=list, max_length=MAX_PROFILE_READS)
+    limit: int = Field(10, ge=1, le=MAX_PAGE_SIZE)
+    # Most recent reads used for the profile
+    history_limit: int = Field(50, ge=1, le=MAX_PROFILE_READS)
+    # Taste clusters searched side by side (1 = one recency-weighted centroid)
+    clusters: int = Field(1, ge=1, le=5)
+    # Age (days) at which a read counts half as much (PROFILE_HALF_LIFE_DAYS when omitted)
+    half_life_days: Optional[float] = Field(None, gt=0)
+    # Response projection (subset of OUTPUT_FIELDS); omit for every field
+    fields: Optional[list[str]] = None
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, v: Optional[list[str]]) -> Optional[list[str]]:
+        return _check_fields(v)
+
+    @model_validator(mode="after")
+    def require_history(self) -> "ProfileRequest":
+        if not self.user_id and not self.reads:
+            raise ValueError("Send user_id (stored reading history) or reads")
+        return self
+
+
+def _profile_half_life_days() -> float:
+    return float(os.getenv("PROFILE_HALF_LIFE_DAYS", "180"))
+
+
+async def _profile_reads(request: ProfileRequest) -> list[dict]:
+    """Newest-first reads (one per work) from the request, else one indexed Mongo query."""
+    if request.reads:
+        reads = [r.model_dump() for r in request.reads]
+    else:
+        try:
+            collection = get_books_collection()
+        except RuntimeError:
+            raise HTTPException(status_code=503, detail="Reading history not configured (MONGO_URL)")
+        with stage("history_query"):
+            reads = await asyncio.get_running_loop().run_in_executor(
+                None, load_recent_reads, collection, request.user_id, request.history_limit
+            )
+    unique: dict[str, dict] = {}
+    for r in reads:
+        unique.setdefault(r["work_key"], r)
+    return list(unique.values())[: request.history_limit]
+
+
+def _profile_recommendations(client, request: ProfileRequest, reads: list[dict]) -> tuple[list[dict], dict]:
+    """One work_key-in query for the read books' embeddings, then one search with every profile centroid."""
+    import numpy as np
+
+    read_keys = [r["work_key"] for r in reads]
+    with stage("profile_embeddings"):
+        rows = call_with_deadline(
+            client.query,
+            collection_name=COLLECTION_NAME,
+            filter=f"work_key in {string_list_literal(read_keys)}",
+            output_fields=["work_key", "title", "author_name", "subjects", "embedding"]
+            + ([SUBJECT_TAGS_FIELD] if subject_tags_enabled() else []),
+            limit=len(read_keys),
+        )
+    by_key = {r["work_key"]: r for r in rows or [] if r.get("embedding") is not None}
+    reads = [r for r in reads if r["work_key"] in by_key]
+    profile = {"reads": len(read_keys), "reads_in_catalog": len(reads), "clusters": 0}
+    if not reads:
+        return [], profile
+
+    half_life = request.half_life_days or _profile_half_life_days()
+    weights = recency_weights([r.get("read_at") for r in reads], half_life)
+    books = [by_key[r["work_key"]] for r in reads]
+    with stage("profile_build"):
+        centroids, shares, _ = profile_centroids([b["embedding"] for b in books], weights, request.clusters)
+    profile["clusters"] = len(centroids)
+
+    # Each centroid's list must fill the page on its own once the others run dry
+    fetch = overfetch_limit(request.limit)
+    search_params = ann_search_params(fetch)
+    with stage("search"):
+        results = call_with_deadline(
+            client.search,
+            collection_name=COLLECTION_NAME,
+            data=[c.tolist() for c in centroids],
+            limit=fetch,
+            filter=f"work_key not in {string_list_literal(read_keys)}",
+            output_fields=_output_fields(request.fields) + ["embedding"],
+            **({"search_params": search_params} if search_params else {}),
+        )
+    lists = []
+    for hits in results or []:
+        entities = []
+        for _, dist, entity in _candidate_hits(hits, ""):
+            if entity is not None and entity.get("work_key") not in by_key:
+                entity["_distance"] = dist
+                entities.append(entity)
+        lists.append(entities)
+    picked = interleave(lists, shares, request.limit)
+    if not picked:
+        return [], profile
+
+    # Explain each pick against the read book it is closest to
+    read_matrix = np.asarray([b["embedding"] for b in books], dtype=np.float32)
+    read_matrix /= np.maximum(np.linalg.norm(read_matrix, axis=1, keepdims=True), 1e-12)
+    recommendations = []
+    with stage("explain"):
+        for _, entity in picked:
+            vector = entity.pop("embedding", None)
+            dist = entity.pop("_distance", None)
+            closest = int(np.argmax(read_matrix @ np.asarray(vector, dtype=np.float32))) if vector is not None else 0
+            anchor = books[closest]
+            reason = build_deterministic_explanation(
+                seed_subjects=record_subject_phrases(anchor),
+                seed_author=anchor.get("author_name") or "",
+                rec=entity,
+                cosine_distance=dist,
+            )
+            entity = _sanitize_record(entity)
+            entity["explanation"] = explanation_templates.because_you_read(anchor.get("title") or "", reason)
+            recommendations.append(entity)
+    return recommendations, profile
+
+
+@router.post("/recommend/profile")
+async def recommend_profile(request: ProfileRequest, req: Request):
+    """Recommendations for a reader's recent history: one embeddings query + one multi-vector search, read books excluded."""
+    _validate_token(req)
+    client = _get_zilliz_client(req)
+    begin_deadline(budget_ms_from_headers(req.headers))
+    reads = await _profile_reads(request)
+    req.state.recommend_tier = "profile"
+    out: dict = {"recommendations": [], "profile": {"reads": 0, "reads_in_catalog": 0, "clusters": 0}}
+    if reads:
+        try:
+            out["recommendations"], out["profile"] = _profile_recommendations(client, request, reads)
+        except DeadlineExceeded:
+            out["degraded"] = True
+    _project(out["recommendations"], request.fields)
+    if not out["recommendations"] and not out.get("degraded"):
+        out["hint"] = "No reads with stored embeddings; profile recommendations need books from the catalog."
+    return out
+
+
+# --- Book detail: description fetched on demand (recommendation payloads can omit it via `fields`) ---
+
+# Descriptions change only on re-ingest; cache per process and let clients/CDNs cache too.
+DESCRIPTION_CACHE_SIZE = 2048
+_descriptions: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+
+def _description_cache_ttl() -> float:
+    return float(os.getenv("DESCRIPTION_CACHE_TTL_SEC", "86400"))
+
+
+def _cached_description(key: str) -> Optional[dict]:
+    entry = _descriptions.get(key)
+    if entry is not None and entry[0] > time.time():
+        _descriptions.move_to_end(key)
+        record_cache_lookup("descriptions", True)
+        return entry[1]
+    cache = get_shared_cache()
+    cached = cache.get_json(key) if cache is not None else None
+    record_cache_lookup("descriptions", cached is not None)
+    if cached is not None:
+        _store_description(key, cached, shared=False)
+    return cached
+
+
+def _store_description(key: str, out: dict, *, shared: bool = True) -> None:
+    ttl = _description_cache_ttl()
+    _descriptions[key] = (time.time() + ttl, out)
+    _descriptions.move_to_end(key)
+    while len(_descriptions) > DESCRIPTION_CACHE_SIZE:
+        _descriptions.popitem(last=False)
+    cache = get_shared_cache()
+    if shared and cache is not None:
+        cache.set_json(key, out, ttl)
+
+
+@router.get("/books/{work_key:path}/description")
+async def book_description(work_key: str, req: Request, response: Response):
+    """Description for one book (accepts OL123W, works/OL123W or /works/OL123W)."""
+    _validate_token(req)
+    work_id = normalize_open_library_work_id(work_key)
+    if work_id is None:
+        raise HTTPException(status_code=400, detail=f"Invalid Open Library work key '{work_key}'")
+    client = _get_zilliz_client(req)
+    response.headers["Cache-Control"] = f"public, max-age={int(_description_cache_ttl())}"
+
+    cache_key = f"desc:{work_id}"
+    cached = _cached_description(cache_key)
+    if cached is not None:
+        return cached
+    stored_key = f"/works/{work_id}"
+    with stage("description_query"):
+        rows = client.query(
+            collection_name=COLLECTION_NAME,
+            filter=f'work_key == "{escape_filter_string(stored_key)}"',
+            output_fields=["work_key", "description"],
+            limit=1,
+        )
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"Book {stored_key} not in catalog")
+    out = {"work_key": stored_key, "description": rows[0].get("description") or ""}
+    _store_description(cache_key, out)
     return out
 
 
@@ -293,12 +1158,79 @@ MOOD_SUBJECT_MAP: dict[str, list[str]] = {
 
 class MoodRequest(BaseModel):
     mood: str
-    limit: int = 10
+    limit: int = Field(10, ge=1, le=MAX_PAGE_SIZE)
+    # Share of the centroid ranking taken by popularity (MOOD_POPULARITY_WEIGHT when omitted)
+    popularity_weight: Optional[float] = Field(None, ge=0.0, le=1.0)
+    # Response projection (subset of OUTPUT_FIELDS); omit for every field
+    fields: Optional[list[str]] = None
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, v: Optional[list[str]]) -> Optional[list[str]]:
+        return _check_fields(v)
+
+    @field_validator("mood")
+    @classmethod
+    def normalize_mood(cls, v: str) -> str:
+        # One spelling per mood, so "Cozy" and "cozy" share a cache entry and a hot-key counter
+        return v.strip().lower()
+
+
+# Centroid searches overfetch this many hits when popularity-blending
+MOOD_CANDIDATES = 50
+
+# Per-process mood responses, LRU-capped (keys include the request's limit, weight and projection);
+# SHARED_CACHE_PATH extends it across workers.
+MOOD_RESPONSE_CACHE_SIZE = 512
+_mood_responses: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+
+def _mood_cache_ttl() -> float:
+    return float(os.getenv("MOOD_CACHE_TTL_SEC", "600"))
+
+
+def _mood_popularity_weight() -> float:
+    return float(os.getenv("MOOD_POPULARITY_WEIGHT", "0.3"))
+
+
+def _cached_mood_response(key: str) -> Optional[dict]:
+    entry = _mood_responses.get(key)
+    if entry is not None:
+        if entry[0] > time.time():
+            _mood_responses.move_to_end(key)
+            record_cache_lookup("mood_responses", True)
+            return entry[1]
+        del _mood_responses[key]
+    cache = get_shared_cache()
+    cached = cache.get_json(key) if cache is not None else None
+    record_cache_lookup("mood_responses", cached is not None)
+    if cached is not None:
+        _store_mood_response(key, cached, shared=False)
+    return cached
+
+
+def _store_mood_response(key: str, out: dict, *, shared: bool = True) -> None:
+    ttl = _mood_cache_ttl()
+    _mood_responses[key] = (time.time() + ttl, out)
+    _mood_responses.move_to_end(key)
+    while len(_mood_responses) > MOOD_RESPONSE_CACHE_SIZE:
+        _mood_responses.popitem(last=False)
+    cache = get_shared_cache()
+    if shared and cache is not None:
+        cache.set_json(key, out, ttl)
 
 
 def _get_zilliz_client(req: Request):
     client = getattr(req.app.state, "zilliz_client", None)
     if not client:
+        readiness = getattr(req.app.state, "readiness", None)
+        if readiness is not None and readiness.backend != "none":
+            # Background connect still in progress (see app/services/warmup.py)
+            raise HTTPException(
+                status_code=503,
+                detail="Recommendation service is starting; vector store not connected yet",
+                headers={"Retry-After": "5"},
+            )
         raise HTTPException(
             status_code=503,
             detail="Recommendation service not configured (ZILLIZ_ENDPOINT / ZILLIZ_API_KEY)",
@@ -308,57 +1240,272 @@ def _get_zilliz_client(req: Request):
 
 @router.post("/recommend/mood")
 async def recommend_by_mood(request: MoodRequest, req: Request):
-    """Return books matching a reading mood/vibe via subject filter on Zilliz."""
+    """Return books matching a reading mood/vibe: one search with the mood centroid, else subject filter on Zilliz."""
     _validate_token(req)
-    subjects = MOOD_SUBJECT_MAP.get(request.mood.lower())
+    subjects = MOOD_SUBJECT_MAP.get(request.mood)
     if not subjects:
         raise HTTPException(
             status_code=400,
             detail=f"Unknown mood '{request.mood}'. Valid moods: {sorted(MOOD_SUBJECT_MAP.keys())}",
         )
     client = _get_zilliz_client(req)
+    hot_keys.record("mood", json.dumps(request.model_dump(), sort_keys=True))
+    out, tier = _mood_response(client, request, subjects)
+    req.state.recommend_tier = tier
+    return out
 
-    results: list[dict] = []
-    seen: set[str] = set()
-    for subject in subjects[:3]:
-        subject_safe = subject.replace("\\", "\\\\").replace('"', '\\"').replace("%", "\\%")
-        hits = client.query(
+
+def _mood_cache_key(request: MoodRequest, popularity_weight: float) -> str:
+    projection = ",".join(sorted(request.fields)) if request.fields is not None else "*"
+    return f"mood:{request.mood}:{request.limit}:{popularity_weight:g}:{projection}"
+
+
+def _mood_response(client, request: MoodRequest, subjects: list[str], *, refresh: bool = False) -> tuple[dict, str]:
+    """(response, tier) for a validated mood request; refresh=True recomputes and re-caches."""
+    popularity_weight = (
+        request.popularity_weight if request.popularity_weight is not None else _mood_popularity_weight()
+    )
+    cache_key = _mood_cache_key(request, popularity_weight)
+    cached = None if refresh else _cached_mood_response(cache_key)
+    if cached is not None:
+        return cached, "cache"
+
+    top, source = _mood_recommendations(
+        client, request.mood, subjects, request.limit, popularity_weight, fields=request.fields
+    )
+    out = {"mood": request.mood, "recommendations": top}
+    if top:
+        _store_mood_response(cache_key, out)
+    return out, f"mood_{source}"
+
+
+def _mood_recommendations(
+    client,
+    mood: str,
+    subjects: list[str],
+    limit: int,
+    popularity_weight: float,
+    fields: Optional[list[str]] = None,
+) -> tuple[list[dict], str]:
+    """(recommendations, "centroid" | "subjects"): centroid search when built, else the subject-filter scan."""
+    output_fields = _output_fields(fields)
+    centroid = get_centroid(mood, subjects)
+    top = []
+    if centroid is not None:
+        top = _mood_centroid_candidates(client, centroid, limit, popularity_weight, output_fields)
+    source = "centroid"
+    if not top:
+        source = "subjects"
+        results = _mood_candidates(client, subjects, limit, output_fields)
+        # Sort by popularity — popular-within-vibe wins
+        results.sort(key=lambda x: x.get("total_shelf_count") or 0, reverse=True)
+        top = results[:limit]
+
+    # Inject mood-aware explanation into each result
+    with stage("explain"):
+        _apply_mood_explanations(top, mood, subjects)
+    _project(top, fields)
+    return top, source
+
+
+def _mood_centroid_candidates(
+    client,
+    centroid: list[float],
+    limit: int,
+    popularity_weight: float,
+    output_fields: list[str] = OUTPUT_FIELDS,
+) -> list[dict]:
+    """One vector search around the mood centroid, optionally blended with popularity (see rerank.py)."""
+    fetch = max(limit, MOOD_CANDIDATES) if popularity_weight > 0 else limit
+    search_params = ann_search_params(fetch)
+    with stage("mood_search"):
+        results = client.search(
             collection_name=COLLECTION_NAME,
-            filter=f'subjects like "%{subject_safe}%"',
-            output_fields=OUTPUT_FIELDS,
-            limit=20,
+            data=[centroid],
+            limit=fetch,
+            output_fields=output_fields,
+            **({"search_params": search_params} if search_params else {}),
+        )
+    candidates: list[dict] = []
+    distances: list[Optional[float]] = []
+    for _, dist, entity in _candidate_hits(results[0] if results else [], ""):
+        if entity is not None:
+            candidates.append(_sanitize_record(entity))
+            distances.append(dist)
+    if popularity_weight <= 0 or len(candidates) <= 1:
+        return candidates[:limit]
+
+    # Imported on first use so NumPy stays off the startup path (see import_time_report).
+    from app.services.rerank import mmr_order, popularity_scores
+
+    with stage("rerank"):
+        order = mmr_order(
+            None,
+            [1.0 - (d if d is not None else 1.0) for d in distances],
+            limit,
+            popularity=popularity_scores(candidates),
+            popularity_weight=popularity_weight,
         )
+    return [candidates[i] for i in order]
+
+
+def _mood_candidates(client, subjects: list[str], limit: int, output_fields: list[str] = OUTPUT_FIELDS) -> list[dict]:
+    """
+    Subject-filter candidates deduplicated by work_key: one array_contains_any query over the first
+    3 subjects when the collection has subject_tags, else up to 3 LIKE queries stopping at `limit`.
+    Never partition-pruned: a row sits in the family of its first mapped subject only, so a book
+    tagged "Fantasy, Humor" must still be found by a humor tag.
+    """
+    results: list[dict] = []
+    seen: set[str] = set()
+    tags_filter = subject_tags_filter(subjects[:3]) if subject_tags_enabled() else ""
+    if tags_filter:
+        filters = [(tags_filter, 20 * len(subjects[:3]))]
+    else:
+        filters = [(_subject_like(subject), 20) for subject in subjects[:3]]
+    for subject_filter, query_limit in filters:
+        with stage("mood_query"):
+            hits = client.query(
+                collection_name=COLLECTION_NAME,
+                filter=subject_filter,
+                output_fields=output_fields,
+                limit=query_limit,
+            )
         for h in hits or []:
             wk = (h.get("work_key") or "").strip()
             if wk and wk not in seen:
                 seen.add(wk)
                 results.append(_sanitize_record(h))
-        if len(results) >= request.limit:
+        if len(results) >= limit:
             break
+    return results
 
-    # Sort by popularity — popular-within-vibe wins
-    results.sort(key=lambda x: x.get("total_shelf_count") or 0, reverse=True)
-    top = results[: request.limit]
 
-    # Inject mood-aware explanation into each result
+def _apply_mood_explanations(top: list[dict], mood: str, subjects: list[str]) -> None:
+    """Inject mood-aware explanation into each result (subject tag, then popularity, then rating)."""
     for r in top:
         shelf = r.get("total_shelf_count") or 0
         avg = r.get("avg_rating") or 0.0
-        rec_subjects_raw = (r.get("subjects") or "").lower()
+        rec_phrases = record_subject_phrases(r)
         matched_tag = next(
-            (s for s in subjects[:3] if s.lower() in rec_subjects_raw),
+            (s for s in subjects[:3] if any(s.lower() in phrase for phrase in rec_phrases)),
             None,
         )
         if matched_tag:
-            r["explanation"] = f"Matched the \"{request.mood}\" mood via the subject \"{matched_tag}\"."
+            r["explanation"] = f"Matched the \"{mood}\" mood via the subject \"{matched_tag}\"."
         elif shelf > 10_000:
-            r["explanation"] = f"A widely loved title that fits the {request.mood} vibe ({shelf:,} readers shelved it)."
+            r["explanation"] = f"A widely loved title that fits the {mood} vibe ({shelf:,} readers shelved it)."
         elif r.get("has_rating") and avg >= 4.0:
-            r["explanation"] = f"Highly rated ({avg:.1f} avg) and a strong fit for the {request.mood} mood."
+            r["explanation"] = f"Highly rated ({avg:.1f} avg) and a strong fit for the {mood} mood."
         else:
-            r["explanation"] = f"Recommended for its {request.mood} reading vibe."
+            r["explanation"] = f"Recommended for its {mood} reading vibe."
+
+
+# --- Warm-up steps (run before /readyz reports ready; see app/services/warmup.py) ---
+
+
+async def _warm_subject_tags(client) -> None:
+    """Check whether the collection has the subject_tags array, switching subject lookups to array_contains_any."""
+    await asyncio.get_running_loop().run_in_executor(None, detect_subject_tags, client, COLLECTION_NAME)
+
+
+async def _warm_partitions(client) -> None:
+    """List the collection's subject-family partitions, switching searches to partition_names pruning."""
+    await asyncio.get_running_loop().run_in_executor(None, detect_partitions, client, COLLECTION_NAME)
+
+
+async def _warm_hot_seeds(client) -> None:
+    """Tier 1 lookup + vector search for each WARMUP_WORK_KEYS seed, pulling their segments into cache."""
+    loop = asyncio.get_running_loop()
+    for work_key in warmup_work_keys():
+        vector = await loop.run_in_executor(None, _lookup_stored_embedding, client, work_key)
+        if vector is None:
+            continue
+        await loop.run_in_executor(
+            None,
+            lambda: client.search(collection_name=COLLECTION_NAME, data=[vector], limit=11, output_fields=OUTPUT_FIELDS),
+        )
+
+
+async def _warm_mood_centroids(client) -> None:
+    """Load mood centroids from MOOD_CENTROIDS_PATH, embedding any missing ones when the embedding API is configured."""
+    await ensure_centroids(MOOD_SUBJECT_MAP)
+
+
+async def _warm_moods(client) -> None:
+    """Pre-populate the mood response cache for WARMUP_MOODS ("all" for every mood) at the default limit."""
+    moods = warmup_moods()
+    if moods == ["all"]:
+        moods = list(MOOD_SUBJECT_MAP)
+    loop = asyncio.get_running_loop()
+    for mood in moods:
+        request = MoodRequest(mood=mood)
+        subjects = MOOD_SUBJECT_MAP.get(request.mood)
+        if not subjects:
+            continue
+        await loop.run_in_executor(None, lambda: _mood_response(client, request, subjects))
 
-    return {"mood": request.mood, "recommendations": top}
+
+# Hot entry -> when its prefetched response expires (monotonic clock)
+_prefetched: dict[str, float] = {}
+
+
+def _internal_request() -> Request:
+    """Stand-in Request for recomputing a response outside an HTTP call (hot-key prefetch)."""
+    return Request({"type": "http", "method": "POST", "path": "/recommend", "headers": [], "query_string": b""})
+
+
+async def prefetch_hot_keys(client, n: Optional[int] = None, *, due_only: bool = False) -> int:
+    """
+    Recompute and re-cache the `n` hottest requests (HOT_KEYS_PREFETCH); /recommend entries only when
+    there is a response cache (SHARED_CACHE_PATH) to fill. With due_only, only those never prefetched
+    here or whose prefetched copy expires within HOT_KEYS_REFRESH_MARGIN_SEC.
+    """
+    margin_s = float(os.getenv("HOT_KEYS_REFRESH_MARGIN_SEC", "60"))
+    loop = asyncio.get_running_loop()
+    done = 0
+    for route, body, _ in hot_keys.top_entries(hot_keys.prefetch_count() if n is None else n):
+        key = f"{route} {json.dumps(body, sort_keys=True)}"
+        if due_only and _prefetched.get(key, 0.0) - time.monotonic() > margin_s:
+            continue
+        try:
+            if route == "recommend":
+                if get_shared_cache() is None:
+                    continue
+                tasks = BackgroundTasks()
+                await _recommend(client, RecommendRequest(**body), tasks, _internal_request(), refresh=True)
+                await tasks()
+                ttl = _response_cache_ttl()
+            elif route == "mood":
+                request = MoodRequest(**body)
+                subjects = MOOD_SUBJECT_MAP.get(request.mood)
+                if not subjects:
+                    continue
+                await loop.run_in_executor(None, lambda: _mood_response(client, request, subjects, refresh=True))
+                ttl = _mood_cache_ttl()
+            else:
+                continue
+        except Exception as e:
+            logger.warning("Prefetch of hot %s request failed: %s", route, e)
+            continue
+        _prefetched[key] = time.monotonic() + ttl
+        done += 1
+    return done
+
+
+async def _warm_hot_keys(client) -> None:
+    """Load the HOT_KEYS_PATH snapshot and pre-compute the hottest /recommend and mood responses."""
+    loaded = await asyncio.get_running_loop().run_in_executor(None, hot_keys.load_snapshot)
+    if loaded:
+        logger.info("Prefetched %s hot requests (%s tracked)", await prefetch_hot_keys(client), loaded)
+
+
+register_warmup_step("subject_tags", _warm_subject_tags)
+register_warmup_step("partitions", _warm_partitions)
+register_warmup_step("hot_seeds", _warm_hot_seeds)
+register_warmup_step("mood_centroids", _warm_mood_centroids)
+register_warmup_step("moods", _warm_moods)
+register_warmup_step("hot_keys", _warm_hot_keys)
 
 
 # --- Legacy route: track recommendations (MongoDB Tracks only). Book recommendations use POST /recommend (Zilliz). ---
@@ -372,7 +1519,8 @@ async def recommend_songs(track_id: str, token: str, top_n: int = 10):
     collection = get_mongo_collection()
 
     # Fetch the target song from MongoDB (Spotify fallback removed)
-    target_song = collection.find_one({"track_id": track_id})
+    with stage("mongo_find_one"):
+        target_song = collection.find_one({"track_id": track_id})
 
     required_features = ['danceability', 'energy', 'valence', 'loudness', 'key', 'speechiness', 'image_url', 'popularity', 'acousticness', 'instrumentalness', 'liveness', 'tempo', 'time_signature', 'mode']
 
@@ -387,15 +1535,20 @@ async def recommend_songs(track_id: str, token: str, top_n: int = 10):
         raise HTTPException(status_code=400, detail="Target song is missing necessary audio features")
 
     # Get all tracks with necessary features
-    all_tracks = list(collection.find({key: {"$exists": True, "$ne": None} for key in required_features}, {
-        "_id": 0, "track_id": 1, "track_name": 1, "artist_name": 1, "popularity": 1, **{key: 1 for key in required_features}
-    }))
+    with stage("mongo_find"):
+        all_tracks = list(collection.find({key: {"$exists": True, "$ne": None} for key in required_features}, {
+            "_id": 0, "track_id": 1, "track_name": 1, "artist_name": 1, "popularity": 1, **{key: 1 for key in required_features}
+        }))
 
     # Define feature columns for similarity calculation
     feature_columns = ['popularity', 'danceability', 'energy', 'valence', 'loudness', 'key', 'speechiness']
 
     # Calculate recommendations with explanations
-    recommended_tracks = calculate_cosine_similarity_with_explanation(target_song, all_tracks, feature_columns, top_n)
+    # Imported on first use: only the legacy track route needs the NumPy kernels.
+    from app.services.recommendation_service import calculate_cosine_similarity_with_explanation
+
+    with stage("similarity"):
+        recommended_tracks = calculate_cosine_similarity_with_explanation(target_song, all_tracks, feature_columns, top_n)
 
     return {
         "recommendations": recommended_tracks,
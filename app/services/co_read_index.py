@@ -0,0 +1,369 @@
+"""Item-item "readers of X also read Y" neighbours from reading history, for /recommend's co_read_weight blend.
+
+Built offline by ``python -m app.jobs.build_co_read_index`` from Mongo ``Books.books_with_metadata``
+(``{user_id, work_key, read_at}``) and opened from CO_READ_INDEX_PATH. Every (user, work) read is one
+entry of a binary sparse user × work matrix X. Two works' co-read count is an entry of XᵀX and their
+score is the cosine of their reader sets, ``co_reads / sqrt(readers_a * readers_b)`` (0–1), kept
+only for pairs read together by at least ``min_co_reads`` users. XᵀX is never materialised: it is
+computed ``block_size`` works at a time (one sparse product per block) and each row is cut to its
+top K before the next block.
+
+Files (keyed by work number like the neighbour index: OL123W -> 123):
+
+- ``keys.i32``                sorted work numbers that have a list (binary-searched in place)
+- ``neighbours.i32``          count × K co-read work numbers, best first (-1 = empty slot)
+- ``scores.f32``              count × K cosine scores (higher = read together more)
+- ``journal.jsonl``           lists recomputed by incremental updates (see apply_reads)
+- ``reads.npz`` + ``users.json`` + ``works.i32``   the build state: X (CSR), its row user ids and
+  column work numbers; only the offline job reads these
+- ``meta.json``               version, K, thresholds, counts, history watermark (set_watermark), build time and id
+
+apply_reads adds new history events to X and recomputes only the lists they can change: the works
+just read and every work sharing a reader with one of them (a new read changes the read work's
+reader count, so every score involving it). Those lists come out exactly as a full rebuild would
+produce them; they are journaled and replayed by the serving workers like the neighbour index's.
+A full rebuild reads the whole history, so it starts an empty journal; workers that see its new
+build id in meta.json reopen the files and replay that journal from the start.
+
+SciPy is imported by the build functions only; serving needs NumPy and the memory-mapped arrays.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.utils.milvus_search_hits import open_library_work_number as work_number
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_K = 20
+DEFAULT_MIN_CO_READS = 2
+DEFAULT_BLOCK_SIZE = 2048
+_JOURNAL_CHECK_INTERVAL_S = 1.0
+_EMPTY = -1
+
+
+class CoReadIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._journal_path = os.path.join(path, "journal.jsonl")
+        self._journal_checked = 0.0
+        self._open(read_meta(path))
+        self.refresh()
+
+    def _open(self, meta: dict) -> None:
+        """Map the files of the build described by `meta`; the journal overlay starts empty."""
+        path = self.path
+        if meta.get("v") != INDEX_VERSION:
+            raise ValueError(f"Unsupported co-read index version {meta.get('v')!r} in {path}")
+        self.k = int(meta["k"])
+        self.count = int(meta["count"])
+        self.built_at = meta.get("built_at")
+        self.build_id = meta.get("build_id")
+        if self.count:
+            self._keys = np.memmap(os.path.join(path, "keys.i32"), dtype=np.int32, mode="r")
+            shape = (self.count, self.k)
+            self._neighbours = np.memmap(os.path.join(path, "neighbours.i32"), dtype=np.int32, mode="r", shape=shape)
+            self._scores = np.memmap(os.path.join(path, "scores.f32"), dtype=np.float32, mode="r", shape=shape)
+        else:
+            self._keys = np.empty(0, dtype=np.int32)
+        self._overlay: dict[int, list[tuple[int, float]]] = {}
+        self._journal_pos = 0
+
+    def neighbours_of(self, number: int) -> Optional[list[tuple[int, float]]]:
+        overlay = self._overlay.get(number)
+        if overlay is not None:
+            return overlay
+        i = int(np.searchsorted(self._keys, number))
+        if i >= len(self._keys) or int(self._keys[i]) != number:
+            return None
+        return [(int(n), float(s)) for n, s in zip(self._neighbours[i], self._scores[i]) if n != _EMPTY]
+
+    def neighbours(self, work_key: str) -> Optional[list[tuple[int, float]]]:
+        """(co-read work number, score) best first, or None if nobody else read the seed's readers' books."""
+        if time.monotonic() - self._journal_checked >= _JOURNAL_CHECK_INTERVAL_S:
+            self.refresh()
+        number = work_number(work_key)
+        return self.neighbours_of(number) if number is not None else None
+
+    def _reopen_if_rebuilt(self) -> None:
+        try:
+            meta = read_meta(self.path)
+        except (OSError, ValueError):
+            return  # mid-swap: try again on the next refresh
+        if meta.get("build_id") == self.build_id:
+            return
+        try:
+            self._open(meta)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Co-read index rebuilt at %s but not reopened: %s", self.path, e)
+            return
+        logger.info("Co-read index reopened after a rebuild (%s works, k=%s)", self.count, self.k)
+
+    def refresh(self) -> None:
+        """Apply journal lines appended since the last refresh, reopening after a rebuild."""
+        self._journal_checked = time.monotonic()
+        with self._lock:
+            self._reopen_if_rebuilt()
+            try:
+                size = os.path.getsize(self._journal_path)
+            except OSError:
+                return
+            if size <= self._journal_pos:
+                return
+            with open(self._journal_path, "rb") as f:
+                f.seek(self._journal_pos)
+                data = f.read(size - self._journal_pos)
+            complete = data.rfind(b"\n") + 1  # ignore a line still being written
+            for line in data[:complete].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    for number, items in (json.loads(line).get("lists") or {}).items():
+                        self._overlay[int(number)] = [(int(n), float(s)) for n, s in items]
+                except (ValueError, TypeError, AttributeError) as e:
+                    logger.warning("Skipping unreadable co-read journal line in %s: %s", self.path, e)
+            self._journal_pos += complete
+
+
+def read_meta(path: str) -> dict:
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(path: str, meta: dict) -> None:
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+# --- Build ---
+
+
+def _read_matrix(user_rows: dict, work_cols: dict, events: Iterable[tuple[object, object]]):
+    """(rows, cols) of the reads in `events`, registering unseen users and works in the two maps."""
+    rows: list[int] = []
+    cols: list[int] = []
+    for user_id, work_key in events:
+        number = work_number(work_key)
+        if number is None or user_id is None:
+            continue
+        if number > np.iinfo(np.int32).max:
+            raise ValueError(f"Work number {number} does not fit the int32 index")
+        rows.append(user_rows.setdefault(str(user_id), len(user_rows)))
+        cols.append(work_cols.setdefault(number, len(work_cols)))
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+
+def _binary(rows: np.ndarray, cols: np.ndarray, shape: tuple[int, int]):
+    """CSR user × work matrix with a 1 per distinct read (repeat reads of a work count once)."""
+    from scipy import sparse
+
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def top_k_lists(
+    reads,
+    works: np.ndarray,
+    columns: np.ndarray,
+    *,
+    k: int,
+    min_co_reads: int = DEFAULT_MIN_CO_READS,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> dict[int, list[tuple[int, float]]]:
+    """
+    Top-k co-read lists of the works at `columns` of the binary user × work CSR matrix `reads`
+    (`works` maps columns to work numbers). One (block × users) @ (users × works) product per block.
+    Ties are broken by work number so a list never depends on how the blocks were cut.
+    """
+    by_work = reads.T.tocsr()
+    readers = np.diff(by_work.indptr).astype(np.float64)
+    lists: dict[int, list[tuple[int, float]]] = {}
+    for start in range(0, len(columns), block_size):
+        block = np.asarray(columns[start : start + block_size], dtype=np.int64)
+        co = (by_work[block] @ reads).tocsr()
+        co.sort_indices()
+        row_of = np.repeat(np.arange(len(block)), np.diff(co.indptr))
+        scores = co.data / np.sqrt(readers[block][row_of] * readers[co.indices])
+        # Drop the work itself and pairs with too few shared readers
+        scores[(co.indices == block[row_of]) | (co.data < min_co_reads)] = -1.0
+        for r, col in enumerate(block):
+            lo, hi = co.indptr[r], co.indptr[r + 1]
+            row_scores, row_cols = scores[lo:hi], co.indices[lo:hi]
+            keep = row_scores > 0
+            if len(row_scores) > k:
+                cut = np.partition(row_scores, len(row_scores) - k)[len(row_scores) - k]
+                keep &= row_scores >= cut
+            cand_scores, cand_works = row_scores[keep], works[row_cols[keep]]
+            order = np.lexsort((cand_works, -cand_scores))[:k]
+            lists[int(works[col])] = [(int(cand_works[i]), float(cand_scores[i])) for i in order]
+    return lists
+
+
+def _write_lists(path: str, lists: dict[int, list[tuple[int, float]]], k: int) -> int:
+    numbers = sorted(n for n, items in lists.items() if items)
+    neighbours = np.full((len(numbers), k), _EMPTY, dtype=np.int32)
+    scores = np.zeros((len(numbers), k), dtype=np.float32)
+    for row, number in enumerate(numbers):
+        for j, (other, score) in enumerate(lists[number]):
+            neighbours[row, j], scores[row, j] = other, score
+    np.asarray(numbers, dtype=np.int32).tofile(os.path.join(path, "keys.i32"))
+    neighbours.tofile(os.path.join(path, "neighbours.i32"))
+    scores.tofile(os.path.join(path, "scores.f32"))
+    return len(numbers)
+
+
+def _save_state(path: str, reads, users: list[str], works: np.ndarray) -> None:
+    from scipy import sparse
+
+    sparse.save_npz(os.path.join(path, "reads.tmp.npz"), reads)
+    os.replace(os.path.join(path, "reads.tmp.npz"), os.path.join(path, "reads.npz"))
+    with open(os.path.join(path, "users.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(users, f)
+    os.replace(os.path.join(path, "users.json.tmp"), os.path.join(path, "users.json"))
+    works.astype(np.int32).tofile(os.path.join(path, "works.i32.tmp"))
+    os.replace(os.path.join(path, "works.i32.tmp"), os.path.join(path, "works.i32"))
+
+
+def build_co_read_index(
+    events: Iterable[tuple[object, object]],
+    path: str,
+    *,
+    k: int = DEFAULT_K,
+    min_co_reads: int = DEFAULT_MIN_CO_READS,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> int:
+    """
+    Build the index from (user_id, work_key) reads into `path`. Returns the number of works with a list.
+    Written to `<path>.building` and swapped in by renaming directories, like the neighbour index;
+    serving workers pick up the new build id on their next journal check.
+    """
+    final_path = path
+    path = f"{final_path}.building"
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    user_rows: dict[str, int] = {}
+    work_cols: dict[int, int] = {}
+    rows, cols = _read_matrix(user_rows, work_cols, events)
+    reads = _binary(rows, cols, (len(user_rows), len(work_cols)))
+    works = np.fromiter(work_cols, dtype=np.int64, count=len(work_cols))
+    lists = top_k_lists(reads, works, np.arange(len(works)), k=k, min_co_reads=min_co_reads, block_size=block_size)
+    count = _write_lists(path, lists, k)
+    _save_state(path, reads, list(user_rows), works)
+    _write_meta(
+        path,
+        {
+            "v": INDEX_VERSION,
+            "k": k,
+            "count": count,
+            "min_co_reads": min_co_reads,
+            "users": len(user_rows),
+            "works": len(works),
+            "reads": int(reads.nnz),
+            "built_at": time.time(),
+            "build_id": uuid.uuid4().hex,
+        },
+    )
+    previous = f"{final_path}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(final_path):
+        os.rename(final_path, previous)
+    os.rename(path, final_path)
+    return count
+
+
+def apply_reads(
+    path: str,
+    events: Iterable[tuple[object, object]],
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> int:
+    """
+    Add new (user_id, work_key) reads to a built index and journal every list they change.
+    Returns the number of lists rewritten (0 when every read was already known, so re-applying a
+    batch after a crash is harmless).
+    """
+    from scipy import sparse
+
+    meta = read_meta(path)
+    old = sparse.load_npz(os.path.join(path, "reads.npz")).tocsr()
+    with open(os.path.join(path, "users.json"), encoding="utf-8") as f:
+        user_rows = {user: row for row, user in enumerate(json.load(f))}
+    work_cols = {int(n): col for col, n in enumerate(np.fromfile(os.path.join(path, "works.i32"), dtype=np.int32))}
+    rows, cols = _read_matrix(user_rows, work_cols, events)
+    shape = (len(user_rows), len(work_cols))
+    old.resize(shape)
+    added = _binary(rows, cols, shape)
+    # Reads already in the matrix change nothing
+    added = added - added.multiply(old)
+    added.eliminate_zeros()
+    updated = 0
+    reads = old
+    if added.nnz:
+        reads = (old + added).tocsr()
+        works = np.fromiter(work_cols, dtype=np.int64, count=len(work_cols))
+        read_now = np.unique(added.indices)
+        # Works sharing a reader with a newly read work: their scores with it moved
+        readers = np.unique(reads.T.tocsr()[read_now].indices)
+        dirty = np.unique(np.concatenate([read_now, reads[readers].indices]))
+        lists = top_k_lists(
+            reads, works, dirty, k=int(meta["k"]), min_co_reads=int(meta["min_co_reads"]), block_size=block_size
+        )
+        update = {"ts": time.time(), "lists": {str(n): [[o, s] for o, s in items] for n, items in lists.items()}}
+        line = (json.dumps(update, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(os.path.join(path, "journal.jsonl"), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        _save_state(path, reads, list(user_rows), works)
+        updated = len(lists)
+    meta.update(users=shape[0], works=shape[1], reads=int(reads.nnz), updated_at=time.time())
+    _write_meta(path, meta)
+    return updated
+
+
+def set_watermark(path: str, watermark: object) -> None:
+    """Record how far into the history the index has read (e.g. the last Mongo _id), for the next update."""
+    meta = read_meta(path)
+    meta["watermark"] = watermark
+    _write_meta(path, meta)
+
+
+_index: Optional[CoReadIndex] = None
+_index_lock = threading.Lock()
+_index_failed = False
+
+
+def get_co_read_index() -> Optional[CoReadIndex]:
+    """Process-wide index from CO_READ_INDEX_PATH, or None when unset or unreadable."""
+    global _index, _index_failed
+    if _index is not None or _index_failed:
+        return _index
+    path = os.getenv("CO_READ_INDEX_PATH", "").strip()
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None and not _index_failed:
+            try:
+                _index = CoReadIndex(path)
+                logger.info("Co-read index loaded from %s (%s works, k=%s)", path, _index.count, _index.k)
+            except (OSError, ValueError, KeyError) as e:
+                _index_failed = True
+                logger.warning("Co-read index disabled (%s): %s", path, e)
+    return _index
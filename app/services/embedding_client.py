@@ -2,14 +2,28 @@
 # Hugging Face Inference API for book embeddings. Use same model (all-MiniLM-L6-v2)
 # and normalize so vectors stay consistent with existing Zilliz data.
 # Changing model or API breaks compatibility with vectors already in Zilliz.
+#
+# Degraded-API safeguards (Tier 3 is always the fallback when embed_text returns None):
+# - Circuit breaker: EMBEDDING_BREAKER_FAILURES consecutive errors/timeouts open it for
+#   EMBEDDING_BREAKER_COOLDOWN_SEC; while open, embed_text returns None without calling HF.
+# - Hedging: if the first request has not answered after ~p95 of recent latencies, a second
+#   identical request is sent and whichever succeeds first wins (replaces the old sleep + retry).
+# - Warm-up: a startup warm-up step and an optional keep-alive loop (EMBEDDING_KEEPALIVE_SEC) call
+#   the model with wait_for_model, so HF's "model is loading" 503s land on the probe, not on users.
 
 import asyncio
 import logging
 import os
+import time
+from collections import deque
 from typing import List, Optional
 
 import httpx
 
+from app.services.warmup import register_warmup_step
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import Counter, record_dependency_error, register, track_dependency
+
 logger = logging.getLogger(__name__)
 
 # Use router.huggingface.co; api-inference.huggingface.co returned 410 (no longer supported).
@@ -17,8 +31,26 @@ DEFAULT_EMBEDDING_URL = (
     "https://router.huggingface.co/pipeline/feature-extraction/"
     "sentence-transformers/all-MiniLM-L6-v2"
 )
-TIMEOUT_S = 15.0
-RETRY_BACKOFF_S = 1.0
+TIMEOUT_S = 8.0
+# Model cold starts can take a while; only the warm-up probe waits this long.
+WARMUP_TIMEOUT_S = 60.0
+# Hedge delay bounds; the default applies until enough latencies have been observed.
+HEDGE_MIN_DELAY_S = 0.2
+HEDGE_DEFAULT_DELAY_S = 1.0
+_LATENCY_WINDOW = 200
+_MIN_SAMPLES_FOR_P95 = 20
+
+EMBEDDING_BREAKER = CircuitBreaker(
+    "embedding_api",
+    failure_threshold=int(os.getenv("EMBEDDING_BREAKER_FAILURES", "5")),
+    cooldown_s=float(os.getenv("EMBEDDING_BREAKER_COOLDOWN_SEC", "30")),
+)
+HEDGED_REQUESTS = register(
+    Counter("embedding_hedged_requests_total", "Hedged embedding requests sent, and how many won.", ("outcome",))
+)
+
+# Latencies (seconds) of recent successful calls, for the hedge delay
+_latencies: deque = deque(maxlen=_LATENCY_WINDOW)
 
 
 def _embedding_url() -> Optional[str]:
@@ -29,48 +61,133 @@ def _embedding_url() -> Optional[str]:
     return url
 
 
-async def embed_text(text: str) -> Optional[List[float]]:
+def _timeout_s() -> float:
+    return float(os.getenv("EMBEDDING_TIMEOUT_SEC", str(TIMEOUT_S)))
+
+
+def _hedging_enabled() -> bool:
+    return os.getenv("EMBEDDING_HEDGE_ENABLED", "1").strip() not in ("0", "false", "no")
+
+
+def hedge_delay_s() -> float:
+    """p95 of recent successful call latencies (HEDGE_DEFAULT_DELAY_S until enough samples)."""
+    if len(_latencies) < _MIN_SAMPLES_FOR_P95:
+        return HEDGE_DEFAULT_DELAY_S
+    ordered = sorted(_latencies)
+    return max(HEDGE_MIN_DELAY_S, ordered[int(0.95 * (len(ordered) - 1))])
+
+
+def expected_latency_s() -> float:
+    """Median of recent successful call latencies (HEDGE_MIN_DELAY_S until enough samples)."""
+    if len(_latencies) < _MIN_SAMPLES_FOR_P95:
+        return HEDGE_MIN_DELAY_S
+    ordered = sorted(_latencies)
+    return ordered[len(ordered) // 2]
+
+
+def _http_client(timeout_s: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=timeout_s)
+
+
+async def _post(client: httpx.AsyncClient, url: str, payload: dict, headers: dict) -> httpx.Response:
+    start = time.perf_counter()
+    with track_dependency("embedding_api", "embed"):
+        resp = await client.post(url, json=payload, headers=headers)
+    if resp.status_code == 200:
+        _latencies.append(time.perf_counter() - start)
+    else:
+        record_dependency_error("embedding_api", "embed")
+    return resp
+
+
+async def _hedged_post(url: str, payload: dict, headers: dict, timeout_s: float) -> httpx.Response:
+    """POST, sending one hedge after hedge_delay_s(); first 200 wins, else the last outcome is returned/raised."""
+    async with _http_client(timeout_s) as client:
+        first = asyncio.create_task(_post(client, url, payload, headers))
+        pending = {first}
+        if _hedging_enabled():
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay_s())
+            if not done:
+                HEDGED_REQUESTS.inc(outcome="sent")
+                pending.add(asyncio.create_task(_post(client, url, payload, headers)))
+        last: Optional[asyncio.Task] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if task.exception() is None and task.result().status_code == 200:
+                        if task is not first:
+                            HEDGED_REQUESTS.inc(outcome="won")
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        return last.result()
+
+
+async def embed_text(text: str, timeout_s: Optional[float] = None) -> Optional[List[float]]:
     """
     Get a single normalized embedding for text from the configured API.
-    Returns None on failure (no token, timeout, 4xx/5xx, invalid body);
+    Returns None on failure (no token, breaker open, timeout, 4xx/5xx, invalid body);
     caller can fall back to Tier 3 (subject filter).
+
+    timeout_s: caller's remaining latency budget; caps EMBEDDING_TIMEOUT_SEC for this call
+    (hedge included). Timeouts caused only by a short budget do not count against the breaker.
     """
     url = _embedding_url()
     if not url:
         logger.debug("Embedding API skipped: EMBEDDING_API_TOKEN not set")
         return None
+    if not EMBEDDING_BREAKER.allow():
+        logger.debug("Embedding API skipped: circuit breaker open")
+        return None
 
     token = os.getenv("EMBEDDING_API_TOKEN", "").strip()
     payload = {"inputs": text, "normalize": True}
     headers = {"Authorization": f"Bearer {token}"}
-    data = None
 
-    for attempt in range(2):  # initial + one retry
+    configured_timeout = _timeout_s()
+    budget_limited = timeout_s is not None and timeout_s < configured_timeout
+    timeout = min(configured_timeout, timeout_s) if timeout_s is not None else configured_timeout
+    # Verdict for the breaker, applied in `finally` so a cancelled call (deadline, client disconnect)
+    # or an unexpected error still frees a half-open trial instead of holding it forever
+    outcome: Optional[str] = None
+    try:
         try:
-            async with httpx.AsyncClient(timeout=TIMEOUT_S) as client:
-                resp = await client.post(url, json=payload, headers=headers)
+            resp = await asyncio.wait_for(_hedged_post(url, payload, headers, timeout), timeout)
             if resp.status_code != 200:
                 logger.warning(
                     "Embedding API returned %s: %s",
                     resp.status_code,
                     resp.text[:200] if resp.text else "",
                 )
+                outcome = "failure"
                 return None
             data = resp.json()
-            break
-        except httpx.TimeoutException as e:
-            logger.warning("Embedding API timeout (attempt %s): %s", attempt + 1, e)
-            if attempt == 0:
-                await asyncio.sleep(RETRY_BACKOFF_S)
-            else:
-                return None
+        except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+            logger.warning("Embedding API timeout after %.2fs: %s", timeout, str(e) or type(e).__name__)
+            # A timeout caused only by the caller's short budget says nothing about the API
+            outcome = None if budget_limited else "failure"
+            return None
         except (httpx.HTTPError, ValueError) as e:
             logger.warning("Embedding API error: %s", e)
+            outcome = "failure"
             return None
 
-    if data is None:
-        return None
+        vec = _parse_vector(data)
+        outcome = "success" if vec is not None else "failure"
+        return vec
+    finally:
+        if outcome == "success":
+            EMBEDDING_BREAKER.record_success()
+        elif outcome == "failure":
+            EMBEDDING_BREAKER.record_failure()
+        else:
+            EMBEDDING_BREAKER.release()
+
 
+def _parse_vector(data) -> Optional[List[float]]:
     # Response: list of vectors (one per input); we sent one string.
     if not isinstance(data, list) or len(data) < 1:
         logger.warning("Embedding API returned unexpected shape: %s", type(data))
@@ -80,3 +197,56 @@ async def embed_text(text: str) -> Optional[List[float]]:
         logger.warning("Embedding API vector invalid")
         return None
     return [float(x) for x in vec]
+
+
+async def warm_model() -> bool:
+    """
+    Call the model once with wait_for_model so a cold HF model loads before users hit it.
+    The outcome feeds the breaker, so this also serves as its recovery probe. False if unconfigured or failed.
+    """
+    url = _embedding_url()
+    if not url:
+        return False
+    token = os.getenv("EMBEDDING_API_TOKEN", "").strip()
+    payload = {"inputs": "warm-up", "normalize": True, "options": {"wait_for_model": True}}
+    headers = {"Authorization": f"Bearer {token}", "X-Wait-For-Model": "true"}
+    try:
+        async with _http_client(WARMUP_TIMEOUT_S) as client:
+            with track_dependency("embedding_api", "warmup"):
+                resp = await client.post(url, json=payload, headers=headers)
+    except httpx.HTTPError as e:
+        # Already counted as a dependency error by track_dependency
+        logger.warning("Embedding warm-up failed: %s", e)
+        EMBEDDING_BREAKER.record_failure()
+        return False
+    try:
+        ok = resp.status_code == 200 and _parse_vector(resp.json()) is not None
+    except ValueError:
+        ok = False
+    if ok:
+        EMBEDDING_BREAKER.record_success()
+    else:
+        logger.warning("Embedding warm-up got an unusable response (HTTP %s)", resp.status_code)
+        record_dependency_error("embedding_api", "warmup")
+        EMBEDDING_BREAKER.record_failure()
+    return ok
+
+
+def keepalive_interval_s() -> float:
+    """EMBEDDING_KEEPALIVE_SEC: seconds between warm-up calls (0 = disabled)."""
+    return float(os.getenv("EMBEDDING_KEEPALIVE_SEC", "0"))
+
+
+async def keep_model_warm(interval_s: float) -> None:
+    """Re-warm the model every `interval_s` seconds (HF unloads idle models). Runs until cancelled."""
+    while True:
+        await asyncio.sleep(interval_s)
+        await warm_model()
+
+
+async def _warm_embedding_model(client) -> None:
+    if _embedding_url() and not await warm_model():
+        raise RuntimeError("embedding model did not answer")
+
+
+register_warmup_step("embedding_model", _warm_embedding_model)
@@ -17,7 +17,7 @@ from __future__ import annotations
 from app.services import explanation_templates as T
 from app.services.explanation_subject_signals import (
     find_shared_subject_labels,
-    parse_subjects_csv,
+    record_subject_phrases,
     top_rec_subject_tags,
 )
 
@@ -53,7 +53,8 @@ def build_deterministic_explanation(
     if rec_author and seed_author and rec_author.lower() == seed_author.strip().lower():
         return T.same_author(rec_author)
 
-    rec_subjects = parse_subjects_csv(rec.get("subjects") or "")
+    # Pre-parsed subject_tags when the collection has them; the CSV is only split as a fallback
+    rec_subjects = record_subject_phrases(rec)
     shared = find_shared_subject_labels(seed_subjects, rec_subjects)
     had_subject_overlap = shared is not None
 
@@ -59,6 +59,19 @@ def parse_subjects_csv(subjects_csv: str) -> list[str]:
     return [s.strip().lower() for s in subjects_csv.split(",") if s.strip()]
 
 
+def normalize_subject_phrase(phrase: str) -> str:
+    """Lowercase, alias-mapped, whitespace-collapsed phrase (the stored ``subject_tags`` form)."""
+    return _apply_aliases(phrase) if phrase else ""
+
+
+def record_subject_phrases(rec: dict) -> list[str]:
+    """A hit's subjects as phrases: the pre-parsed ``subject_tags`` array when present, else the CSV."""
+    tags = rec.get("subject_tags")
+    if isinstance(tags, (list, tuple)):
+        return [str(t) for t in tags if t]
+    return parse_subjects_csv(rec.get("subjects") or "")
+
+
 def _lower_strip_list(subjects: list[str]) -> list[str]:
     return [s.strip().lower() for s in subjects if s and str(s).strip()]
 
@@ -135,7 +148,7 @@ def find_shared_subject_labels(
     """
     Layered subject overlap. Returns display-ready labels (short list) or None.
 
-    rec_subjects_parsed: output of parse_subjects_csv.
+    rec_subjects_parsed: output of parse_subjects_csv (or record_subject_phrases).
     """
     seed_list = _lower_strip_list(seed_subjects)
     rec_list = [s for s in rec_subjects_parsed if s]
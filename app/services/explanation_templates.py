@@ -51,3 +51,11 @@ def embedding_no_tags(strength_sentence: str) -> str:
 
 def generic_semantic() -> str:
     return "Matched by semantic similarity across themes and narrative scope."
+
+
+def because_you_read(title: str, reason: str) -> str:
+    return f'Because you read "{title}". {reason}' if title else reason
+
+
+def co_read(reason: str) -> str:
+    return f"Readers of your book often read this one too. {reason}"
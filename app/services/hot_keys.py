@@ -0,0 +1,216 @@
+# app/services/hot_keys.py
+# Heavy-hitter tracking for /recommend and /recommend/mood, so caches can be filled before traffic
+# asks for them.
+#
+# Each first-page request is offered to a Space-Saving sketch keyed by (route, canonical request
+# body): the same string the response cache is keyed on, so re-running a tracked entry produces
+# exactly the cache entry the next identical request will hit. The sketch keeps HOT_KEYS_CAPACITY
+# counters: any key with more than 1/capacity of the traffic is guaranteed a counter, and a
+# counter's over-count is bounded by its `error`. An offer is a dict update plus a heap push, so
+# it is cheap enough for the request path.
+#
+# With HOT_KEYS_PATH set, the sketch is snapshotted there every HOT_KEYS_SNAPSHOT_SEC (and at
+# shutdown), counts decaying by HOT_KEYS_DECAY each time so yesterday's hits fade. A new process
+# loads the snapshot during warm-up and pre-computes the top HOT_KEYS_PREFETCH entries before
+# /readyz reports ready; the maintenance loop re-computes them shortly before their cached copy
+# expires (see prefetch_hot_keys in app/routes/recommendations.py).
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_VERSION = 1
+
+
+class SpaceSaving:
+    """Space-Saving top-k sketch: at most `capacity` counters; a new key replaces the smallest one."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(1, capacity)
+        self.counts: dict[str, float] = {}
+        self.errors: dict[str, float] = {}
+        # (count, key) entries, possibly stale; the smallest live counter is found lazily on eviction
+        self._heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def offer(self, key: str, weight: float = 1.0) -> None:
+        with self._lock:
+            count = self.counts.get(key)
+            if count is not None:
+                self.counts[key] = count + weight
+            elif len(self.counts) < self.capacity:
+                self.counts[key] = weight
+                self.errors[key] = 0.0
+            else:
+                floor, victim = self._pop_min()
+                del self.counts[victim]
+                del self.errors[victim]
+                self.counts[key] = floor + weight
+                self.errors[key] = floor
+            heapq.heappush(self._heap, (self.counts[key], key))
+            if len(self._heap) > 4 * self.capacity:
+                self._rebuild_heap()
+
+    def _pop_min(self) -> tuple[float, str]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(c, k) for k, c in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n: int) -> list[tuple[str, float, float]]:
+        """(key, count, error) for the `n` largest counters, largest first."""
+        with self._lock:
+            items = heapq.nlargest(n, self.counts.items(), key=lambda kv: kv[1])
+            return [(k, c, self.errors[k]) for k, c in items]
+
+    def decay(self, factor: float) -> None:
+        """Scale every counter (and its error) by `factor`; counters that fall below 1 hit are dropped."""
+        with self._lock:
+            for key in list(self.counts):
+                count = self.counts[key] * factor
+                if count < 1.0:
+                    del self.counts[key]
+                    del self.errors[key]
+                else:
+                    self.counts[key] = count
+                    self.errors[key] *= factor
+            self._rebuild_heap()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "version": _VERSION,
+                "capacity": self.capacity,
+                "items": [[k, c, self.errors[k]] for k, c in sorted(self.counts.items(), key=lambda kv: -kv[1])],
+            }
+
+    def merge_dict(self, data: dict) -> None:
+        """Add a snapshot's counters (largest first, so a smaller sketch keeps the heaviest)."""
+        if data.get("version") != _VERSION:
+            raise ValueError("Unsupported hot-keys snapshot version")
+        # Parsed up front so a malformed snapshot merges nothing rather than half of itself
+        items = [(str(key), float(count), float(error)) for key, count, error in data.get("items") or []]
+        for key, count, error in items:
+            self.offer(key, count)
+            with self._lock:
+                self.errors[key] = max(self.errors.get(key, 0.0), error)
+
+
+# --- Process-wide tracker ---
+
+_tracker: Optional[SpaceSaving] = None
+
+
+def hot_keys_enabled() -> bool:
+    return os.getenv("HOT_KEYS_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+
+
+def get_tracker() -> SpaceSaving:
+    global _tracker
+    if _tracker is None:
+        _tracker = SpaceSaving(int(os.getenv("HOT_KEYS_CAPACITY", "1024")))
+    return _tracker
+
+
+def record(route: str, body: str) -> None:
+    """Count one request for `route` with canonical JSON `body`."""
+    if hot_keys_enabled():
+        get_tracker().offer(f"{route} {body}")
+
+
+def top_entries(n: int) -> list[tuple[str, dict, float]]:
+    """(route, request body, estimated hits) for the `n` hottest requests."""
+    out = []
+    for key, count, _ in get_tracker().top(n):
+        route, _, body = key.partition(" ")
+        try:
+            out.append((route, json.loads(body), count))
+        except ValueError:
+            continue
+    return out
+
+
+def refresh_interval_s() -> float:
+    return float(os.getenv("HOT_KEYS_REFRESH_SEC", "30"))
+
+
+def hot_keys_path() -> Optional[str]:
+    return os.getenv("HOT_KEYS_PATH", "").strip() or None
+
+
+def prefetch_count() -> int:
+    return int(os.getenv("HOT_KEYS_PREFETCH", "50"))
+
+
+def save_snapshot(path: Optional[str] = None) -> bool:
+    """Write the sketch to `path` (HOT_KEYS_PATH) atomically; False when there is nowhere to write."""
+    path = path or hot_keys_path()
+    if not path:
+        return False
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**get_tracker().to_dict(), "saved_at": time.time()}, f)
+    os.replace(tmp, path)
+    return True
+
+
+def load_snapshot(path: Optional[str] = None) -> int:
+    """Merge a saved sketch into this process's tracker; returns counters loaded (0 if none or unreadable)."""
+    path = path or hot_keys_path()
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        get_tracker().merge_dict(data)
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning("Hot-keys snapshot %s not loaded: %s", path, e)
+        return 0
+    return len(data.get("items") or [])
+
+
+async def maintenance_loop(
+    get_client: Callable[[], object],
+    refresh: Callable[[object], Awaitable[int]],
+    interval_s: float,
+) -> None:
+    """
+    Every `interval_s`: re-populate hot entries about to expire (`refresh(client)`, skipped while
+    `get_client()` is None), and every HOT_KEYS_SNAPSHOT_SEC save and decay the sketch. Runs until
+    cancelled (the app saves a final snapshot at shutdown).
+    """
+    snapshot_every = float(os.getenv("HOT_KEYS_SNAPSHOT_SEC", "300"))
+    decay = float(os.getenv("HOT_KEYS_DECAY", "0.8"))
+    last_snapshot = time.monotonic()
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_s)
+        client = get_client()
+        if client is not None:
+            try:
+                await refresh(client)
+            except Exception as e:
+                logger.warning("Hot-key refresh failed: %s", e)
+        if time.monotonic() - last_snapshot >= snapshot_every:
+            last_snapshot = time.monotonic()
+            try:
+                await loop.run_in_executor(None, save_snapshot)
+            except OSError as e:
+                logger.warning("Hot-key snapshot failed: %s", e)
+            get_tracker().decay(decay)
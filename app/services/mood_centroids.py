@@ -0,0 +1,129 @@
+# app/services/mood_centroids.py
+# One vector per mood: the normalized mean of the embeddings of its MOOD_SUBJECT_MAP subjects.
+# /recommend/mood searches with this centroid instead of scanning `subjects like` per subject.
+#
+# Centroids are built by app/jobs/build_mood_centroids.py (or by the "mood_centroids" warm-up step
+# when EMBEDDING_API_TOKEN is set) and persisted to MOOD_CENTROIDS_PATH. An entry is only used while
+# its subject list still matches the map, so editing a mood falls back to the subject scan until the
+# centroids are rebuilt.
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.services.embedding_client import embed_text
+
+logger = logging.getLogger(__name__)
+
+_VERSION = 1
+
+# mood -> (subjects the vector was built from, unit vector)
+_centroids: dict[str, tuple[list[str], list[float]]] = {}
+
+
+def centroids_path() -> Optional[str]:
+    return os.getenv("MOOD_CENTROIDS_PATH", "").strip() or None
+
+
+def _normalized_mean(vectors: list[list[float]]) -> Optional[list[float]]:
+    if not vectors:
+        return None
+    dim = len(vectors[0])
+    mean = [0.0] * dim
+    for vec in vectors:
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        for i, x in enumerate(vec):
+            mean[i] += x / norm
+    norm = math.sqrt(sum(x * x for x in mean))
+    if norm == 0:
+        return None
+    return [x / norm for x in mean]
+
+
+async def build_centroids(
+    mood_map: dict[str, list[str]],
+    embed: Callable[[str], Awaitable[Optional[list[float]]]] = embed_text,
+) -> dict[str, list[float]]:
+    """Embed every subject once and average per mood. Moods whose subjects all fail to embed are skipped."""
+    cache: dict[str, Optional[list[float]]] = {}
+    out: dict[str, list[float]] = {}
+    for mood, subjects in mood_map.items():
+        vectors = []
+        for subject in subjects:
+            if subject not in cache:
+                cache[subject] = await embed(subject)
+            if cache[subject] is not None:
+                vectors.append(cache[subject])
+        centroid = _normalized_mean(vectors)
+        if centroid is None:
+            logger.warning("No centroid for mood %r: none of its subjects could be embedded", mood)
+            continue
+        out[mood] = centroid
+    return out
+
+
+def set_centroids(centroids: dict[str, list[float]], mood_map: dict[str, list[str]]) -> None:
+    """Install centroids for serving (replaces the previous set)."""
+    global _centroids
+    _centroids = {mood: (list(mood_map[mood]), vec) for mood, vec in centroids.items() if mood in mood_map}
+
+
+def get_centroid(mood: str, subjects: list[str]) -> Optional[list[float]]:
+    """Centroid for `mood`, or None if not built or built from a different subject list."""
+    entry = _centroids.get(mood)
+    if entry is None or entry[0] != list(subjects):
+        return None
+    return entry[1]
+
+
+def save_centroids(path: str, centroids: dict[str, list[float]], mood_map: dict[str, list[str]]) -> None:
+    payload = {
+        "v": _VERSION,
+        "built_at": time.time(),
+        "moods": {mood: {"subjects": mood_map[mood], "vector": vec} for mood, vec in centroids.items()},
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def load_centroids(path: str, mood_map: dict[str, list[str]]) -> dict[str, list[float]]:
+    """Centroids from `path` whose subject lists still match `mood_map` ({} if missing or unreadable)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable mood centroids %s: %s", path, e)
+        return {}
+    if not isinstance(payload, dict) or payload.get("v") != _VERSION:
+        return {}
+    out = {}
+    for mood, entry in (payload.get("moods") or {}).items():
+        if mood in mood_map and entry.get("subjects") == mood_map[mood] and entry.get("vector"):
+            out[mood] = [float(x) for x in entry["vector"]]
+    return out
+
+
+async def ensure_centroids(mood_map: dict[str, list[str]]) -> int:
+    """Load centroids from MOOD_CENTROIDS_PATH, embedding (and saving) any that are missing. Returns the count installed."""
+    path = centroids_path()
+    centroids = load_centroids(path, mood_map) if path else {}
+    missing = {mood: subjects for mood, subjects in mood_map.items() if mood not in centroids}
+    if missing and os.getenv("EMBEDDING_API_TOKEN", "").strip():
+        built = await build_centroids(missing)
+        centroids.update(built)
+        if built and path:
+            save_centroids(path, centroids, mood_map)
+    set_centroids(centroids, mood_map)
+    return len(centroids)
@@ -0,0 +1,554 @@
+"""Precomputed top-K neighbour lists for every catalog book, so Tier 1 /recommend needs no Zilliz call.
+
+Built offline by ``python -m app.jobs.build_neighbour_index`` and opened from NEIGHBOUR_INDEX_PATH.
+Files (all keyed by the numeric part of the Open Library work id, OL123W -> 123):
+
+- ``keys.i32``            sorted work numbers, one per catalog book (binary-searched in place)
+- ``neighbours.i32``      count × K neighbour work numbers, closest first (-1 = empty slot)
+- ``distances.f32``       count × K COSINE distances (repo convention: lower = closer)
+- ``records.jsonl`` + ``records.off``   each book's stored fields (no embedding) and byte offsets
+- ``explanations.jsonl`` + ``explanations.off``   optional: K rendered explanations per seed
+- ``journal.jsonl``       incremental updates appended by Tier 2 write-backs (see add_book)
+- ``meta.json``           version, K, stored fields, build time and build id
+
+The arrays are memory-mapped read-only, so every worker shares one page-cache copy and a lookup
+is a binary search plus K record reads. New books are added incrementally: add_book searches
+around the new vector once and journals the book's own list plus only the lists it enters (those
+whose K-th distance is larger than the distance to the new book). Every worker replays new
+journal lines before lookups; rebuilding the index folds the journal in and starts a fresh one.
+Writers hold an exclusive flock on the journal while they re-read and rewrite lists, so concurrent
+write-backs from different workers merge instead of dropping each other's entries.
+Books journaled while a build runs are re-added to the new index around the swap, and workers
+that see a new build id in meta.json reopen the files, replay the new journal from the start, and
+only then publish the new build in one assignment (each lookup reads a single build snapshot).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from app.services.explanation_service import build_deterministic_explanation
+from app.services.explanation_subject_signals import record_subject_phrases
+from app.utils.milvus_filters import string_list_literal
+from app.utils.milvus_search_hits import (
+    open_library_work_number as work_number,
+    sanitize_numpy_scalars,
+    search_hit_distance,
+    search_hit_entity_dict,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: write-backs from separate workers are last-writer-wins
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_K = 20
+# Candidates searched around a new book when updating lists incrementally
+UPDATE_CANDIDATES = 100
+_JOURNAL_CHECK_INTERVAL_S = 1.0
+_EMPTY = -1
+
+
+def _offsets_file(path: str, name: str) -> np.ndarray:
+    return np.fromfile(os.path.join(path, name), dtype=np.int64)
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass(frozen=True)
+class _Build:
+    """One opened build: its mapped files plus the journal overlay replayed on top of them."""
+
+    k: int
+    fields: list
+    count: int
+    built_at: Optional[float]
+    build_id: Optional[str]
+    keys: np.ndarray
+    neighbours: Optional[np.ndarray]
+    distances: Optional[np.ndarray]
+    records: Any
+    record_offsets: np.ndarray
+    explanations: Any
+    explanation_offsets: Optional[np.ndarray]
+    # Journal overlay: work number -> neighbour list / record (newer than the built files).
+    # Filled one key at a time under the index lock, so readers never see a half-applied entry.
+    overlay_lists: dict = field(default_factory=dict)
+    overlay_records: dict = field(default_factory=dict)
+
+
+def _open_blob(path: str, name: str):
+    blob_path = os.path.join(path, f"{name}.jsonl")
+    if os.path.getsize(blob_path) == 0:
+        return None, np.zeros(1, dtype=np.int64)
+    with open(blob_path, "rb") as f:
+        blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return blob, _offsets_file(path, f"{name}.off")
+
+
+def _open_build(path: str, meta: dict) -> _Build:
+    """Map the files of the build described by `meta`; the journal overlay starts empty."""
+    if meta.get("v") != INDEX_VERSION:
+        raise ValueError(f"Unsupported neighbour index version {meta.get('v')!r} in {path}")
+    k = int(meta["k"])
+    count = int(meta["count"])
+    neighbours = distances = None
+    if count:
+        keys = np.memmap(os.path.join(path, "keys.i32"), dtype=np.int32, mode="r")
+        neighbours = np.memmap(os.path.join(path, "neighbours.i32"), dtype=np.int32, mode="r", shape=(count, k))
+        distances = np.memmap(os.path.join(path, "distances.f32"), dtype=np.float32, mode="r", shape=(count, k))
+    else:
+        keys = np.empty(0, dtype=np.int32)
+    records, record_offsets = _open_blob(path, "records")
+    explanations, explanation_offsets = _open_blob(path, "explanations") if meta.get("explanations") else (None, None)
+    return _Build(
+        k=k,
+        fields=list(meta["fields"]),
+        count=count,
+        built_at=meta.get("built_at"),
+        build_id=meta.get("build_id"),
+        keys=keys,
+        neighbours=neighbours,
+        distances=distances,
+        records=records,
+        record_offsets=record_offsets,
+        explanations=explanations,
+        explanation_offsets=explanation_offsets,
+    )
+
+
+def _row(state: _Build, number: int) -> Optional[int]:
+    i = int(np.searchsorted(state.keys, number))
+    if i < len(state.keys) and int(state.keys[i]) == number:
+        return i
+    return None
+
+
+def _blob_item(blob, offsets: np.ndarray, row: int):
+    if blob is None:
+        return None
+    return json.loads(blob[int(offsets[row]) : int(offsets[row + 1])])
+
+
+class NeighbourIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._journal_path = os.path.join(path, "journal.jsonl")
+        self._journal_checked = 0.0
+        # The open build and how much of its journal has been replayed; replaced together under
+        # the lock. Readers take one `self._state` snapshot per call, so a reopen never mixes builds.
+        self._state = _open_build(path, _read_meta(path))
+        self._journal_pos = 0
+        self.refresh()
+
+    @property
+    def k(self) -> int:
+        return self._state.k
+
+    @property
+    def fields(self) -> list:
+        return self._state.fields
+
+    @property
+    def count(self) -> int:
+        return self._state.count
+
+    @property
+    def built_at(self) -> Optional[float]:
+        return self._state.built_at
+
+    @property
+    def build_id(self) -> Optional[str]:
+        return self._state.build_id
+
+    # Lookups
+
+    def neighbours_of(self, number: int) -> Optional[list[tuple[int, float]]]:
+        state = self._state
+        overlay = state.overlay_lists.get(number)
+        if overlay is not None:
+            return overlay
+        row = _row(state, number)
+        if row is None:
+            return None
+        ids = state.neighbours[row]
+        dists = state.distances[row]
+        return [(int(n), float(d)) for n, d in zip(ids, dists) if n != _EMPTY]
+
+    def neighbours(self, work_key: str) -> Optional[list[tuple[int, float]]]:
+        """(neighbour work number, distance) closest first, or None if the seed is not indexed."""
+        self._maybe_refresh()
+        number = work_number(work_key)
+        return self.neighbours_of(number) if number is not None else None
+
+    def record(self, number: int) -> Optional[dict]:
+        state = self._state
+        overlay = state.overlay_records.get(number)
+        if overlay is not None:
+            return dict(overlay)
+        row = _row(state, number)
+        return _blob_item(state.records, state.record_offsets, row) if row is not None else None
+
+    def explanations(self, work_key: str) -> Optional[list[str]]:
+        """Explanations rendered at build time for the seed's list (None if not built or the list has changed)."""
+        state = self._state
+        number = work_number(work_key)
+        if number is None or state.explanations is None or number in state.overlay_lists:
+            return None
+        row = _row(state, number)
+        return _blob_item(state.explanations, state.explanation_offsets, row) if row is not None else None
+
+    # Incremental maintenance
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() - self._journal_checked >= _JOURNAL_CHECK_INTERVAL_S:
+            self.refresh()
+
+    def _rebuilt_state(self, current: _Build) -> Optional[_Build]:
+        """A freshly opened build if meta.json names a different build id than `current`, else None."""
+        try:
+            meta = _read_meta(self.path)
+        except (OSError, ValueError):
+            return None  # mid-swap: try again on the next refresh
+        if meta.get("build_id") == current.build_id:
+            return None
+        try:
+            state = _open_build(self.path, meta)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Neighbour index rebuilt at %s but not reopened: %s", self.path, e)
+            return None
+        logger.info("Neighbour index reopened after a rebuild (%s books, k=%s)", state.count, state.k)
+        return state
+
+    def refresh(self) -> None:
+        """Apply journal lines appended since the last refresh (by this or another worker), reopening after a rebuild."""
+        self._journal_checked = time.monotonic()
+        with self._lock:
+            state, pos = self._state, self._journal_pos
+            rebuilt = self._rebuilt_state(state)
+            if rebuilt is not None:
+                # Replay the new journal before publishing, so no reader sees the bare build
+                state, pos = rebuilt, 0
+            try:
+                size = os.path.getsize(self._journal_path)
+            except OSError:
+                size = pos
+            if size > pos:
+                with open(self._journal_path, "rb") as f:
+                    f.seek(pos)
+                    data = f.read(size - pos)
+                complete = data.rfind(b"\n") + 1  # ignore a line still being written
+                for line in data[:complete].splitlines():
+                    if not line.strip():
+                        continue
+                    try:
+                        _apply(state, json.loads(line))
+                    except (ValueError, TypeError, KeyError, AttributeError) as e:
+                        logger.warning("Skipping unreadable neighbour journal line in %s: %s", self.path, e)
+                pos += complete
+            self._state, self._journal_pos = state, pos
+
+    def add_book(self, client, record: dict, vector: list, *, collection_name: str = "books") -> int:
+        """
+        Index a newly written book: its own top-K plus every list it enters. Returns lists updated.
+        One vector search; the new book's distance to a candidate equals the candidate's distance to it.
+        """
+        number = work_number(record.get("work_key"))
+        if number is None:
+            return 0
+        results = client.search(
+            collection_name=collection_name,
+            data=[vector],
+            limit=max(UPDATE_CANDIDATES, self.k + 1),
+            output_fields=["work_key"],
+        )
+        candidates: list[tuple[int, float]] = []
+        seen = {number}
+        for hit in results[0] if results else []:
+            other = work_number(search_hit_entity_dict(hit).get("work_key"))
+            dist = search_hit_distance(hit)
+            if other is None or other in seen or dist is None:
+                continue
+            seen.add(other)
+            candidates.append((other, float(dist)))
+
+        # Other books' lists are read, merged and rewritten, so hold the journal lock from the
+        # re-read to the append: a concurrent write-back would otherwise drop this book's entries.
+        fd = os.open(self._journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self.refresh()
+            k = self.k
+            lists: dict[str, list] = {str(number): [[n, d] for n, d in candidates[:k]]}
+            for other, dist in candidates:
+                current = self.neighbours_of(other)
+                if current is None:
+                    continue
+                current = [(n, d) for n, d in current if n != number]
+                if len(current) >= k and dist >= current[-1][1]:
+                    continue
+                current.append((number, dist))
+                current.sort(key=lambda item: item[1])
+                lists[str(other)] = [[n, d] for n, d in current[:k]]
+            stored = {f: record.get(f) for f in ["id", *self.fields] if f in record}
+            update = {"ts": time.time(), "lists": lists, "records": {str(number): stored}}
+            # One O_APPEND write per update, so readers never see interleaved lines
+            os.write(fd, (json.dumps(update, separators=(",", ":")) + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)  # releases the lock
+        self.refresh()
+        return len(lists) - 1
+
+
+def _apply(state: _Build, update: dict) -> None:
+    for number, items in (update.get("lists") or {}).items():
+        state.overlay_lists[int(number)] = [(int(n), float(d)) for n, d in items]
+    for number, record in (update.get("records") or {}).items():
+        state.overlay_records[int(number)] = record
+
+
+# --- Build ---
+
+
+def _write_blob(path: str, name: str, items: Iterable) -> None:
+    offsets = [0]
+    with open(os.path.join(path, f"{name}.jsonl"), "wb") as f:
+        for item in items:
+            data = json.dumps(item, separators=(",", ":")).encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+    np.asarray(offsets, dtype=np.int64).tofile(os.path.join(path, f"{name}.off"))
+
+
+def _journal_size(path: str) -> int:
+    try:
+        return os.path.getsize(os.path.join(path, "journal.jsonl"))
+    except OSError:
+        return 0
+
+
+def _carry_over_journal(client, collection_name: str, journal_dir: str, start: int, index: NeighbourIndex) -> int:
+    """
+    Re-add to `index` the books journaled in `journal_dir` from byte `start` (write-backs that landed
+    while a build ran, so the walk may have missed them). Returns the offset to resume from.
+    """
+    try:
+        with open(os.path.join(journal_dir, "journal.jsonl"), "rb") as f:
+            f.seek(start)
+            data = f.read()
+    except OSError:
+        return start
+    complete = data.rfind(b"\n") + 1
+    numbers: set[int] = set()
+    for line in data[:complete].splitlines():
+        try:
+            numbers.update(int(n) for n in (json.loads(line).get("records") or {}))
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning("Skipping unreadable neighbour journal line in %s: %s", journal_dir, e)
+    if numbers:
+        # Write-backs keep the work_key the client sent, so match both spellings
+        keys = [key for n in sorted(numbers) for key in (f"/works/OL{n}W", f"OL{n}W")]
+        rows = client.query(
+            collection_name=collection_name,
+            filter=f"work_key in {string_list_literal(keys)}",
+            output_fields=list(dict.fromkeys(["id", "work_key", "embedding", *index.fields])),
+            limit=len(keys),
+        )
+        for row in rows or []:
+            if row.get("embedding") is not None:
+                index.add_book(client, sanitize_numpy_scalars(dict(row)), row["embedding"], collection_name=collection_name)
+        logger.info("Carried %s journaled books into the rebuilt neighbour index", len(numbers))
+    return start + complete
+
+
+def build_neighbour_index(
+    client,
+    path: str,
+    *,
+    collection_name: str = "books",
+    fields: list[str],
+    k: int = DEFAULT_K,
+    batch_size: int = 1000,
+    search_batch: int = 64,
+    with_explanations: bool = False,
+    limit: int = -1,
+) -> int:
+    """
+    Walk the collection with a query iterator, search each batch of stored vectors in one
+    multi-vector call, and write the index into `path`. Returns the number of seeds indexed.
+
+    Files are written to `<path>.building` and swapped in by renaming directories. The previous
+    journal is dropped (the rebuilt lists already include every book written before the build),
+    except for books journaled while the build ran: those are re-added to the new index just before
+    and just after the swap. Running workers see the new build id and reopen the files.
+    """
+    final_path = path
+    path = f"{final_path}.building"
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    journal_start = _journal_size(final_path)
+    fetch_fields = list(dict.fromkeys(["id", "work_key", "embedding", *fields]))
+    hit_fields = list(dict.fromkeys(["work_key", *(fields if with_explanations else [])]))
+    tmp_records = os.path.join(path, "records.unsorted.jsonl")
+    numbers: list[int] = []
+    record_spans: list[tuple[int, int]] = []
+    neighbour_rows: list[np.ndarray] = []
+    distance_rows: list[np.ndarray] = []
+    explanation_rows: list[list[str]] = []
+    seen: set[int] = set()
+
+    iterator = client.query_iterator(
+        collection_name=collection_name,
+        batch_size=batch_size,
+        limit=limit,
+        output_fields=fetch_fields,
+    )
+    try:
+        with open(tmp_records, "wb") as records_out:
+            pos = 0
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                rows = []
+                for row in batch:
+                    number = work_number(row.get("work_key"))
+                    if number is None or number in seen:
+                        continue  # not an OL work, or a duplicate write-back of one
+                    if number > np.iinfo(np.int32).max:
+                        raise ValueError(f"Work number {number} does not fit the int32 index")
+                    seen.add(number)
+                    rows.append((number, sanitize_numpy_scalars(dict(row))))
+                for start in range(0, len(rows), search_batch):
+                    chunk = rows[start : start + search_batch]
+                    results = client.search(
+                        collection_name=collection_name,
+                        data=[r["embedding"] for _, r in chunk],
+                        limit=k + 1 + max(2, k // 10),
+                        output_fields=hit_fields,
+                    )
+                    for (number, row), hits in zip(chunk, results):
+                        ids = np.full(k, _EMPTY, dtype=np.int32)
+                        dists = np.full(k, np.inf, dtype=np.float32)
+                        rendered: list[str] = []
+                        taken = {number}
+                        n = 0
+                        for hit in hits:
+                            entity = search_hit_entity_dict(hit)
+                            other = work_number(entity.get("work_key"))
+                            dist = search_hit_distance(hit)
+                            if other is None or other in taken or dist is None:
+                                continue
+                            taken.add(other)
+                            ids[n], dists[n] = other, dist
+                            if with_explanations:
+                                rendered.append(
+                                    build_deterministic_explanation(
+                                        seed_subjects=record_subject_phrases(row),
+                                        seed_author=row.get("author_name") or "",
+                                        rec=entity,
+                                        cosine_distance=dist,
+                                    )
+                                )
+                            n += 1
+                            if n == k:
+                                break
+                        numbers.append(number)
+                        neighbour_rows.append(ids)
+                        distance_rows.append(dists)
+                        explanation_rows.append(rendered)
+                        stored = {f: row.get(f) for f in ["id", *fields] if f in row}
+                        data = json.dumps(stored, separators=(",", ":")).encode("utf-8")
+                        records_out.write(data)
+                        record_spans.append((pos, len(data)))
+                        pos += len(data)
+                logger.info("Indexed %s books", len(numbers))
+    finally:
+        iterator.close()
+
+    order = np.argsort(np.asarray(numbers, dtype=np.int64), kind="stable")
+    np.asarray(numbers, dtype=np.int32)[order].tofile(os.path.join(path, "keys.i32"))
+    if numbers:
+        np.stack(neighbour_rows)[order].tofile(os.path.join(path, "neighbours.i32"))
+        np.stack(distance_rows)[order].tofile(os.path.join(path, "distances.f32"))
+    else:
+        open(os.path.join(path, "neighbours.i32"), "wb").close()
+        open(os.path.join(path, "distances.f32"), "wb").close()
+    with open(tmp_records, "rb") as f:
+        blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if record_spans else b""
+
+        def sorted_records():
+            for i in order:
+                start, length = record_spans[i]
+                yield json.loads(blob[start : start + length])
+
+        _write_blob(path, "records", sorted_records())
+        if record_spans:
+            blob.close()
+    os.remove(tmp_records)
+    if with_explanations:
+        _write_blob(path, "explanations", (explanation_rows[i] for i in order))
+    meta = {
+        "v": INDEX_VERSION,
+        "k": k,
+        "count": len(numbers),
+        "fields": fields,
+        "explanations": with_explanations,
+        "built_at": time.time(),
+        "build_id": uuid.uuid4().hex,
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    journal_pos = _carry_over_journal(client, collection_name, final_path, journal_start, NeighbourIndex(path))
+    previous = f"{final_path}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(final_path):
+        os.rename(final_path, previous)
+        # Appends that raced the rename went to the old journal
+        _carry_over_journal(client, collection_name, previous, journal_pos, NeighbourIndex(path))
+    os.rename(path, final_path)
+    return len(numbers)
+
+
+_index: Optional[NeighbourIndex] = None
+_index_lock = threading.Lock()
+_index_failed = False
+
+
+def get_neighbour_index() -> Optional[NeighbourIndex]:
+    """Process-wide index from NEIGHBOUR_INDEX_PATH, or None when unset or unreadable."""
+    global _index, _index_failed
+    if _index is not None or _index_failed:
+        return _index
+    path = os.getenv("NEIGHBOUR_INDEX_PATH", "").strip()
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None and not _index_failed:
+            try:
+                _index = NeighbourIndex(path)
+                logger.info("Neighbour index loaded from %s (%s books, k=%s)", path, _index.count, _index.k)
+            except (OSError, ValueError, KeyError) as e:
+                _index_failed = True
+                logger.warning("Neighbour index disabled (%s): %s", path, e)
+    return _index
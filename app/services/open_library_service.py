@@ -1,12 +1,28 @@
 # Open Library API client for book metadata. Replaces Spotify for the books migration.
 # See MIGRATION_AND_ARCHITECTURE.md section 9. Identify with User-Agent + contact for rate limits.
+#
+# fetch_work is the blocking client for scripts. The /recommend route uses get_work_cached to fill in
+# work_key-only seeds: fetch_work_async (httpx, author and ratings lookups in parallel, rate-limited by
+# a token bucket instead of a sleep before every call) behind a per-process + shared cache, with one
+# fetch in flight per work so concurrent requests for the same new book share it.
 
+import asyncio
+import logging
 import os
 import re
 import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
 import requests
 from fastapi import HTTPException
 
+from app.utils.metrics import record_cache_lookup, track_dependency
+from app.utils.shared_cache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
 BASE_URL = "https://openlibrary.org"
 COVERS_BASE = "https://covers.openlibrary.org/b/id"
 # Rate limit: with User-Agent + contact, ~3 req/s. Be conservative.
@@ -21,6 +37,11 @@ def _headers():
     return {"User-Agent": user_agent, "Accept": "application/json"}
 
 
+def _base_url() -> str:
+    """API root; OPEN_LIBRARY_BASE_URL points it at a stand-in (see app/jobs/load_test.py)."""
+    return (os.getenv("OPEN_LIBRARY_BASE_URL", "").strip() or BASE_URL).rstrip("/")
+
+
 def _normalize_work_id(work_id: str) -> str:
     """Return OL-style id e.g. OL45804W. Accepts OL45804W or /works/OL45804W."""
     s = work_id.strip()
@@ -33,43 +54,43 @@ def _work_key(work_id: str) -> str:
     return f"/works/{n}" if not n.startswith("/") else n
 
 
-def _fetch_json(url: str) -> dict:
+def _fetch_json(url: str, operation: str = "work") -> dict:
     time.sleep(_REQUEST_DELAY_SEC)
-    r = requests.get(url, headers=_headers(), timeout=15)
-    r.raise_for_status()
-    return r.json()
+    with track_dependency("open_library", operation):
+        r = requests.get(url, headers=_headers(), timeout=15)
+        r.raise_for_status()
+        return r.json()
 
 
 def _author_name(author_key: str) -> str:
     """Fetch author display name. author_key e.g. /authors/OL34184A."""
     if not author_key or not author_key.startswith("/authors/"):
         return "Unknown"
-    url = f"{BASE_URL}{author_key}.json"
+    url = f"{_base_url()}{author_key}.json"
     try:
-        data = _fetch_json(url)
+        data = _fetch_json(url, "author")
         return data.get("name") or data.get("personal_name") or "Unknown"
     except Exception:
         return "Unknown"
 
 
-def fetch_work(work_id: str) -> dict:
-    """
-    Fetch a work by ID from Open Library and return a document suitable for
-    Books.books_with_metadata. On failure raises HTTPException(404).
-    """
-    key = _work_key(work_id)
-    url = f"{BASE_URL}{key}.json"
-    try:
-        data = _fetch_json(url)
-    except requests.RequestException as e:
-        raise HTTPException(status_code=404, detail=f"Work not found: {str(e)}")
+def _search_url(work_id: str) -> str:
+    # Search by work ID so we get this work in results (key in response is e.g. /works/OL45804W)
+    return f"{_base_url()}/search.json?q={_normalize_work_id(work_id)}&limit=5&fields=key,first_publish_year,ratings_average"
+
+
+def _search_stats(search_data: dict, key: str) -> tuple[int, float]:
+    """(first_publish_year, ratings_average) of `key` in a search response; zeros when absent."""
+    for hit in search_data.get("docs") or []:
+        if hit.get("key") == key:
+            return int(hit.get("first_publish_year") or 0) or 0, float(hit.get("ratings_average") or 0) or 0.0
+    return 0, 0.0
 
-    # Extract fields
-    work_id_norm = _normalize_work_id(work_id)
+
+def _work_document(work_id: str, data: dict, author_name: str, first_publish_year: int, ratings_average: float) -> dict:
+    """Document for Books.books_with_metadata from a work's JSON plus its author and search stats."""
     title = data.get("title") or "Unknown"
     authors = data.get("authors") or []
-    author_key = authors[0]["author"]["key"] if authors else None
-    author_name_str = _author_name(author_key) if author_key else "Unknown"
     subjects = data.get("subjects") or []
     covers = data.get("covers") or []
 
@@ -90,28 +111,10 @@ def fetch_work(work_id: str) -> dict:
     author_count = len(authors)
     cover_count = len([c for c in covers if isinstance(c, int) and c > 0]) or (1 if cover_i else 0)
 
-    # Enrich with first_publish_year and ratings from Search API (one extra call)
-    first_publish_year = 0
-    ratings_average = 0.0
-    try:
-        # Search by work ID so we get this work in results (key in response is e.g. /works/OL45804W)
-        search_url = f"{BASE_URL}/search.json?q={work_id_norm}&limit=5&fields=key,first_publish_year,ratings_average"
-        time.sleep(_REQUEST_DELAY_SEC)
-        r = requests.get(search_url, headers=_headers(), timeout=15)
-        if r.ok:
-            search_data = r.json()
-            for hit in (search_data.get("docs") or []):
-                if hit.get("key") == key:
-                    first_publish_year = int(hit.get("first_publish_year") or 0) or 0
-                    ratings_average = float(hit.get("ratings_average") or 0) or 0.0
-                    break
-    except Exception:
-        pass
-
-    doc = {
-        "work_id": work_id_norm,
+    return {
+        "work_id": _normalize_work_id(work_id),
         "title": title,
-        "author_name": author_name_str,
+        "author_name": author_name,
         "author_count": author_count,
         "subject_count": subject_count,
         "cover_count": cover_count,
@@ -121,4 +124,193 @@ def fetch_work(work_id: str) -> dict:
         "first_publish_year": first_publish_year,
         "ratings_average": ratings_average,
     }
+
+
+def _first_author_key(data: dict) -> Optional[str]:
+    authors = data.get("authors") or []
+    try:
+        return authors[0]["author"]["key"] if authors else None
+    except (KeyError, TypeError):
+        return None
+
+
+def fetch_work(work_id: str) -> dict:
+    """
+    Fetch a work by ID from Open Library and return a document suitable for
+    Books.books_with_metadata. On failure raises HTTPException(404).
+    """
+    key = _work_key(work_id)
+    url = f"{_base_url()}{key}.json"
+    try:
+        data = _fetch_json(url)
+    except requests.RequestException as e:
+        raise HTTPException(status_code=404, detail=f"Work not found: {str(e)}")
+
+    author_key = _first_author_key(data)
+    author_name_str = _author_name(author_key) if author_key else "Unknown"
+
+    # Enrich with first_publish_year and ratings from Search API (one extra call)
+    first_publish_year, ratings_average = 0, 0.0
+    try:
+        time.sleep(_REQUEST_DELAY_SEC)
+        with track_dependency("open_library", "search"):
+            r = requests.get(_search_url(work_id), headers=_headers(), timeout=15)
+        if r.ok:
+            first_publish_year, ratings_average = _search_stats(r.json(), key)
+    except Exception:
+        pass
+
+    return _work_document(work_id, data, author_name_str, first_publish_year, ratings_average)
+
+
+# --- Async, cached fetch for the request path ---
+
+TIMEOUT_S = 5.0
+WORK_CACHE_SIZE = 2048
+# Works Open Library does not have are remembered briefly so retries do not hammer it
+MISSING_WORK_TTL_S = 600.0
+
+# Token bucket for the async client: the same average rate as _REQUEST_DELAY_SEC, but one lookup's
+# work + author + search calls can go out back to back
+_BURST = 3
+_tokens = float(_BURST)
+_tokens_at = 0.0
+# work id -> (expires_at, document or None for a missing work)
+_works: OrderedDict[str, tuple[float, Optional[dict]]] = OrderedDict()
+# work id -> fetch shared by every request currently waiting on it
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _timeout_s() -> float:
+    return float(os.getenv("OPEN_LIBRARY_TIMEOUT_SEC", str(TIMEOUT_S)))
+
+
+def _work_cache_ttl() -> float:
+    return float(os.getenv("OPEN_LIBRARY_CACHE_TTL_SEC", "86400"))
+
+
+async def _pace() -> None:
+    """Wait for a request token (refilled one per _REQUEST_DELAY_SEC, up to _BURST)."""
+    global _tokens, _tokens_at
+    now = time.monotonic()
+    _tokens = min(float(_BURST), _tokens + (now - _tokens_at) / _REQUEST_DELAY_SEC)
+    _tokens_at = now
+    _tokens -= 1.0
+    if _tokens < 0:
+        await asyncio.sleep(-_tokens * _REQUEST_DELAY_SEC)
+
+
+async def _get_json_async(client: httpx.AsyncClient, url: str, operation: str) -> dict:
+    await _pace()
+    with track_dependency("open_library", operation):
+        r = await client.get(url, headers=_headers())
+        r.raise_for_status()
+        return r.json()
+
+
+async def _author_name_async(client: httpx.AsyncClient, author_key: Optional[str]) -> str:
+    if not author_key or not author_key.startswith("/authors/"):
+        return "Unknown"
+    try:
+        data = await _get_json_async(client, f"{_base_url()}{author_key}.json", "author")
+        return data.get("name") or data.get("personal_name") or "Unknown"
+    except (httpx.HTTPError, ValueError):
+        return "Unknown"
+
+
+async def _search_stats_async(client: httpx.AsyncClient, work_id: str, key: str) -> tuple[int, float]:
+    try:
+        return _search_stats(await _get_json_async(client, _search_url(work_id), "search"), key)
+    except (httpx.HTTPError, ValueError):
+        return 0, 0.0
+
+
+async def fetch_work_async(work_id: str, timeout_s: Optional[float] = None) -> dict:
+    """
+    fetch_work without blocking the event loop: the author and search lookups run concurrently once
+    the work is fetched. Raises HTTPException(404) when Open Library has no such work; other failures
+    (timeouts, 5xx) raise httpx.HTTPError.
+    """
+    key = _work_key(work_id)
+    async with httpx.AsyncClient(timeout=timeout_s or _timeout_s()) as client:
+        try:
+            data = await _get_json_async(client, f"{_base_url()}{key}.json", "work")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise HTTPException(status_code=404, detail=f"Work not found: {key}")
+            raise
+        author_name, (first_publish_year, ratings_average) = await asyncio.gather(
+            _author_name_async(client, _first_author_key(data)),
+            _search_stats_async(client, work_id, key),
+        )
+    return _work_document(work_id, data, author_name, first_publish_year, ratings_average)
+
+
+def _cached_work(work_id: str) -> tuple[bool, Optional[dict]]:
+    entry = _works.get(work_id)
+    if entry is not None and entry[0] > time.time():
+        return True, entry[1]
+    cache = get_shared_cache()
+    cached = cache.get_json(f"olwork:{work_id}") if cache is not None else None
+    if cached is not None:
+        doc = cached.get("doc")
+        _remember_work(work_id, doc)
+        return True, doc
+    return False, None
+
+
+def _remember_work(work_id: str, doc: Optional[dict]) -> float:
+    """Cache `doc` (None = missing work) in this process; returns the TTL used."""
+    ttl = _work_cache_ttl() if doc is not None else MISSING_WORK_TTL_S
+    _works[work_id] = (time.time() + ttl, doc)
+    _works.move_to_end(work_id)
+    while len(_works) > WORK_CACHE_SIZE:
+        _works.popitem(last=False)
+    return ttl
+
+
+def _store_work(work_id: str, doc: Optional[dict]) -> None:
+    ttl = _remember_work(work_id, doc)
+    cache = get_shared_cache()
+    if cache is not None:
+        cache.set_json(f"olwork:{work_id}", {"doc": doc}, ttl)
+
+
+async def _fetch_and_store(work_id: str) -> Optional[dict]:
+    try:
+        doc = await fetch_work_async(work_id)
+    except HTTPException:
+        doc = None
+    except httpx.HTTPError as e:
+        # Transient: not cached, the next request tries again
+        logger.warning("Open Library fetch of %s failed: %s", work_id, str(e) or type(e).__name__)
+        return None
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        # A malformed payload (bad JSON, unexpected shape) is treated as transient too
+        logger.warning("Open Library returned an unreadable work %s: %s: %s", work_id, type(e).__name__, e)
+        return None
+    _store_work(work_id, doc)
     return doc
+
+
+async def get_work_cached(work_id: str, timeout_s: Optional[float] = None) -> Optional[dict]:
+    """
+    fetch_work_async result for `work_id`, cached (OPEN_LIBRARY_CACHE_TTL_SEC; missing works for
+    MISSING_WORK_TTL_S). Concurrent callers share one fetch. None when the work does not exist, the
+    fetch fails, or it does not finish within `timeout_s`; in that last case the fetch keeps running
+    and fills the cache for the next request.
+    """
+    work_id = _normalize_work_id(work_id)
+    hit, doc = _cached_work(work_id)
+    record_cache_lookup("open_library_works", hit)
+    if hit:
+        return doc
+    task = _inflight.get(work_id)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(_fetch_and_store(work_id))
+        _inflight[work_id] = task
+        task.add_done_callback(lambda _: _inflight.pop(work_id, None))
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout_s)
+    except asyncio.TimeoutError:
+        return None
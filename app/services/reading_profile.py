@@ -0,0 +1,115 @@
+"""Reading-history profiles for POST /recommend/profile.
+
+A user's recent reads (Mongo ``Books.books_with_metadata``: ``{user_id, work_key, read_at}``, one
+indexed ``find`` sorted by ``read_at``) become a recency-weighted profile of their stored embeddings:
+each read weighs ``0.5 ** (age_days / half_life_days)``. One profile vector is the weighted mean; with
+``clusters > 1`` a weighted spherical k-means splits the history into tastes (e.g. fantasy and
+history readers) so one search per taste runs in the same multi-vector ``client.search`` call instead
+of the mean landing between them. Results are interleaved in proportion to each taste's weight.
+
+The ``(user_id, read_at desc)`` index is created offline by ``python -m app.jobs.create_history_index``
+(ensure_history_index), never on the request path: building it on a large collection is slow.
+
+NumPy is imported on first use (the profile route is the only caller).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+HISTORY_FIELDS = {"_id": 0, "work_key": 1, "read_at": 1}
+_KMEANS_ITERATIONS = 10
+HISTORY_INDEX = "user_recent_reads"
+
+
+def ensure_history_index(collection) -> str:
+    """Create the (user_id, read_at desc) index load_recent_reads needs (a no-op when it exists); returns its name."""
+    return collection.create_index([("user_id", 1), ("read_at", -1)], name=HISTORY_INDEX)
+
+
+def load_recent_reads(collection, user_id: str, limit: int) -> list[dict]:
+    """Most recent `limit` reads of `user_id` (newest first): [{"work_key", "read_at"}]."""
+    cursor = collection.find({"user_id": user_id}, HISTORY_FIELDS).sort("read_at", -1).limit(limit)
+    return [r for r in cursor if r.get("work_key")]
+
+
+def _as_utc(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            return _as_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+        except ValueError:
+            return None
+    return None
+
+
+def recency_weights(read_ats: list, half_life_days: float, now: Optional[datetime] = None) -> list[float]:
+    """Exponential decay by age; reads without a usable date weigh as much as the oldest dated read."""
+    now = now or datetime.now(timezone.utc)
+    ages = []
+    for value in read_ats:
+        when = _as_utc(value)
+        ages.append(None if when is None else max(0.0, (now - when).total_seconds() / 86400.0))
+    known = [a for a in ages if a is not None]
+    fallback = max(known) if known else 0.0
+    return [0.5 ** ((fallback if a is None else a) / half_life_days) for a in ages]
+
+
+def profile_centroids(vectors: list, weights: list[float], clusters: int = 1):
+    """
+    (centroids, shares, labels): unit-norm profile vectors, each one's share of the total weight, and
+    the centroid index of every read. k-means++-style farthest-point seeding from the heaviest read,
+    then weighted spherical k-means; empty clusters are dropped.
+    """
+    import numpy as np
+
+    x = np.asarray(vectors, dtype=np.float32)
+    x /= np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+    w = np.asarray(weights, dtype=np.float64)
+    k = max(1, min(clusters, len(x)))
+    centres = [x[int(np.argmax(w))]]
+    for _ in range(1, k):
+        nearest = np.max(x @ np.stack(centres).T, axis=1)
+        centres.append(x[int(np.argmax(w * (1.0 - nearest)))])
+    centres = np.stack(centres)
+    labels = np.zeros(len(x), dtype=np.int64)
+    for _ in range(_KMEANS_ITERATIONS if k > 1 else 1):
+        labels = np.argmax(x @ centres.T, axis=1) if k > 1 else labels
+        sums = np.zeros_like(centres, dtype=np.float64)
+        np.add.at(sums, labels, x * w[:, None])
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        moved = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centres).astype(np.float32)
+        if np.allclose(moved, centres):
+            break
+        centres = moved
+    mass = np.bincount(labels, weights=w, minlength=k)
+    keep = np.flatnonzero(mass > 0)
+    remap = {int(old): new for new, old in enumerate(keep)}
+    return centres[keep], (mass[keep] / mass.sum()).tolist(), [remap[int(label)] for label in labels]
+
+
+def interleave(result_lists: list[list[dict]], shares: list[float], limit: int) -> list[tuple[int, dict]]:
+    """
+    Merge per-centroid result lists into (centroid index, hit) pairs: each pick goes to the list
+    furthest behind its share of the page (weighted round-robin), skipping works already taken.
+    """
+    taken: list[tuple[int, dict]] = []
+    seen: set = set()
+    positions = [0] * len(result_lists)
+    served = [0] * len(result_lists)
+    while len(taken) < limit:
+        open_lists = [i for i, hits in enumerate(result_lists) if positions[i] < len(hits)]
+        if not open_lists:
+            break
+        i = min(open_lists, key=lambda j: (served[j] / max(shares[j], 1e-9), j))
+        hit = result_lists[i][positions[i]]
+        positions[i] += 1
+        key = hit.get("work_key")
+        if key in seen:
+            continue
+        seen.add(key)
+        served[i] += 1
+        taken.append((i, hit))
+    return taken
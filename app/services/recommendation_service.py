@@ -1,9 +1,22 @@
 # app/services/recommendation_service.py
+# NumPy-only similarity kernels for the legacy track route. sklearn is not imported at serve time
+# (it cost ~1s of import per worker); the commented PCA helpers below would import it locally.
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.decomposition import PCA
-import pickle
-import os
+
+
+def cosine_similarity(a, b) -> np.ndarray:
+    """Row-wise cosine similarity matrix between 2-D arrays `a` (m×d) and `b` (n×d), like sklearn's.
+
+    Zero-norm rows get similarity 0 rather than NaN.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    a_norm = np.linalg.norm(a, axis=1, keepdims=True)
+    b_norm = np.linalg.norm(b, axis=1, keepdims=True)
+    a_norm[a_norm == 0] = 1.0
+    b_norm[b_norm == 0] = 1.0
+    return (a / a_norm) @ (b / b_norm).T
+
 
 def calculate_cosine_similarity(target_song, all_tracks, feature_columns, top_n=10):
     # Convert track features into NumPy arrays for similarity calculation
@@ -62,18 +75,14 @@ def calculate_weighted_cosine_similarity(target_song, all_tracks, feature_column
     # Extract feature values for the target song
     target_features = np.array([target_song[feature] * weights[feature] for feature in feature_columns])
 
-    # List to store similarity results
-    similarities = []
-
-    # Compare the target song with all tracks
-    for track in all_tracks:
-        track_features = np.array([track[feature] * weights[feature] for feature in feature_columns])
-        similarity_score = cosine_similarity([target_features], [track_features])[0][0]
-        similarities.append((track, similarity_score))
+    # Score every track in one matrix product
+    weight_row = np.array([weights[feature] for feature in feature_columns])
+    track_features = np.array([[track[feature] for feature in feature_columns] for track in all_tracks]) * weight_row
+    similarity_scores = cosine_similarity([target_features], track_features)[0]
 
-    # Sort by similarity score and return the top N recommendations
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    recommended_tracks = [track for track, _ in similarities[:top_n]]
+    # Sort by similarity score (stable, like the previous list sort) and return the top N recommendations
+    order = np.argsort(-similarity_scores, kind="stable")[:top_n]
+    recommended_tracks = [all_tracks[i] for i in order]
 
     return recommended_tracks
 
@@ -0,0 +1,87 @@
+"""
+Diversity + popularity re-ranking over an overfetched candidate set.
+
+Maximal marginal relevance (MMR): repeatedly pick the candidate maximizing
+
+    (1 − diversity) · base_score − diversity · max_sim_to_already_picked
+
+where base_score blends semantic relevance (cosine similarity to the seed) with popularity
+(log shelf count and average rating). All pairwise similarities come from one matmul over the
+candidate matrix; the greedy loop only does O(n) vector updates per pick, so 50 candidates
+re-rank well under a millisecond.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# Popularity = shelf share + rating share (ratings are sparse in Open Library data).
+_SHELF_SHARE = 0.7
+_RATING_SHARE = 0.3
+
+
+def popularity_scores(records: list[dict]) -> np.ndarray:
+    """[0, 1] popularity per record from total_shelf_count (log-scaled) and avg_rating."""
+    shelves = np.log1p(np.array([max(0, int(r.get("total_shelf_count") or 0)) for r in records], dtype=np.float64))
+    ratings = np.array(
+        [float(r.get("avg_rating") or 0.0) if r.get("has_rating") else 0.0 for r in records],
+        dtype=np.float64,
+    )
+    shelf_max = shelves.max() if len(shelves) else 0.0
+    shelf_norm = shelves / shelf_max if shelf_max > 0 else shelves
+    return _SHELF_SHARE * shelf_norm + _RATING_SHARE * np.clip(ratings / 5.0, 0.0, 1.0)
+
+
+def cosine_distances(query, vectors) -> np.ndarray:
+    """COSINE distance (1 − cosine similarity) from `query` to each row of `vectors`, as search_hit_distance reports it."""
+    x = np.asarray(vectors, dtype=np.float64)
+    q = np.asarray(query, dtype=np.float64)
+    norms = np.linalg.norm(x, axis=1) * np.linalg.norm(q)
+    norms[norms == 0] = 1.0
+    return 1.0 - (x @ q) / norms
+
+
+def mmr_order(
+    embeddings: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    *,
+    diversity: float = 0.0,
+    popularity: np.ndarray | None = None,
+    popularity_weight: float = 0.0,
+) -> list[int]:
+    """
+    Indices of the k candidates to return, in order.
+
+    embeddings: n × d candidate vectors (any scale; normalized here).
+    relevance: n cosine similarities to the seed (higher = closer).
+    diversity: 0 = pure relevance order, 1 = maximally spread out.
+    popularity_weight: share of the base score taken by `popularity` (0–1).
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    base = np.asarray(relevance, dtype=np.float64)
+    if popularity is not None and popularity_weight > 0:
+        base = (1.0 - popularity_weight) * base + popularity_weight * np.asarray(popularity, dtype=np.float64)
+    if diversity <= 0:
+        return np.argsort(-base, kind="stable")[:k].tolist()
+
+    x = np.asarray(embeddings, dtype=np.float64)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    x = x / norms
+    sim = x @ x.T
+
+    max_sim = np.full(n, -1.0)
+    available = np.ones(n, dtype=bool)
+    order: list[int] = []
+    for _ in range(k):
+        scores = (1.0 - diversity) * base - diversity * np.maximum(max_sim, 0.0) if order else base.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        available[best] = False
+        np.maximum(max_sim, sim[best], out=max_sim)
+    return order
@@ -0,0 +1,134 @@
+"""Partition layout for the books collection: coarse subject family × rated/unrated.
+
+Every row lives in partition ``<family>__rated`` or ``<family>__unrated``. The family comes from the
+book's first subject that maps to one (FAMILY_KEYWORDS, checked in order), else "general"; rated
+means ``has_rating``. ``python -m app.jobs.partition_catalog`` lays an existing collection out this
+way and Tier 2 write-backs insert into the right partition.
+
+Searches then pass ``partition_names`` when the request context narrows them:
+
+- ``min_avg_rating`` implies ``has_rating == true``: only the rated partitions (exact, no recall loss)
+- ``same_family`` on /recommend: only the seed's family (opt-in: books outside it are excluded)
+
+Mood searches and tag queries are not pruned: a row lives in one family only (its first mapped
+subject), so "Fantasy, Humor" is in fantasy and a humor tag must still reach it.
+
+Detection runs once per process (the ``partitions`` warm-up step, or ``detect_partitions``);
+PARTITION_SEARCH=0 turns pruning off, PARTITION_SEARCH=1 forces it on for every family partition.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Iterable, Optional
+
+from app.services.explanation_subject_signals import normalize_subject_phrase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAMILY = "general"
+# Checked in order, so the more specific families win ("historical romance" -> romance)
+FAMILY_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "children": ("juvenile", "children", "picture book", "young adult", "nursery"),
+    "science_fiction": ("science fiction", "space opera", "dystopia", "cyberpunk", "time travel", "speculative"),
+    "fantasy": ("fantasy", "magic", "dragon", "wizard", "fairy", "mythology"),
+    "horror": ("horror", "gothic", "ghost", "vampire", "supernatural"),
+    "mystery_thriller": ("mystery", "mysteries", "detective", "crime", "thriller", "suspense", "espionage", "noir"),
+    "romance": ("romance", "love stories"),
+    "humor": ("humor", "humour", "satire", "comedic", "comedy"),
+    "historical": ("historical fiction", "war", "world war"),
+    "nonfiction": ("history", "biography", "philosophy", "science", "essays", "politics", "religion", "self-help"),
+    "literary": ("literary fiction", "domestic fiction", "coming-of-age", "fiction"),
+}
+FAMILIES = [*FAMILY_KEYWORDS, DEFAULT_FAMILY]
+# Whole words (optional plural), so "war" does not match "award" or "warriors"
+_FAMILY_PATTERNS = {
+    family: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")s?\b")
+    for family, keywords in FAMILY_KEYWORDS.items()
+}
+
+_available: Optional[frozenset] = None
+
+
+def phrase_family(phrase: str) -> Optional[str]:
+    p = normalize_subject_phrase(phrase)
+    for family, pattern in _FAMILY_PATTERNS.items():
+        if pattern.search(p):
+            return family
+    return None
+
+
+def subject_family(subjects: Iterable[str]) -> str:
+    """Family of the first subject that maps to one (subjects are in the book's own priority order)."""
+    for subject in subjects or []:
+        family = phrase_family(str(subject))
+        if family is not None:
+            return family
+    return DEFAULT_FAMILY
+
+
+def partition_name(family: str, rated: bool) -> str:
+    return f"{family}__{'rated' if rated else 'unrated'}"
+
+
+def all_partition_names() -> list[str]:
+    return [partition_name(f, rated) for f in FAMILIES for rated in (True, False)]
+
+
+def partition_for_record(record: dict) -> str:
+    """Partition a row belongs in (subject_tags when present, else the subjects CSV)."""
+    subjects = record.get("subject_tags")
+    if not isinstance(subjects, (list, tuple)):
+        subjects = (record.get("subjects") or "").split(",")
+    return partition_name(subject_family(subjects), bool(record.get("has_rating")))
+
+
+def insert_by_partition(client, collection_name: str, rows: list[dict], partition_for=partition_for_record) -> None:
+    """Insert `rows` grouped by ``partition_for(row)`` (one insert per partition present in the batch)."""
+    groups: dict[str, list[dict]] = {}
+    for row in rows:
+        groups.setdefault(partition_for(row), []).append(row)
+    for name, group in groups.items():
+        client.insert(collection_name=collection_name, data=group, partition_name=name)
+
+
+def partitions_enabled() -> bool:
+    forced = os.getenv("PARTITION_SEARCH", "auto").strip().lower()
+    if forced in ("0", "false", "no"):
+        return False
+    if forced in ("1", "true", "yes"):
+        return True
+    return bool(_available)
+
+
+def detect_partitions(client, collection_name: str) -> bool:
+    """Record which family partitions the collection has; pruning is on when any exist."""
+    global _available
+    list_partitions = getattr(client, "list_partitions", None)
+    names = set(list_partitions(collection_name=collection_name)) if list_partitions is not None else set()
+    _available = frozenset(names & set(all_partition_names()))
+    logger.info("Collection %s: %s family partitions", collection_name, len(_available))
+    return bool(_available)
+
+
+def reset_detection() -> None:
+    global _available
+    _available = None
+
+
+def search_partitions(families: Optional[Iterable[str]] = None, rated: Optional[bool] = None) -> Optional[list[str]]:
+    """
+    ``partition_names`` for a search narrowed to `families` and/or rated state, or None to search
+    everything (nothing to narrow, pruning off, or none of the partitions exist).
+    """
+    if (families is None and rated is None) or not partitions_enabled():
+        return None
+    wanted_families = list(dict.fromkeys(families)) if families is not None else FAMILIES
+    states = (True, False) if rated is None else (rated,)
+    names = [partition_name(f, r) for f in wanted_families for r in states]
+    if _available is not None:
+        names = [n for n in names if n in _available]
+    return names or None
+
@@ -0,0 +1,84 @@
+"""Array-typed subject tags: ``subject_tags`` ARRAY<VARCHAR> with an INVERTED scalar index.
+
+The original ``subjects`` field is one comma-joined VARCHAR, so subject lookups are ``like "%x%"``
+scans (one per subject) and every hit is re-split at read time. Collections migrated by
+``python -m app.jobs.migrate_subject_tags`` also carry ``subject_tags``: the alias-normalized,
+de-duplicated phrases. When the serving collection has the field, Tier 3 and the mood subject
+path issue a single ``array_contains_any`` query for all candidate subjects, ``require_subjects``
+becomes ``array_contains_all``, and explanations read the array directly. ``subjects`` stays as
+the display string returned to clients.
+
+Detection runs once per process (the ``subject_tags`` warm-up step, or ``detect_subject_tags``);
+SUBJECT_TAGS=1/0 forces it on or off.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Iterable, Optional
+
+from app.services.explanation_subject_signals import normalize_subject_phrase
+from app.utils.milvus_filters import array_contains_any
+
+logger = logging.getLogger(__name__)
+
+SUBJECT_TAGS_FIELD = "subject_tags"
+# Schema limits of the migrated field (max_capacity / element max_length)
+MAX_SUBJECT_TAGS = 16
+SUBJECT_TAG_MAX_LENGTH = 128
+
+_detected: Optional[bool] = None
+
+
+def subject_tags(subjects: Iterable[str]) -> list[str]:
+    """Stored form of a subject list: normalized, de-duplicated, capped to the schema limits."""
+    tags: list[str] = []
+    for subject in subjects or []:
+        tag = normalize_subject_phrase(str(subject))[:SUBJECT_TAG_MAX_LENGTH].strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+            if len(tags) >= MAX_SUBJECT_TAGS:
+                break
+    return tags
+
+
+def subject_tags_csv(subjects_csv: str) -> list[str]:
+    return subject_tags(s for s in (subjects_csv or "").split(","))
+
+
+def subject_tags_enabled() -> bool:
+    """True when the serving collection has ``subject_tags`` (or SUBJECT_TAGS forces it)."""
+    forced = os.getenv("SUBJECT_TAGS", "auto").strip().lower()
+    if forced in ("1", "true", "yes"):
+        return True
+    if forced in ("0", "false", "no"):
+        return False
+    return bool(_detected)
+
+
+def _field_names(description: dict) -> set[str]:
+    return {f.get("name") for f in (description or {}).get("fields") or [] if isinstance(f, dict)}
+
+
+def detect_subject_tags(client, collection_name: str) -> bool:
+    """Check the collection schema for ``subject_tags`` and remember the answer for this process."""
+    global _detected
+    describe = getattr(client, "describe_collection", None)
+    if describe is None:
+        _detected = False
+    else:
+        _detected = SUBJECT_TAGS_FIELD in _field_names(describe(collection_name=collection_name))
+    logger.info("Collection %s: subject_tags %s", collection_name, "present" if _detected else "absent")
+    return _detected
+
+
+def reset_detection() -> None:
+    global _detected
+    _detected = None
+
+
+def subject_tags_filter(subjects: Iterable[str]) -> str:
+    """One indexed ``array_contains_any`` over every candidate subject ("" when none survive normalization)."""
+    tags = subject_tags(subjects)
+    return array_contains_any(SUBJECT_TAGS_FIELD, tags) if tags else ""
@@ -0,0 +1,178 @@
+# app/services/warmup.py
+# Background vector-store connect with retries, readiness state, and the warm-up phase that runs
+# before /readyz reports ready. Startup no longer blocks on Zilliz: the port binds immediately and
+# book routes return 503 + Retry-After until the client is connected.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Callable[[Any], Awaitable[None]]
+
+# Ordered registry; routes/services add steps at import time (see register_warmup_step).
+_WARMUP_STEPS: list[tuple[str, WarmupStep]] = []
+
+
+@dataclass
+class Readiness:
+    """What /readyz reports. `ready` only once connected, loaded and warmed."""
+
+    backend: str = "none"
+    connected: bool = False
+    collection_loaded: bool = False
+    warmed: bool = False
+    attempts: int = 0
+    last_error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    warmup_steps: dict[str, str] = field(default_factory=dict)
+    # Extra dependency probes (e.g. embedding circuit breaker); name -> callable returning a dict.
+    probes: dict[str, Callable[[], dict]] = field(default_factory=dict)
+
+    @property
+    def ready(self) -> bool:
+        return self.connected and self.collection_loaded and self.warmed
+
+    def as_dict(self) -> dict:
+        out = {
+            "status": "ready" if self.ready else "starting",
+            "backend": self.backend,
+            "connected": self.connected,
+            "collection_loaded": self.collection_loaded,
+            "warmed": self.warmed,
+            "connect_attempts": self.attempts,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "warmup_steps": dict(self.warmup_steps),
+        }
+        if self.last_error:
+            out["last_error"] = self.last_error
+        for name, probe in self.probes.items():
+            out[name] = probe()
+        return out
+
+
+def register_warmup_step(name: str, step: WarmupStep) -> None:
+    """Add an async step `step(client)` to the warm-up phase (idempotent by name)."""
+    global _WARMUP_STEPS
+    _WARMUP_STEPS = [(n, s) for n, s in _WARMUP_STEPS if n != name]
+    _WARMUP_STEPS.append((name, step))
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("WARMUP_ENABLED", "1").strip() not in ("0", "false", "no")
+
+
+def _env_list(name: str) -> list[str]:
+    return [s.strip() for s in os.getenv(name, "").split(",") if s.strip()]
+
+
+def warmup_work_keys() -> list[str]:
+    """Hot seeds to preload (WARMUP_WORK_KEYS, comma-separated work keys)."""
+    return _env_list("WARMUP_WORK_KEYS")
+
+
+def warmup_moods() -> list[str]:
+    """Moods to preload (WARMUP_MOODS, comma-separated, or "all")."""
+    return _env_list("WARMUP_MOODS")
+
+
+def _load_state_name(state: Any) -> str:
+    raw = state.get("state") if isinstance(state, dict) else state
+    return getattr(raw, "name", None) or str(raw).split(".")[-1]
+
+
+async def _ensure_collection_loaded(client, collection_name: str, timeout_s: float) -> None:
+    """Poll load state; trigger a load once if the collection is released. No-op for clients without the API."""
+    get_state = getattr(client, "get_load_state", None)
+    if get_state is None:
+        return
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + timeout_s
+    requested_load = False
+    while True:
+        state = _load_state_name(await loop.run_in_executor(None, lambda: get_state(collection_name=collection_name)))
+        if state == "Loaded":
+            return
+        if state == "NotLoad" and not requested_load and hasattr(client, "load_collection"):
+            requested_load = True
+            await loop.run_in_executor(None, lambda: client.load_collection(collection_name=collection_name))
+        if state == "NotExist":
+            raise RuntimeError(f"Collection {collection_name!r} does not exist")
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Collection {collection_name!r} not loaded after {timeout_s:.0f}s (state {state})")
+        await asyncio.sleep(1.0)
+
+
+async def run_warmup(client, readiness: Readiness) -> None:
+    """Run registered steps in order. A failing step is logged and does not block readiness."""
+    if not warmup_enabled():
+        readiness.warmed = True
+        return
+    for name, step in list(_WARMUP_STEPS):
+        start = time.perf_counter()
+        try:
+            await step(client)
+            readiness.warmup_steps[name] = f"ok ({(time.perf_counter() - start) * 1000:.0f}ms)"
+        except Exception as e:
+            readiness.warmup_steps[name] = f"failed: {e}"
+            logger.warning("Warm-up step %s failed: %s", name, e)
+    readiness.warmed = True
+
+
+async def connect_in_background(
+    app,
+    connect: Callable[[], Any],
+    readiness: Readiness,
+    *,
+    collection_name: str,
+) -> None:
+    """
+    Connect with per-attempt timeout and exponential backoff until it succeeds, then wait for the
+    collection to load (retried with the same backoff) and run warm-up. app.state.zilliz_client is set as soon as the client works,
+    so requests can be served (un-warmed) while warm-up is still running.
+    """
+    timeout_s = float(os.getenv("ZILLIZ_CONNECT_TIMEOUT_SEC", "90"))
+    backoff_s = float(os.getenv("ZILLIZ_CONNECT_BACKOFF_SEC", "2"))
+    max_backoff_s = float(os.getenv("ZILLIZ_CONNECT_MAX_BACKOFF_SEC", "60"))
+    loop = asyncio.get_running_loop()
+    client = None
+    while client is None:
+        readiness.attempts += 1
+        logger.info("Connecting to %s (attempt %s, timeout %.0fs)...", readiness.backend, readiness.attempts, timeout_s)
+        try:
+            client = await asyncio.wait_for(loop.run_in_executor(None, connect), timeout=timeout_s)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            readiness.last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            logger.error("Connect to %s failed: %s; retrying in %.0fs", readiness.backend, readiness.last_error, backoff_s)
+            await asyncio.sleep(backoff_s)
+            backoff_s = min(max_backoff_s, backoff_s * 2)
+    readiness.connected = True
+    readiness.last_error = None
+    app.state.zilliz_client = client
+    logger.info("%s client ready", readiness.backend)
+
+    # Retried like the connect: a collection still loading (or briefly unreachable) must not leave
+    # the instance connected but never ready
+    backoff_s = float(os.getenv("ZILLIZ_CONNECT_BACKOFF_SEC", "2"))
+    while not readiness.collection_loaded:
+        try:
+            await _ensure_collection_loaded(client, collection_name, timeout_s)
+            readiness.collection_loaded = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            readiness.last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            logger.error("Collection load check failed: %s; retrying in %.0fs", readiness.last_error, backoff_s)
+            await asyncio.sleep(backoff_s)
+            backoff_s = min(max_backoff_s, backoff_s * 2)
+    readiness.last_error = None
+    await run_warmup(client, readiness)
+    logger.info("Warm-up complete; instance ready")
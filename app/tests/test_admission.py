@@ -0,0 +1,122 @@
+"""Adaptive admission control: queueing, shedding, per-client fairness and AIMD limit."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils import admission
+from app.utils.admission import AdaptiveLimiter, AdmissionRejected
+
+
+def _limiter(**kwargs):
+    defaults = dict(initial_limit=1, min_limit=1, max_limit=4, max_queue=2, queue_timeout_s=1.0)
+    defaults.update(kwargs)
+    return AdaptiveLimiter("test", **defaults)
+
+
+def test_queue_then_shed_with_retry_after():
+    async def scenario():
+        limiter = _limiter(max_limit=1)
+        await limiter.acquire("a")
+        waiting = [asyncio.create_task(limiter.acquire(k)) for k in ("b", "c")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire("d")
+        assert exc.value.status_code == 503 and exc.value.retry_after_s >= 1
+        limiter.release(0.01, ok=True)
+        await asyncio.sleep(0.01)
+        assert [t.done() for t in waiting] == [True, False]
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.inflight == 1
+
+
+def test_queue_timeout_rejects():
+    async def scenario():
+        limiter = _limiter(queue_timeout_s=0.02)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        assert exc.value.reason == "queue_timeout"
+        assert limiter.as_dict()["queued"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_per_client_fairness():
+    async def scenario():
+        limiter = _limiter(max_queue=10, per_client_queue=2, fairness=True)
+        await limiter.acquire("heavy")
+        order = []
+
+        async def wait(key):
+            await limiter.acquire(key)
+            order.append(key)
+
+        tasks = [asyncio.create_task(wait(k)) for k in ("heavy", "heavy", "light")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire("heavy")
+        assert exc.value.status_code == 429
+        for _ in tasks:
+            limiter.release(0.01, ok=True, record=False)
+            await asyncio.sleep(0.01)
+        return order
+
+    assert asyncio.run(scenario()) == ["heavy", "light", "heavy"]
+
+
+def test_callers_sharing_the_secret_do_not_share_a_queue(monkeypatch):
+    from starlette.requests import Request
+
+    from app.routes.recommendations import client_key
+
+    monkeypatch.setenv("SECRET_TOKEN", "shared")
+    monkeypatch.delenv("ADMISSION_FAIRNESS", raising=False)
+    assert AdaptiveLimiter.from_env("book").fairness is False
+
+    def request(host, headers=()):
+        scope = {"type": "http", "method": "POST", "path": "/recommend", "query_string": b"token=shared",
+                 "headers": [(k.encode(), v.encode()) for k, v in headers], "client": (host, 5000)}
+        return Request(scope)
+
+    one, two = client_key(request("10.0.0.1")), client_key(request("10.0.0.2"))
+    assert one != two
+    assert client_key(request("10.0.0.1", [("x-client-id", "app-a")])) == "c:app-a"
+
+    async def scenario():
+        limiter = _limiter(max_queue=10, per_client_queue=1, fairness=True)
+        await limiter.acquire(one)
+        waiting = [asyncio.create_task(limiter.acquire(k)) for k in (one, two)]
+        await asyncio.sleep(0)
+        assert limiter.as_dict()["queued"] == 2
+        for _ in waiting:
+            limiter.release(0.01, ok=True, record=False)
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*waiting)
+
+    asyncio.run(scenario())
+
+
+def test_aimd_backs_off_on_slow_or_failed_requests():
+    limiter = _limiter(initial_limit=4, max_limit=8, target_latency_s=0.1, backoff=0.5)
+    limiter.inflight = 4
+    limiter.release(0.5, ok=True)
+    assert limiter.limit == 2
+    limiter.inflight = 2
+    limiter.release(0.01, ok=True)
+    assert limiter.limit == 2.5
+
+
+def test_middleware_returns_503_with_retry_after(monkeypatch):
+    from main import app
+
+    saturated = _limiter(max_queue=0)
+    asyncio.run(saturated.acquire())
+    monkeypatch.setattr(admission, "_limiters", {"book": saturated})
+    resp = TestClient(app).post("/recommend", json={"work_key": "/works/OL1W"})
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert TestClient(app).get("/healthz").status_code == 200
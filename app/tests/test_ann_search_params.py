@@ -0,0 +1,70 @@
+"""ANN search params (ANN_SEARCH_PARAMS / per-request ann_params) and the recall sweep tool."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.jobs.ann_recall_benchmark import cheapest_meeting, ground_truth, parse_grid, sample_seeds, sweep
+from app.routes import recommendations
+from app.utils.ann_search_params import ann_search_params, validate_ann_params
+from app.utils.local_vector_store import LocalMilvusClient
+from app.utils.recommend_cursor import range_search_params
+from main import app
+
+
+def test_validation_and_merge(monkeypatch):
+    assert validate_ann_params({"ef": 64, "level": 2}) == {"ef": 64, "level": 2}
+    for bad in ({"radius": 1}, {"ef": 0}, {"ef": "64"}, {"level": True}):
+        with pytest.raises(ValueError):
+            validate_ann_params(bad)
+
+    monkeypatch.delenv("ANN_SEARCH_PARAMS", raising=False)
+    assert ann_search_params(11) is None
+    monkeypatch.setenv("ANN_SEARCH_PARAMS", '{"ef": 8, "level": 1}')
+    assert ann_search_params(11) == {"params": {"ef": 11, "level": 1}}
+    merged = ann_search_params(11, {"level": 3}, range_search_params(0.75))
+    assert merged == {"params": {"ef": 11, "level": 3, "radius": -1.01, "range_filter": 0.75}}
+    monkeypatch.setenv("ANN_SEARCH_PARAMS", '{"index_type": "FLAT"}')
+    with pytest.raises(ValueError):
+        ann_search_params(11)
+
+
+def test_recommend_sends_request_ann_params(monkeypatch):
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setenv("ANN_SEARCH_PARAMS", '{"level": 1}')
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[{"id": i, "work_key": f"/works/OL{i}W", "embedding": [1.0, i / 10]} for i in range(1, 4)],
+    )
+    sent = []
+    original = store.search
+    monkeypatch.setattr(store, "search", lambda **kw: sent.append(kw.get("search_params")) or original(**kw))
+    app.state.zilliz_client = store
+    try:
+        http = TestClient(app)
+        resp = http.post("/recommend", json={"work_key": "/works/OL1W", "ann_params": {"level": 4}, "fields": ["title"]})
+        assert resp.status_code == 200 and len(resp.json()["recommendations"]) == 2
+        assert sent == [{"params": {"level": 4}}]
+        assert http.post("/recommend", json={"work_key": "/works/OL1W", "ann_params": {"metric": 1}}).status_code == 422
+    finally:
+        app.state.zilliz_client = None
+
+
+def test_recall_sweep_against_exact_truth():
+    assert parse_grid(["ef=16,32", "nprobe=4"]) == [{"ef": 16, "nprobe": 4}, {"ef": 32, "nprobe": 4}]
+    assert parse_grid([]) == [{}]
+    with pytest.raises(ValueError):
+        parse_grid(["ef"])
+
+    store = LocalMilvusClient(dim=3)
+    store.insert(
+        collection_name="books",
+        data=[{"id": i, "embedding": [1.0, (i % 7) / 7, (i % 5) / 5]} for i in range(1, 60)],
+    )
+    seeds = sample_seeds(store, "books", 8)
+    truth = ground_truth(store, "books", seeds, k=5)
+    assert all(len(v) == 5 and seed_id not in v for (seed_id, _), v in zip(seeds, truth.values()))
+    rows = sweep(store, "books", seeds, truth, [{}, {"ef": 16}], k=5)
+    assert [r["recall"] for r in rows] == [1.0, 1.0]
+    assert cheapest_meeting(rows, 0.99) in rows
+    assert cheapest_meeting([{"params": {}, "recall": 0.5, "p50_ms": 1, "p99_ms": 1}], 0.9) is None
@@ -0,0 +1,372 @@
+"""POST /recommend and /recommend/mood served from the in-process LocalMilvusClient (no MilvusClient mocks)."""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.routes import recommendations
+from app.services import mood_centroids, open_library_service, subject_families, subject_tags
+from app.utils.local_vector_store import LocalMilvusClient
+from main import app
+
+DIM = 4
+
+
+def _book(i, vec, **extra):
+    row = {
+        "id": i,
+        "work_key": f"/works/OL{i}W",
+        "title": f"Book {i}",
+        "author_name": "Author",
+        "subjects": "Fantasy, Magic",
+        "description": "",
+        "avg_rating": 0.0,
+        "has_rating": False,
+        "rating_count": 0,
+        "want_to_read_count": 0,
+        "currently_reading_count": 0,
+        "already_read_count": 0,
+        "total_shelf_count": 0,
+        "cover_id": 0,
+        "embedding": vec,
+    }
+    row.update(extra)
+    return row
+
+
+@pytest.fixture
+def local_client(monkeypatch):
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setattr(recommendations, "_mood_responses", recommendations.OrderedDict())
+    monkeypatch.setattr(mood_centroids, "_centroids", {})
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    monkeypatch.setattr(subject_families, "_available", None)
+    monkeypatch.setattr(recommendations, "_descriptions", recommendations.OrderedDict())
+    monkeypatch.setattr(open_library_service, "_works", open_library_service.OrderedDict())
+    store = LocalMilvusClient(dim=DIM)
+    store.insert(
+        collection_name="books",
+        data=[
+            _book(1, [1.0, 0.0, 0.0, 0.0], description="A long description."),
+            _book(2, [0.9, 0.1, 0.0, 0.0], subjects="epic fantasy, war", total_shelf_count=20_000),
+            _book(3, [0.7, 0.3, 0.0, 0.0], subjects="Humor, Satire"),
+            _book(4, [0.0, 0.0, 1.0, 0.0], subjects="Romance"),
+        ],
+    )
+    app.state.zilliz_client = store
+    yield store
+    app.state.zilliz_client = None
+
+
+@pytest.fixture
+def http():
+    return TestClient(app)
+
+
+def test_recommend_tier1_uses_stored_embedding(local_client, http):
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W", "subjects": ["Fantasy"]})
+    assert resp.status_code == 200
+    body = resp.json()
+    keys = [r["work_key"] for r in body["recommendations"]]
+    assert "/works/OL1W" not in keys
+    assert keys[:2] == ["/works/OL2W", "/works/OL3W"]
+    assert body["fallback_used"] is False
+    assert all(r["explanation"] for r in body["recommendations"])
+
+
+def test_recommend_tier3_subject_filter_without_embedding_api(local_client, http, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_API_TOKEN", raising=False)
+    resp = http.post(
+        "/recommend",
+        json={"work_key": "/works/OL999W", "title": "New", "subjects": ["Romance"]},
+    )
+    body = resp.json()
+    assert body["fallback_used"] is True
+    assert body["embedding_unavailable"] is True
+    assert [r["work_key"] for r in body["recommendations"]] == ["/works/OL4W"]
+
+
+def test_mood_sorts_by_popularity(local_client, http):
+    resp = http.post("/recommend/mood", json={"mood": "epic"})
+    assert resp.status_code == 200
+    recs = resp.json()["recommendations"]
+    assert recs[0]["work_key"] == "/works/OL2W"
+
+
+def test_mood_limit_is_bounded_and_response_cache_capped(local_client, http, monkeypatch):
+    assert http.post("/recommend/mood", json={"mood": "epic", "limit": 100000}).status_code == 422
+    monkeypatch.setattr(recommendations, "MOOD_RESPONSE_CACHE_SIZE", 2)
+    for limit in (1, 2, 3):
+        assert http.post("/recommend/mood", json={"mood": "epic", "limit": limit}).status_code == 200
+    assert len(recommendations._mood_responses) == 2
+    # Expired entries are dropped when read
+    key = next(iter(recommendations._mood_responses))
+    recommendations._mood_responses[key] = (0.0, {})
+    assert recommendations._cached_mood_response(key) is None
+    assert key not in recommendations._mood_responses
+
+
+def test_mood_spellings_share_the_warmed_cache_entry(local_client, http, monkeypatch):
+    monkeypatch.setenv("WARMUP_MOODS", "Epic")
+    monkeypatch.setattr(recommendations, "get_shared_cache", lambda: None)
+    asyncio.run(recommendations._warm_moods(local_client))
+    assert len(recommendations._mood_responses) == 1
+    for mood in ("EPIC", " epic", "Epic"):
+        resp = http.post("/recommend/mood", json={"mood": mood})
+        assert resp.headers["X-Recommend-Tier"] == "cache" and resp.json()["mood"] == "epic"
+    assert len(recommendations._mood_responses) == 1
+
+
+def test_metrics_exposes_tier_and_dependency_series(local_client, http):
+    from app.utils.metrics import InstrumentedVectorClient
+
+    app.state.zilliz_client = InstrumentedVectorClient(local_client, dependency="local_vector_store")
+    http.post("/recommend", json={"work_key": "/works/OL1W"})
+    text = http.get("/metrics").text
+    assert 'http_request_duration_seconds_count{route="/recommend",tier="1"}' in text
+    assert 'dependency_call_duration_seconds_count{dependency="local_vector_store",operation="search"}' in text
+    assert "background_write_queue_depth" in text
+
+
+def test_server_timing_header_lists_stages(local_client, http):
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W"})
+    header = resp.headers["Server-Timing"]
+    for name in ("tier1_query", "search", "explain", "total"):
+        assert f"{name};dur=" in header
+
+
+def test_repeat_request_served_from_shared_cache(local_client, http, tmp_path, monkeypatch):
+    from app.routes import recommendations
+    from app.utils.shared_cache import SharedCache
+
+    shared = SharedCache(str(tmp_path / "cache"), n_slots=64, slot_bytes=64 * 1024)
+    monkeypatch.setattr(recommendations, "get_shared_cache", lambda: shared)
+    first = http.post("/recommend", json={"work_key": "/works/OL1W"}).json()
+    calls = []
+    monkeypatch.setattr(local_client, "search", lambda **kw: calls.append(kw) or [[]])
+    second = http.post("/recommend", json={"work_key": "/works/OL1W"}).json()
+    assert second == first
+    assert calls == []
+    shared.close()
+
+
+def test_cursor_pages_through_results_without_repeats(local_client, http):
+    seen = []
+    body = {"work_key": "/works/OL1W", "limit": 1}
+    for _ in range(5):
+        page = http.post("/recommend", json=body).json()
+        seen.extend(r["work_key"] for r in page["recommendations"])
+        if not page["next_cursor"]:
+            break
+        body = {"work_key": "/works/OL1W", "limit": 1, "cursor": page["next_cursor"]}
+    assert seen == ["/works/OL2W", "/works/OL3W", "/works/OL4W"]
+
+
+def test_cursor_pages_through_tied_distances(http, monkeypatch):
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    store = LocalMilvusClient(dim=DIM)
+    store.insert(
+        collection_name="books",
+        data=[_book(1, [1.0, 0.0, 0.0, 0.0])] + [_book(i, [0.0, 1.0, 0.0, 0.0]) for i in range(2, 8)],
+    )
+    app.state.zilliz_client = store
+    try:
+        first = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 4}).json()
+        second = http.post(
+            "/recommend", json={"work_key": "/works/OL1W", "limit": 4, "cursor": first["next_cursor"]}
+        ).json()
+    finally:
+        app.state.zilliz_client = None
+    keys = [r["work_key"] for r in first["recommendations"] + second["recommendations"]]
+    assert len(keys) == len(set(keys)) == 6
+    assert second["next_cursor"] is None
+
+
+def test_later_page_without_a_query_vector_is_503_not_a_replay(local_client, http, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_API_TOKEN", "test-token")
+    # No write-back, so the seed stays a Tier 2 seed for page 2
+    monkeypatch.setattr(recommendations, "_store_new_book", lambda *a: recommendations.BACKGROUND_WRITE_QUEUE.dec())
+
+    async def embed(text, timeout_s=None):
+        return [1.0, 0.0, 0.0, 0.0]
+
+    monkeypatch.setattr(recommendations, "embed_text", embed)
+    seed = {"work_key": "/works/OL999W", "title": "New", "subjects": ["Fantasy"], "limit": 1}
+    first = http.post("/recommend", json=seed).json()
+    assert first["next_cursor"]
+
+    async def unavailable(text, timeout_s=None):
+        return None
+
+    monkeypatch.setattr(recommendations, "embed_text", unavailable)
+    resp = http.post("/recommend", json={**seed, "cursor": first["next_cursor"]})
+    assert resp.status_code == 503
+
+
+def test_invalid_cursor_rejected(local_client, http):
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W", "cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+def test_diversity_rerank_returns_spread_results(local_client, http):
+    plain = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2}).json()
+    diverse = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2, "diversity": 0.9}).json()
+    assert [r["work_key"] for r in plain["recommendations"]] == ["/works/OL2W", "/works/OL3W"]
+    assert [r["work_key"] for r in diverse["recommendations"]][1] == "/works/OL4W"
+    assert diverse["next_cursor"] is None
+    assert all("embedding" not in r for r in diverse["recommendations"])
+
+
+def test_constraints_applied_in_search(local_client, http):
+    resp = http.post(
+        "/recommend",
+        json={"work_key": "/works/OL1W", "min_shelf_count": 1000, "exclude_authors": ["Nobody"]},
+    ).json()
+    assert [r["work_key"] for r in resp["recommendations"]] == ["/works/OL2W"]
+
+
+def test_constraints_applied_in_tier3(local_client, http, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_API_TOKEN", raising=False)
+    resp = http.post(
+        "/recommend",
+        json={"work_key": "/works/OL999W", "title": "New", "subjects": ["Fantasy"], "exclude_authors": ["Author"]},
+    ).json()
+    assert resp["recommendations"] == []
+
+
+def test_mood_uses_centroid_search_and_caches(local_client, http, monkeypatch):
+    mood_centroids.set_centroids({"epic": [0.0, 0.0, 1.0, 0.0]}, recommendations.MOOD_SUBJECT_MAP)
+    calls = {"search": 0, "query": 0}
+    for name in calls:
+        original = getattr(local_client, name)
+
+        def counted(*args, _name=name, _original=original, **kwargs):
+            calls[_name] += 1
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(local_client, name, counted)
+
+    body = {"mood": "epic", "limit": 2, "popularity_weight": 0}
+    first = http.post("/recommend/mood", json=body).json()
+    assert [r["work_key"] for r in first["recommendations"]][0] == "/works/OL4W"
+    assert len(first["recommendations"]) == 2
+    assert http.post("/recommend/mood", json=body).json() == first
+    assert calls == {"search": 1, "query": 0}
+
+
+def test_mood_centroid_popularity_blend(local_client, http):
+    mood_centroids.set_centroids({"epic": [0.0, 0.0, 1.0, 0.0]}, recommendations.MOOD_SUBJECT_MAP)
+    resp = http.post("/recommend/mood", json={"mood": "epic", "limit": 1, "popularity_weight": 1.0}).json()
+    assert [r["work_key"] for r in resp["recommendations"]] == ["/works/OL2W"]
+
+
+def test_fields_projection_skips_unrequested_fields(local_client, http, monkeypatch):
+    fetched = []
+    original = local_client.search
+
+    def spy(*args, **kwargs):
+        fetched.append(kwargs["output_fields"])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(local_client, "search", spy)
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W", "fields": ["title", "cover_id"]}).json()
+    assert "description" not in fetched[0]
+    assert resp["recommendations"]
+    assert all(set(r) == {"work_key", "title", "cover_id", "explanation"} for r in resp["recommendations"])
+
+    mood = http.post("/recommend/mood", json={"mood": "epic", "fields": ["title"]}).json()
+    assert all(set(r) == {"work_key", "title", "explanation"} for r in mood["recommendations"])
+
+
+def test_unknown_field_rejected(local_client, http):
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W", "fields": ["embedding"]})
+    assert resp.status_code == 422
+
+
+def test_description_endpoint_cached(local_client, http, monkeypatch):
+    calls = []
+    original = local_client.query
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(local_client, "query", spy)
+    for path in ("/books/OL1W/description", "/books/works/OL1W/description"):
+        resp = http.get(path)
+        assert resp.status_code == 200
+        assert resp.json() == {"work_key": "/works/OL1W", "description": "A long description."}
+        assert resp.headers["cache-control"].startswith("public, max-age=")
+    assert len(calls) == 1
+    assert http.get("/books/OL404W/description").status_code == 404
+    assert http.get("/books/not-a-key/description").status_code == 400
+
+
+def test_deadline_cuts_slow_search_and_flags_degraded(local_client, http, monkeypatch):
+    def slow_search(timeout=None, **kwargs):
+        time.sleep(timeout)
+        raise TimeoutError("search timed out")
+
+    monkeypatch.setattr(local_client, "search", slow_search)
+    start = time.perf_counter()
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W"}, headers={"X-Request-Deadline-Ms": "100"})
+    assert time.perf_counter() - start < 1.0
+    body = resp.json()
+    assert resp.status_code == 200
+    assert body["degraded"] is True
+    assert body["recommendations"] == []
+
+
+def test_deadline_skips_embedding_without_budget(local_client, http, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_API_TOKEN", "test-token")
+    monkeypatch.setattr(recommendations, "expected_latency_s", lambda: 5.0)
+
+    async def never(*args, **kwargs):
+        raise AssertionError("embedding should have been skipped")
+
+    monkeypatch.setattr(recommendations, "embed_text", never)
+    resp = http.post(
+        "/recommend",
+        json={"work_key": "/works/OL999W", "title": "New", "subjects": ["Romance"]},
+        headers={"X-Request-Deadline-Ms": "500"},
+    ).json()
+    assert resp["degraded"] is True
+    assert [r["work_key"] for r in resp["recommendations"]] == ["/works/OL4W"]
+
+
+def test_work_key_only_seed_enriched_from_open_library(local_client, http, monkeypatch):
+    calls = []
+
+    async def fetch(work_id, timeout_s=None):
+        calls.append(work_id)
+        return {"title": "Unlisted Romance", "author_name": "New Author", "subjects": ["Romance", "Love stories"]}
+
+    monkeypatch.setattr(open_library_service, "fetch_work_async", fetch)
+    monkeypatch.setenv("EMBEDDING_API_TOKEN", "test-token")
+
+    async def embed(text, timeout_s=None):
+        assert text == "Unlisted Romance | New Author | Romance, Love stories"
+        return [0.0, 0.0, 1.0, 0.0]
+
+    monkeypatch.setattr(recommendations, "embed_text", embed)
+    body = http.post("/recommend", json={"work_key": "/works/OL999W"}).json()
+    assert body["recommendations"][0]["work_key"] == "/works/OL4W"
+    assert "hint" not in body
+    # The write-back stored the enriched metadata
+    stored = local_client.query(collection_name="books", filter='work_key == "/works/OL999W"', output_fields=["title", "subjects"])
+    assert stored[0]["title"] == "Unlisted Romance"
+
+    # Embedding down: Tier 3 runs on the enriched subjects; the repeat is served from the work cache
+    async def unavailable(text, timeout_s=None):
+        return None
+
+    monkeypatch.setattr(recommendations, "embed_text", unavailable)
+    for _ in range(2):
+        body = http.post("/recommend", json={"work_key": "/works/OL998W"}).json()
+        assert "/works/OL4W" in [r["work_key"] for r in body["recommendations"]]
+    assert calls == ["OL999W", "OL998W"]
+
+    monkeypatch.setenv("SEED_ENRICHMENT", "0")
+    assert "hint" in http.post("/recommend", json={"work_key": "/works/OL997W"}).json()
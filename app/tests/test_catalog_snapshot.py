@@ -0,0 +1,89 @@
+"""Catalog snapshots: columnar export, memory-mapped loading, id-watermark increments and re-import."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.jobs.catalog_snapshot import (  # noqa: E402
+    export_snapshot,
+    import_snapshot,
+    iter_chunks,
+    load_table,
+    read_manifest,
+    snapshot_partitions,
+    vector_matrix,
+)
+from app.utils.local_vector_store import LocalMilvusClient  # noqa: E402
+
+
+def _book(i, **extra):
+    return {
+        "id": i,
+        "work_key": f"/works/OL{i}W",
+        "title": f"Book {i}",
+        "subject_tags": ["fantasy", f"tag{i % 3}"],
+        "avg_rating": i / 2.0,
+        "has_rating": i % 2 == 0,
+        "embedding": [float(i), 1.0, -1.0],
+        **extra,
+    }
+
+
+@pytest.fixture
+def source():
+    client = LocalMilvusClient(dim=3)
+    client.create_partition(collection_name="books", partition_name="fantasy__rated")
+    client.insert(collection_name="books", data=[_book(i) for i in range(1, 6)])
+    client.insert(collection_name="books", data=[_book(i) for i in range(6, 9)], partition_name="fantasy__rated")
+    return client
+
+
+def test_export_chunks_by_partition_and_reimports(source, tmp_path):
+    snap = str(tmp_path / "snap")
+    entry = export_snapshot(source, "books", snap, chunk_rows=2, batch_size=3)
+    assert entry["rows"] == 8 and entry["watermark"] == 8
+
+    manifest = read_manifest(snap)
+    assert [c["rows"] for c in manifest["chunks"]] == [2, 2, 1, 2, 1]
+    assert snapshot_partitions(manifest) == ["fantasy__rated"]
+    assert manifest["dim"] == 3
+
+    target = LocalMilvusClient(str(tmp_path / "store"), dim=3)
+    target.create_partition(collection_name="books", partition_name="fantasy__rated")
+    assert import_snapshot(target, snap, "books", batch_size=4) == 8
+    rows = target.query(collection_name="books", filter="", output_fields=["*"], partition_names=["fantasy__rated"])
+    assert [r["id"] for r in rows] == [6, 7, 8]
+    assert rows[0]["subject_tags"] == ["fantasy", "tag0"] and rows[0]["has_rating"] is True
+    assert rows[0]["embedding"] == pytest.approx([6.0, 1.0, -1.0])
+
+
+def test_arrow_chunks_map_vectors_without_copying(source, tmp_path):
+    snap = str(tmp_path / "snap")
+    export_snapshot(source, "books", snap, chunk_rows=100)
+
+    for _, table in iter_chunks(snap, partitions=["fantasy__rated"]):
+        vectors = vector_matrix(table)
+        assert vectors.shape == (3, 3) and vectors.dtype == np.float32
+        assert not vectors.flags.owndata and not vectors.flags.writeable
+        np.testing.assert_array_equal(vectors[:, 0], [6.0, 7.0, 8.0])
+
+    table = load_table(snap, columns=["id", "embedding"])
+    assert table.column("id").to_pylist() == list(range(1, 9))
+    assert vector_matrix(table).shape == (8, 3)
+
+
+def test_incremental_export_fetches_rows_past_the_watermark(source, tmp_path):
+    snap = str(tmp_path / "snap")
+    export_snapshot(source, "books", snap, fmt="parquet")
+    with pytest.raises(ValueError):
+        export_snapshot(source, "books", snap)
+
+    source.insert(collection_name="books", data=[_book(9), _book(10)])
+    entry = export_snapshot(source, "books", snap, incremental=True)
+    assert entry["since"] == 8 and entry["rows"] == 2 and entry["watermark"] == 10
+
+    manifest = read_manifest(snap)
+    assert manifest["rows"] == 10 and manifest["chunks"][-1]["file"].endswith(".parquet")
+    assert export_snapshot(source, "books", snap, incremental=True)["rows"] == 0
+    assert sorted(load_table(snap, columns=["id"]).column("id").to_pylist()) == list(range(1, 11))
@@ -0,0 +1,136 @@
+"""Co-read index: blocked build from reading history, exact incremental updates, and the /recommend blend."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("scipy")
+
+from app.routes import recommendations  # noqa: E402
+from app.services import co_read_index, subject_families, subject_tags  # noqa: E402
+from app.services.co_read_index import CoReadIndex, apply_reads, build_co_read_index, read_meta  # noqa: E402
+from app.utils.local_vector_store import LocalMilvusClient  # noqa: E402
+from main import app  # noqa: E402
+
+# Three readers of book 1 also read book 4; book 2 shares one reader with it; 5 and 6 go together
+HISTORY = [
+    ("ann", "/works/OL1W"), ("ann", "/works/OL4W"), ("ann", "/works/OL2W"),
+    ("ben", "OL1W"), ("ben", "OL4W"),
+    ("cat", "/works/OL1W"), ("cat", "/works/OL4W"), ("cat", "/works/OL1W"),
+    ("dan", "/works/OL5W"), ("dan", "/works/OL6W"),
+    ("eve", "/works/OL5W"), ("eve", "/works/OL6W"), ("eve", "not-a-work"),
+]
+
+
+def _lists(index: CoReadIndex, numbers) -> dict:
+    return {n: [(o, round(s, 6)) for o, s in index.neighbours_of(n) or []] for n in numbers}
+
+
+def test_build_scores_co_reads_by_cosine(tmp_path):
+    path = str(tmp_path / "co")
+    assert build_co_read_index(HISTORY, path, k=3, block_size=2) == 4
+    index = CoReadIndex(path)
+    # 3 shared readers of 3 each; book 2's single shared reader is below min_co_reads
+    assert index.neighbours("/works/OL1W") == [(4, pytest.approx(1.0))]
+    assert index.neighbours("OL5W") == [(6, pytest.approx(1.0))]
+    assert index.neighbours("/works/OL2W") is None
+    assert read_meta(path)["reads"] == 11
+
+    build_co_read_index(HISTORY, path, k=3, min_co_reads=1)
+    assert [n for n, _ in CoReadIndex(path).neighbours("/works/OL4W")] == [1, 2]
+    assert CoReadIndex(path + ".previous").neighbours("/works/OL4W") == [(1, pytest.approx(1.0))]
+
+
+def test_incremental_reads_match_a_full_rebuild(tmp_path):
+    more = [("ben", "/works/OL2W"), ("fay", "/works/OL4W"), ("fay", "/works/OL7W"), ("gus", "/works/OL7W"),
+            ("gus", "/works/OL4W"), ("dan", "/works/OL1W")]
+    path = str(tmp_path / "co")
+    build_co_read_index(HISTORY, path, k=2, block_size=3)
+    serving = CoReadIndex(path)
+
+    assert apply_reads(path, more, block_size=2) > 0
+    assert apply_reads(path, more[:3]) == 0
+    build_co_read_index(HISTORY + more, str(tmp_path / "full"), k=2)
+    everything = range(1, 8)
+    serving.refresh()
+    assert _lists(serving, everything) == _lists(CoReadIndex(str(tmp_path / "full")), everything)
+    assert [n for n, _ in serving.neighbours("/works/OL7W")] == [4]
+    assert read_meta(path)["users"] == 7
+
+
+def test_serving_index_follows_a_rebuild(tmp_path):
+    path = str(tmp_path / "co")
+    build_co_read_index(HISTORY, path, k=3)
+    serving = CoReadIndex(path)
+    apply_reads(path, [("fay", "/works/OL1W"), ("fay", "/works/OL9W"), ("gus", "/works/OL1W"), ("gus", "/works/OL9W")])
+    serving.refresh()
+    built_id = serving.build_id
+
+    # The rebuild's journal is shorter than the old one: the worker must not seek into it at the old offset
+    build_co_read_index(HISTORY[:5], path, k=3, min_co_reads=1)
+    apply_reads(path, [("hal", "/works/OL2W"), ("hal", "/works/OL4W")])
+    with open(f"{path}/journal.jsonl", "ab") as f:
+        f.write(b'{"lists": {"3": [["x"]]}}\n')
+    serving.refresh()
+    assert serving.build_id != built_id
+    assert _lists(serving, range(1, 10)) == _lists(CoReadIndex(path), range(1, 10))
+    assert serving.neighbours("/works/OL9W") is None
+    assert [n for n, _ in serving.neighbours("/works/OL2W")] == [4, 1]
+
+
+def _book(i, vec):
+    return {"id": i, "work_key": f"/works/OL{i}W", "title": f"Book {i}", "subjects": "Fantasy", "embedding": vec}
+
+
+def test_recommend_blends_co_reads_with_vector_results(tmp_path, monkeypatch):
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[_book(1, [1.0, 0.0]), _book(2, [0.95, 0.05]), _book(3, [0.9, 0.1]), _book(4, [0.1, 0.9])],
+    )
+    path = str(tmp_path / "co")
+    build_co_read_index(HISTORY, path)
+    monkeypatch.setenv("CO_READ_INDEX_PATH", path)
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setattr(co_read_index, "_index", None)
+    monkeypatch.setattr(co_read_index, "_index_failed", False)
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    monkeypatch.setattr(subject_families, "_available", None)
+    # The vector search only returns the seed and the two nearest books, so book 4 has to be fetched by work_key
+    monkeypatch.setattr(recommendations, "RERANK_CANDIDATES", 2)
+    monkeypatch.setattr(recommendations, "overfetch_limit", lambda limit: limit + 1)
+    app.state.zilliz_client = store
+    http = TestClient(app)
+    try:
+        plain = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2}).json()
+        blended = http.post(
+            "/recommend", json={"work_key": "/works/OL1W", "limit": 2, "co_read_weight": 0.6, "fields": ["title"]}
+        ).json()
+    finally:
+        app.state.zilliz_client = None
+    assert [r["work_key"] for r in plain["recommendations"]] == ["/works/OL2W", "/works/OL3W"]
+    top = blended["recommendations"][0]
+    assert top["work_key"] == "/works/OL4W" and top["title"] == "Book 4" and "embedding" not in top
+    assert top["explanation"].startswith("Readers of your book often read this one too.")
+    assert blended["recommendations"][1]["work_key"] == "/works/OL2W"
+
+
+def test_co_read_weight_is_ignored_without_an_index(monkeypatch):
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[_book(1, [1.0, 0.0]), _book(2, [0.95, 0.05]), _book(3, [0.9, 0.1]), _book(4, [0.1, 0.9])],
+    )
+    monkeypatch.delenv("CO_READ_INDEX_PATH", raising=False)
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    monkeypatch.setattr(subject_families, "_available", None)
+    app.state.zilliz_client = store
+    http = TestClient(app)
+    try:
+        plain = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2}).json()
+        weighted = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2, "co_read_weight": 0.6}).json()
+    finally:
+        app.state.zilliz_client = None
+    assert plain["next_cursor"]
+    assert weighted["recommendations"] == plain["recommendations"]
+    assert weighted["next_cursor"] == plain["next_cursor"]
@@ -0,0 +1,55 @@
+"""Request deadline parsing and budgeted vector-store calls."""
+
+import time
+
+import pytest
+
+from app.utils.deadline import (
+    DEADLINE_HEADER,
+    DeadlineExceeded,
+    begin_deadline,
+    budget_ms_from_headers,
+    call_with_deadline,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_deadline_leak():
+    yield
+    begin_deadline(None)
+
+
+def test_budget_from_header_or_default(monkeypatch):
+    monkeypatch.delenv("RECOMMEND_DEADLINE_MS", raising=False)
+    assert budget_ms_from_headers({}) is None
+    assert budget_ms_from_headers({DEADLINE_HEADER: "250"}) == 250.0
+    assert budget_ms_from_headers({DEADLINE_HEADER: "1"}) == 50.0
+    assert budget_ms_from_headers({DEADLINE_HEADER: "soon"}) is None
+    monkeypatch.setenv("RECOMMEND_DEADLINE_MS", "800")
+    assert budget_ms_from_headers({}) == 800.0
+
+
+def test_call_with_deadline_passes_remaining_budget_as_timeout():
+    seen = {}
+
+    def query(**kwargs):
+        seen.update(kwargs)
+        return ["row"]
+
+    begin_deadline(None)
+    assert call_with_deadline(query, limit=1) == ["row"] and "timeout" not in seen
+    begin_deadline(500)
+    assert call_with_deadline(query, limit=1) == ["row"]
+    assert 0 < seen["timeout"] <= 0.5
+
+
+def test_client_timeout_after_expiry_becomes_deadline_exceeded():
+    def slow_query(timeout, **kwargs):
+        time.sleep(timeout)
+        raise TimeoutError("deadline exceeded")
+
+    begin_deadline(50)
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(slow_query, limit=1)
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(slow_query, limit=1)  # already spent: not even attempted
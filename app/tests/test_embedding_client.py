@@ -0,0 +1,133 @@
+"""Embedding client safeguards: circuit breaker, hedged requests, warm-up probe (HF stubbed with httpx.MockTransport)."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services import embedding_client
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def hf(monkeypatch):
+    """Route embedding calls to `handler` (set by the test); fresh breaker and latency window."""
+    monkeypatch.setenv("EMBEDDING_API_TOKEN", "test-token")
+    monkeypatch.setattr(embedding_client, "EMBEDDING_BREAKER", CircuitBreaker("embedding_test", failure_threshold=2))
+    monkeypatch.setattr(embedding_client, "_latencies", embedding_client.deque(maxlen=10))
+    state = {"handler": None, "calls": 0}
+
+    async def dispatch(request):
+        state["calls"] += 1
+        return await state["handler"](request, state["calls"])
+
+    monkeypatch.setattr(
+        embedding_client,
+        "_http_client",
+        lambda timeout_s: httpx.AsyncClient(transport=httpx.MockTransport(dispatch), timeout=timeout_s),
+    )
+    return state
+
+
+def test_breaker_opens_half_opens_and_closes():
+    now = [0.0]
+    breaker = CircuitBreaker("unit", failure_threshold=2, cooldown_s=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    now[0] = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial in flight
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.as_dict() == {"state": "closed", "consecutive_failures": 0}
+
+
+def test_breaker_skips_api_after_consecutive_failures(hf):
+    async def overloaded(request, n):
+        return httpx.Response(503, json={"error": "Model is currently loading"})
+
+    hf["handler"] = overloaded
+    for _ in range(2):
+        assert asyncio.run(embedding_client.embed_text("dune")) is None
+    calls = hf["calls"]
+    assert asyncio.run(embedding_client.embed_text("dune")) is None
+    assert hf["calls"] == calls
+    assert embedding_client.EMBEDDING_BREAKER.state == OPEN
+
+
+def test_cancelled_half_open_trial_is_released(hf, monkeypatch):
+    now = [0.0]
+    breaker = CircuitBreaker("embedding_test", failure_threshold=1, cooldown_s=10, clock=lambda: now[0])
+    monkeypatch.setattr(embedding_client, "EMBEDDING_BREAKER", breaker)
+    monkeypatch.setattr(embedding_client, "_hedging_enabled", lambda: False)
+    breaker.record_failure()
+    now[0] = 10.0
+
+    async def hang(request, n):
+        await asyncio.sleep(10)
+
+    async def cancel_mid_call():
+        hf["handler"] = hang
+        task = asyncio.create_task(embedding_client.embed_text("dune"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_mid_call())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()  # the trial slot was freed
+
+
+def test_hedge_wins_when_first_request_is_slow(hf, monkeypatch):
+    monkeypatch.setattr(embedding_client, "HEDGE_DEFAULT_DELAY_S", 0.05)
+
+    async def first_slow(request, n):
+        if n == 1:
+            await asyncio.sleep(2)
+        return httpx.Response(200, json=[[0.6, 0.8]])
+
+    hf["handler"] = first_slow
+    won = embedding_client.HEDGED_REQUESTS.value(outcome="won")
+    start = time.perf_counter()
+    assert asyncio.run(embedding_client.embed_text("dune")) == [0.6, 0.8]
+    assert time.perf_counter() - start < 1.0
+    assert hf["calls"] == 2
+    assert embedding_client.HEDGED_REQUESTS.value(outcome="won") == won + 1
+
+
+def test_warm_model_success_closes_breaker(hf):
+    async def ok(request, n):
+        assert request.headers["x-wait-for-model"] == "true"
+        return httpx.Response(200, json=[[1.0]])
+
+    hf["handler"] = ok
+    breaker = embedding_client.EMBEDDING_BREAKER
+    breaker.record_failure()
+    breaker.record_failure()
+    assert asyncio.run(embedding_client.warm_model()) is True
+    assert breaker.state == CLOSED
+
+
+def test_warm_model_failures_count_one_dependency_error_each(hf):
+    from app.utils.metrics import DEPENDENCY_ERRORS
+
+    async def down(request, n):
+        if n == 1:
+            raise httpx.ConnectError("refused")
+        if n == 2:
+            return httpx.Response(503, json={"error": "loading"})
+        return httpx.Response(200, content=b"not json")
+
+    hf["handler"] = down
+    errors = DEPENDENCY_ERRORS.value(dependency="embedding_api", operation="warmup")
+    for _ in range(3):
+        assert asyncio.run(embedding_client.warm_model()) is False
+    assert DEPENDENCY_ERRORS.value(dependency="embedding_api", operation="warmup") == errors + 3
@@ -0,0 +1,121 @@
+"""Hot-key sketch (Space-Saving), its snapshots, and prefetching the hottest responses into the caches."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.routes import recommendations
+from app.services import hot_keys, mood_centroids, subject_families, subject_tags
+from app.services.hot_keys import SpaceSaving
+from app.utils.local_vector_store import LocalMilvusClient
+from app.utils.shared_cache import SharedCache
+from main import app
+
+
+def test_space_saving_keeps_heavy_hitters():
+    sketch = SpaceSaving(capacity=8)
+    for i in range(400):
+        sketch.offer("hot-a")
+        if i % 2 == 0:
+            sketch.offer("hot-b")
+        sketch.offer(f"cold-{i}")
+    top = sketch.top(2)
+    assert [k for k, _, _ in top] == ["hot-a", "hot-b"]
+    true_counts = {"hot-a": 400, "hot-b": 200}
+    for key, count, error in top:
+        assert count - error <= true_counts[key] <= count
+    assert len(sketch) == 8
+
+    restored = SpaceSaving(capacity=8)
+    restored.merge_dict(sketch.to_dict())
+    assert restored.top(2) == top
+    sketch.decay(0.5)
+    assert sketch.top(1)[0][1] == pytest.approx(top[0][1] / 2)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "{not json",
+        "[1, 2]",
+        '{"version": 99, "items": []}',
+        '{"version": 1, "items": [["a", 3.0, 0.0], ["b", "many", 0.0]]}',
+        '{"version": 1, "items": [["a", 3.0]]}',
+        '{"version": 1, "items": 7}',
+    ],
+)
+def test_unreadable_snapshot_loads_nothing(content, tmp_path, monkeypatch):
+    path = tmp_path / "hot.json"
+    path.write_text(content, encoding="utf-8")
+    monkeypatch.setattr(hot_keys, "_tracker", None)
+    assert hot_keys.load_snapshot(str(path)) == 0
+    assert len(hot_keys.get_tracker()) == 0
+
+
+@pytest.fixture
+def hot(monkeypatch, tmp_path):
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setenv("HOT_KEYS_PATH", str(tmp_path / "hot.json"))
+    monkeypatch.setattr(hot_keys, "_tracker", None)
+    monkeypatch.setattr(recommendations, "_prefetched", {})
+    monkeypatch.setattr(recommendations, "_mood_responses", recommendations.OrderedDict())
+    monkeypatch.setattr(mood_centroids, "_centroids", {})
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    monkeypatch.setattr(subject_families, "_available", None)
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[
+            {"id": i, "work_key": f"/works/OL{i}W", "subjects": "romance", "embedding": [1.0, i / 10]}
+            for i in range(1, 6)
+        ],
+    )
+    app.state.zilliz_client = store
+    yield store
+    app.state.zilliz_client = None
+
+
+def test_routes_record_and_prefetch_fills_cache(hot, tmp_path, monkeypatch):
+    http = TestClient(app)
+    for _ in range(3):
+        http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2})
+    http.post("/recommend", json={"work_key": "/works/OL2W"})
+    http.post("/recommend/mood", json={"mood": "romantic", "limit": 3})
+    entries = hot_keys.top_entries(2)
+    assert entries[0][0] == "recommend" and entries[0][1]["work_key"] == "/works/OL1W" and entries[0][2] == 3
+    assert hot_keys.save_snapshot()
+
+    # A fresh process: empty caches, sketch restored from the snapshot, then warm-up prefetch
+    monkeypatch.setattr(hot_keys, "_tracker", None)
+    monkeypatch.setattr(recommendations, "_mood_responses", recommendations.OrderedDict())
+    shared = SharedCache(str(tmp_path / "cache"), n_slots=64, slot_bytes=64 * 1024)
+    monkeypatch.setattr(recommendations, "get_shared_cache", lambda: shared)
+    asyncio.run(recommendations._warm_hot_keys(hot))
+    assert len(recommendations._prefetched) == 3
+    assert recommendations._mood_responses
+
+    searches = []
+    monkeypatch.setattr(hot, "search", lambda **kw: searches.append(kw) or [[]])
+    resp = http.post("/recommend", json={"work_key": "/works/OL1W", "limit": 2})
+    assert resp.headers["X-Recommend-Tier"] == "cache"
+    assert [r["work_key"] for r in resp.json()["recommendations"]] == ["/works/OL2W", "/works/OL3W"]
+    assert searches == []
+    shared.close()
+
+
+def test_refresh_only_recomputes_due_entries(hot, monkeypatch):
+    hot_keys.record("mood", '{"fields": null, "limit": 2, "mood": "romantic", "popularity_weight": null}')
+    assert asyncio.run(recommendations.prefetch_hot_keys(hot, due_only=True)) == 1
+    assert asyncio.run(recommendations.prefetch_hot_keys(hot, due_only=True)) == 0
+    monkeypatch.setenv("HOT_KEYS_REFRESH_MARGIN_SEC", "100000")
+    assert asyncio.run(recommendations.prefetch_hot_keys(hot, due_only=True)) == 1
+
+
+def test_recommend_entries_are_not_prefetched_without_a_response_cache(hot, monkeypatch):
+    hot_keys.record("recommend", '{"fields": null, "limit": 2, "work_key": "/works/OL1W"}')
+    monkeypatch.setattr(recommendations, "get_shared_cache", lambda: None)
+    searches = []
+    monkeypatch.setattr(hot, "search", lambda **kw: searches.append(kw) or [[]])
+    assert asyncio.run(recommendations.prefetch_hot_keys(hot)) == 0
+    assert searches == [] and recommendations._prefetched == {}
@@ -0,0 +1,85 @@
+"""Load-test harness pieces: latency model, stand-ins, open-loop generator and report."""
+
+import asyncio
+import statistics
+
+import httpx
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.jobs.load_test import (
+    LatencyModel,
+    Result,
+    Scenarios,
+    embedding_stand_in,
+    open_library_stand_in,
+    parse_mix,
+    run_load,
+    summarize,
+    text_vector,
+)
+from app.utils.metrics import percentile
+
+
+def test_latency_model_fits_p50_and_p99():
+    model = LatencyModel(20, 200, seed=1)
+    samples = sorted(model.sample_s() * 1000 for _ in range(20_000))
+    assert 17 < statistics.median(samples) < 23
+    assert 160 < percentile(samples, 99) < 250
+    assert LatencyModel.parse("5").p99_ms == 5
+
+
+def test_embedding_stand_in_shape_and_errors():
+    http = TestClient(embedding_stand_in(LatencyModel(1, 1), dim=8))
+    body = http.post("/pipeline/feature-extraction/x", json={"inputs": "dune"}).json()
+    assert body == [text_vector("dune", 8)]
+    assert abs(sum(x * x for x in body[0]) - 1.0) < 1e-5
+    assert len(http.post("/any", json={"inputs": ["a", "b"]}).json()) == 2
+
+    failing = TestClient(embedding_stand_in(LatencyModel(1, 1, error_rate=1.0), dim=8))
+    assert failing.post("/x", json={"inputs": "dune"}).status_code == 503
+
+
+def test_open_library_stand_in_work():
+    http = TestClient(open_library_stand_in(LatencyModel(1, 1)))
+    work = http.get("/works/OL45804W.json").json()
+    assert work["key"] == "/works/OL45804W" and work["subjects"]
+    assert http.get(work["authors"][0]["author"]["key"] + ".json").json()["name"]
+
+
+def test_parse_mix_normalizes():
+    assert parse_mix("catalog=3,new=1,mood=0") == {"catalog": 0.75, "new": 0.25}
+
+
+def test_run_load_open_loop_and_summary():
+    app = FastAPI()
+
+    @app.post("/recommend")
+    async def recommend(response: Response):
+        response.headers["X-Recommend-Tier"] = "1"
+        return {"recommendations": []}
+
+    @app.post("/recommend/mood")
+    async def mood():
+        return Response(status_code=503)
+
+    async def drive():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            scenarios = Scenarios([{"work_key": "/works/OL1W", "subjects": ["Fantasy"]}])
+            return await run_load(client, scenarios, {"catalog": 0.5, "mood": 0.5}, rps=200, duration_s=0.25)
+
+    results = asyncio.run(drive())
+    assert 20 < len(results) < 90
+    report = summarize(results, 0.25)
+    assert report["scenarios"]["mood"]["error_rate"] == 1.0
+    assert report["scenarios"]["catalog"]["error_rate"] == 0.0
+    assert "catalog/1" in report["tiers"]
+    assert report["overall"]["requests"] == len(results)
+
+
+def test_summary_percentiles():
+    results = [Result("catalog", "1", 200, ms / 1000.0) for ms in range(1, 101)]
+    stats = summarize(results, 10.0)["overall"]
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+    assert stats["throughput_rps"] == 10.0
@@ -0,0 +1,162 @@
+"""LocalMilvusClient: filters, COSINE search, inserts and on-disk persistence."""
+
+import pytest
+
+from app.utils.local_vector_store import FilterSyntaxError, LocalMilvusClient
+from app.utils.milvus_search_hits import search_hit_distance
+
+
+def _book(i, work_key, vec, **extra):
+    row = {
+        "id": i,
+        "work_key": work_key,
+        "title": f"Book {i}",
+        "author_name": extra.pop("author_name", "A"),
+        "subjects": extra.pop("subjects", "Fantasy, Magic"),
+        "total_shelf_count": extra.pop("total_shelf_count", 0),
+        "has_rating": extra.pop("has_rating", False),
+        "embedding": vec,
+    }
+    row.update(extra)
+    return row
+
+
+@pytest.fixture
+def client():
+    c = LocalMilvusClient(dim=3)
+    c.insert(
+        collection_name="books",
+        data=[
+            _book(1, "/works/OL1W", [1.0, 0.0, 0.0], subjects="Fantasy, Dragons", total_shelf_count=50),
+            _book(2, "/works/OL2W", [0.9, 0.1, 0.0], subjects="Science fiction", total_shelf_count=5),
+            _book(3, "/works/OL3W", [0.0, 1.0, 0.0], subjects="100% True \"Quotes\"", has_rating=True),
+            _book(4, "/works/OL4W", [0.0, 0.0, 1.0], author_name="B"),
+        ],
+    )
+    return c
+
+
+def test_query_equality_returns_output_fields_and_pk(client):
+    rows = client.query(
+        collection_name="books",
+        filter='work_key == "/works/OL2W"',
+        output_fields=["embedding"],
+        limit=1,
+    )
+    assert len(rows) == 1
+    assert rows[0]["id"] == 2
+    assert rows[0]["embedding"] == pytest.approx([0.9, 0.1, 0.0])
+
+
+def test_query_in_like_and_boolean_ops(client):
+    rows = client.query(collection_name="books", filter='work_key in ["/works/OL1W", "/works/OL4W"]', output_fields=["title"])
+    assert [r["id"] for r in rows] == [1, 4]
+
+    rows = client.query(collection_name="books", filter='subjects like "%dragons%" or subjects like "%Dragons%"', output_fields=["work_key"])
+    assert [r["work_key"] for r in rows] == ["/works/OL1W"]
+
+    rows = client.query(collection_name="books", filter='author_name == "A" and not (total_shelf_count >= 10) and has_rating == false', output_fields=["work_key"])
+    assert [r["work_key"] for r in rows] == ["/works/OL2W"]
+
+
+def test_like_respects_route_escaping(client):
+    # Same escaping recommendations.py applies to subjects before building LIKE filters.
+    subject = '100% True "Quotes"'
+    subject_safe = subject.replace("\\", "\\\\").replace('"', '\\"').replace("%", "\\%")
+    rows = client.query(collection_name="books", filter=f'subjects like "%{subject_safe}%"', output_fields=["work_key"], limit=10)
+    assert [r["work_key"] for r in rows] == ["/works/OL3W"]
+
+
+def test_search_scores_cosine_similarity_like_milvus(client):
+    results = client.search(collection_name="books", data=[[1.0, 0.0, 0.0]], limit=3, output_fields=["work_key"])
+    hits = results[0]
+    assert [h["entity"]["work_key"] for h in hits] == ["/works/OL1W", "/works/OL2W", "/works/OL3W"]
+    # COSINE: `distance` is the similarity, higher = closer
+    assert hits[0]["distance"] == pytest.approx(1.0, abs=1e-6)
+    assert hits[0]["distance"] > hits[1]["distance"] > hits[2]["distance"]
+    assert search_hit_distance(hits[0]) == pytest.approx(0.0, abs=1e-6)
+
+
+def test_range_search_keeps_radius_below_score_up_to_range_filter(client):
+    scores = [h["distance"] for h in client.search(collection_name="books", data=[[1.0, 0.0, 0.0]], limit=3)[0]]
+    page = client.search(
+        collection_name="books",
+        data=[[1.0, 0.0, 0.0]],
+        limit=3,
+        output_fields=["work_key"],
+        search_params={"params": {"radius": -1.01, "range_filter": scores[1]}},
+    )[0]
+    assert [h["entity"]["work_key"] for h in page][:2] == ["/works/OL2W", "/works/OL3W"]
+    assert page[0]["distance"] == scores[1] and all(h["distance"] <= scores[1] for h in page)
+    with pytest.raises(ValueError):
+        client.search(
+            collection_name="books", data=[[1.0, 0.0, 0.0]], limit=3, search_params={"params": {"radius": 2.0, "range_filter": 0.5}}
+        )
+
+
+def test_search_applies_filter(client):
+    hits = client.search(collection_name="books", data=[[1.0, 0.0, 0.0]], limit=2, filter='work_key != "/works/OL1W"', output_fields=["work_key"])[0]
+    assert [h["entity"]["work_key"] for h in hits] == ["/works/OL2W", "/works/OL3W"]
+
+
+def test_unsupported_filter_raises(client):
+    with pytest.raises(FilterSyntaxError):
+        client.query(collection_name="books", filter="work_key ~ 3")
+
+
+def test_persistence_and_growth(tmp_path):
+    c = LocalMilvusClient(str(tmp_path), dim=2)
+    rows = [_book(i, f"/works/OL{i}W", [float(i), 1.0]) for i in range(1, 1500)]
+    c.insert(collection_name="books", data=rows)
+    c.flush("books")
+
+    reopened = LocalMilvusClient(str(tmp_path), dim=2)
+    assert reopened.num_entities("books") == len(rows)
+    found = reopened.query(collection_name="books", filter='work_key == "/works/OL1499W"', output_fields=["embedding"])
+    assert found[0]["embedding"] == pytest.approx([1499.0, 1.0])
+
+
+def test_missing_store_is_not_created_by_reads(tmp_path):
+    path = tmp_path / "typo"
+    with pytest.raises(FileNotFoundError):
+        LocalMilvusClient(str(path), dim=2, must_exist=True)
+    c = LocalMilvusClient(str(path), dim=2)
+    assert c.query(collection_name="books", filter="", output_fields=["title"]) == []
+    assert c.search(collection_name="books", data=[[1.0, 0.0]], limit=3) == [[]]
+    assert not path.exists()
+
+    c.insert(collection_name="books", data=[_book(1, "/works/OL1W", [1.0, 0.0])])
+    assert LocalMilvusClient(str(path), dim=2, must_exist=True).num_entities("books") == 1
+
+
+def test_array_contains_filters(client):
+    client.insert(
+        collection_name="books",
+        data=[
+            _book(10, "/works/OL10W", [0.0, 1.0, 0.0], subject_tags=["fantasy", "dragons"]),
+            _book(11, "/works/OL11W", [0.0, 0.0, 1.0], subject_tags=["science fiction"]),
+        ],
+    )
+    q = lambda f: [r["id"] for r in client.query(collection_name="books", filter=f)]  # noqa: E731
+    assert q('array_contains_any(subject_tags, ["dragons", "science fiction"])') == [10, 11]
+    assert q('array_contains(subject_tags, "fantasy") and id > 0') == [10]
+    assert q('array_contains_all(subject_tags, ["fantasy", "dragons"])') == [10]
+    assert q('array_contains_all(subject_tags, ["fantasy", "magic"])') == []
+    fields = {f["name"]: f["type"] for f in client.describe_collection(collection_name="books")["fields"]}
+    assert fields["subject_tags"] == "ARRAY" and fields["embedding"] == "FLOAT_VECTOR"
+
+
+def test_partitions_restrict_search_and_persist(tmp_path):
+    c = LocalMilvusClient(str(tmp_path), dim=2)
+    c.create_partition(collection_name="books", partition_name="fantasy__rated")
+    c.insert(collection_name="books", data=[_book(1, "/works/OL1W", [1.0, 0.0])])
+    c.insert(collection_name="books", data=[_book(2, "/works/OL2W", [0.0, 1.0])], partition_name="fantasy__rated")
+    with pytest.raises(ValueError):
+        c.insert(collection_name="books", data=[_book(3, "/works/OL3W", [1.0, 1.0])], partition_name="missing")
+
+    reopened = LocalMilvusClient(str(tmp_path), dim=2)
+    assert reopened.list_partitions(collection_name="books") == ["_default", "fantasy__rated"]
+    hits = reopened.search(collection_name="books", data=[[1.0, 0.0]], limit=5, partition_names=["fantasy__rated"])
+    assert [h["id"] for h in hits[0]] == [2]
+    assert "$partition" not in reopened.query(collection_name="books", filter="id == 2", output_fields=["*"])[0]
+    assert [r["id"] for r in reopened.query(collection_name="books", partition_names=["_default"])] == [1]
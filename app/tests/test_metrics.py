@@ -0,0 +1,38 @@
+"""Prometheus-style metric primitives and text rendering."""
+
+import pytest
+
+from app.utils.metrics import Counter, Histogram, record_cache_lookup, render_prometheus, track_dependency
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    h.observe(0.05, route="/a")
+    h.observe(0.5, route="/a")
+    h.observe(5.0, route="/a")
+    lines = h.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 't_seconds_count{route="/a"} 3' in lines
+    assert h.count(route="/a") == 3
+
+
+def test_counter_escapes_label_values():
+    c = Counter("t_total", "test", ("name",))
+    c.inc(name='a"b')
+    assert 't_total{name="a\\"b"} 1' in c.render()
+
+
+def test_track_dependency_counts_errors_and_reraises():
+    with pytest.raises(RuntimeError):
+        with track_dependency("test_dep", "boom"):
+            raise RuntimeError("down")
+    text = render_prometheus()
+    assert 'dependency_call_errors_total{dependency="test_dep",operation="boom"} 1' in text
+
+
+def test_cache_hit_ratio_rendered():
+    record_cache_lookup("test_cache", hit=True)
+    record_cache_lookup("test_cache", hit=False)
+    assert 'cache_hit_ratio{cache="test_cache"} 0.5' in render_prometheus()
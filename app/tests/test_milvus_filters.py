@@ -0,0 +1,40 @@
+"""Constraint compilation into Milvus filter expressions (escaping + evaluation on the local store)."""
+
+from app.utils.local_vector_store import LocalMilvusClient
+from app.utils.milvus_filters import and_filters, array_contains_any, build_constraint_filter, escape_filter_string
+
+
+def test_escape_filter_string_neutralizes_quotes():
+    assert escape_filter_string('a" or id > 0 or "') == 'a\\" or id > 0 or \\"'
+    assert escape_filter_string("back\\slash") == "back\\\\slash"
+
+
+def test_unconstrained_is_empty_and_and_filters_skips_blanks():
+    assert build_constraint_filter() == ""
+    assert and_filters("", None, "x == 1") == "x == 1"
+    assert and_filters("a == 1", "b == 2") == "(a == 1) and (b == 2)"
+
+
+def test_constraints_compile_and_evaluate():
+    expr = build_constraint_filter(
+        exclude_authors=['O"Brien'],
+        min_avg_rating=4.0,
+        min_shelf_count=100,
+        require_subjects=["100% fantasy"],
+    )
+    store = LocalMilvusClient(dim=2)
+    rows = [
+        {"id": 1, "author_name": 'O"Brien', "avg_rating": 4.5, "has_rating": True, "total_shelf_count": 500, "subjects": "100% fantasy"},
+        {"id": 2, "author_name": "Le Guin", "avg_rating": 4.5, "has_rating": True, "total_shelf_count": 500, "subjects": "100% fantasy, magic"},
+        {"id": 3, "author_name": "Le Guin", "avg_rating": 4.5, "has_rating": False, "total_shelf_count": 500, "subjects": "100% fantasy"},
+        {"id": 4, "author_name": "Le Guin", "avg_rating": 4.5, "has_rating": True, "total_shelf_count": 5, "subjects": "100% fantasy"},
+        {"id": 5, "author_name": "Le Guin", "avg_rating": 4.5, "has_rating": True, "total_shelf_count": 500, "subjects": "1000 fantasy"},
+    ]
+    store.insert(collection_name="books", data=[{**r, "embedding": [1.0, 0.0]} for r in rows])
+    assert [r["id"] for r in store.query(collection_name="books", filter=expr)] == [2]
+
+
+def test_require_subjects_on_tags_uses_array_contains_all():
+    expr = build_constraint_filter(require_subjects=['sci"fi', " "], subject_tags_field="subject_tags")
+    assert expr == 'array_contains_all(subject_tags, ["sci\\"fi"])'
+    assert array_contains_any("subject_tags", ["a", "b"]) == 'array_contains_any(subject_tags, ["a", "b"])'
@@ -0,0 +1,35 @@
+"""Mood centroid build / persist / staleness checks."""
+
+import asyncio
+import math
+
+from app.services import mood_centroids
+
+
+def _fake_embed(vectors):
+    async def embed(text):
+        return vectors.get(text)
+
+    return embed
+
+
+def test_build_averages_normalized_subject_vectors():
+    mood_map = {"epic": ["a", "b"], "dark": ["missing"]}
+    built = asyncio.run(mood_centroids.build_centroids(mood_map, _fake_embed({"a": [2.0, 0.0], "b": [0.0, 5.0]})))
+    assert set(built) == {"epic"}
+    assert all(math.isclose(x, 1 / math.sqrt(2)) for x in built["epic"])
+
+
+def test_saved_centroids_are_dropped_when_subjects_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(mood_centroids, "_centroids", {})
+    path = str(tmp_path / "centroids" / "moods.json")
+    mood_centroids.save_centroids(path, {"epic": [1.0, 0.0], "dark": [0.0, 1.0]}, {"epic": ["a"], "dark": ["b"]})
+
+    current = {"epic": ["a"], "dark": ["b", "c"]}
+    loaded = mood_centroids.load_centroids(path, current)
+    assert loaded == {"epic": [1.0, 0.0]}
+
+    mood_centroids.set_centroids(loaded, current)
+    assert mood_centroids.get_centroid("epic", ["a"]) == [1.0, 0.0]
+    assert mood_centroids.get_centroid("epic", ["a", "z"]) is None
+    assert mood_centroids.get_centroid("dark", ["b", "c"]) is None
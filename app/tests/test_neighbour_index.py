@@ -0,0 +1,194 @@
+"""Precomputed neighbour index: build from LocalMilvusClient, incremental add_book, and /recommend serving from it."""
+
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.routes import recommendations
+from app.services import neighbour_index
+from app.services.neighbour_index import NeighbourIndex, build_neighbour_index, work_number
+from app.utils.local_vector_store import LocalMilvusClient
+from main import app
+
+FIELDS = ["work_key", "title", "author_name", "subjects", "avg_rating", "has_rating", "total_shelf_count"]
+
+
+def _book(i, vec, subjects="Fantasy, Magic"):
+    return {
+        "id": i,
+        "work_key": f"/works/OL{i}W",
+        "title": f"Book {i}",
+        "author_name": "Author",
+        "subjects": subjects,
+        "description": "",
+        "avg_rating": 0.0,
+        "has_rating": False,
+        "total_shelf_count": 0,
+        "embedding": vec,
+    }
+
+
+@pytest.fixture
+def store():
+    client = LocalMilvusClient(dim=4)
+    client.insert(
+        collection_name="books",
+        data=[
+            _book(1, [1.0, 0.0, 0.0, 0.0]),
+            _book(2, [0.9, 0.1, 0.0, 0.0]),
+            _book(3, [0.7, 0.3, 0.0, 0.0], subjects="Humor"),
+            _book(4, [0.0, 0.0, 1.0, 0.0], subjects="Romance"),
+        ],
+    )
+    return client
+
+
+def test_work_number():
+    assert work_number("/works/OL123W") == 123
+    assert work_number("OL45W") == 45
+    assert work_number("not-a-key") is None
+
+
+def test_build_and_lookup(store, tmp_path):
+    path = str(tmp_path / "idx")
+    assert build_neighbour_index(store, path, fields=FIELDS, k=2, batch_size=3, search_batch=2) == 4
+    index = NeighbourIndex(path)
+    assert index.count == 4 and index.k == 2
+    assert [n for n, _ in index.neighbours("/works/OL1W")] == [2, 3]
+    dists = [d for _, d in index.neighbours("OL1W")]
+    assert dists == sorted(dists)
+    assert index.neighbours("/works/OL999W") is None
+    record = index.record(3)
+    assert record["work_key"] == "/works/OL3W" and record["id"] == 3
+    assert "embedding" not in record
+    assert index.explanations("/works/OL1W") is None
+
+
+def test_rebuild_keeps_previous_index(store, tmp_path):
+    path = str(tmp_path / "idx")
+    build_neighbour_index(store, path, fields=FIELDS, k=2, with_explanations=True)
+    build_neighbour_index(store, path, fields=FIELDS, k=3, with_explanations=True)
+    assert NeighbourIndex(path).k == 3
+    assert NeighbourIndex(path + ".previous").k == 2
+    assert len(NeighbourIndex(path).explanations("/works/OL1W")) == 3
+
+
+def test_add_book_updates_only_lists_it_enters(store, tmp_path):
+    path = str(tmp_path / "idx")
+    build_neighbour_index(store, path, fields=FIELDS, k=2)
+    index = NeighbourIndex(path)
+    other_worker = NeighbourIndex(path)
+
+    new = _book(5, [0.0, 0.0, 0.95, 0.05], subjects="Romance")
+    store.insert(collection_name="books", data=[new])
+    record = {k: v for k, v in new.items() if k != "embedding"}
+    updated = index.add_book(store, record, new["embedding"])
+
+    assert [n for n, _ in index.neighbours("/works/OL5W")][0] == 4
+    assert [n for n, _ in index.neighbours("/works/OL4W")][0] == 5
+    # Book 1's list (2, 3) is closer than the new book, so it is untouched
+    assert [n for n, _ in index.neighbours("/works/OL1W")] == [2, 3]
+    assert updated >= 1
+    assert index.record(5)["title"] == "Book 5"
+
+    other_worker.refresh()
+    assert [n for n, _ in other_worker.neighbours_of(4)][0] == 5
+
+
+def test_running_worker_follows_a_rebuild_and_keeps_books_written_during_it(store, tmp_path, monkeypatch):
+    path = str(tmp_path / "idx")
+    build_neighbour_index(store, path, fields=FIELDS, k=2)
+    worker = NeighbourIndex(path)
+    first = _book(5, [0.0, 0.0, 0.95, 0.05], subjects="Romance")
+    store.insert(collection_name="books", data=[first])
+    worker.add_book(store, {k: v for k, v in first.items() if k != "embedding"}, first["embedding"])
+    built_id = worker.build_id
+
+    # A write-back lands after the rebuild's walk has started, so only the old journal has it
+    during = _book(6, [0.0, 0.0, 0.9, 0.1], subjects="Romance")
+    walk = store.query_iterator
+
+    def walk_then_write_back(**kwargs):
+        iterator = walk(**kwargs)
+        store.insert(collection_name="books", data=[during])
+        worker.add_book(store, {k: v for k, v in during.items() if k != "embedding"}, during["embedding"])
+        return iterator
+
+    monkeypatch.setattr(store, "query_iterator", walk_then_write_back)
+    assert build_neighbour_index(store, path, fields=FIELDS, k=2) == 5
+    with open(f"{path}/journal.jsonl", "ab") as f:
+        f.write(b'{"lists": {"7": [["x"]]}}\n')
+
+    worker.refresh()
+    assert worker.build_id != built_id and worker.count == 5
+    assert worker.record(6)["title"] == "Book 6"
+    assert [n for n, _ in worker.neighbours("/works/OL6W")] == [5, 4]
+    assert 6 in [n for n, _ in worker.neighbours("/works/OL4W")]
+    assert worker.neighbours("/works/OL7W") is None
+
+
+@pytest.mark.skipif(neighbour_index.fcntl is None, reason="journal locking needs fcntl")
+def test_concurrent_write_backs_merge_into_shared_lists(store, tmp_path):
+    path = str(tmp_path / "idx")
+    build_neighbour_index(store, path, fields=FIELDS, k=2)
+    worker = NeighbourIndex(path)
+    new = _book(5, [0.0, 0.0, 0.95, 0.05], subjects="Romance")
+    store.insert(collection_name="books", data=[new])
+
+    # Another worker is mid-write-back: it holds the journal lock and puts book 9 into book 4's list
+    fd = os.open(f"{path}/journal.jsonl", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    neighbour_index.fcntl.flock(fd, neighbour_index.fcntl.LOCK_EX)
+    writer = threading.Thread(
+        target=worker.add_book,
+        args=(store, {k: v for k, v in new.items() if k != "embedding"}, new["embedding"]),
+    )
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()
+    os.write(fd, b'{"lists": {"4": [[9, 0.001]]}, "records": {"9": {"id": 9}}}\n')
+    os.close(fd)
+    writer.join(5)
+
+    assert [n for n, _ in NeighbourIndex(path).neighbours("/works/OL4W")] == [9, 5]
+
+
+@pytest.fixture
+def served_index(store, tmp_path, monkeypatch):
+    path = str(tmp_path / "idx")
+    build_neighbour_index(store, path, fields=FIELDS, k=2)
+    monkeypatch.setenv("NEIGHBOUR_INDEX_PATH", path)
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setattr(neighbour_index, "_index", None)
+    monkeypatch.setattr(neighbour_index, "_index_failed", False)
+    app.state.zilliz_client = store
+    yield store
+    app.state.zilliz_client = None
+
+
+def test_recommend_served_from_index_without_search(served_index, monkeypatch):
+    def no_search(**kwargs):
+        raise AssertionError("search should not be called for an indexed seed")
+
+    monkeypatch.setattr(served_index, "search", no_search)
+    resp = TestClient(app).post(
+        "/recommend",
+        json={"work_key": "/works/OL1W", "subjects": ["Fantasy"], "limit": 2, "fields": ["title"]},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["X-Recommend-Tier"] == "index"
+    body = resp.json()
+    assert [r["work_key"] for r in body["recommendations"]] == ["/works/OL2W", "/works/OL3W"]
+    assert set(body["recommendations"][0]) == {"work_key", "title", "explanation"}
+    assert body["next_cursor"]
+
+
+def test_recommend_falls_back_to_search_when_index_cannot_answer(served_index):
+    http = TestClient(app)
+    # description is not stored in the table, and limit exceeds K
+    for payload in ({"work_key": "/works/OL1W", "limit": 2}, {"work_key": "/works/OL1W", "limit": 3, "fields": ["title"]}):
+        resp = http.post("/recommend", json=payload)
+        assert resp.status_code == 200
+        assert [r["work_key"] for r in resp.json()["recommendations"]][:2] == ["/works/OL2W", "/works/OL3W"]
+    assert recommendations._neighbour_index() is not None
@@ -0,0 +1,104 @@
+"""Open Library work lookups for seed enrichment: cache, single-flight and missing works."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.services import open_library_service
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(open_library_service, "_works", open_library_service.OrderedDict())
+    monkeypatch.setattr(open_library_service, "_inflight", {})
+    monkeypatch.setattr(open_library_service, "get_shared_cache", lambda: None)
+
+
+def test_concurrent_lookups_share_one_fetch_and_cache_it(monkeypatch):
+    calls = []
+
+    async def fetch(work_id, timeout_s=None):
+        calls.append(work_id)
+        await asyncio.sleep(0.05)
+        return {"title": "T", "author_name": "A", "subjects": ["s"]}
+
+    monkeypatch.setattr(open_library_service, "fetch_work_async", fetch)
+
+    async def run():
+        first = await asyncio.gather(*(open_library_service.get_work_cached(k) for k in ("OL1W", "/works/OL1W", "ol1w")))
+        # A caller with too little budget gives up, but the fetch it started still fills the cache
+        late = await open_library_service.get_work_cached("OL2W", timeout_s=0.001)
+        await asyncio.sleep(0.1)
+        again = await open_library_service.get_work_cached("OL2W", timeout_s=0.001)
+        return first, late, again
+
+    first, late, again = asyncio.run(run())
+    assert [d["title"] for d in first] == ["T", "T", "T"]
+    assert late is None and again["title"] == "T"
+    assert calls == ["OL1W", "OL2W"]
+
+
+def test_missing_works_cached_and_transient_errors_retried(monkeypatch):
+    calls = []
+
+    async def fetch(work_id, timeout_s=None):
+        calls.append(work_id)
+        if work_id == "OL404W":
+            raise HTTPException(status_code=404, detail="Work not found")
+        raise httpx.ConnectError("down")
+
+    monkeypatch.setattr(open_library_service, "fetch_work_async", fetch)
+
+    async def run():
+        return [await open_library_service.get_work_cached(k) for k in ("OL404W", "OL404W", "OL5W", "OL5W")]
+
+    assert asyncio.run(run()) == [None, None, None, None]
+    assert calls == ["OL404W", "OL5W", "OL5W"]
+
+
+def test_malformed_payloads_are_not_cached_and_do_not_raise(monkeypatch):
+    calls = []
+    errors = iter([ValueError("Expecting value: line 1 column 1"), KeyError("key"), AttributeError("'list' object")])
+
+    async def fetch(work_id, timeout_s=None):
+        calls.append(work_id)
+        error = next(errors, None)
+        if error is not None:
+            raise error
+        return {"title": "T", "author_name": "A", "subjects": []}
+
+    monkeypatch.setattr(open_library_service, "fetch_work_async", fetch)
+
+    async def run():
+        return [await open_library_service.get_work_cached("OL7W") for _ in range(5)]
+
+    results = asyncio.run(run())
+    assert results[:3] == [None, None, None] and results[3]["title"] == "T" and results[4]["title"] == "T"
+    assert len(calls) == 4
+
+
+def test_shared_cache_hits_use_the_local_ttl_and_bound(monkeypatch):
+    class Shared:
+        def __init__(self):
+            self.writes = []
+
+        def get_json(self, key):
+            return {"doc": None} if key == "olwork:OL404W" else {"doc": {"title": key}}
+
+        def set_json(self, key, value, ttl):
+            self.writes.append(key)
+
+    shared = Shared()
+    monkeypatch.setattr(open_library_service, "get_shared_cache", lambda: shared)
+    monkeypatch.setattr(open_library_service, "WORK_CACHE_SIZE", 2)
+    now = open_library_service.time.time()
+
+    assert open_library_service._cached_work("OL404W") == (True, None)
+    expires, _ = open_library_service._works["OL404W"]
+    assert expires <= now + open_library_service.MISSING_WORK_TTL_S + 1
+    for work_id in ("OL1W", "OL2W"):
+        assert open_library_service._cached_work(work_id)[1] == {"title": f"olwork:{work_id}"}
+    assert list(open_library_service._works) == ["OL1W", "OL2W"]
+    assert shared.writes == []
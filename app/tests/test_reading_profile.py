@@ -0,0 +1,138 @@
+"""POST /recommend/profile: recency weights, taste clusters, and the one-query / one-search route."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.routes import recommendations
+from app.services import reading_profile, subject_tags
+from app.services.reading_profile import interleave, profile_centroids, recency_weights
+from app.utils.local_vector_store import LocalMilvusClient
+from main import app
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def _book(i, vec, subjects, title=None):
+    return {
+        "id": i,
+        "work_key": f"/works/OL{i}W",
+        "title": title or f"Book {i}",
+        "author_name": f"Author {i}",
+        "subjects": subjects,
+        "description": "",
+        "avg_rating": 0.0,
+        "has_rating": False,
+        "total_shelf_count": 0,
+        "cover_id": 0,
+        "embedding": vec,
+    }
+
+
+def test_recency_weights_and_clusters():
+    weights = recency_weights([NOW, (NOW - timedelta(days=30)).isoformat(), None], 30.0, now=NOW)
+    assert weights == pytest.approx([1.0, 0.5, 0.5])
+
+    vectors = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]]
+    one, shares, _ = profile_centroids(vectors, [1.0, 1.0, 1.0], 1)
+    assert len(one) == 1 and shares == [1.0]
+    two, shares, labels = profile_centroids(vectors, [1.0, 1.0, 1.0], 2)
+    assert labels[0] == labels[1] != labels[2]
+    assert sorted(shares) == pytest.approx([1 / 3, 2 / 3])
+
+    lists = [[{"work_key": k} for k in "abc"], [{"work_key": k} for k in "xay"]]
+    assert [h["work_key"] for _, h in interleave(lists, [0.75, 0.25], 4)] == ["a", "x", "b", "c"]
+
+
+class _History:
+    """Just the pymongo Collection surface load_recent_reads uses."""
+
+    def __init__(self, docs):
+        self.docs, self.finds, self.indexes = docs, [], []
+
+    def create_index(self, keys, name):
+        self.indexes.append(name)
+        return name
+
+    def find(self, query, projection):
+        self.finds.append(query)
+        rows = [{k: d[k] for k in ("work_key", "read_at")} for d in self.docs if d["user_id"] == query["user_id"]]
+        return _Cursor(rows)
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def sort(self, key, direction):
+        return _Cursor(sorted(self.rows, key=lambda r: r[key], reverse=direction < 0))
+
+    def limit(self, n):
+        return iter(self.rows[:n])
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[
+            _book(1, [1.0, 0.0], "Fantasy, Magic", title="Read Fantasy"),
+            _book(2, [0.0, 1.0], "History", title="Read History"),
+            _book(3, [0.95, 0.05], "Fantasy"),
+            _book(4, [0.9, 0.1], "Magic"),
+            _book(5, [0.05, 0.95], "History"),
+            _book(6, [0.7, 0.7], "Essays"),
+        ],
+    )
+    app.state.zilliz_client = store
+    yield store
+    app.state.zilliz_client = None
+
+
+def test_profile_is_one_query_and_one_search(catalog, monkeypatch):
+    calls = {"query": [], "search": []}
+    for name in calls:
+        original = getattr(catalog, name)
+        monkeypatch.setattr(catalog, name, lambda _n=name, _o=original, **kw: calls[_n].append(kw) or _o(**kw))
+    body = {
+        "reads": [{"work_key": "/works/OL1W", "read_at": "2026-05-01T00:00:00Z"}, {"work_key": "/works/OL2W"}],
+        "clusters": 2,
+        "limit": 3,
+    }
+    resp = TestClient(app).post("/recommend/profile", json=body)
+    assert resp.status_code == 200
+    out = resp.json()
+    keys = [r["work_key"] for r in out["recommendations"]]
+    assert len(keys) == 3 and not {"/works/OL1W", "/works/OL2W"} & set(keys)
+    assert {"/works/OL3W", "/works/OL5W"} <= set(keys)
+    assert out["profile"] == {"reads": 2, "reads_in_catalog": 2, "clusters": 2}
+    assert len(calls["query"]) == 1 and len(calls["search"]) == 1
+    assert len(calls["search"][0]["data"]) == 2
+    assert "embedding" not in out["recommendations"][0]
+    by_key = {r["work_key"]: r["explanation"] for r in out["recommendations"]}
+    assert by_key["/works/OL3W"].startswith('Because you read "Read Fantasy".')
+    assert resp.headers["X-Recommend-Tier"] == "profile"
+
+
+def test_profile_from_mongo_history(catalog, monkeypatch):
+    history = _History(
+        [
+            {"user_id": "u1", "work_key": "/works/OL2W", "read_at": NOW - timedelta(days=400)},
+            {"user_id": "u1", "work_key": "/works/OL1W", "read_at": NOW},
+            {"user_id": "u2", "work_key": "/works/OL5W", "read_at": NOW},
+        ]
+    )
+    monkeypatch.setattr(recommendations, "get_books_collection", lambda: history)
+    http = TestClient(app)
+    out = http.post("/recommend/profile", json={"user_id": "u1", "limit": 2, "fields": ["title"]}).json()
+    # The recent fantasy read dominates the single centroid
+    assert {r["work_key"] for r in out["recommendations"]} == {"/works/OL3W", "/works/OL4W"}
+    assert set(out["recommendations"][0]) == {"work_key", "title", "explanation"}
+    # The index is the offline job's business, never created on the request path
+    assert history.finds == [{"user_id": "u1"}] and history.indexes == []
+    assert reading_profile.ensure_history_index(history) == "user_recent_reads"
+    assert http.post("/recommend/profile", json={"limit": 2}).status_code == 422
@@ -144,4 +144,18 @@ def test_calculate_cosine_similarity_with_explanation():
 
         # Ensure that the feature_difference keys match the feature columns
         for col in feature_columns:
-            assert col in feature_diff
\ No newline at end of file
+            assert col in feature_diff
+
+def test_numpy_cosine_matches_sklearn():
+    from app.services.recommendation_service import cosine_similarity as numpy_cosine
+
+    a = np.array([[target_track[col] for col in feature_columns]])
+    b = np.array([[t[col] for col in feature_columns] for t in dummy_tracks])
+    assert np.allclose(numpy_cosine(a, b), cosine_similarity(a, b))
+
+
+def test_heavy_dependencies_not_imported_at_startup():
+    from app.jobs.import_time_report import measure_imports
+
+    loaded = {name.split(".")[0] for name, _, _, _ in measure_imports("main")}
+    assert not loaded & {"sklearn", "pymilvus", "pymongo", "scipy"}
@@ -0,0 +1,49 @@
+"""Stage timing (Server-Timing) and opt-in request profiles."""
+
+import asyncio
+import os
+
+import pytest
+
+from app.utils.request_profiler import maybe_start_profile
+from app.utils.request_timing import begin_request, stage
+
+
+def test_stage_is_noop_outside_request():
+    from app.utils import request_timing
+
+    request_timing._current.set(None)
+    with stage("orphan"):
+        pass
+    assert request_timing.current_timings() is None
+
+
+def test_repeated_stages_accumulate_into_header():
+    timings = begin_request()
+    for _ in range(3):
+        with stage("explain"):
+            pass
+    with stage("tier1 query"):
+        pass
+    header = timings.header_value()
+    assert header.startswith("explain;dur=")
+    assert "tier1_query;dur=" in header
+    assert header.rstrip().split(", ")[-1].startswith("total;dur=")
+    assert timings.as_log_fields()["stage_counts"] == {"explain": 3}
+
+
+def test_forced_profile_written_to_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_ALLOW_HEADER", "1")
+    profile = maybe_start_profile({"x-profile": "1"})
+    if profile is None:
+        pytest.skip("another tracer (e.g. coverage) owns the profiling hook")
+    sum(range(1000))
+    path = asyncio.run(profile.finish("/recommend", 12.0))
+    assert path is not None and os.path.exists(path)
+
+
+def test_profile_not_started_without_trigger(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.delenv("PROFILE_SLOW_MS", raising=False)
+    assert maybe_start_profile({"x-profile": "1"}) is None
@@ -0,0 +1,53 @@
+"""MMR diversity + popularity re-ranking over overfetched candidates."""
+
+import time
+
+import numpy as np
+
+from app.services.rerank import mmr_order, popularity_scores
+
+# Three near-duplicates of one saga, then a different book slightly further from the seed.
+EMBEDDINGS = np.array(
+    [
+        [1.0, 0.00, 0.0],
+        [1.0, 0.01, 0.0],
+        [1.0, 0.02, 0.0],
+        [0.0, 1.00, 0.0],
+    ]
+)
+RELEVANCE = np.array([0.95, 0.94, 0.93, 0.80])
+
+
+def test_zero_diversity_keeps_relevance_order():
+    assert mmr_order(EMBEDDINGS, RELEVANCE, 3) == [0, 1, 2]
+
+
+def test_diversity_promotes_different_cluster():
+    assert mmr_order(EMBEDDINGS, RELEVANCE, 2, diversity=0.5) == [0, 3]
+
+
+def test_popularity_weight_reorders():
+    records = [
+        {"total_shelf_count": 10},
+        {"total_shelf_count": 10},
+        {"total_shelf_count": 10},
+        {"total_shelf_count": 50_000, "has_rating": True, "avg_rating": 4.5},
+    ]
+    pop = popularity_scores(records)
+    assert pop[3] > pop[0]
+    assert mmr_order(EMBEDDINGS, RELEVANCE, 1, popularity=pop, popularity_weight=0.5) == [3]
+
+
+def test_fifty_candidates_rerank_quickly():
+    rng = np.random.default_rng(0)
+    emb = rng.normal(size=(50, 384))
+    rel = rng.uniform(size=50)
+    pop = rng.uniform(size=50)
+    mmr_order(emb, rel, 10, diversity=0.3, popularity=pop, popularity_weight=0.2)  # warm
+    runs = []
+    for _ in range(20):
+        start = time.perf_counter()
+        mmr_order(emb, rel, 10, diversity=0.3, popularity=pop, popularity_weight=0.2)
+        runs.append(time.perf_counter() - start)
+    # Target is < 1 ms; leave headroom for slow CI machines.
+    assert sorted(runs)[len(runs) // 2] < 0.005
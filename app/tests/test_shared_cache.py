@@ -0,0 +1,64 @@
+"""mmap-backed cross-worker cache: round trips, TTL, eviction and visibility across processes."""
+
+import multiprocessing
+import time
+
+import pytest
+
+from app.utils.shared_cache import SharedCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = SharedCache(str(tmp_path / "cache"), n_slots=64, slot_bytes=512, n_stripes=4)
+    yield c
+    c.close()
+
+
+def test_round_trip_json_and_vectors(cache):
+    assert cache.get("missing") is None
+    assert cache.set_json("rec:a", {"recommendations": [1, 2]}, ttl_s=60)
+    assert cache.get_json("rec:a") == {"recommendations": [1, 2]}
+    cache.set_vector("emb:a", [0.5, -1.0, 2.0], ttl_s=60)
+    assert cache.get_vector("emb:a") == [0.5, -1.0, 2.0]
+
+
+def test_overwrite_and_expiry(cache):
+    cache.set("k", b"one", ttl_s=60)
+    cache.set("k", b"two", ttl_s=60)
+    assert cache.get("k") == b"two"
+    cache.set("short", b"x", ttl_s=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+
+def test_oversized_value_not_cached(cache):
+    assert cache.set("big", b"x" * 1024, ttl_s=60) is False
+    assert cache.get("big") is None
+
+
+def test_full_group_evicts_soonest_expiring(tmp_path):
+    # 8 slots = one probe group, so every key competes for the same slots
+    c = SharedCache(str(tmp_path / "small"), n_slots=8, slot_bytes=256, n_stripes=1)
+    for i in range(8):
+        c.set(f"k{i}", b"v", ttl_s=100 + i)
+    c.set("new", b"v", ttl_s=100)
+    assert c.get("k0") is None
+    assert c.get("new") == b"v"
+    assert c.get("k7") == b"v"
+    c.close()
+
+
+def _child_write(path):
+    c = SharedCache(path, n_slots=64, slot_bytes=512, n_stripes=4)
+    c.set_json("from-child", {"pid": "child"}, ttl_s=60)
+    c.close()
+
+
+def test_value_written_by_another_process_is_visible(cache):
+    ctx = multiprocessing.get_context("spawn")
+    proc = ctx.Process(target=_child_write, args=(cache.path,))
+    proc.start()
+    proc.join(timeout=30)
+    assert proc.exitcode == 0
+    assert cache.get_json("from-child") == {"pid": "child"}
@@ -0,0 +1,148 @@
+"""Subject-family partitions: the family mapping, the catalog re-layout, and partition_names pruning on the routes."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.jobs.partition_benchmark import build_partitioned_store, run_benchmark
+from app.jobs.partition_catalog import partition_catalog
+from app.routes import recommendations
+from app.services import mood_centroids, subject_families, subject_tags
+from app.services.subject_families import (
+    all_partition_names,
+    detect_partitions,
+    partition_for_record,
+    phrase_family,
+    search_partitions,
+    subject_family,
+)
+from app.utils.local_vector_store import LocalMilvusClient
+from main import app
+
+
+def _book(i, vec, subjects, rated=False):
+    return {
+        "id": i,
+        "work_key": f"/works/OL{i}W",
+        "title": f"Book {i}",
+        "author_name": f"Author {i}",
+        "subjects": subjects,
+        "description": "",
+        "avg_rating": 4.5 if rated else 0.0,
+        "has_rating": rated,
+        "total_shelf_count": i * 100,
+        "cover_id": 0,
+        "embedding": vec,
+    }
+
+
+def test_family_mapping():
+    assert phrase_family("Historical Romance") == "romance"
+    assert phrase_family("World War, 1939-1945") == "historical"
+    assert phrase_family("Sci-Fi") == "science_fiction"
+    assert phrase_family("award winners") is None
+    assert subject_family(["Award winners", "Epic Fantasy", "Romance"]) == "fantasy"
+    assert subject_family([]) == "general"
+    assert partition_for_record({"subjects": "Humor, Satire", "has_rating": True}) == "humor__rated"
+    assert partition_for_record({"subject_tags": ["mystery"], "subjects": "Humor"}) == "mystery_thriller__unrated"
+
+
+@pytest.fixture
+def partitioned(monkeypatch):
+    for module, name in ((subject_tags, "_detected"), (subject_families, "_available")):
+        monkeypatch.setattr(module, name, None)
+    monkeypatch.setattr(recommendations, "_mood_responses", recommendations.OrderedDict())
+    monkeypatch.setattr(mood_centroids, "_centroids", {})
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.delenv("PARTITION_SEARCH", raising=False)
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[
+            _book(1, [1.0, 0.0], "Epic Fantasy, Magic", rated=True),
+            _book(2, [0.9, 0.1], "Romance"),
+            _book(3, [0.8, 0.2], "Fantasy"),
+            _book(4, [0.7, 0.3], "Humor", rated=True),
+        ],
+    )
+    for name in all_partition_names():
+        store.create_partition(collection_name="books_p", partition_name=name)
+    counts = partition_catalog(store, "books", "books_p", batch_size=3)
+    assert counts == {"fantasy__rated": 1, "fantasy__unrated": 1, "romance__unrated": 1, "humor__rated": 1}
+    monkeypatch.setattr(recommendations, "COLLECTION_NAME", "books_p")
+    assert search_partitions(families=["fantasy"]) is None  # not detected yet
+    assert detect_partitions(store, "books_p") is True
+    subject_tags.detect_subject_tags(store, "books_p")
+    app.state.zilliz_client = store
+    yield store
+    app.state.zilliz_client = None
+
+
+def _record_calls(store, monkeypatch, name):
+    calls = []
+    original = getattr(store, name)
+
+    def recording(**kwargs):
+        calls.append(kwargs.get("partition_names"))
+        return original(**kwargs)
+
+    monkeypatch.setattr(store, name, recording)
+    return calls
+
+
+def test_recommend_prunes_by_family_and_rating(partitioned, monkeypatch):
+    searches = _record_calls(partitioned, monkeypatch, "search")
+    http = TestClient(app)
+    keys = lambda body: [r["work_key"] for r in http.post("/recommend", json=body).json()["recommendations"]]  # noqa: E731
+
+    assert keys({"work_key": "/works/OL1W"}) == ["/works/OL2W", "/works/OL3W", "/works/OL4W"]
+    assert keys({"work_key": "/works/OL1W", "subjects": ["Fantasy"], "same_family": True}) == ["/works/OL3W"]
+    assert keys({"work_key": "/works/OL1W", "min_avg_rating": 4.0}) == ["/works/OL4W"]
+    assert searches[0] is None
+    assert searches[1] == ["fantasy__rated", "fantasy__unrated"]
+    assert searches[2] == [f"{f}__rated" for f in subject_families.FAMILIES]
+
+    # same_family is never silently ignored: no subjects to take the family from, or no partitions
+    assert http.post("/recommend", json={"work_key": "/works/OL1W", "same_family": True}).status_code == 422
+    monkeypatch.setenv("PARTITION_SEARCH", "0")
+    body = {"work_key": "/works/OL1W", "subjects": ["Fantasy"], "same_family": True}
+    assert http.post("/recommend", json=body).status_code == 422
+    assert len(searches) == 3
+
+
+def test_mood_is_unpruned_and_write_back_uses_partitions(partitioned, monkeypatch):
+    queries = _record_calls(partitioned, monkeypatch, "query")
+    body = TestClient(app).post("/recommend/mood", json={"mood": "romantic"}).json()
+    assert [r["work_key"] for r in body["recommendations"]] == ["/works/OL2W"]
+    assert queries[-1] is None
+
+    # Stored under fantasy (its first mapped subject), still found by a humor mood
+    both = {**_book(5, [0.6, 0.4], "Fantasy, Humor"), "subject_tags": subject_tags.subject_tags(["Fantasy", "Humor"])}
+    partitioned.insert(collection_name="books_p", data=[both], partition_name=partition_for_record(both))
+    body = TestClient(app).post("/recommend/mood", json={"mood": "funny"}).json()
+    assert [r["work_key"] for r in body["recommendations"]] == ["/works/OL5W", "/works/OL4W"]
+
+    monkeypatch.setenv("EMBEDDING_API_TOKEN", "test-token")
+
+    async def embed(text, timeout_s=None):
+        return [0.0, 1.0]
+
+    monkeypatch.setattr(recommendations, "embed_text", embed)
+    TestClient(app).post("/recommend", json={"work_key": "/works/OL9W", "title": "New", "subjects": ["Cozy mystery"]})
+    rows = partitioned.query(
+        collection_name="books_p", filter='work_key == "/works/OL9W"', partition_names=["mystery_thriller__unrated"]
+    )
+    assert len(rows) == 1
+
+
+def test_partition_search_off_switch(partitioned, monkeypatch):
+    monkeypatch.setenv("PARTITION_SEARCH", "0")
+    assert search_partitions(families=["fantasy"], rated=True) is None
+
+
+def test_benchmark_reports_every_scenario():
+    store = LocalMilvusClient(dim=8)
+    samples = build_partitioned_store(store, "bench", books=600, dim=8, batch=250)
+    report = run_benchmark(store, "bench", samples[:5], limit=5)
+    assert set(report["scenarios"]) == {"full", "family", "rated_full", "rated"}
+    assert report["queries"] == 5
+    assert 0.0 <= report["family_recall_vs_full"] <= 1.0
@@ -0,0 +1,113 @@
+"""subject_tags array field: normalization, migration, detection and the array_contains_any query paths."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.jobs.migrate_subject_tags import migrate_rows
+from app.routes import recommendations
+from app.services import mood_centroids, subject_tags
+from app.services.explanation_service import build_deterministic_explanation
+from app.services.subject_tags import detect_subject_tags, subject_tags_csv, subject_tags_filter
+from app.utils.local_vector_store import LocalMilvusClient
+from main import app
+
+
+def _book(i, vec, subjects):
+    return {
+        "id": i,
+        "work_key": f"/works/OL{i}W",
+        "title": f"Book {i}",
+        "author_name": f"Author {i}",
+        "subjects": subjects,
+        "description": "",
+        "avg_rating": 0.0,
+        "has_rating": False,
+        "total_shelf_count": i * 100,
+        "cover_id": 0,
+        "embedding": vec,
+    }
+
+
+def test_subject_tags_normalize_and_dedupe():
+    assert subject_tags_csv("Sci-Fi, science fiction,  Epic   Fantasy ,, Magic") == [
+        "science fiction",
+        "epic fantasy",
+        "magic",
+    ]
+    assert len(subject_tags_csv(", ".join(f"s{i}" for i in range(40)))) == subject_tags.MAX_SUBJECT_TAGS
+    assert subject_tags_filter(["SF", " "]) == 'array_contains_any(subject_tags, ["science fiction"])'
+    assert subject_tags_filter([]) == ""
+
+
+def test_explanations_read_tags_without_csv():
+    rec = {"author_name": "X", "subjects": "", "subject_tags": ["science fiction", "space opera"]}
+    assert "Science Fiction" in build_deterministic_explanation(seed_subjects=["Sci-Fi"], seed_author="", rec=rec)
+
+
+@pytest.fixture
+def migrated(monkeypatch):
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    monkeypatch.setattr(recommendations, "_mood_responses", recommendations.OrderedDict())
+    monkeypatch.setattr(mood_centroids, "_centroids", {})
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.delenv("EMBEDDING_API_TOKEN", raising=False)
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[
+            _book(1, [1.0, 0.0], "Romance, Sci-Fi"),
+            _book(2, [0.9, 0.1], "Historical Romance"),
+            _book(3, [0.0, 1.0], "Humor, Satire"),
+            _book(4, [0.5, 0.5], "Science Fiction"),
+        ],
+    )
+    assert migrate_rows(store, "books", "books_v2", batch_size=3) == 4
+    monkeypatch.setattr(recommendations, "COLLECTION_NAME", "books_v2")
+    assert detect_subject_tags(store, "books_v2") is True
+    assert detect_subject_tags(store, "books") is False
+    detect_subject_tags(store, "books_v2")
+    app.state.zilliz_client = store
+    yield store
+    app.state.zilliz_client = None
+
+
+def test_migration_adds_tags(migrated):
+    rows = migrated.query(collection_name="books_v2", filter="id == 1", output_fields=["subjects", "subject_tags"])
+    assert rows[0]["subjects"] == "Romance, Sci-Fi"
+    assert rows[0]["subject_tags"] == ["romance", "science fiction"]
+
+
+def test_tier3_is_one_array_query(migrated, monkeypatch):
+    filters = []
+    query = migrated.query
+
+    def recording_query(**kwargs):
+        filters.append(kwargs["filter"])
+        return query(**kwargs)
+
+    monkeypatch.setattr(migrated, "query", recording_query)
+    resp = TestClient(app).post(
+        "/recommend",
+        json={"work_key": "/works/OL99W", "title": "New", "subjects": ["sci fi", "Satire", "series:X"]},
+    )
+    assert resp.status_code == 200
+    keys = [r["work_key"] for r in resp.json()["recommendations"]]
+    assert sorted(keys) == ["/works/OL1W", "/works/OL3W", "/works/OL4W"]
+    assert "subject_tags" not in resp.json()["recommendations"][0]
+    tier3 = [f for f in filters if "subject" in f]
+    assert tier3 == ['array_contains_any(subject_tags, ["science fiction", "satire"])']
+
+
+def test_require_subjects_and_mood_use_tags(migrated):
+    http = TestClient(app)
+    resp = http.post(
+        "/recommend",
+        json={"work_key": "/works/OL2W", "require_subjects": ["SF"], "fields": ["title"]},
+    )
+    assert [r["work_key"] for r in resp.json()["recommendations"]] == ["/works/OL1W", "/works/OL4W"]
+
+    # Exact tag match: "romance" no longer matches "historical romance" by substring
+    body = http.post("/recommend/mood", json={"mood": "romantic"}).json()
+    assert {r["work_key"] for r in body["recommendations"]} == {"/works/OL1W", "/works/OL2W"}
+    assert all("subject_tags" not in r for r in body["recommendations"])
+    assert 'subject "romance"' in body["recommendations"][-1]["explanation"]
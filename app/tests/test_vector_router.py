@@ -0,0 +1,176 @@
+"""VectorRouter over local stand-in clusters with injected latency and outages."""
+
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import subject_families, subject_tags
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.local_vector_store import FilterSyntaxError, LocalMilvusClient
+from app.utils.vector_router import PRIMARY, REPLICA, Endpoint, VectorRouter
+from main import app
+
+
+class StandIn:
+    """A LocalMilvusClient 'cluster' whose reads take `latency_s` and raise while `down`."""
+
+    def __init__(self, store, latency_s=0.0):
+        self.store = store
+        self.latency_s = latency_s
+        self.down = False
+        self.calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self.store, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            if self.down:
+                raise ConnectionError("cluster unreachable")
+            time.sleep(self.latency_s)
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def _store():
+    store = LocalMilvusClient(dim=2)
+    store.insert(
+        collection_name="books",
+        data=[
+            {"id": i, "work_key": f"/works/OL{i}W", "title": f"Book {i}", "subjects": "Fantasy", "embedding": v}
+            for i, v in enumerate([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]], start=1)
+        ],
+    )
+    return store
+
+
+def _router(*clusters, explore=0.0):
+    endpoints = [
+        Endpoint(
+            "primary" if i == 0 else f"replica{i}",
+            PRIMARY if i == 0 else REPLICA,
+            lambda c=c: c,
+            breaker=CircuitBreaker(f"test_{i}", failure_threshold=2, cooldown_s=60.0),
+        )
+        for i, c in enumerate(clusters)
+    ]
+    return VectorRouter(endpoints, explore_fraction=explore, rng=random.Random(3)).connect()
+
+
+def test_reads_follow_lowest_ewma_and_writes_stay_on_primary():
+    primary, slow, fast = StandIn(_store(), 0.02), StandIn(_store(), 0.03), StandIn(_store(), 0.0)
+    router = _router(primary, slow, fast)
+    for _ in range(10):
+        hits = router.search(collection_name="books", data=[[1.0, 0.0]], limit=2, output_fields=["work_key"])
+        assert [h["entity"]["work_key"] for h in hits[0]] == ["/works/OL1W", "/works/OL2W"]
+    # Each endpoint is measured once, then the fast replica takes every read
+    assert primary.calls.count("search") == 1 and slow.calls.count("search") == 1
+    assert fast.calls.count("search") == 8
+
+    router.insert(collection_name="books", data=[{"id": 9, "work_key": "/works/OL9W", "embedding": [0.5, 0.5]}])
+    assert primary.store.num_entities("books") == 4
+    assert fast.store.num_entities("books") == 3 and "insert" not in fast.calls
+
+
+def test_failed_reads_fail_over_and_breaker_recovers_via_probe():
+    primary, replica = StandIn(_store(), 0.01), StandIn(_store())
+    router = _router(primary, replica)
+    router.query(collection_name="books", filter="id == 1", output_fields=["title"])
+    router.query(collection_name="books", filter="id == 1", output_fields=["title"])
+    replica.down = True
+    for _ in range(3):
+        rows = router.query(collection_name="books", filter="id == 2", output_fields=["title"])
+        assert rows[0]["title"] == "Book 2"
+    replica_endpoint = router.endpoints[1]
+    assert replica_endpoint.breaker.state == "open"
+    # Open breaker: the replica is skipped without being called
+    calls = len(replica.calls)
+    router.query(collection_name="books", filter="id == 3", output_fields=["title"])
+    assert len(replica.calls) == calls
+
+    replica.down = False
+    assert router.probe(replica_endpoint, "books") is True
+    assert replica_endpoint.breaker.state == "closed"
+
+    # A bad filter is the caller's error: raised once, not retried elsewhere
+    calls = len(primary.calls) + len(replica.calls)
+    with pytest.raises(FilterSyntaxError):
+        router.query(collection_name="books", filter="id ==", output_fields=["title"])
+    assert len(primary.calls) + len(replica.calls) == calls + 1
+
+
+def test_spent_deadline_returns_an_unused_half_open_trial(monkeypatch):
+    primary, replica = StandIn(_store()), StandIn(_store())
+    router = _router(primary, replica)
+    primary.down = True
+    now = [0.0]
+    breaker = router.endpoints[1].breaker
+    breaker._clock = lambda: now[0]
+    breaker.record_failure()
+    breaker.record_failure()
+    now[0] = 61.0
+    assert breaker.state == "half_open"
+    router.primary.ewma_s, router.endpoints[1].ewma_s = 0.1, 0.5
+    # Budget left when the primary fails, none by the time the replica's turn comes
+    left = iter([1.0, 0.0])
+    monkeypatch.setattr("app.utils.vector_router.remaining_s", lambda: next(left))
+
+    with pytest.raises(ConnectionError):
+        router.query(collection_name="books", filter="id == 1", output_fields=["title"], timeout=1.0)
+    assert "query" not in replica.calls
+    assert breaker.allow()
+
+
+class Rejecting:
+    """A cluster that rejects every read with `error`, like Milvus on a malformed request."""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def query(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def test_pymilvus_parameter_errors_are_not_retried_or_held_against_the_endpoint():
+    exceptions = pytest.importorskip("pymilvus.exceptions")
+    for error in (
+        exceptions.ParamError(message="invalid top_k"),
+        exceptions.MilvusException(code=1100, message="cannot parse expression: id =="),
+    ):
+        primary, replica = Rejecting(error), Rejecting(error)
+        router = _router(primary, replica)
+        for _ in range(3):
+            with pytest.raises(type(error)):
+                router.query(collection_name="books", filter="id ==")
+        assert primary.calls + replica.calls == 3
+        assert all(e.breaker.state == "closed" for e in router.endpoints)
+
+    # Anything else is the endpoint's fault: failed over and counted
+    primary, replica = Rejecting(exceptions.MilvusException(code=2, message="node down")), StandIn(_store())
+    router = _router(primary, replica)
+    router.primary.ewma_s, router.endpoints[1].ewma_s = 0.1, 0.5
+    assert router.query(collection_name="books", filter="id == 1", output_fields=["title"])[0]["title"] == "Book 1"
+    assert primary.calls == 1 and "node down" in router.primary.last_error
+
+
+def test_recommend_served_while_a_replica_is_down(monkeypatch):
+    monkeypatch.delenv("SECRET_TOKEN", raising=False)
+    monkeypatch.setattr(subject_tags, "_detected", None)
+    monkeypatch.setattr(subject_families, "_available", None)
+    replica = StandIn(_store())
+    replica.down = True
+    router = _router(StandIn(_store()), replica)
+    # The replica looks fastest, so every read tries it first until its breaker opens
+    router.primary.ewma_s = 0.5
+    app.state.zilliz_client = router
+    try:
+        body = TestClient(app).post("/recommend", json={"work_key": "/works/OL1W"}).json()
+    finally:
+        app.state.zilliz_client = None
+    assert [r["work_key"] for r in body["recommendations"]][:1] == ["/works/OL2W"]
+    assert replica.calls and router.endpoints[1].breaker.state == "open"
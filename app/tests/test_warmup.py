@@ -0,0 +1,83 @@
+"""Background connect with retries, readiness probe and warm-up steps."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.services import warmup
+from app.services.warmup import Readiness, connect_in_background, run_warmup
+
+
+def test_connect_retries_then_marks_ready(monkeypatch):
+    monkeypatch.setenv("ZILLIZ_CONNECT_BACKOFF_SEC", "0.01")
+    monkeypatch.setattr(warmup, "_WARMUP_STEPS", [])
+    calls = {"n": 0}
+    client = SimpleNamespace(get_load_state=lambda collection_name: {"state": "Loaded"})
+
+    def connect():
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise ConnectionError("refused")
+        return client
+
+    app = SimpleNamespace(state=SimpleNamespace(zilliz_client=None))
+    readiness = Readiness(backend="zilliz")
+    asyncio.run(connect_in_background(app, connect, readiness, collection_name="books"))
+    assert app.state.zilliz_client is client
+    assert readiness.attempts == 3
+    assert readiness.ready
+    assert readiness.last_error is None
+
+
+def test_failed_load_check_is_retried(monkeypatch):
+    monkeypatch.setenv("ZILLIZ_CONNECT_BACKOFF_SEC", "0.01")
+    monkeypatch.setattr(warmup, "_WARMUP_STEPS", [])
+    checks = {"n": 0}
+
+    def get_load_state(collection_name):
+        checks["n"] += 1
+        if checks["n"] == 1:
+            raise ConnectionError("load state unavailable")
+        return {"state": "Loaded"}
+
+    client = SimpleNamespace(get_load_state=get_load_state)
+    app = SimpleNamespace(state=SimpleNamespace(zilliz_client=None))
+    readiness = Readiness(backend="zilliz")
+    asyncio.run(connect_in_background(app, lambda: client, readiness, collection_name="books"))
+    assert checks["n"] == 2
+    assert readiness.ready and readiness.last_error is None
+
+
+def test_failing_warmup_step_does_not_block_readiness(monkeypatch):
+    async def ok(client):
+        pass
+
+    async def broken(client):
+        raise RuntimeError("cold")
+
+    monkeypatch.setattr(warmup, "_WARMUP_STEPS", [("ok", ok), ("broken", broken)])
+    readiness = Readiness(connected=True, collection_loaded=True)
+    asyncio.run(run_warmup(object(), readiness))
+    assert readiness.warmed
+    assert readiness.warmup_steps["ok"].startswith("ok")
+    assert readiness.warmup_steps["broken"] == "failed: cold"
+
+
+def test_local_backend_lifespan_reports_ready(monkeypatch):
+    monkeypatch.setenv("VECTOR_BACKEND", "local")
+    monkeypatch.delenv("LOCAL_VECTOR_STORE_PATH", raising=False)
+    from main import app
+
+    with TestClient(app) as http:
+        assert http.get("/healthz").json() == {"status": "ok"}
+        deadline = time.monotonic() + 5
+        resp = http.get("/readyz")
+        while resp.status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            resp = http.get("/readyz")
+        assert resp.status_code == 200
+        assert resp.json()["backend"] == "local"
+    app.state.zilliz_client = None
+    app.state.readiness = None
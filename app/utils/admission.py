@@ -0,0 +1,232 @@
+"""Admission control for the recommendation routes: adaptive concurrency limit + bounded wait queue.
+
+One limiter per route group (book, mood, track), so a Zilliz slowdown on /recommend cannot also
+starve /recommend/mood. Requests over the limit wait in a short FIFO queue; when the queue is full
+(or the wait exceeds ADMISSION_QUEUE_TIMEOUT_MS) the request is rejected immediately with
+503 + Retry-After instead of piling up until workers time out.
+
+The limit adapts by AIMD on observed latency: each request finishing under the group's latency
+target adds 1/limit (about +1 per window of requests), while a request over the target or a 5xx
+multiplies it by ADMISSION_BACKOFF (at most once per target interval, so one slow burst does not
+collapse it).
+
+Fairness (ADMISSION_FAIRNESS=1, off by default): queued requests are keyed by client (a personal
+API token; callers sharing SECRET_TOKEN by X-Client-Id, else address), a slot is handed out
+round-robin across clients, and each client may hold at most ADMISSION_PER_CLIENT_QUEUE queued
+requests; past that it gets 429, so one heavy caller is throttled without affecting the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from app.utils.metrics import Counter, Gauge, register
+
+ADMISSION_LIMIT = register(Gauge("admission_concurrency_limit", "Current adaptive concurrency limit.", ("group",)))
+ADMISSION_INFLIGHT = register(Gauge("admission_inflight", "Admitted requests in progress.", ("group",)))
+ADMISSION_QUEUED = register(Gauge("admission_queue_depth", "Requests waiting for a slot.", ("group",)))
+ADMISSION_REJECTED = register(
+    Counter("admission_rejected_total", "Requests shed by admission control.", ("group", "reason"))
+)
+
+# Latency target per group (ms): above it the limit backs off.
+DEFAULT_TARGET_MS = {"book": 1500.0, "mood": 800.0, "track": 1500.0}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after_s: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        group: str,
+        *,
+        initial_limit: float = 16,
+        min_limit: float = 2,
+        max_limit: float = 64,
+        max_queue: int = 64,
+        per_client_queue: int = 8,
+        queue_timeout_s: float = 2.0,
+        target_latency_s: float = 1.5,
+        backoff: float = 0.8,
+        fairness: bool = False,
+    ):
+        self.group = group
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.max_queue = max_queue
+        self.per_client_queue = per_client_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.target_latency_s = target_latency_s
+        self.backoff = backoff
+        self.fairness = fairness
+        self.inflight = 0
+        self._queued = 0
+        # client key -> FIFO of waiting futures; rotated for round-robin hand-off
+        self._waiters: OrderedDict[str, deque] = OrderedDict()
+        self._last_decrease = 0.0
+        self._ewma_latency_s = target_latency_s / 2
+        ADMISSION_LIMIT.set(self.limit, group=group)
+
+    @classmethod
+    def from_env(cls, group: str) -> "AdaptiveLimiter":
+        env_group = group.upper()
+        return cls(
+            group,
+            initial_limit=_env_float(f"ADMISSION_{env_group}_INITIAL_LIMIT", _env_float("ADMISSION_INITIAL_LIMIT", 16)),
+            min_limit=_env_float("ADMISSION_MIN_LIMIT", 2),
+            max_limit=_env_float(f"ADMISSION_{env_group}_MAX_LIMIT", _env_float("ADMISSION_MAX_LIMIT", 64)),
+            max_queue=int(_env_float("ADMISSION_MAX_QUEUE", 64)),
+            per_client_queue=int(_env_float("ADMISSION_PER_CLIENT_QUEUE", 8)),
+            queue_timeout_s=_env_float("ADMISSION_QUEUE_TIMEOUT_MS", 2000) / 1000.0,
+            target_latency_s=_env_float(f"ADMISSION_{env_group}_TARGET_MS", DEFAULT_TARGET_MS.get(group, 1500.0))
+            / 1000.0,
+            backoff=_env_float("ADMISSION_BACKOFF", 0.8),
+            fairness=os.getenv("ADMISSION_FAIRNESS", "0").strip().lower() in ("1", "true", "yes"),
+        )
+
+    def _capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def _retry_after_s(self) -> int:
+        """Rough time for the queue ahead to drain at the current limit and latency."""
+        drain_s = (self._queued + 1) * self._ewma_latency_s / self._capacity()
+        return max(1, math.ceil(drain_s))
+
+    def _publish(self) -> None:
+        ADMISSION_INFLIGHT.set(self.inflight, group=self.group)
+        ADMISSION_QUEUED.set(self._queued, group=self.group)
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(group=self.group, reason=reason)
+        return AdmissionRejected(status_code, reason, self._retry_after_s())
+
+    async def acquire(self, client_key: str = "") -> None:
+        """Take a slot, waiting in the queue if needed. Raises AdmissionRejected when shedding."""
+        key = client_key if self.fairness else ""
+        if self.inflight < self._capacity() and self._queued == 0:
+            self.inflight += 1
+            self._publish()
+            return
+        if self._queued >= self.max_queue:
+            raise self._reject(503, "queue_full")
+        queue = self._waiters.get(key)
+        if self.fairness and queue is not None and len(queue) >= self.per_client_queue:
+            raise self._reject(429, "client_queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._waiters[key] = deque()
+        queue.append(waiter)
+        self._queued += 1
+        self._publish()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return  # slot handed over just as the wait expired
+            self._remove_waiter(key, waiter)
+            raise self._reject(503, "queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0, ok=True, record=False)  # pass the slot on
+            else:
+                self._remove_waiter(key, waiter)
+            raise
+
+    def _remove_waiter(self, key: str, waiter: asyncio.Future) -> None:
+        queue = self._waiters.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._waiters[key]
+        waiter.cancel()
+        self._publish()
+
+    def _hand_off(self) -> None:
+        """Give free slots to queued requests, one client at a time in round-robin order."""
+        while self._waiters and self.inflight < self._capacity():
+            key, queue = next(iter(self._waiters.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+            if waiter.done():
+                continue
+            self.inflight += 1
+            waiter.set_result(None)
+
+    def _record(self, latency_s: float, ok: bool) -> None:
+        self._ewma_latency_s = 0.8 * self._ewma_latency_s + 0.2 * latency_s
+        now = time.monotonic()
+        if not ok or latency_s > self.target_latency_s:
+            if now - self._last_decrease >= self.target_latency_s:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.inflight + 1 >= self._capacity() / 2:
+            # Only grow while the limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        ADMISSION_LIMIT.set(self.limit, group=self.group)
+
+    def release(self, latency_s: float, *, ok: bool, record: bool = True) -> None:
+        """Return a slot. `ok` False (5xx/timeout) counts as an overload signal."""
+        self.inflight -= 1
+        if record:
+            self._record(latency_s, ok)
+        self._hand_off()
+        self._publish()
+
+    def as_dict(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "queued": self._queued,
+            "target_latency_ms": round(self.target_latency_s * 1000),
+        }
+
+
+_limiters: dict[str, AdaptiveLimiter] = {}
+
+
+def admission_enabled() -> bool:
+    return os.getenv("ADMISSION_ENABLED", "1").strip() not in ("0", "false", "no")
+
+
+def route_group(path: str) -> Optional[str]:
+    """Limiter group for a request path; None for routes that are not admission-controlled."""
+    if path.startswith("/recommend/mood"):
+        return "mood"
+    if path.startswith("/recommend") or path.startswith("/books/"):
+        return "book"
+    if path.startswith("/recommendations/"):
+        return "track"
+    return None
+
+
+def get_limiter(group: str) -> AdaptiveLimiter:
+    limiter = _limiters.get(group)
+    if limiter is None:
+        limiter = _limiters[group] = AdaptiveLimiter.from_env(group)
+    return limiter
+
+
+def reset_limiters() -> None:
+    """Drop all limiters (config is re-read on next use)."""
+    _limiters.clear()
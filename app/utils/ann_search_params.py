@@ -0,0 +1,72 @@
+"""ANN search parameters for the books index (``search_params["params"]`` on MilvusClient.search).
+
+Without them every search runs at the cluster's index defaults. ANN_SEARCH_PARAMS sets the
+process default as JSON (``{"level": 2}`` for Zilliz AUTOINDEX, ``{"ef": 64}`` for HNSW,
+``{"nprobe": 16}`` for IVF); POST /recommend may override it per request with ``ann_params``.
+Both go through the same whitelist and bounds, so a client can trade latency for recall but not
+pass arbitrary index options. Pick values with ``python -m app.jobs.ann_recall_benchmark``.
+
+HNSW rejects ``ef`` below the search limit, so ``ef`` is raised to the limit when needed. The
+in-process LocalMilvusClient is exact and ignores these.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Mapping, Optional
+
+# name -> (min, max); anything else is rejected
+ANN_PARAM_BOUNDS: dict[str, tuple[int, int]] = {
+    "level": (1, 10),  # Zilliz AUTOINDEX recall/latency level
+    "ef": (1, 1024),  # HNSW candidate list size
+    "nprobe": (1, 1024),  # IVF clusters probed
+    "search_list": (1, 1024),  # DiskANN candidate list size
+}
+
+_default_cache: tuple[str, dict] = ("", {})
+
+
+def validate_ann_params(params: Optional[Mapping]) -> dict:
+    """Whitelisted, bounds-checked copy of `params`; raises ValueError on anything else."""
+    out: dict = {}
+    for name, value in (params or {}).items():
+        bounds = ANN_PARAM_BOUNDS.get(name)
+        if bounds is None:
+            raise ValueError(f"Unsupported ANN parameter '{name}' (allowed: {sorted(ANN_PARAM_BOUNDS)})")
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"ANN parameter '{name}' must be an integer")
+        low, high = bounds
+        if not low <= value <= high:
+            raise ValueError(f"ANN parameter '{name}' must be between {low} and {high}")
+        out[name] = value
+    return out
+
+
+def default_ann_params() -> dict:
+    """ANN_SEARCH_PARAMS, parsed once per distinct value (an invalid value raises at first search)."""
+    global _default_cache
+    raw = os.getenv("ANN_SEARCH_PARAMS", "").strip()
+    if raw != _default_cache[0]:
+        parsed = json.loads(raw) if raw else {}
+        if not isinstance(parsed, dict):
+            raise ValueError("ANN_SEARCH_PARAMS must be a JSON object")
+        _default_cache = (raw, validate_ann_params(parsed))
+    return dict(_default_cache[1])
+
+
+def ann_search_params(
+    limit: int, overrides: Optional[Mapping] = None, base: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    ``search_params`` for a search of `limit` hits: the defaults, then `overrides` (already validated),
+    merged into `base` (e.g. range_search_params). None when there is nothing to send.
+    """
+    params = {**default_ann_params(), **(overrides or {})}
+    if "ef" in params:
+        params["ef"] = max(params["ef"], limit)
+    if not params:
+        return base
+    out = dict(base or {})
+    out["params"] = {**params, **(out.get("params") or {})}
+    return out
@@ -0,0 +1,111 @@
+"""Consecutive-failure circuit breaker for outbound dependencies.
+
+closed    -> calls go through; `failure_threshold` consecutive failures trip it open.
+open      -> calls are refused (callers take their fallback) until `cooldown_s` has passed.
+half_open -> exactly one trial call is let through; success closes, failure re-opens for another cool-down.
+
+State is exported as ``circuit_breaker_state{name}`` (0 closed, 1 half-open, 2 open) and
+``circuit_breaker_trips_total{name}`` on /metrics.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable
+
+from app.utils.metrics import Counter, Gauge, register
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = register(
+    Gauge("circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ("name",))
+)
+BREAKER_TRIPS = register(Counter("circuit_breaker_trips_total", "Times each circuit breaker opened.", ("name",)))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        cooldown_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        BREAKER_STATE.set(0, name=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+                return HALF_OPEN
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.info("Circuit breaker %s: %s -> %s", self.name, self._state, state)
+        self._state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], name=self.name)
+
+    def allow(self) -> bool:
+        """True if a call may be made now. In half-open, only the first caller gets the trial."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.cooldown_s:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._set_state(OPEN)
+                BREAKER_TRIPS.inc(name=self.name)
+
+    def release(self) -> None:
+        """The allowed call ended without a verdict (e.g. cut short by the caller): free the half-open trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._set_state(CLOSED)
+
+    def as_dict(self) -> dict:
+        state = self.state
+        out = {"state": state, "consecutive_failures": self._failures}
+        if state != CLOSED:
+            out["retry_in_s"] = round(max(0.0, self.cooldown_s - (self._clock() - self._opened_at)), 1)
+        return out
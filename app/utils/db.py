@@ -1,30 +1,42 @@
 # app/utils/db.py
-# MongoDB is used for user data only (future: profiles, reading history, saved books).
+# MongoDB is used for user data only (reading history for POST /recommend/profile; future: saved books).
 # Book recommendations are served from Zilliz (POST /recommend). Do not use MongoDB for book catalog or recommendations.
-from pymongo import MongoClient
+# pymongo is imported on first use so workers that never hit a Mongo route don't pay for it.
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_clients: dict = {}
+
+
+def _mongo_client(url: str):
+    """One MongoClient (connection pool) per URL per process, created lazily."""
+    client = _clients.get(url)
+    if client is None:
+        from pymongo import MongoClient
+
+        client = _clients[url] = MongoClient(url)
+    return client
+
 
 def get_mongo_collection():
     """Legacy: Tracks collection (Spotify-era). Used only by GET /recommendations/cosine-similarity/{track_id}."""
     MONGO_URL = os.getenv("MONGO_URL")
     if not MONGO_URL:
         raise RuntimeError("MONGO_URL is required for track recommendations")
-    client = MongoClient(MONGO_URL)
+    client = _mongo_client(MONGO_URL)
     db = client.Tracks
     collection = db["tracks_with_features"]
     return collection
 
 
 def get_books_collection():
-    """Reserved for future user data (e.g. saved books, reading list, profiles). Not used by recommendation flow; book recommendations use Zilliz (POST /recommend)."""
+    """User data: reading history ({user_id, work_key, read_at}) read by POST /recommend/profile. Book vectors and metadata stay in Zilliz."""
     MONGO_URL = os.getenv("MONGO_URL")
     if not MONGO_URL:
         raise RuntimeError("MONGO_URL is required for user data")
-    client = MongoClient(MONGO_URL)
+    client = _mongo_client(MONGO_URL)
     db = client.Books
     collection = db["books_with_metadata"]
     return collection
@@ -0,0 +1,99 @@
+"""Per-request latency budget for POST /recommend.
+
+The budget comes from the ``X-Request-Deadline-Ms`` header (milliseconds from arrival) or the
+RECOMMEND_DEADLINE_MS default; with neither, requests have no deadline and behave as before.
+The route calls ``begin_deadline()``; each stage then asks for ``remaining_s()`` and passes it as
+its timeout (Zilliz ``timeout=``, the embedding call), or skips itself when the budget left is
+smaller than the stage usually takes. Like request_timing, the deadline lives in a ContextVar, so
+it is per request and invisible outside one.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Mapping, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+# Clamp caller-supplied budgets: below this nothing useful can run, above it the header is pointless.
+MIN_BUDGET_MS = 50.0
+MAX_BUDGET_MS = 60_000.0
+
+
+class DeadlineExceeded(Exception):
+    """The request's budget ran out before (or during) a stage."""
+
+
+class Deadline:
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining_s(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_s() <= 0.0
+
+    def allows(self, estimate_s: float) -> bool:
+        """True if a stage expected to take `estimate_s` can still finish in time."""
+        return self.remaining_s() > estimate_s
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def budget_ms_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Budget from the request header, else RECOMMEND_DEADLINE_MS; None when neither is set (or invalid)."""
+    raw = (headers.get(DEADLINE_HEADER) or os.getenv("RECOMMEND_DEADLINE_MS", "")).strip()
+    try:
+        budget = float(raw)
+    except ValueError:
+        return None
+    if budget <= 0:
+        return None
+    return min(MAX_BUDGET_MS, max(MIN_BUDGET_MS, budget))
+
+
+def begin_deadline(budget_ms: Optional[float]) -> Optional[Deadline]:
+    deadline = Deadline(budget_ms / 1000.0) if budget_ms else None
+    _current.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining_s() -> Optional[float]:
+    """Seconds left in the current request's budget, or None when there is no deadline."""
+    deadline = _current.get()
+    return deadline.remaining_s() if deadline is not None else None
+
+
+def timeout_kwargs() -> dict:
+    """``{"timeout": remaining}`` for MilvusClient calls under a deadline, else {}."""
+    left = remaining_s()
+    return {} if left is None else {"timeout": max(left, 0.001)}
+
+
+def call_with_deadline(fn: Callable[..., Any], **kwargs) -> Any:
+    """
+    Call a MilvusClient-style method with the remaining budget as ``timeout``.
+
+    Raises DeadlineExceeded if the budget is already spent, or if the call fails once it is (a
+    client-side timeout); other errors propagate unchanged. Without a deadline this is ``fn(**kwargs)``.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return fn(**kwargs)
+    if deadline.expired:
+        raise DeadlineExceeded()
+    try:
+        return fn(**kwargs, **timeout_kwargs())
+    except Exception as e:
+        if deadline.expired:
+            raise DeadlineExceeded() from e
+        raise
@@ -0,0 +1,782 @@
+"""In-process, MilvusClient-compatible vector store for offline mode and load testing.
+
+Implements the subset of the MilvusClient API the routes use:
+
+- ``query(collection_name, filter, output_fields, limit)``
+- ``search(collection_name, data=[...], limit, output_fields, filter)`` — brute-force
+  COSINE top-k over a float32 matrix using batched matmuls (BLAS via NumPy)
+- ``insert(collection_name, data)``
+- ``query_iterator(collection_name, batch_size, limit, filter, output_fields)`` for offline jobs
+
+Filters support the Milvus boolean expression subset we emit: ``==``, ``!=``, ``<``,
+``<=``, ``>``, ``>=``, ``in`` / ``not in``, ``like`` (``%`` / ``_`` wildcards,
+``\\%`` escapes), ``array_contains`` / ``array_contains_any`` / ``array_contains_all`` on
+list-valued fields (answered from a per-field inverted index, like Milvus' INVERTED scalar
+index), ``and`` / ``or`` / ``not`` and parentheses.
+
+Partitions (``create_partition``, ``insert(partition_name=)``, ``search/query(partition_names=)``)
+are a per-row partition code; a search restricted to a few partitions (or a selective filter)
+gathers just those rows before the matmul, so narrower searches are proportionally cheaper.
+
+Storage per collection (when ``path`` is set; directories are created on the first write, so a
+mistyped path is not silently turned into an empty store — pass ``must_exist=True`` to fail on it):
+- ``vectors.f32`` — memory-mapped float32 matrix (capacity × dim), grown by doubling
+- ``rows.jsonl`` — append-only scalar rows (plus ``$partition``); loaded into columnar arrays at startup
+
+Search hits use the same shape and semantics as Zilliz with the COSINE metric: ``{id, distance,
+entity}`` where ``distance`` is the cosine similarity (higher = closer; search_hit_distance turns it
+into the repo's lower-is-closer distance). Range search keeps ``radius < score <= range_filter``
+and, like Milvus, rejects ``range_filter <= radius``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import operator
+import os
+import re
+import threading
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 384
+DEFAULT_VECTOR_FIELD = "embedding"
+PRIMARY_KEY = "id"
+
+# Rows scored per matmul; bounds the temporary score buffer at ~chunk × n_queries floats.
+_SEARCH_CHUNK_ROWS = 65_536
+_INITIAL_CAPACITY = 1_024
+DEFAULT_PARTITION = "_default"
+_PARTITION_KEY = "$partition"
+# Below this share of selected rows, search gathers the selected rows instead of scoring all of them,
+# in cache-sized blocks (one large fancy-index copy costs about as much as the full scan it replaces)
+_GATHER_FRACTION = 0.5
+_GATHER_CHUNK_ROWS = 2_048
+
+
+# --- Filter expressions ---
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<str>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+      | (?P<num>-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+      | (?P<op>==|!=|>=|<=|&&|\|\||[<>\[\](),])
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    )
+    """,
+    re.VERBOSE,
+)
+
+_KEYWORDS = {"and", "or", "not", "in", "like", "true", "false"}
+_ARRAY_FUNCTIONS = {"array_contains", "array_contains_any", "array_contains_all"}
+
+
+class FilterSyntaxError(ValueError):
+    """Raised when a filter expression is outside the supported subset."""
+
+
+def _unescape_string(raw: str) -> str:
+    """Strip quotes; unescape \\\\ and quote escapes but keep \\% / \\_ for LIKE."""
+    body = raw[1:-1]
+    out: list[str] = []
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch == "\\" and i + 1 < len(body):
+            nxt = body[i + 1]
+            if nxt in "\"'\\":
+                out.append(nxt)
+            else:
+                out.append(ch + nxt)
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _tokenize(expr: str) -> list[tuple[str, Any]]:
+    tokens: list[tuple[str, Any]] = []
+    pos = 0
+    expr = expr.strip()
+    while pos < len(expr):
+        m = _TOKEN_RE.match(expr, pos)
+        if not m or m.end() == pos:
+            raise FilterSyntaxError(f"Unexpected input at {pos}: {expr[pos:pos + 20]!r}")
+        pos = m.end()
+        if m.group("str") is not None:
+            tokens.append(("value", _unescape_string(m.group("str"))))
+        elif m.group("num") is not None:
+            text = m.group("num")
+            tokens.append(("value", float(text) if any(c in text for c in ".eE") else int(text)))
+        elif m.group("op") is not None:
+            op = m.group("op")
+            tokens.append(("op", {"&&": "and", "||": "or"}.get(op, op)))
+        else:
+            word = m.group("ident")
+            low = word.lower()
+            if low in ("true", "false"):
+                tokens.append(("value", low == "true"))
+            elif low in _KEYWORDS:
+                tokens.append(("op", low))
+            else:
+                tokens.append(("ident", word))
+    return tokens
+
+
+def _like_regex(pattern: str) -> re.Pattern:
+    out: list[str] = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        if ch == "%":
+            out.append(".*")
+        elif ch == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    return re.compile("".join(out), re.DOTALL)
+
+
+class _FilterParser:
+    """Recursive-descent parser producing a mask function over a collection's columns."""
+
+    def __init__(self, expr: str):
+        self.tokens = _tokenize(expr)
+        self.pos = 0
+
+    def parse(self):
+        if not self.tokens:
+            return None
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise FilterSyntaxError(f"Unexpected token {self.tokens[self.pos][1]!r}")
+        return node
+
+    def _peek(self) -> tuple[str, Any] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self, kind: str, value: Any = None) -> Any:
+        tok = self._peek()
+        if tok is None or tok[0] != kind or (value is not None and tok[1] != value):
+            raise FilterSyntaxError(f"Expected {value or kind}, got {tok[1] if tok else 'end'!r}")
+        self.pos += 1
+        return tok[1]
+
+    def _accept(self, kind: str, value: Any) -> bool:
+        tok = self._peek()
+        if tok is not None and tok[0] == kind and tok[1] == value:
+            self.pos += 1
+            return True
+        return False
+
+    def _or(self):
+        left = self._and()
+        while self._accept("op", "or"):
+            right = self._and()
+            left = ("or", left, right)
+        return left
+
+    def _and(self):
+        left = self._not()
+        while self._accept("op", "and"):
+            right = self._not()
+            left = ("and", left, right)
+        return left
+
+    def _not(self):
+        if self._accept("op", "not"):
+            return ("not", self._not())
+        return self._primary()
+
+    def _list(self) -> list:
+        self._take("op", "[")
+        values: list = []
+        if self._accept("op", "]"):
+            return values
+        while True:
+            values.append(self._take("value"))
+            if self._accept("op", "]"):
+                return values
+            self._take("op", ",")
+
+    def _primary(self):
+        if self._accept("op", "("):
+            node = self._or()
+            self._take("op", ")")
+            return node
+        field = self._take("ident")
+        tok = self._peek()
+        if tok is None or tok[0] != "op":
+            raise FilterSyntaxError(f"Expected operator after {field!r}")
+        op = tok[1]
+        self.pos += 1
+        if op == "(" and field.lower() in _ARRAY_FUNCTIONS:
+            func = field.lower()
+            field = self._take("ident")
+            self._take("op", ",")
+            if func == "array_contains":
+                values = [self._take("value")]
+            else:
+                values = self._list()
+            self._take("op", ")")
+            return ("array", func, field, values)
+        if op == "not":
+            self._take("op", "in")
+            return ("not", ("in", field, self._list()))
+        if op == "in":
+            return ("in", field, self._list())
+        if op == "like":
+            pattern = self._take("value")
+            if not isinstance(pattern, str):
+                raise FilterSyntaxError("LIKE requires a string pattern")
+            return ("like", field, _like_regex(pattern))
+        if op in ("==", "!=", "<", "<=", ">", ">="):
+            return ("cmp", op, field, self._take("value"))
+        raise FilterSyntaxError(f"Unsupported operator {op!r}")
+
+
+_CMP = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+
+_PY_CMP = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if left is None:
+        return False
+    try:
+        return bool(_PY_CMP[op](left, right))
+    except TypeError:
+        return False
+
+
+# --- Collection ---
+
+
+class _LocalCollection:
+    """One collection: float32 vector matrix + columnar scalar arrays."""
+
+    def __init__(self, directory: str | None, dim: int, vector_field: str):
+        self.directory = directory
+        self.dim = dim
+        self.vector_field = vector_field
+        self.count = 0
+        self._columns: dict[str, list] = {}
+        self._arrays: dict[str, np.ndarray] = {}
+        # Per list-valued field: element -> sorted row indices (built on first array_contains*)
+        self._inverted: dict[str, dict[Any, np.ndarray]] = {}
+        # Partition code per row; code -> name
+        self.partitions: list[str] = [DEFAULT_PARTITION]
+        self._partition_codes = np.zeros(0, dtype=np.int32)
+        self._inv_norms = np.zeros(0, dtype=np.float32)
+        self._lock = threading.RLock()
+        self._vectors: np.ndarray = np.zeros((0, dim), dtype=np.float32)
+        # Read-only until the first write: only an existing directory is loaded, none is created
+        if directory and os.path.isdir(directory):
+            self._load()
+
+    # Paths
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    def _rows_path(self) -> str:
+        return os.path.join(self.directory, "rows.jsonl")
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    # Persistence
+
+    def _load(self) -> None:
+        meta_path = self._meta_path()
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim = int(meta.get("dim", self.dim))
+            for name in meta.get("partitions", []):
+                if name not in self.partitions:
+                    self.partitions.append(name)
+        rows: list[dict] = []
+        if os.path.exists(self._rows_path()):
+            with open(self._rows_path(), encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        rows.append(json.loads(line))
+        capacity = max(_INITIAL_CAPACITY, len(rows))
+        vec_path = self._vectors_path()
+        if os.path.exists(vec_path):
+            on_disk = os.path.getsize(vec_path) // (4 * self.dim)
+            capacity = max(capacity, on_disk)
+        self._open_vectors(capacity)
+        codes = []
+        for row in rows:
+            codes.append(self.partition_code(row.pop(_PARTITION_KEY, DEFAULT_PARTITION)))
+            self._append_columns(row)
+        self._partition_codes = np.asarray(codes, dtype=np.int32)
+        self.count = len(rows)
+        self._recompute_norms()
+        self._write_meta()
+
+    def _open_vectors(self, capacity: int) -> None:
+        if not self.directory:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[: self.count] = self._vectors[: self.count]
+            self._vectors = grown
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        vec_path = self._vectors_path()
+        needed = capacity * self.dim * 4
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        with open(vec_path, "ab") as f:
+            if f.tell() < needed:
+                f.truncate(needed)
+        self._vectors = np.memmap(vec_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _write_meta(self) -> None:
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._meta_path(), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "vector_field": self.vector_field, "partitions": self.partitions}, f)
+
+    def _recompute_norms(self) -> None:
+        norms = np.linalg.norm(self._vectors[: self.count], axis=1)
+        with np.errstate(divide="ignore"):
+            inv = np.where(norms > 0, 1.0 / norms, 0.0)
+        self._inv_norms = inv.astype(np.float32)
+
+    # Columns
+
+    def _append_columns(self, row: dict) -> None:
+        for name in list(self._columns.keys() | row.keys()):
+            if name == self.vector_field:
+                continue
+            col = self._columns.get(name)
+            if col is None:
+                col = self._columns[name] = [None] * self.count
+            col.append(row.get(name))
+        self._arrays.clear()
+        self._inverted.clear()
+
+    def column(self, name: str) -> np.ndarray:
+        """Columnar view of a scalar field (cached until the next insert)."""
+        arr = self._arrays.get(name)
+        if arr is None:
+            values = self._columns.get(name)
+            if values is None:
+                raise FilterSyntaxError(f"Unknown field {name!r}")
+            if values and all(isinstance(v, bool) for v in values):
+                arr = np.array(values, dtype=bool)
+            elif values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                arr = np.array(values, dtype=np.float64)
+            else:
+                arr = np.empty(len(values), dtype=object)
+                arr[:] = values
+            self._arrays[name] = arr
+        return arr
+
+    def inverted(self, name: str) -> dict[Any, np.ndarray]:
+        """Element -> row indices for a list-valued field (cached until the next insert)."""
+        index = self._inverted.get(name)
+        if index is None:
+            values = self._columns.get(name)
+            if values is None:
+                raise FilterSyntaxError(f"Unknown field {name!r}")
+            rows: dict[Any, list[int]] = {}
+            for i, items in enumerate(values):
+                for item in set(items) if isinstance(items, (list, tuple)) else ():
+                    rows.setdefault(item, []).append(i)
+            index = self._inverted[name] = {k: np.asarray(v, dtype=np.int64) for k, v in rows.items()}
+        return index
+
+    # Partitions
+
+    def partition_code(self, name: str) -> int:
+        if name not in self.partitions:
+            self.partitions.append(name)
+            self._write_meta()
+        return self.partitions.index(name)
+
+    def partition_mask(self, partition_names: list[str] | None) -> np.ndarray | None:
+        if not partition_names:
+            return None
+        unknown = [n for n in partition_names if n not in self.partitions]
+        if unknown:
+            raise ValueError(f"Partition not found: {unknown}")
+        codes = [self.partitions.index(n) for n in partition_names]
+        return np.isin(self._partition_codes[: self.count], codes)
+
+    # Mutations
+
+    def insert(self, rows: list[dict], partition_name: str | None = None) -> list:
+        ids: list = []
+        with self._lock:
+            if partition_name is not None and partition_name not in self.partitions:
+                raise ValueError(f"Partition not found: {partition_name!r}")
+            code = self.partitions.index(partition_name or DEFAULT_PARTITION)
+            if self.count + len(rows) > self._vectors.shape[0]:
+                capacity = max(self._vectors.shape[0] * 2, self.count + len(rows), _INITIAL_CAPACITY)
+                self._open_vectors(capacity)
+            new_inv = np.empty(len(rows), dtype=np.float32)
+            for i, row in enumerate(rows):
+                vec = np.asarray(row.get(self.vector_field), dtype=np.float32)
+                if vec.shape != (self.dim,):
+                    raise ValueError(f"{self.vector_field} must have dim {self.dim}, got {vec.shape}")
+                self._vectors[self.count + i] = vec
+                norm = float(np.linalg.norm(vec))
+                new_inv[i] = 1.0 / norm if norm > 0 else 0.0
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            scalars = [{k: v for k, v in row.items() if k != self.vector_field} for row in rows]
+            if self.directory:
+                with open(self._rows_path(), "a", encoding="utf-8") as f:
+                    for row in scalars:
+                        f.write(json.dumps({**row, _PARTITION_KEY: self.partitions[code]} if code else row) + "\n")
+            for row in scalars:
+                self._append_columns(row)
+                ids.append(row.get(PRIMARY_KEY))
+            self.count += len(rows)
+            self._inv_norms = np.concatenate([self._inv_norms, new_inv])
+            self._partition_codes = np.concatenate([self._partition_codes, np.full(len(rows), code, dtype=np.int32)])
+        return ids
+
+    # Reads
+
+    def mask(self, expr: str | None, partition_names: list[str] | None = None) -> np.ndarray:
+        node = _FilterParser(expr or "").parse()
+        out = np.ones(self.count, dtype=bool) if node is None else self._eval(node)
+        in_partitions = self.partition_mask(partition_names)
+        return out if in_partitions is None else out & in_partitions
+
+    def _eval(self, node) -> np.ndarray:
+        kind = node[0]
+        if kind == "and":
+            return self._eval(node[1]) & self._eval(node[2])
+        if kind == "or":
+            return self._eval(node[1]) | self._eval(node[2])
+        if kind == "not":
+            return ~self._eval(node[1])
+        if kind == "cmp":
+            _, op, field, value = node
+            col = self.column(field)
+            if col.dtype != object and not isinstance(value, str):
+                return _CMP[op](col, value)
+            return np.fromiter(
+                (_compare(op, v, value) for v in col),
+                dtype=bool,
+                count=len(col),
+            )
+        if kind == "in":
+            _, field, values = node
+            col = self.column(field)
+            if col.dtype != object and not any(isinstance(v, str) for v in values):
+                return np.isin(col, values)
+            wanted = set(values)
+            return np.fromiter((v in wanted for v in col), dtype=bool, count=len(col))
+        if kind == "array":
+            _, func, field, values = node
+            index = self.inverted(field)
+            out = np.zeros(self.count, dtype=bool)
+            if func == "array_contains_all":
+                out[:] = bool(values)
+                for v in values:
+                    hit = np.zeros(self.count, dtype=bool)
+                    hit[index.get(v, np.empty(0, dtype=np.int64))] = True
+                    out &= hit
+                return out
+            for v in values:
+                out[index.get(v, np.empty(0, dtype=np.int64))] = True
+            return out
+        if kind == "like":
+            _, field, regex = node
+            col = self.column(field)
+            return np.fromiter(
+                (isinstance(v, str) and regex.fullmatch(v) is not None for v in col),
+                dtype=bool,
+                count=len(col),
+            )
+        raise FilterSyntaxError(f"Unsupported node {kind!r}")
+
+    def row(self, idx: int, output_fields: list[str] | None) -> dict:
+        names = self._resolve_fields(output_fields)
+        ids = self._columns.get(PRIMARY_KEY)
+        out: dict[str, Any] = {PRIMARY_KEY: ids[idx] if ids is not None else None}
+        for name in names:
+            if name == self.vector_field:
+                out[name] = self._vectors[idx].tolist()
+            elif name in self._columns:
+                out[name] = self._columns[name][idx]
+        return out
+
+    def _resolve_fields(self, output_fields: list[str] | None) -> list[str]:
+        if not output_fields:
+            return []
+        if "*" in output_fields:
+            # Like Milvus, "*" includes the vector field
+            return [n for n in self._columns if n != PRIMARY_KEY] + [self.vector_field]
+        return [n for n in output_fields if n != PRIMARY_KEY]
+
+    def top_k(
+        self,
+        queries: np.ndarray,
+        mask: np.ndarray,
+        k: int,
+        *,
+        radius: float | None = None,
+        range_filter: float | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Exact top-k by cosine similarity; returns (row_indices, similarities) per query.
+
+        radius / range_filter implement Milvus COSINE range search (``radius < score <= range_filter``).
+        """
+        if radius is not None and range_filter is not None and range_filter <= radius:
+            raise ValueError(f"range_filter ({range_filter}) must be greater than radius ({radius}) for COSINE")
+        n = self.count
+        q_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        q_norms[q_norms == 0] = 1.0
+        q = (queries / q_norms).astype(np.float32)
+        best_idx = [np.empty(0, dtype=np.int64) for _ in range(len(q))]
+        best_sim = [np.empty(0, dtype=np.float32) for _ in range(len(q))]
+        selected = np.flatnonzero(mask)
+        gather = len(selected) < _GATHER_FRACTION * n
+        step = _GATHER_CHUNK_ROWS if gather else _SEARCH_CHUNK_ROWS
+        for start in range(0, len(selected) if gather else n, step):
+            if gather:
+                # Narrow search (few partitions / selective filter): score only the selected rows
+                rows = selected[start : start + step]
+                sims = (q @ self._vectors[rows].T) * self._inv_norms[rows]
+            else:
+                stop = min(n, start + _SEARCH_CHUNK_ROWS)
+                chunk_mask = mask[start:stop]
+                if not chunk_mask.any():
+                    continue
+                rows = np.arange(start, stop)
+                sims = (q @ self._vectors[start:stop].T) * self._inv_norms[start:stop]
+                sims[:, ~chunk_mask] = -np.inf
+            if radius is not None:
+                sims[sims <= np.float32(radius)] = -np.inf
+            if range_filter is not None:
+                sims[sims > np.float32(range_filter)] = -np.inf
+            for qi in range(len(q)):
+                row = sims[qi]
+                kk = min(k, int(np.isfinite(row).sum()))
+                if kk == 0:
+                    continue
+                part = np.argpartition(-row, kk - 1)[:kk] if kk < len(row) else np.arange(len(row))
+                part = part[np.isfinite(row[part])]
+                cand_idx = np.concatenate([best_idx[qi], rows[part]])
+                cand_sim = np.concatenate([best_sim[qi], row[part]])
+                order = np.argsort(-cand_sim, kind="stable")[:k]
+                best_idx[qi] = cand_idx[order]
+                best_sim[qi] = cand_sim[order]
+        return list(zip(best_idx, best_sim))
+
+
+# --- Client ---
+
+
+class _QueryIterator:
+    def __init__(self, coll: _LocalCollection, idx: np.ndarray, batch_size: int, output_fields: list[str] | None):
+        self._coll = coll
+        self._idx = idx
+        self._batch_size = max(1, batch_size)
+        self._output_fields = output_fields
+        self._pos = 0
+
+    def next(self) -> list[dict]:
+        batch = self._idx[self._pos : self._pos + self._batch_size]
+        self._pos += len(batch)
+        with self._coll._lock:
+            return [self._coll.row(int(i), self._output_fields) for i in batch]
+
+    def close(self) -> None:
+        self._pos = len(self._idx)
+
+
+class LocalMilvusClient:
+    """Drop-in stand-in for ``pymilvus.MilvusClient`` backed by local NumPy arrays."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        dim: int = DEFAULT_DIM,
+        vector_field: str = DEFAULT_VECTOR_FIELD,
+        must_exist: bool = False,
+    ):
+        """
+        Open the store at `path` (None = in memory only). A missing `path` raises FileNotFoundError
+        with must_exist=True (serving, benchmarks); otherwise it is created by the first write.
+        """
+        self.path = path
+        self.dim = dim
+        self.vector_field = vector_field
+        self._collections: dict[str, _LocalCollection] = {}
+        self._lock = threading.Lock()
+        if path and os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.isdir(os.path.join(path, name)):
+                    self._collection(name)
+        elif path and must_exist:
+            raise FileNotFoundError(f"No local vector store at {path}")
+        elif path:
+            logger.warning("No local vector store at %s yet; it is created on the first write", path)
+
+    def _collection(self, collection_name: str) -> _LocalCollection:
+        with self._lock:
+            coll = self._collections.get(collection_name)
+            if coll is None:
+                directory = os.path.join(self.path, collection_name) if self.path else None
+                coll = _LocalCollection(directory, self.dim, self.vector_field)
+                self._collections[collection_name] = coll
+            return coll
+
+    def has_collection(self, collection_name: str, **kwargs) -> bool:
+        return collection_name in self._collections
+
+    def describe_collection(self, collection_name: str, **kwargs) -> dict:
+        """Schema as MilvusClient reports it (names and coarse types; the local store is schemaless)."""
+        coll = self._collection(collection_name)
+        with coll._lock:
+            fields = [{"name": PRIMARY_KEY, "type": "INT64", "is_primary": True}]
+            for name, values in coll._columns.items():
+                if name == PRIMARY_KEY:
+                    continue
+                sample = next((v for v in values if v is not None), None)
+                kind = "ARRAY" if isinstance(sample, (list, tuple)) else type(sample).__name__.upper()
+                fields.append({"name": name, "type": kind})
+            fields.append({"name": coll.vector_field, "type": "FLOAT_VECTOR", "params": {"dim": coll.dim}})
+        return {"collection_name": collection_name, "fields": fields}
+
+    def get_load_state(self, collection_name: str, **kwargs) -> dict:
+        # Collections are created on first insert and always resident.
+        return {"state": "Loaded"}
+
+    def create_partition(self, collection_name: str, partition_name: str, **kwargs) -> None:
+        coll = self._collection(collection_name)
+        with coll._lock:
+            coll.partition_code(partition_name)
+
+    def has_partition(self, collection_name: str, partition_name: str, **kwargs) -> bool:
+        return collection_name in self._collections and partition_name in self._collections[collection_name].partitions
+
+    def list_partitions(self, collection_name: str, **kwargs) -> list[str]:
+        return list(self._collection(collection_name).partitions)
+
+    def insert(
+        self, collection_name: str, data: dict | list[dict], partition_name: str | None = None, **kwargs
+    ) -> dict:
+        rows = [data] if isinstance(data, dict) else list(data)
+        ids = self._collection(collection_name).insert(rows, partition_name=partition_name)
+        return {"insert_count": len(ids), "ids": ids}
+
+    def query(
+        self,
+        collection_name: str,
+        filter: str = "",
+        output_fields: list[str] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        partition_names: list[str] | None = None,
+        **kwargs,
+    ) -> list[dict]:
+        coll = self._collection(collection_name)
+        with coll._lock:
+            idx = np.flatnonzero(coll.mask(filter, partition_names))
+            idx = idx[offset:]
+            if limit is not None and limit >= 0:
+                idx = idx[:limit]
+            return [coll.row(int(i), output_fields) for i in idx]
+
+    def query_iterator(
+        self,
+        collection_name: str,
+        batch_size: int = 1000,
+        limit: int = -1,
+        filter: str = "",
+        output_fields: list[str] | None = None,
+        partition_names: list[str] | None = None,
+        **kwargs,
+    ) -> "_QueryIterator":
+        """Batched walk over matching rows (MilvusClient.query_iterator shape: next() until empty, close())."""
+        coll = self._collection(collection_name)
+        with coll._lock:
+            idx = np.flatnonzero(coll.mask(filter, partition_names))
+        if limit is not None and limit >= 0:
+            idx = idx[:limit]
+        return _QueryIterator(coll, idx, batch_size, output_fields)
+
+    def search(
+        self,
+        collection_name: str,
+        data: list[list[float]] | None = None,
+        filter: str = "",
+        limit: int = 10,
+        output_fields: list[str] | None = None,
+        search_params: dict | None = None,
+        partition_names: list[str] | None = None,
+        **kwargs,
+    ) -> list[list[dict]]:
+        coll = self._collection(collection_name)
+        if not data:
+            return []
+        queries = np.asarray(data, dtype=np.float32).reshape(len(data), -1)
+        with coll._lock:
+            if coll.count == 0:
+                return [[] for _ in range(len(queries))]
+            mask = coll.mask(filter, partition_names)
+            params = (search_params or {}).get("params") or {}
+            results: list[list[dict]] = []
+            ranked = coll.top_k(
+                queries,
+                mask,
+                limit,
+                radius=params.get("radius"),
+                range_filter=params.get("range_filter"),
+            )
+            for idx, scores in ranked:
+                hits = []
+                for i, score in zip(idx, scores):
+                    row = coll.row(int(i), output_fields)
+                    pk = row.pop(PRIMARY_KEY)
+                    hits.append({"id": pk, "distance": float(score), "entity": row})
+                results.append(hits)
+            return results
+
+    def flush(self, collection_name: str, **kwargs) -> None:
+        coll = self._collections.get(collection_name)
+        if coll is not None and isinstance(coll._vectors, np.memmap):
+            coll._vectors.flush()
+
+    def num_entities(self, collection_name: str) -> int:
+        coll = self._collections.get(collection_name)
+        return coll.count if coll else 0
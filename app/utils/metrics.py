@@ -0,0 +1,253 @@
+"""Minimal Prometheus-style metrics (counters, gauges, histograms) rendered at GET /metrics.
+
+No client library: each series is a dict keyed by label values behind one lock, and a
+histogram observation is a bisect + two additions, so collection stays on at full load.
+
+Series:
+- ``http_request_duration_seconds{route,tier}`` — tier is 1/2/3 for POST /recommend, "none" elsewhere
+- ``http_requests_total{route,status}``
+- ``dependency_call_duration_seconds{dependency,operation}`` / ``dependency_call_errors_total{...}``
+  for zilliz (query/search/insert), embedding_api (embed) and open_library (work/author/search)
+- ``cache_requests_total{cache,result}`` plus a derived ``cache_hit_ratio{cache}``
+- ``background_write_queue_depth`` — Tier 2 write-backs scheduled but not yet finished
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Seconds; spans in-process cache hits through HF cold starts.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[idx] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines: list[str] = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(cumulative)}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template and recommendation tier.",
+    ("route", "tier"),
+)
+REQUESTS_TOTAL = Counter("http_requests_total", "Requests by route template and status code.", ("route", "status"))
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_call_duration_seconds",
+    "Latency of calls to Zilliz, the embedding API and Open Library.",
+    ("dependency", "operation"),
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_call_errors_total",
+    "Failed calls (exception, timeout or non-200) per dependency operation.",
+    ("dependency", "operation"),
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result"))
+BACKGROUND_WRITE_QUEUE = Gauge("background_write_queue_depth", "Tier 2 Zilliz write-backs scheduled but not finished.")
+
+_REGISTRY: list[_Metric] = [
+    REQUEST_LATENCY,
+    REQUESTS_TOTAL,
+    DEPENDENCY_LATENCY,
+    DEPENDENCY_ERRORS,
+    CACHE_REQUESTS,
+    BACKGROUND_WRITE_QUEUE,
+]
+
+
+def register(metric: _Metric) -> _Metric:
+    """Add a module-level metric to the /metrics output."""
+    _REGISTRY.append(metric)
+    return metric
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """Time a dependency call; exceptions count as errors and propagate."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS.inc(dependency=dependency, operation=operation)
+        raise
+    finally:
+        DEPENDENCY_LATENCY.observe(time.perf_counter() - start, dependency=dependency, operation=operation)
+
+
+def record_dependency_error(dependency: str, operation: str) -> None:
+    """Count a failure that did not raise (e.g. a non-200 response)."""
+    DEPENDENCY_ERRORS.inc(dependency=dependency, operation=operation)
+
+
+def _cache_ratio_lines() -> list[str]:
+    with CACHE_REQUESTS._lock:
+        values = dict(CACHE_REQUESTS._values)
+    caches = sorted({k[0] for k in values})
+    lines = ["# HELP cache_hit_ratio Hits / lookups per cache since process start.", "# TYPE cache_hit_ratio gauge"]
+    for cache in caches:
+        hits = values.get((cache, "hit"), 0.0)
+        total = hits + values.get((cache, "miss"), 0.0)
+        ratio = hits / total if total else 0.0
+        lines.append(f'cache_hit_ratio{{cache="{_escape(cache)}"}} {_format_value(ratio)}')
+    return lines
+
+
+def render_prometheus() -> str:
+    lines: list[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_cache_ratio_lines())
+    return "\n".join(lines) + "\n"
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of an ascending list; shared by the benchmark jobs."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class InstrumentedVectorClient:
+    """Wrap a MilvusClient (or LocalMilvusClient) so query/search/insert feed dependency metrics."""
+
+    _TRACKED = frozenset({"query", "search", "insert"})
+
+    def __init__(self, client, dependency: str = "zilliz"):
+        self._client = client
+        self._dependency = dependency
+
+    @property
+    def wrapped(self):
+        return self._client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name not in self._TRACKED or not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            with track_dependency(self._dependency, name):
+                return attr(*args, **kwargs)
+
+        return timed
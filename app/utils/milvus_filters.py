@@ -0,0 +1,80 @@
+"""Safe construction of Milvus boolean filter expressions from request values.
+
+All user-supplied strings go through ``escape_filter_string`` (the escaping /recommend has always
+applied to work_key) or ``escape_like_pattern`` (adds ``%`` escaping for LIKE), so request data can
+never terminate a string literal or inject operators.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Iterable, Optional
+
+
+def escape_filter_string(value: str) -> str:
+    """Escape a value for use inside a double-quoted Milvus string literal."""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def escape_like_pattern(value: str) -> str:
+    """Escape a value for use inside ``like "%...%"`` (literal %, quotes and backslashes)."""
+    return escape_filter_string(value).replace("%", "\\%")
+
+
+def string_list_literal(values: Iterable[str]) -> str:
+    """``["a", "b"]`` with each element escaped."""
+    return "[" + ", ".join(f'"{escape_filter_string(v)}"' for v in values) + "]"
+
+
+def id_list_literal(values: Iterable) -> str:
+    """Primary-key list literal (ints stay bare, strings are quoted)."""
+    return json.dumps([v if isinstance(v, int) else str(v) for v in values])
+
+
+def array_contains_any(field: str, values: Iterable[str]) -> str:
+    """``array_contains_any(field, [...])``: rows whose ARRAY field holds at least one value (uses its scalar index)."""
+    return f"array_contains_any({field}, {string_list_literal(values)})"
+
+
+def array_contains_all(field: str, values: Iterable[str]) -> str:
+    """``array_contains_all(field, [...])``: rows whose ARRAY field holds every value."""
+    return f"array_contains_all({field}, {string_list_literal(values)})"
+
+
+def and_filters(*parts: Optional[str]) -> str:
+    """Join non-empty expressions with ``and``; each part is parenthesized."""
+    present = [p for p in parts if p]
+    if len(present) == 1:
+        return present[0]
+    return " and ".join(f"({p})" for p in present)
+
+
+def build_constraint_filter(
+    *,
+    exclude_authors: Iterable[str] = (),
+    min_avg_rating: Optional[float] = None,
+    min_shelf_count: Optional[int] = None,
+    require_subjects: Iterable[str] = (),
+    subject_tags_field: Optional[str] = None,
+) -> str:
+    """
+    Compile optional recommendation constraints into one filter expression ("" when unconstrained).
+
+    require_subjects: every listed subject must appear in the subjects CSV (substring match), or,
+    with ``subject_tags_field``, in that ARRAY field (exact match on already-normalized tags).
+    """
+    parts: list[str] = []
+    authors = [a.strip() for a in exclude_authors if a and a.strip()]
+    if authors:
+        parts.append(f"author_name not in {string_list_literal(authors)}")
+    if min_avg_rating is not None:
+        parts.append(f"has_rating == true and avg_rating >= {float(min_avg_rating)}")
+    if min_shelf_count is not None:
+        parts.append(f"total_shelf_count >= {int(min_shelf_count)}")
+    required = [s.strip() for s in require_subjects if s and s.strip()]
+    if required and subject_tags_field:
+        parts.append(array_contains_all(subject_tags_field, required))
+    else:
+        for subject in required:
+            parts.append(f'subjects like "%{escape_like_pattern(subject)}%"')
+    return and_filters(*parts)
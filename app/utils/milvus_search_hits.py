@@ -26,6 +26,12 @@ def normalize_open_library_work_id(work_key: object) -> str | None:
     return m.group(0).upper() if m else None
 
 
+def open_library_work_number(work_key: object) -> int | None:
+    """OL123W / /works/OL123W -> 123 (None if not an Open Library work key)."""
+    work_id = normalize_open_library_work_id(work_key)
+    return int(work_id[2:-1]) if work_id else None
+
+
 def same_open_library_work(a: object, b: object) -> bool:
     """True if both refer to the same Open Library work (OL…W), tolerant of /works/ prefix."""
     ta = normalize_open_library_work_id(a)
@@ -72,8 +78,8 @@ def search_hit_entity_dict(hit: object) -> dict | None:
     return sanitize_numpy_scalars(merged)
 
 
-def search_hit_distance(hit: object) -> float | None:
-    """Milvus search hit: lower COSINE distance = closer match."""
+def search_hit_score(hit: object) -> float | None:
+    """Raw Milvus score of a hit: with the COSINE metric, the cosine similarity (higher = closer)."""
     if isinstance(hit, dict):
         d = hit.get("distance")
     else:
@@ -81,3 +87,9 @@ def search_hit_distance(hit: object) -> float | None:
     if isinstance(d, (int, float)):
         return float(d)
     return None
+
+
+def search_hit_distance(hit: object) -> float | None:
+    """COSINE distance of a hit in the repo convention: 1 − similarity, lower = closer match."""
+    score = search_hit_score(hit)
+    return None if score is None else 1.0 - score
@@ -0,0 +1,78 @@
+"""Opaque page cursors for POST /recommend ("load more" past the first page).
+
+A cursor records how to rebuild the seed vector (work_key, plus a digest of the Tier 2 query text
+when the seed was embedded on the fly) and where the previous page stopped: the last raw Milvus
+score served and the ids already returned at exactly that score (ties). The next page is a range
+search starting at that score with the tie ids excluded, so earlier pages are never recomputed.
+
+Milvus reports the COSINE similarity as the score (higher = closer) and its range search keeps
+``radius < score <= range_filter``, so the next page is ``MIN_COSINE_SCORE < score <= last_score``.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Exclusive lower bound below every cosine similarity (-1 is the minimum)
+MIN_COSINE_SCORE = -1.01
+_VERSION = 2
+
+
+@dataclass
+class PageCursor:
+    work_key: str
+    last_score: float
+    boundary_ids: list = field(default_factory=list)
+    served: int = 0
+    query_digest: Optional[str] = None
+
+
+def encode_cursor(cursor: PageCursor) -> str:
+    payload = {
+        "v": _VERSION,
+        "wk": cursor.work_key,
+        "s": cursor.last_score,
+        "x": cursor.boundary_ids,
+        "n": cursor.served,
+    }
+    if cursor.query_digest:
+        payload["q"] = cursor.query_digest
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> PageCursor:
+    """Parse a cursor from encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(payload, dict) or payload.get("v") != _VERSION:
+        raise ValueError("Unsupported cursor version")
+    try:
+        boundary = payload.get("x") or []
+        if not isinstance(boundary, list) or not all(isinstance(i, (int, str)) for i in boundary):
+            raise ValueError("Malformed cursor boundary")
+        return PageCursor(
+            work_key=str(payload["wk"]),
+            last_score=float(payload["s"]),
+            boundary_ids=boundary,
+            served=int(payload.get("n") or 0),
+            query_digest=payload.get("q"),
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+
+
+def range_search_params(last_score: float) -> dict:
+    """Milvus COSINE range-search params resuming at `last_score` (inclusive, ties removed by id filter)."""
+    return {"params": {"radius": MIN_COSINE_SCORE, "range_filter": float(last_score)}}
+
+
+def overfetch_limit(page_size: int) -> int:
+    """Hits to request for a full page: the seed itself plus a small margin for duplicate works."""
+    return page_size + 1 + max(2, page_size // 10)
@@ -0,0 +1,99 @@
+"""Opt-in cProfile capture of single requests, written to disk for offline analysis.
+
+Triggers (all off unless PROFILE_DIR is set):
+- ``X-Profile: 1`` request header (requires PROFILE_ALLOW_HEADER=1)
+- latency threshold: PROFILE_SLOW_MS with PROFILE_SAMPLE_RATE (0–1) of requests profiled
+  speculatively; the profile is kept only if the request took at least PROFILE_SLOW_MS
+
+cProfile hooks the event-loop thread, so a profile also contains any other coroutines that
+ran during the request; only one request is profiled at a time to keep that bounded.
+Inspect dumps with ``python -m pstats <file>`` or snakeviz.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_PROFILE_LOCK = threading.Lock()
+_FILENAME_SAFE = re.compile(r"[^A-Za-z0-9_\-]+")
+
+
+def _profile_dir() -> Optional[str]:
+    return os.getenv("PROFILE_DIR", "").strip() or None
+
+
+def _slow_ms() -> Optional[float]:
+    raw = os.getenv("PROFILE_SLOW_MS", "").strip()
+    return float(raw) if raw else None
+
+
+def _sample_rate() -> float:
+    return float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+
+
+class RequestProfile:
+    """A running profile for one request; call ``finish`` once the response is ready."""
+
+    def __init__(self, forced: bool):
+        self.forced = forced
+        self.profiler = cProfile.Profile()
+
+    def start(self) -> bool:
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Another profiler/tracer is active in this thread (e.g. a debugger).
+            return False
+        return True
+
+    async def finish(self, route: str, elapsed_ms: float) -> Optional[str]:
+        """
+        Stop profiling; dump to disk when forced or slow. Returns the file path or None. The dump
+        runs in the default executor so it does not stall the event loop for other requests.
+        """
+        try:
+            self.profiler.disable()
+        finally:
+            _PROFILE_LOCK.release()
+        slow = _slow_ms()
+        if not self.forced and (slow is None or elapsed_ms < slow):
+            return None
+        directory = _profile_dir()
+        if not directory:
+            return None
+        name = _FILENAME_SAFE.sub("_", route).strip("_") or "root"
+        path = os.path.join(directory, f"{int(time.time() * 1000)}_{name}_{elapsed_ms:.0f}ms.prof")
+        await asyncio.get_running_loop().run_in_executor(None, self._dump, directory, path)
+        logger.info("Request profile written: %s", path)
+        return path
+
+    def _dump(self, directory: str, path: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.profiler.dump_stats(path)
+
+
+def maybe_start_profile(headers) -> Optional[RequestProfile]:
+    """Start a profile if this request is selected; None otherwise (the common, free path)."""
+    if not _profile_dir():
+        return None
+    forced = os.getenv("PROFILE_ALLOW_HEADER") == "1" and headers.get("x-profile") == "1"
+    sampled = _slow_ms() is not None and random.random() < _sample_rate()
+    if not (forced or sampled):
+        return None
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        return None
+    profile = RequestProfile(forced=forced)
+    if not profile.start():
+        _PROFILE_LOCK.release()
+        return None
+    return profile
@@ -0,0 +1,72 @@
+"""Per-request stage timing, emitted as a ``Server-Timing`` header and one structured log line.
+
+The HTTP middleware in main.py calls ``begin_request()``; route code wraps stages with
+``with stage("search"):``. Repeated stages (e.g. one explanation per hit) accumulate into
+a single entry. Outside a request ``stage`` is a no-op, so services can be instrumented freely.
+
+Cost per stage is two ``perf_counter`` calls and a dict update.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_TOKEN_SAFE = re.compile(r"[^A-Za-z0-9_\-]")
+
+
+class RequestTimings:
+    """Accumulated milliseconds per stage, in first-seen order."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000.0
+
+    def header_value(self) -> str:
+        parts = [f"{_TOKEN_SAFE.sub('_', name)};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+    def as_log_fields(self) -> dict:
+        return {
+            "total_ms": round(self.total_ms(), 1),
+            "stages_ms": {name: round(ms, 1) for name, ms in self.stages.items()},
+            "stage_counts": {name: n for name, n in self.counts.items() if n > 1},
+        }
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000.0)
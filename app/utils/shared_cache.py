@@ -0,0 +1,229 @@
+"""Cross-worker cache in an mmap'd file: one warm cache per host instead of one per uvicorn worker.
+
+Enabled by SHARED_CACHE_PATH (put it on tmpfs, e.g. /dev/shm/recsrv-cache). Every worker maps the
+same file. The file is sparse, so resident memory grows with the entries actually written (the
+working set), not with the configured capacity or the worker count.
+
+Layout: a 4 KiB header, then SHARED_CACHE_SLOTS fixed-size slots of SHARED_CACHE_SLOT_BYTES. A key
+hashes to an aligned group of _PROBE slots (open addressing within the group).
+
+- Reads are lock-free: each slot carries a seqlock counter (odd while a write is in progress); a
+  reader retries if the counter changed or was odd, then verifies the stored key bytes.
+- Writes take one striped lock: an fcntl byte-range lock in the header (across processes) plus a
+  threading lock (fcntl locks do not exclude threads of the same process). On platforms without
+  fcntl only the threading lock is used.
+- Replacement within a group: same key, else empty/expired slot, else the slot expiring soonest.
+  Values that don't fit in a slot are simply not cached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: per-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"RSC1"
+_HEADER_BYTES = 4096
+_HEADER = struct.Struct("<4sIII")  # magic, n_slots, slot_bytes, n_stripes
+_LOCK_REGION = 64  # stripe lock bytes start here (fcntl locks need no data, only offsets)
+_SLOT = struct.Struct("<IQdII")  # seq, key_hash, expires_at, key_len, value_len
+_SLOT_HEADER_BYTES = 32
+_PROBE = 8
+_READ_RETRIES = 4
+
+DEFAULT_SLOTS = 16_384
+DEFAULT_SLOT_BYTES = 32 * 1024
+DEFAULT_STRIPES = 64
+
+
+def _key_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class SharedCache:
+    """Fixed-slot hash table in a shared mmap. Keys are str, values are bytes."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        n_slots: int = DEFAULT_SLOTS,
+        slot_bytes: int = DEFAULT_SLOT_BYTES,
+        n_stripes: int = DEFAULT_STRIPES,
+    ):
+        n_slots = max(_PROBE, n_slots - n_slots % _PROBE)
+        n_stripes = max(1, min(n_stripes, _HEADER_BYTES - _LOCK_REGION))
+        self.path = path
+        size = _HEADER_BYTES + n_slots * slot_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._init_file(size, n_slots, slot_bytes, n_stripes)
+        self._mm = mmap.mmap(self._fd, size)
+        magic, self.n_slots, self.slot_bytes, self.n_stripes = _HEADER.unpack_from(self._mm, 0)
+        self._groups = self.n_slots // _PROBE
+        self._thread_locks = [threading.Lock() for _ in range(self.n_stripes)]
+
+    def _init_file(self, size: int, n_slots: int, slot_bytes: int, n_stripes: int) -> None:
+        """First worker creates the (sparse) file and header; others reuse it if the geometry matches."""
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0) if hasattr(os, "pread") else b""
+            expected = _HEADER.pack(_MAGIC, n_slots, slot_bytes, n_stripes)
+            if header != expected or os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, expected)
+        finally:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    # Slots
+
+    def _slot_offset(self, slot: int) -> int:
+        return _HEADER_BYTES + slot * self.slot_bytes
+
+    def _group(self, key_hash: int) -> int:
+        return key_hash % self._groups
+
+    @contextmanager
+    def _stripe_lock(self, group: int) -> Iterator[None]:
+        stripe = group % self.n_stripes
+        with self._thread_locks[stripe]:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, _LOCK_REGION + stripe)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, _LOCK_REGION + stripe)
+
+    def _read_slot(self, slot: int, key: bytes, key_hash: int, now: float) -> Optional[bytes]:
+        off = self._slot_offset(slot)
+        for _ in range(_READ_RETRIES):
+            seq, h, expires_at, key_len, value_len = _SLOT.unpack_from(self._mm, off)
+            if seq & 1:
+                continue
+            if h != key_hash or expires_at <= now or key_len != len(key):
+                return None
+            data_off = off + _SLOT_HEADER_BYTES
+            stored_key = self._mm[data_off : data_off + key_len]
+            value = self._mm[data_off + key_len : data_off + key_len + value_len]
+            if _SLOT.unpack_from(self._mm, off)[0] != seq:
+                continue  # torn read: a writer got in between
+            return value if stored_key == key else None
+        return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        kb = key.encode("utf-8")
+        h = _key_hash(kb)
+        base = self._group(h) * _PROBE
+        now = time.time()
+        for slot in range(base, base + _PROBE):
+            value = self._read_slot(slot, kb, h, now)
+            if value is not None:
+                return value
+        return None
+
+    def set(self, key: str, value: bytes, ttl_s: float) -> bool:
+        """Store `value` for `ttl_s` seconds. Returns False if it does not fit in a slot."""
+        kb = key.encode("utf-8")
+        if _SLOT_HEADER_BYTES + len(kb) + len(value) > self.slot_bytes:
+            return False
+        h = _key_hash(kb)
+        group = self._group(h)
+        base = group * _PROBE
+        now = time.time()
+        with self._stripe_lock(group):
+            target = None
+            soonest = None
+            for slot in range(base, base + _PROBE):
+                off = self._slot_offset(slot)
+                _, sh, expires_at, key_len, _ = _SLOT.unpack_from(self._mm, off)
+                if sh == h and key_len == len(kb):
+                    stored = self._mm[off + _SLOT_HEADER_BYTES : off + _SLOT_HEADER_BYTES + key_len]
+                    if stored == kb:
+                        target = slot
+                        break
+                if target is None and expires_at <= now:
+                    target = slot
+                if soonest is None or expires_at < soonest[1]:
+                    soonest = (slot, expires_at)
+            if target is None:
+                target = soonest[0]
+            off = self._slot_offset(target)
+            seq = _SLOT.unpack_from(self._mm, off)[0]
+            struct.pack_into("<I", self._mm, off, seq + 1)  # odd: write in progress
+            data_off = off + _SLOT_HEADER_BYTES
+            self._mm[data_off : data_off + len(kb)] = kb
+            self._mm[data_off + len(kb) : data_off + len(kb) + len(value)] = value
+            _SLOT.pack_into(self._mm, off, seq + 1, h, now + ttl_s, len(kb), len(value))
+            struct.pack_into("<I", self._mm, off, (seq + 2) & 0xFFFFFFFF)
+        return True
+
+    # Typed helpers
+
+    def get_json(self, key: str) -> Any:
+        raw = self.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set_json(self, key: str, value: Any, ttl_s: float) -> bool:
+        return self.set(key, json.dumps(value, separators=(",", ":")).encode("utf-8"), ttl_s)
+
+    def get_vector(self, key: str) -> Optional[list[float]]:
+        raw = self.get(key)
+        if raw is None:
+            return None
+        vec = array("f")
+        vec.frombytes(raw)
+        return vec.tolist()
+
+    def set_vector(self, key: str, vector: list[float], ttl_s: float) -> bool:
+        return self.set(key, array("f", vector).tobytes(), ttl_s)
+
+
+_cache: Optional[SharedCache] = None
+_cache_lock = threading.Lock()
+_cache_failed = False
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Process-wide SharedCache from SHARED_CACHE_PATH, or None when unset or the file can't be mapped."""
+    global _cache, _cache_failed
+    if _cache is not None or _cache_failed:
+        return _cache
+    path = os.getenv("SHARED_CACHE_PATH", "").strip()
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            try:
+                _cache = SharedCache(
+                    path,
+                    n_slots=int(os.getenv("SHARED_CACHE_SLOTS", DEFAULT_SLOTS)),
+                    slot_bytes=int(os.getenv("SHARED_CACHE_SLOT_BYTES", DEFAULT_SLOT_BYTES)),
+                )
+                logger.info("Shared cache mapped at %s (%s slots)", path, _cache.n_slots)
+            except OSError as e:
+                _cache_failed = True
+                logger.warning("Shared cache disabled (%s): %s", path, e)
+    return _cache
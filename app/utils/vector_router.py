@@ -0,0 +1,266 @@
+"""Read/write routing across several Zilliz endpoints: one primary for writes, read replicas for reads.
+
+``ZILLIZ_ENDPOINT`` stays the primary; ``ZILLIZ_REPLICA_ENDPOINTS`` (comma-separated, token
+``ZILLIZ_REPLICA_API_KEY`` or else ``ZILLIZ_API_KEY``) adds read replicas, e.g. clusters in other
+regions kept in sync by Zilliz replication. ``VectorRouter`` is MilvusClient-shaped, so the routes
+keep calling ``client.search(...)`` / ``client.insert(...)``:
+
+- Writes (``insert``, ``upsert``, ``delete`` and any method not listed in READ_METHODS) go to the
+  primary only and are never failed over: a write landing on a replica would diverge from it.
+- Reads go to the eligible endpoint (connected, circuit breaker allowing) with the lowest EWMA
+  latency of its recent reads; ``ZILLIZ_EXPLORE_FRACTION`` of reads try another eligible one so the
+  estimates stay current. A read that fails is retried on the next endpoint while the request
+  deadline has time left. Caller errors (bad filter, bad arguments, pymilvus ``ParamError`` or a
+  server "invalid parameter" status) are not retried and do not count against the breaker.
+- ``health_loop`` probes every endpoint (``get_load_state``) every ``ZILLIZ_HEALTH_INTERVAL_SEC``,
+  connecting ones that were down at startup and closing or opening their breakers.
+
+Replicas lag the primary: a Tier 2 write-back is only visible to reads served by the primary until
+it has replicated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.deadline import remaining_s
+from app.utils.metrics import Counter, Gauge, register
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+READ_METHODS = frozenset(
+    {
+        "query",
+        "search",
+        "hybrid_search",
+        "get",
+        "query_iterator",
+        "describe_collection",
+        "has_collection",
+        "list_collections",
+        "get_load_state",
+        "has_partition",
+        "list_partitions",
+        "list_indexes",
+        "describe_index",
+    }
+)
+# Raised for the caller's own mistakes; another endpoint would reject the call the same way
+_CALLER_ERRORS = (ValueError, TypeError, KeyError)
+# Milvus status codes for a malformed request: parameter invalid / missing / too large (bad expr, top_k, ...)
+_PARAMETER_ERROR_CODES = frozenset({1100, 1101, 1102})
+
+ENDPOINT_EWMA = register(
+    Gauge("vector_endpoint_latency_ewma_seconds", "EWMA of read latency per vector-store endpoint.", ("endpoint",))
+)
+ENDPOINT_FAILOVERS = register(
+    Counter("vector_endpoint_failovers_total", "Reads retried on another endpoint after this one failed.", ("endpoint",))
+)
+
+
+def _is_caller_error(error: Exception) -> bool:
+    if isinstance(error, _CALLER_ERRORS):
+        return True
+    try:
+        from pymilvus.exceptions import MilvusException, ParamError
+    except ImportError:  # pymilvus is optional (stand-in clients)
+        return False
+    if isinstance(error, ParamError):
+        return True
+    return isinstance(error, MilvusException) and getattr(error, "code", None) in _PARAMETER_ERROR_CODES
+
+
+class Endpoint:
+    """One cluster: its client (connected lazily), role, breaker and read-latency EWMA."""
+
+    def __init__(self, name: str, role: str, connect: Callable[[], Any], *, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.role = role
+        self._connect = connect
+        self.client: Any = None
+        self.breaker = breaker or CircuitBreaker(
+            f"vector_{name}",
+            failure_threshold=int(os.getenv("ZILLIZ_BREAKER_FAILURES", "3")),
+            cooldown_s=float(os.getenv("ZILLIZ_BREAKER_COOLDOWN_SEC", "15")),
+        )
+        self.ewma_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def ensure_client(self) -> Any:
+        if self.client is None:
+            self.client = self._connect()
+        return self.client
+
+    def as_dict(self) -> dict:
+        out = {
+            "role": self.role,
+            "connected": self.client is not None,
+            "breaker": self.breaker.as_dict(),
+            "latency_ewma_ms": None if self.ewma_s is None else round(self.ewma_s * 1000.0, 1),
+        }
+        if self.last_error:
+            out["last_error"] = self.last_error
+        return out
+
+
+class VectorRouter:
+    """MilvusClient-shaped facade over one primary and any number of read replicas."""
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        *,
+        alpha: float = 0.2,
+        explore_fraction: float = 0.05,
+        rng: Optional[random.Random] = None,
+    ):
+        primaries = [e for e in endpoints if e.role == PRIMARY]
+        if len(primaries) != 1:
+            raise ValueError("VectorRouter needs exactly one primary endpoint")
+        self.endpoints = list(endpoints)
+        self.primary = primaries[0]
+        self.alpha = alpha
+        self.explore_fraction = explore_fraction
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    def connect(self) -> "VectorRouter":
+        """Connect every endpoint that answers; fails only when none does (the health loop retries the rest)."""
+        for endpoint in self.endpoints:
+            try:
+                endpoint.ensure_client()
+            except Exception as e:
+                endpoint.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("Vector endpoint %s (%s) not connected: %s", endpoint.name, endpoint.role, e)
+        if not any(e.client is not None for e in self.endpoints):
+            raise ConnectionError("No vector-store endpoint reachable: " + "; ".join(e.last_error or "" for e in self.endpoints))
+        return self
+
+    # Routing
+
+    def _ranked(self) -> list[Endpoint]:
+        """Connected endpoints by EWMA (unmeasured first); sometimes one other is moved to the front."""
+        connected = [e for e in self.endpoints if e.client is not None]
+        with self._lock:
+            ranked = sorted(connected, key=lambda e: -1.0 if e.ewma_s is None else e.ewma_s)
+            if len(ranked) > 1 and self._rng.random() < self.explore_fraction:
+                ranked.insert(0, ranked.pop(self._rng.randrange(1, len(ranked))))
+        return ranked
+
+    @staticmethod
+    def _candidates(ranked: list[Endpoint]):
+        """Endpoints whose breaker allows a call, in order; those with open breakers only as a last resort."""
+        skipped = []
+        for endpoint in ranked:
+            if endpoint.breaker.allow():
+                yield endpoint
+            else:
+                skipped.append(endpoint)
+        yield from skipped
+
+    def _record(self, endpoint: Endpoint, elapsed_s: float) -> None:
+        with self._lock:
+            prev = endpoint.ewma_s
+            endpoint.ewma_s = elapsed_s if prev is None else prev + self.alpha * (elapsed_s - prev)
+        ENDPOINT_EWMA.set(endpoint.ewma_s, endpoint=endpoint.name)
+        endpoint.breaker.record_success()
+
+    def _read(self, method: str, args: tuple, kwargs: dict) -> Any:
+        ranked = self._ranked()
+        if not ranked:
+            raise ConnectionError("No vector-store endpoint connected")
+        last_error: Optional[Exception] = None
+        for attempt, endpoint in enumerate(self._candidates(ranked)):
+            if attempt and "timeout" in kwargs:
+                left = remaining_s()
+                if left is not None:
+                    if left <= 0:
+                        endpoint.breaker.release()  # return a half-open trial this attempt never used
+                        break
+                    kwargs = {**kwargs, "timeout": left}
+            start = time.perf_counter()
+            try:
+                result = getattr(endpoint.client, method)(*args, **kwargs)
+            except Exception as e:
+                if _is_caller_error(e):
+                    endpoint.breaker.release()
+                    raise
+                left = remaining_s()
+                if left is not None and left <= 0:
+                    # The request ran out of budget, not the endpoint: no penalty, no retry
+                    endpoint.breaker.release()
+                    raise
+                endpoint.breaker.record_failure()
+                endpoint.last_error = f"{type(e).__name__}: {e}"
+                ENDPOINT_FAILOVERS.inc(endpoint=endpoint.name)
+                logger.warning("%s on %s failed (%s); trying the next endpoint", method, endpoint.name, endpoint.last_error)
+                last_error = e
+                continue
+            self._record(endpoint, time.perf_counter() - start)
+            return result
+        raise last_error or ConnectionError("Request deadline spent before any endpoint answered")
+
+    def _write(self, method: str, args: tuple, kwargs: dict) -> Any:
+        return getattr(self.primary.ensure_client(), method)(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in READ_METHODS:
+            return lambda *args, **kwargs: self._read(name, args, kwargs)
+        attr = getattr(self.primary.ensure_client(), name)
+        if not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self._write(name, args, kwargs)
+
+    # Health
+
+    def probe(self, endpoint: Endpoint, collection_name: str) -> bool:
+        """Connect if needed and check the collection's load state; feeds the endpoint's breaker."""
+        try:
+            endpoint.ensure_client().get_load_state(collection_name=collection_name)
+        except Exception as e:
+            endpoint.last_error = f"{type(e).__name__}: {e}"
+            endpoint.breaker.record_failure()
+            return False
+        endpoint.last_error = None
+        endpoint.breaker.record_success()
+        return True
+
+    def as_dict(self) -> dict:
+        return {e.name: e.as_dict() for e in self.endpoints}
+
+
+def replica_endpoints() -> list[str]:
+    return [u.strip() for u in os.getenv("ZILLIZ_REPLICA_ENDPOINTS", "").split(",") if u.strip()]
+
+
+def health_interval_s() -> float:
+    return float(os.getenv("ZILLIZ_HEALTH_INTERVAL_SEC", "5"))
+
+
+def build_router(primary_connect: Callable[[], Any], replica_connects: list[Callable[[], Any]]) -> VectorRouter:
+    endpoints = [Endpoint("primary", PRIMARY, primary_connect)]
+    endpoints += [Endpoint(f"replica{i}", REPLICA, connect) for i, connect in enumerate(replica_connects, start=1)]
+    return VectorRouter(endpoints, explore_fraction=float(os.getenv("ZILLIZ_EXPLORE_FRACTION", "0.05")))
+
+
+async def health_loop(router: VectorRouter, collection_name: str, interval_s: float) -> None:
+    """Probe every endpoint each `interval_s` (in the default executor, concurrently) until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_s)
+        await asyncio.gather(
+            *(loop.run_in_executor(None, router.probe, e, collection_name) for e in router.endpoints),
+            return_exceptions=True,
+        )
@@ -1,16 +1,28 @@
 ﻿# app/main.py
 import asyncio
+import functools
+import json
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
+from typing import Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from pymilvus import MilvusClient
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 load_dotenv()
 
 from app.routes import recommendations
+from app.services import hot_keys
+from app.services.embedding_client import EMBEDDING_BREAKER, keep_model_warm, keepalive_interval_s
+from app.services.warmup import Readiness, connect_in_background
+from app.utils.admission import AdmissionRejected, admission_enabled, get_limiter, route_group
+from app.utils.metrics import REQUEST_LATENCY, REQUESTS_TOTAL, InstrumentedVectorClient, render_prometheus
+from app.utils.request_profiler import maybe_start_profile
+from app.utils.request_timing import begin_request
+from app.utils.vector_router import VectorRouter, build_router, health_interval_s, health_loop, replica_endpoints
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
@@ -20,35 +32,114 @@ if not logger.handlers:
     logger.setLevel(logging.INFO)
     logger.propagate = False
 
+# One JSON line per instrumented request (stage breakdown); same handler setup as above.
+timing_logger = logging.getLogger("app.timing")
+if not timing_logger.handlers:
+    _timing_handler = logging.StreamHandler()
+    _timing_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    timing_logger.addHandler(_timing_handler)
+    timing_logger.setLevel(logging.INFO)
+    timing_logger.propagate = False
+
+
+# Vector backends are imported inside the connect functions (run in the background connect task),
+# so pymilvus / numpy stay off the startup path. See app/jobs/import_time_report.py.
+
+
+def _milvus_client(endpoint: str, token: str):
+    from pymilvus import MilvusClient
 
-def _connect_zilliz(endpoint: str, token: str) -> MilvusClient:
     return MilvusClient(uri=endpoint, token=token)
 
 
+def _connect_zilliz(endpoint: str, token: str, router: Optional[VectorRouter] = None) -> InstrumentedVectorClient:
+    """One MilvusClient, or with ZILLIZ_REPLICA_ENDPOINTS the primary + replicas behind `router`."""
+    if router is not None:
+        return InstrumentedVectorClient(router.connect())
+    return InstrumentedVectorClient(_milvus_client(endpoint, token))
+
+
+def _zilliz_router(endpoint: str, token: str) -> Optional[VectorRouter]:
+    replicas = replica_endpoints()
+    if not replicas:
+        return None
+    replica_token = os.getenv("ZILLIZ_REPLICA_API_KEY", "").strip() or token
+    return build_router(
+        functools.partial(_milvus_client, endpoint, token),
+        [functools.partial(_milvus_client, uri, replica_token) for uri in replicas],
+    )
+
+
+def _open_local_store(path: Optional[str]) -> InstrumentedVectorClient:
+    from app.utils.local_vector_store import LocalMilvusClient
+
+    return InstrumentedVectorClient(LocalMilvusClient(path, must_exist=True), dependency="local_vector_store")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create Zilliz client at startup. Embeddings are done via external API (see embedding_client)."""
+    """Start the vector-store connect in the background so the port binds immediately.
+
+    Embeddings are done via external API (see embedding_client). VECTOR_BACKEND=local serves from the
+    in-process store at LOCAL_VECTOR_STORE_PATH instead (offline / load tests). Readiness (connected,
+    collection loaded, warm-up done) is reported at /readyz; see app/services/warmup.py.
+    """
     endpoint = os.getenv("ZILLIZ_ENDPOINT")
     token = os.getenv("ZILLIZ_API_KEY")
-    if endpoint and token:
-        timeout_s = float(os.getenv("ZILLIZ_CONNECT_TIMEOUT_SEC", "90"))
-        loop = asyncio.get_running_loop()
-        logger.info("Connecting to Zilliz (timeout %.0fs)...", timeout_s)
-        try:
-            app.state.zilliz_client = await asyncio.wait_for(
-                loop.run_in_executor(None, _connect_zilliz, endpoint, token),
-                timeout=timeout_s,
-            )
-        except asyncio.TimeoutError as e:
-            logger.error("Zilliz connect timed out after %.0fs", timeout_s)
-            raise RuntimeError(
-                f"Zilliz connection timed out after {timeout_s:.0f}s. "
-                "Check ZILLIZ_ENDPOINT, ZILLIZ_API_KEY, network, and firewall."
-            ) from e
-        logger.info("Zilliz client ready")
+    backend = os.getenv("VECTOR_BACKEND", "zilliz").strip().lower()
+    app.state.zilliz_client = None
+    connect_task = None
+    router = None
+    if backend == "local":
+        path = os.getenv("LOCAL_VECTOR_STORE_PATH", "").strip() or None
+        app.state.readiness = Readiness(backend="local")
+        connect = functools.partial(_open_local_store, path)
+    elif endpoint and token:
+        app.state.readiness = Readiness(backend="zilliz")
+        router = _zilliz_router(endpoint, token)
+        connect = functools.partial(_connect_zilliz, endpoint, token, router)
+        if router is not None:
+            app.state.readiness.probes["vector_endpoints"] = router.as_dict
     else:
-        app.state.zilliz_client = None
+        # Not configured: nothing to wait for; book routes return 503.
+        app.state.readiness = Readiness(connected=True, collection_loaded=True, warmed=True)
+        connect = None
+    app.state.readiness.probes["embedding_breaker"] = EMBEDDING_BREAKER.as_dict
+    if connect is not None:
+        connect_task = asyncio.create_task(
+            connect_in_background(
+                app,
+                connect,
+                app.state.readiness,
+                collection_name=recommendations.COLLECTION_NAME,
+            )
+        )
+    keepalive_task = None
+    if keepalive_interval_s() > 0 and os.getenv("EMBEDDING_API_TOKEN", "").strip():
+        keepalive_task = asyncio.create_task(keep_model_warm(keepalive_interval_s()))
+    health_task = None
+    if router is not None:
+        # Reconnect endpoints that were down at startup; open/close their breakers between requests
+        health_task = asyncio.create_task(health_loop(router, recommendations.COLLECTION_NAME, health_interval_s()))
+    hot_keys_task = None
+    if connect is not None and hot_keys.hot_keys_enabled():
+        # Re-populate hot responses before they expire; snapshot the sketch to HOT_KEYS_PATH
+        hot_keys_task = asyncio.create_task(
+            hot_keys.maintenance_loop(
+                lambda: app.state.zilliz_client if app.state.readiness.warmed else None,
+                functools.partial(recommendations.prefetch_hot_keys, due_only=True),
+                hot_keys.refresh_interval_s(),
+            )
+        )
     yield
+    for task in (connect_task, keepalive_task, health_task, hot_keys_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if hot_keys.hot_keys_enabled():
+        try:
+            hot_keys.save_snapshot()
+        except OSError as e:
+            logger.warning("Hot-key snapshot failed: %s", e)
     # No explicit close required for MilvusClient; process exit is fine
 
 
@@ -58,7 +149,88 @@ app = FastAPI(lifespan=lifespan)
 app.include_router(recommendations.router)
 
 
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Adaptive concurrency limit per route group; sheds load with 429/503 + Retry-After (app/utils/admission.py)."""
+    group = route_group(request.url.path) if admission_enabled() else None
+    if group is None:
+        return await call_next(request)
+    limiter = get_limiter(group)
+    try:
+        await limiter.acquire(recommendations.client_key(request))
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": f"Server busy ({e.reason}); retry later"},
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = await call_next(request)
+        ok = response.status_code < 500
+        return response
+    finally:
+        limiter.release(time.perf_counter() - start, ok=ok)
+
+
+# Registered after admission_control so it wraps it: shed requests still show up in metrics.
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """Metrics by route template (not raw path, to bound label cardinality) and tier; Server-Timing; opt-in profiles."""
+    timings = begin_request()
+    profile = maybe_start_profile(request.headers)
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - timings.start
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        tier = getattr(request.state, "recommend_tier", None) or "none"
+        if profile is not None:
+            await profile.finish(route, elapsed * 1000.0)
+        REQUEST_LATENCY.observe(elapsed, route=route, tier=str(tier))
+        REQUESTS_TOTAL.inc(route=route, status=str(status))
+        if response is not None:
+            response.headers["Server-Timing"] = timings.header_value()
+            if tier != "none":
+                response.headers["X-Recommend-Tier"] = str(tier)
+        if timings.stages:
+            timing_logger.info(
+                json.dumps({"route": route, "status": status, "tier": tier, **timings.as_log_fields()})
+            )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text exposition. Set METRICS_TOKEN to require ?token= or a Bearer header."""
+    expected = os.getenv("METRICS_TOKEN")
+    if expected:
+        if recommendations.request_token(request) != expected:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 @app.head("/")
 async def root():
     return {"message": "Hello World"}
+
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is up and serving the event loop."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz(request: Request):
+    """Readiness: vector store connected, collection loaded and warm-up finished."""
+    readiness = getattr(request.app.state, "readiness", None)
+    if readiness is None:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    body = readiness.as_dict()
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=body)